@@ -0,0 +1,175 @@
+"""
+acumulador.py — Escritura por columnas de resultados largos en Parquet.
+
+La extracción masiva de fichas acumulaba un ``dict`` por ficha en una
+lista y construía el DataFrame al final: en 100.000 URLs son cientos de
+miles de objetos vivos (y de MB) hasta el último momento, y nada del
+resultado se podía consultar mientras tanto.
+
+``AcumuladorColumnar`` guarda los valores en un búfer por columna (una
+lista de cadenas por campo, sin objeto por fila) y cada
+``filas_por_parte`` registros los vuelca como una parte Parquet nueva
+del directorio de destino. La memoria queda acotada por el tamaño de la
+parte, no por el de la extracción, y el directorio es desde la primera
+parte un *dataset* Parquet legible con pandas, DuckDB o ``leer``,
+mientras el rastreo sigue:
+
+    >>> pd.read_parquet("output/detalles_parciales/3f2a...")
+
+Cada parte se escribe en un temporal y se renombra: un lector nunca ve
+una parte a medias. Todas las columnas son texto, como las de la ficha.
+
+Uso:
+    >>> acumulador = AcumuladorColumnar(directorio, COLUMNAS_DETALLE)
+    >>> for detalle in detalles:
+    ...     acumulador.agregar(detalle)
+    >>> acumulador.cerrar()
+    >>> df = acumulador.leer()
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Any, Callable, Optional, Sequence
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from config import DETALLE_FILAS_POR_PARTE
+
+logger = logging.getLogger(__name__)
+
+_PATRON_PARTE = "parte-*.parquet"
+
+
+class AcumuladorColumnar:
+    """Búfer columnar de texto que se vuelca a partes Parquet.
+
+    Args:
+        directorio:      Carpeta del dataset (se crea si no existe). Las
+                         partes que ya tenga se conservan.
+        columnas:        Columnas, en orden; cada registro aporta un valor
+                         por columna.
+        filas_por_parte: Registros por parte Parquet.
+        al_volcar:       Callback opcional con los valores de
+                         ``columna_clave`` de cada parte recién escrita
+                         (p. ej. para marcarlos en la bitácora).
+        columna_clave:   Columna que se pasa a ``al_volcar``.
+    """
+
+    __slots__ = (
+        "directorio",
+        "columnas",
+        "filas_por_parte",
+        "columna_clave",
+        "_al_volcar",
+        "_buferes",
+        "_pendientes",
+        "_escritas",
+        "_esquema",
+    )
+
+    def __init__(
+        self,
+        directorio: str | Path,
+        columnas: Sequence[str],
+        filas_por_parte: int = DETALLE_FILAS_POR_PARTE,
+        al_volcar: Optional[Callable[[list[str]], None]] = None,
+        columna_clave: Optional[str] = None,
+    ) -> None:
+        self.directorio = Path(directorio)
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        self.columnas = tuple(columnas)
+        self.filas_por_parte = max(1, filas_por_parte)
+        self.columna_clave = columna_clave
+        self._al_volcar = al_volcar
+        self._buferes: tuple[list[str], ...] = tuple([] for _ in self.columnas)
+        self._pendientes = 0
+        self._escritas = 0
+        self._esquema = pa.schema([(columna, pa.string()) for columna in self.columnas])
+
+    # ── Escritura ───────────────────────────────────────────
+
+    def agregar(self, registro: Any) -> None:
+        """Añade un registro: un ``dict`` o un objeto con un atributo por columna."""
+        if isinstance(registro, dict):
+            valores = (registro.get(columna, "") for columna in self.columnas)
+        else:
+            valores = (getattr(registro, columna, "") for columna in self.columnas)
+        for bufer, valor in zip(self._buferes, valores):
+            bufer.append("" if valor is None else str(valor))
+        self._pendientes += 1
+        if self._pendientes >= self.filas_por_parte:
+            self.volcar()
+
+    def volcar(self) -> Optional[Path]:
+        """Escribe lo acumulado como una parte nueva y vacía los búferes.
+
+        Returns:
+            Ruta de la parte escrita, o ``None`` si no había nada.
+        """
+        if not self._pendientes:
+            return None
+
+        tabla = pa.Table.from_arrays(
+            [pa.array(bufer, type=pa.string()) for bufer in self._buferes],
+            schema=self._esquema,
+        )
+        nombre = f"parte-{time.time_ns():020d}-{os.getpid()}.parquet"
+        temporal = self.directorio / f".{nombre}.tmp"
+        pq.write_table(tabla, temporal)
+        os.replace(temporal, self.directorio / nombre)
+
+        claves = (
+            list(self._buferes[self.columnas.index(self.columna_clave)])
+            if self.columna_clave is not None
+            else []
+        )
+        self._escritas += self._pendientes
+        logger.debug("Parte %s: %d filas.", nombre, self._pendientes)
+        for bufer in self._buferes:
+            bufer.clear()
+        self._pendientes = 0
+
+        if self._al_volcar is not None:
+            self._al_volcar(claves)
+        return self.directorio / nombre
+
+    def cerrar(self) -> None:
+        """Vuelca lo que quede en los búferes."""
+        self.volcar()
+
+    @property
+    def filas(self) -> int:
+        """Registros añadidos en esta sesión (escritos y en búfer)."""
+        return self._escritas + self._pendientes
+
+    # ── Lectura ─────────────────────────────────────────────
+
+    def partes(self) -> list[Path]:
+        """Partes ya escritas, en orden de escritura."""
+        return sorted(self.directorio.glob(_PATRON_PARTE))
+
+    def leer(self, columnas: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """Todas las partes escritas como un único DataFrame.
+
+        Lo que sigue en los búferes no se incluye (``volcar`` antes si
+        hace falta).
+        """
+        partes = self.partes()
+        columnas = list(columnas or self.columnas)
+        if not partes:
+            return pd.DataFrame(columns=columnas)
+        return pq.read_table(partes, columns=columnas, schema=self._esquema).to_pandas()
+
+    def borrar(self) -> None:
+        """Elimina el directorio con todas sus partes."""
+        for bufer in self._buferes:
+            bufer.clear()
+        self._pendientes = 0
+        shutil.rmtree(self.directorio, ignore_errors=True)
@@ -0,0 +1,419 @@
+"""
+agregados_api.py — Agregados del Estudio del Sector calculados en Socrata.
+
+Para construir un Estudio del Sector el dashboard descargaba todos los
+contratos que coincidían con los filtros (con un tope de 20.000 por
+defecto) solo para que ``estudio_sector`` los agrupara y sumara en
+pandas: sobre el universo completo de SECOP II (casi 6 millones de
+filas) la muestra quedaba truncada y las cifras no eran las del mercado.
+
+Aquí cada tabla del estudio se pide ya agregada con ``$select`` +
+``$group``, de modo que por la red solo viaja una fila por categoría:
+
+  • **Totales**: ``count(*)``, ``sum(valor_del_contrato)`` y el rango de
+    fechas, en una sola fila.
+  • **Distribuciones** (modalidad, tipo, entidad, ciudad, estado,
+    proveedor): contratos y valor por categoría. Se traen todas las
+    categorías, no solo las primeras, para que los porcentajes y el
+    número de proveedores sean exactos.
+  • **Series**: contratos y valor por año y por mes de
+    ``fecha_de_inicio_del_contrato``.
+  • **Precios**: el bloque de ``estudio_sector.calcular_estadisticas``
+    calculado en el servidor. Conteo, suma, media, extremos y desviación
+    salen de una sola fila agregada; cada cuantil, de los dos valores
+    vecinos de su posición en el orden por valor (``$offset``), con la
+    misma interpolación que pandas; la moda, de un ``$group`` con
+    ``$limit=1``. Son exactos y por la red viajan unas pocas filas, no
+    una por contrato (agrupar por valor devolvía casi una fila por
+    contrato, porque los valores apenas se repiten).
+  • **Anexo**: solo se descargan los ``tope_anexo`` contratos de mayor
+    valor, y de ellos solo las columnas del perfil ``"anexo"``.
+
+Las consultas son independientes y se lanzan en paralelo
+(``API_HILOS``).
+
+Uso:
+    >>> from agregados_api import agregar_universo
+    >>> agregados = agregar_universo(palabra_clave="vigilancia")
+    >>> agregados.total_contratos
+"""
+
+from __future__ import annotations
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Optional
+
+import pandas as pd
+
+from api_scraper import (
+    columnas_perfil,
+    construir_where,
+    descargar_paginado,
+    pedir_pagina,
+)
+from cache_disco import huella
+from config import API_HILOS, SOCRATA_DATASET_CONTRATOS
+
+logger = logging.getLogger(__name__)
+
+CAMPO_FECHA = "fecha_de_inicio_del_contrato"
+CAMPO_VALOR = "valor_del_contrato"
+
+# Columnas cuyas distribuciones lleva el estudio.
+COLUMNAS_DISTRIBUCION: tuple[str, ...] = (
+    "modalidad_de_contratacion",
+    "tipo_de_contrato",
+    "nombre_entidad",
+    "ciudad",
+    "estado_contrato",
+    "proveedor_adjudicado",
+)
+
+
+@dataclass
+class AgregadosEstudio:
+    """Lo que necesita ``estudio_sector`` del universo filtrado.
+
+    Attributes:
+        total_contratos: Contratos que cumplen los filtros.
+        valor_total:     Suma de ``valor_del_contrato``.
+        grupos:          Por columna, todas sus categorías con
+                         ``categoria``, ``contratos`` y ``valor_total``
+                         (``categoria`` nula = sin informar).
+        por_anio:        ``anio``, ``contratos``, ``valor_total``.
+        por_mes:         ``mes`` (1-12), ``contratos``.
+        periodo:         Primera y última fecha de inicio, si las hay.
+        estadisticas:    Estadísticas de ``valor_del_contrato`` con las
+                         claves de ``estudio_sector.calcular_estadisticas``.
+        muestra:         Los contratos de mayor valor (perfil del anexo).
+    """
+
+    total_contratos: int
+    valor_total: float
+    grupos: dict[str, pd.DataFrame]
+    por_anio: pd.DataFrame
+    por_mes: pd.DataFrame
+    periodo: Optional[tuple[pd.Timestamp, pd.Timestamp]]
+    estadisticas: dict[str, Any]
+    muestra: pd.DataFrame
+
+
+# ────────────────────────────────────────────────────────────
+# CONSULTAS AGREGADAS
+# ────────────────────────────────────────────────────────────
+
+
+def _numerico(df: pd.DataFrame, columnas: Iterable[str]) -> pd.DataFrame:
+    """Socrata entrega los agregados como texto."""
+    for columna in columnas:
+        if columna not in df.columns:
+            df[columna] = 0
+        df[columna] = pd.to_numeric(df[columna], errors="coerce").fillna(0)
+    return df
+
+
+def _agrupar(
+    dataset: str, where: str, expresion: str, alias: str, valor: bool = True
+) -> pd.DataFrame:
+    """Contratos (y valor) por cada valor de ``expresion``, paginado."""
+    select = f"{expresion} as {alias}, count(*) as contratos"
+    if valor:
+        select += f", sum({CAMPO_VALOR}) as valor_total"
+    filas = descargar_paginado(
+        dataset, where=where, select=select, order=expresion, group=expresion
+    )
+    df = pd.DataFrame(filas)
+    if alias not in df.columns:
+        df[alias] = None
+    return _numerico(df, ["contratos"] + (["valor_total"] if valor else []))
+
+
+def _totales(dataset: str, where: str) -> dict[str, Any]:
+    filas = pedir_pagina(
+        dataset,
+        where=where,
+        select=(
+            f"count(*) as contratos, sum({CAMPO_VALOR}) as valor_total, "
+            f"min({CAMPO_FECHA}) as desde, max({CAMPO_FECHA}) as hasta"
+        ),
+        limit=1,
+        order="",
+    )
+    return filas[0] if filas else {}
+
+
+def _serie(dataset: str, where: str, funcion: str, alias: str, valor: bool) -> pd.DataFrame:
+    """Serie temporal por ``funcion(fecha)`` (año o mes), sin fechas nulas."""
+    df = _agrupar(dataset, where, f"{funcion}({CAMPO_FECHA})", alias, valor)
+    df[alias] = pd.to_numeric(df[alias], errors="coerce")
+    df = df.dropna(subset=[alias])
+    df[alias] = df[alias].astype(int)
+    columnas = [alias, "contratos"] + (["valor_total"] if valor else [])
+    return df[columnas].sort_values(alias).reset_index(drop=True)
+
+
+# ────────────────────────────────────────────────────────────
+# ESTADÍSTICAS DE PRECIOS
+# ────────────────────────────────────────────────────────────
+
+
+def _y(where: str, condicion: str) -> str:
+    return f"({where}) AND {condicion}" if where else condicion
+
+
+def _resumen_valor(dataset: str, filtro: str) -> dict[str, float]:
+    """Conteo, suma, media, extremos y desviación muestral, en una fila."""
+    filas = pedir_pagina(
+        dataset,
+        where=filtro,
+        select=(
+            f"count(*) as n, sum({CAMPO_VALOR}) as suma, "
+            f"avg({CAMPO_VALOR}) as media, min({CAMPO_VALOR}) as minimo, "
+            f"max({CAMPO_VALOR}) as maximo, "
+            f"stddev_samp({CAMPO_VALOR}) as desviacion"
+        ),
+        limit=1,
+        order="",
+    )
+    fila = filas[0] if filas else {}
+    # Con un solo valor la desviación llega nula.
+    return {
+        clave: float(fila.get(clave) or 0)
+        for clave in ("n", "suma", "media", "minimo", "maximo", "desviacion")
+    }
+
+
+def _cuantil(dataset: str, filtro: str, n: int, q: float) -> float:
+    """Cuantil ``q`` de ``n`` valores con la interpolación lineal de pandas.
+
+    Solo se piden los dos valores vecinos de la posición ``(n - 1) * q``
+    en el orden por valor.
+
+    Raises:
+        RuntimeError: Si los datos cambiaron y la posición ya no existe.
+    """
+    posicion = (n - 1) * q
+    base = int(posicion)
+    filas = pedir_pagina(
+        dataset,
+        where=filtro,
+        select=f"{CAMPO_VALOR} as valor",
+        limit=2,
+        offset=base,
+        order=CAMPO_VALOR,
+    )
+    vecinos = [float(fila["valor"]) for fila in filas]
+    if not vecinos:
+        raise RuntimeError("Los valores cambiaron mientras se calculaban los cuantiles.")
+    if len(vecinos) == 1:
+        return vecinos[0]
+    return vecinos[0] + (posicion - base) * (vecinos[1] - vecinos[0])
+
+
+def _moda(dataset: str, filtro: str) -> Optional[float]:
+    """Valor más repetido (el menor, si empatan, como ``Series.mode``)."""
+    filas = pedir_pagina(
+        dataset,
+        where=filtro,
+        select=f"{CAMPO_VALOR} as valor, count(*) as frecuencia",
+        limit=1,
+        order=f"count(*) DESC, {CAMPO_VALOR}",
+        group=CAMPO_VALOR,
+    )
+    return float(filas[0]["valor"]) if filas else None
+
+
+def _bloque_valor(dataset: str, filtro: str) -> dict[str, Any]:
+    """Bloque ``ajustadas`` de ``calcular_estadisticas``."""
+    resumen = _resumen_valor(dataset, filtro)
+    n = int(resumen["n"])
+    if not n:
+        return {"n": 0}
+    media, desviacion = resumen["media"], resumen["desviacion"]
+    return {
+        "n": n,
+        "media": media,
+        "mediana": _cuantil(dataset, filtro, n, 0.50),
+        "minimo": resumen["minimo"],
+        "maximo": resumen["maximo"],
+        "desviacion": desviacion,
+        "coef_variacion": (desviacion / media * 100) if media else 0.0,
+        "total": resumen["suma"],
+    }
+
+
+def _estadisticas_valor(dataset: str, where: str) -> dict[str, Any]:
+    """``estudio_sector.calcular_estadisticas`` de los valores positivos.
+
+    Returns:
+        Las mismas claves, calculadas en Socrata; ``{"n": 0}`` si no hay
+        valores.
+    """
+    filtro = _y(where, f"{CAMPO_VALOR} > 0")
+    resumen = _resumen_valor(dataset, filtro)
+    n = int(resumen["n"])
+    if not n:
+        return {"n": 0}
+
+    cuantiles = {q: _cuantil(dataset, filtro, n, q) for q in (0.10, 0.25, 0.50, 0.75, 0.90)}
+    q1, q2, q3 = cuantiles[0.25], cuantiles[0.50], cuantiles[0.75]
+    ric = q3 - q1
+    limite_inferior = q1 - 1.5 * ric
+    limite_superior = q3 + 1.5 * ric
+
+    # ``repr`` da el literal exacto del límite; el inferior solo filtra
+    # si es positivo (los valores ya lo son).
+    dentro = f"{CAMPO_VALOR} <= {limite_superior!r}"
+    fuera = f"{CAMPO_VALOR} > {limite_superior!r}"
+    if limite_inferior > 0:
+        dentro += f" AND {CAMPO_VALOR} >= {limite_inferior!r}"
+        fuera = f"({fuera} OR {CAMPO_VALOR} < {limite_inferior!r})"
+    ajustadas = _bloque_valor(dataset, _y(filtro, dentro))
+    n_atipicos = n - ajustadas["n"]
+    mayores = pedir_pagina(
+        dataset,
+        where=_y(filtro, fuera),
+        select=f"{CAMPO_VALOR} as valor",
+        limit=5,
+        order=f"{CAMPO_VALOR} DESC",
+    ) if n_atipicos else []
+
+    media, desviacion = resumen["media"], resumen["desviacion"]
+    return {
+        "n": n,
+        "media": media,
+        "mediana": q2,
+        "moda": _moda(dataset, filtro),
+        "minimo": resumen["minimo"],
+        "maximo": resumen["maximo"],
+        "rango": resumen["maximo"] - resumen["minimo"],
+        "suma": resumen["suma"],
+        "varianza": desviacion**2,
+        "desviacion": desviacion,
+        "coef_variacion": (desviacion / media * 100) if media else 0.0,
+        "q1": q1,
+        "q2": q2,
+        "q3": q3,
+        "ric": ric,
+        "p10": cuantiles[0.10],
+        "p90": cuantiles[0.90],
+        "limite_inferior": limite_inferior,
+        "limite_superior": limite_superior,
+        "atipicos": {
+            "n": n_atipicos,
+            "pct": n_atipicos / n * 100,
+            "valores": [float(fila["valor"]) for fila in mayores],
+        },
+        "ajustadas": ajustadas,
+    }
+
+
+# ────────────────────────────────────────────────────────────
+# AGREGADOS DEL ESTUDIO
+# ────────────────────────────────────────────────────────────
+
+
+def _muestra(dataset: str, where: str, tope: int, columnas: list[str]) -> pd.DataFrame:
+    filas = pedir_pagina(
+        dataset,
+        where=where,
+        select=",".join(columnas),
+        limit=tope,
+        order=f"{CAMPO_VALOR} DESC",
+    )
+    df = pd.DataFrame(filas)
+    for columna in columnas:
+        if columna not in df.columns:
+            df[columna] = pd.NA
+    return df[columnas]
+
+
+def version_universo(
+    dataset: str = SOCRATA_DATASET_CONTRATOS, **filtros: Any
+) -> str:
+    """Versión barata de los datos de unos filtros, con una sola petición.
+
+    Cambia si cambian el número de contratos, su valor total o la última
+    fecha de inicio: sirve para saber si un estudio en caché sigue al día
+    sin recalcular los agregados.
+    """
+    where = construir_where(**filtros)
+    totales = _totales(dataset, where)
+    return huella(
+        "universo", dataset, where,
+        totales.get("contratos"), totales.get("valor_total"), totales.get("hasta"),
+    )
+
+
+def agregar_universo(
+    departamento: Optional[str] = None,
+    modalidad: Optional[str | Iterable[str]] = None,
+    estado: Optional[str] = None,
+    palabra_clave: Optional[str] = None,
+    fecha_inicio: Optional[str] = None,
+    fecha_fin: Optional[str] = None,
+    tipo_contrato: Optional[str | Iterable[str]] = None,
+    dataset: str = SOCRATA_DATASET_CONTRATOS,
+    tope_anexo: int = 50,
+    perfil_anexo: str = "anexo",
+    hilos: int = API_HILOS,
+) -> AgregadosEstudio:
+    """Calcula en Socrata los agregados del estudio para unos filtros.
+
+    Acepta los mismos filtros que ``api_scraper.consultar_contratos``.
+
+    Args:
+        tope_anexo:   Contratos de mayor valor que se descargan.
+        perfil_anexo: Sus columnas (``api_scraper.PERFILES_PROYECCION``).
+        hilos:        Consultas agregadas que se lanzan a la vez.
+
+    Returns:
+        Los agregados, sin tope de registros.
+
+    Raises:
+        RuntimeError: Si alguna consulta a la API falla.
+        ValueError:   Si el perfil no existe.
+    """
+    columnas_anexo = columnas_perfil(perfil_anexo)
+    where = construir_where(
+        departamento, modalidad, estado, palabra_clave,
+        fecha_inicio, fecha_fin, tipo_contrato,
+    )
+
+    tareas: dict[str, Callable[[], Any]] = {
+        "totales": lambda: _totales(dataset, where),
+        "por_anio": lambda: _serie(dataset, where, "date_extract_y", "anio", True),
+        "por_mes": lambda: _serie(dataset, where, "date_extract_m", "mes", False),
+        "estadisticas": lambda: _estadisticas_valor(dataset, where),
+        "muestra": lambda: _muestra(dataset, where, tope_anexo, columnas_anexo),
+    }
+    for columna in COLUMNAS_DISTRIBUCION:
+        tareas[columna] = lambda c=columna: _agrupar(dataset, where, c, "categoria")
+
+    with ThreadPoolExecutor(max_workers=max(1, hilos), thread_name_prefix="secop-agregados") as pool:
+        futuros = {nombre: pool.submit(tarea) for nombre, tarea in tareas.items()}
+        resultados = {nombre: futuro.result() for nombre, futuro in futuros.items()}
+
+    totales = resultados["totales"]
+    desde = pd.to_datetime(totales.get("desde"), errors="coerce")
+    hasta = pd.to_datetime(totales.get("hasta"), errors="coerce")
+    agregados = AgregadosEstudio(
+        total_contratos=int(totales.get("contratos", 0) or 0),
+        valor_total=float(totales.get("valor_total", 0) or 0),
+        grupos={c: resultados[c] for c in COLUMNAS_DISTRIBUCION},
+        por_anio=resultados["por_anio"],
+        por_mes=resultados["por_mes"],
+        periodo=None if pd.isna(desde) or pd.isna(hasta) else (desde, hasta),
+        estadisticas=resultados["estadisticas"],
+        muestra=resultados["muestra"],
+    )
+    logger.info(
+        "Agregados del estudio en la API: %d contratos, %d con valor, "
+        "%d proveedores.",
+        agregados.total_contratos,
+        agregados.estadisticas["n"],
+        len(agregados.grupos["proveedor_adjudicado"]),
+    )
+    return agregados
@@ -0,0 +1,305 @@
+"""
+analitica.py — Consultas SQL analíticas sobre las salidas en Parquet.
+
+El análisis del dashboard y del Estudio del Sector trabaja sobre un
+DataFrame cargado entero en memoria. Con historiales de millones de
+filas eso deja de ser viable. Este módulo expone las salidas en disco
+como vistas de DuckDB, un motor columnar embebido que lee Parquet
+directamente:
+
+  • **Proyección**: solo se leen las columnas que usa la consulta.
+  • **Predicados**: los filtros del ``WHERE`` se evalúan contra las
+    estadísticas de cada *row group* y se saltan los que no pueden
+    coincidir.
+  • El resultado (normalmente un agregado pequeño) es lo único que
+    llega a pandas.
+
+Vistas registradas por ``MotorAnalitico.por_defecto``:
+  • ``sincronizados``: las copias locales de ``sincronizacion.py``.
+  • ``historico``: la base particionada de ``historico.py``, si se
+    indica su directorio (solo la versión vigente de cada registro).
+
+Cualquier otro Parquet o CSV se añade con ``registrar``.
+
+Uso:
+    >>> from analitica import MotorAnalitico
+    >>> with MotorAnalitico.por_defecto() as motor:
+    ...     motor.consultar(
+    ...         "SELECT departamento, count(*) AS n, sum(valor_del_contrato) AS valor "
+    ...         "FROM sincronizados WHERE fecha_de_firma >= ? GROUP BY 1",
+    ...         ["2024-01-01"],
+    ...     )
+
+Requiere ``duckdb`` (``pip install duckdb``); el resto del pipeline no
+depende de él.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import sqlite3
+from contextlib import closing
+from glob import glob
+from pathlib import Path
+from typing import Any, Optional, Sequence
+
+import pandas as pd
+
+from config import SYNC_DIR
+from historico import BaseHistorica
+
+logger = logging.getLogger(__name__)
+
+_RE_IDENTIFICADOR = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def _identificador(nombre: str) -> str:
+    """Valida un nombre de vista (se interpola en el SQL)."""
+    if not _RE_IDENTIFICADOR.match(nombre):
+        raise ValueError(f"Nombre de tabla no válido: {nombre!r}")
+    return nombre
+
+
+def _literal(texto: str) -> str:
+    return "'" + texto.replace("'", "''") + "'"
+
+
+def _lista_archivos(rutas: Sequence[Path]) -> str:
+    return "[" + ", ".join(_literal(r.as_posix()) for r in rutas) + "]"
+
+
+class MotorAnalitico:
+    """Conexión DuckDB en memoria con vistas sobre archivos en disco.
+
+    Las vistas no copian datos: cada consulta vuelve a leer los archivos,
+    así que reflejan el estado actual del disco.
+
+    Args:
+        hilos: Hilos de ejecución de DuckDB. ``None`` = todos los núcleos.
+
+    Raises:
+        RuntimeError: Si ``duckdb`` no está instalado.
+    """
+
+    def __init__(self, hilos: Optional[int] = None) -> None:
+        try:
+            import duckdb
+        except ImportError as exc:
+            raise RuntimeError(
+                "El motor analítico requiere duckdb. Instálalo con "
+                "'pip install duckdb'."
+            ) from exc
+
+        self._conexion = duckdb.connect(database=":memory:")
+        if hilos:
+            self._conexion.execute(f"SET threads = {int(hilos)}")
+        self._vistas: dict[str, str] = {}
+
+    @classmethod
+    def por_defecto(
+        cls, historico: Optional[str | Path] = None, **kwargs: Any
+    ) -> "MotorAnalitico":
+        """Crea un motor con las salidas habituales del pipeline.
+
+        Args:
+            historico: Directorio de una base de ``historico.py``.
+        """
+        motor = cls(**kwargs)
+        copias = sorted(Path(SYNC_DIR).glob("*/datos.parquet"))
+        if copias:
+            motor.registrar("sincronizados", copias)
+        if historico is not None:
+            motor.registrar_historico("historico", historico)
+        return motor
+
+    # ── Registro de vistas ──────────────────────────────────
+
+    def registrar(self, nombre: str, rutas: str | Path | Sequence[Path]) -> None:
+        """Registra uno o varios archivos como vista.
+
+        Args:
+            nombre: Nombre de la vista en SQL.
+            rutas:  Archivo, directorio (todos sus ``*.parquet``), patrón
+                    glob o lista de archivos. Los ``.csv`` se leen con
+                    detección de tipos; el resto como Parquet.
+
+        Raises:
+            FileNotFoundError: Si no hay archivos que registrar.
+        """
+        nombre = _identificador(nombre)
+        if isinstance(rutas, (str, Path)):
+            ruta = Path(rutas)
+            if ruta.is_dir():
+                archivos = sorted(ruta.rglob("*.parquet"))
+            elif any(c in str(rutas) for c in "*?["):
+                archivos = [Path(a) for a in sorted(glob(str(rutas), recursive=True))]
+            else:
+                archivos = [ruta] if ruta.exists() else []
+        else:
+            archivos = [Path(r) for r in rutas]
+
+        if not archivos:
+            raise FileNotFoundError(f"No hay archivos para la tabla '{nombre}': {rutas}")
+
+        if all(a.suffix.lower() == ".csv" for a in archivos):
+            origen = (
+                f"read_csv_auto({_lista_archivos(archivos)}, "
+                "union_by_name = true, header = true)"
+            )
+        else:
+            origen = f"read_parquet({_lista_archivos(archivos)}, union_by_name = true)"
+
+        self._crear_vista(nombre, f"SELECT * FROM {origen}")
+        logger.info("Tabla '%s' registrada (%d archivos).", nombre, len(archivos))
+
+    def registrar_historico(
+        self,
+        nombre: str,
+        directorio: str | Path,
+        columna_clave: Optional[str] = None,
+    ) -> None:
+        """Registra la versión vigente de una base de ``historico.py``.
+
+        Las particiones conservan las filas reemplazadas; la vista las
+        descarta cruzando cada fila con el índice de claves (que se lee
+        del SQLite de la base: solo claves y particiones, no datos).
+
+        Args:
+            nombre:        Nombre de la vista en SQL.
+            directorio:    Carpeta de la base.
+            columna_clave: Clave de la base; por defecto la guardada en
+                           su índice (``numero_proceso`` o ``id_contrato``).
+
+        Raises:
+            FileNotFoundError: Si el directorio no es una base histórica.
+            ValueError: Si ``columna_clave`` no es la clave de la base.
+        """
+        nombre = _identificador(nombre)
+        directorio = Path(directorio)
+        ruta_indice = directorio / "indice.sqlite"
+        if not ruta_indice.exists():
+            raise FileNotFoundError(f"No hay base histórica en '{directorio}'.")
+
+        with closing(sqlite3.connect(ruta_indice)) as conexion:
+            indice = pd.read_sql_query(
+                "SELECT clave, particion FROM claves", conexion
+            )
+        if indice.empty:
+            raise FileNotFoundError(f"La base histórica '{directorio}' está vacía.")
+        columna_clave = BaseHistorica(directorio, columna_clave).columna_clave
+
+        archivos = [directorio / p for p in sorted(indice["particion"].unique())]
+        indice["particion"] = [(directorio / p).as_posix() for p in indice["particion"]]
+
+        tabla_indice = f"_indice_{nombre}"
+        self._conexion.register(tabla_indice, indice)
+        self._crear_vista(
+            nombre,
+            f"SELECT t.* EXCLUDE (filename) "
+            f"FROM read_parquet({_lista_archivos(archivos)}, "
+            f"union_by_name = true, filename = true) AS t "
+            f"JOIN {tabla_indice} AS i "
+            f"ON i.particion = t.filename "
+            f"AND i.clave = trim(CAST(t.{_identificador(columna_clave)} AS VARCHAR))",
+        )
+        logger.info(
+            "Base histórica '%s' registrada como '%s' (%d registros vigentes).",
+            directorio, nombre, len(indice),
+        )
+
+    def registrar_dataframe(self, nombre: str, df: pd.DataFrame) -> None:
+        """Expone un DataFrame ya cargado como tabla (sin copiarlo)."""
+        nombre = _identificador(nombre)
+        self._conexion.register(nombre, df)
+        self._vistas[nombre] = "DataFrame"
+
+    def _crear_vista(self, nombre: str, sql: str) -> None:
+        self._conexion.execute(f"CREATE OR REPLACE VIEW {nombre} AS {sql}")
+        self._vistas[nombre] = sql
+
+    # ── Consultas ───────────────────────────────────────────
+
+    @property
+    def tablas(self) -> list[str]:
+        """Nombres de las vistas registradas."""
+        return sorted(self._vistas)
+
+    def consultar(
+        self, sql: str, parametros: Optional[Sequence[Any]] = None
+    ) -> pd.DataFrame:
+        """Ejecuta una consulta y devuelve el resultado como DataFrame.
+
+        Args:
+            sql:        Consulta SQL (dialecto DuckDB).
+            parametros: Valores para los marcadores ``?``. Úsalos para
+                        los valores que vienen del usuario en lugar de
+                        interpolarlos en el texto.
+        """
+        logger.debug("SQL: %s | %s", sql, parametros)
+        return self._conexion.execute(sql, parametros or []).df()
+
+    def agregar(
+        self,
+        tabla: str,
+        por: Sequence[str],
+        medidas: dict[str, str],
+        filtros: Optional[dict[str, Any]] = None,
+    ) -> pd.DataFrame:
+        """Atajo para el agregado más común: filtrar, agrupar y resumir.
+
+        Args:
+            tabla:   Vista registrada.
+            por:     Columnas de agrupación.
+            medidas: ``{alias: expresión}``, p. ej.
+                     ``{"n": "count(*)", "valor": "sum(valor_del_contrato)"}``.
+            filtros: ``{columna: valor}`` por igualdad; una lista o tupla
+                     se traduce a ``IN``.
+
+        Returns:
+            DataFrame con una fila por grupo, ordenado por la primera
+            medida de mayor a menor.
+        """
+        tabla = _identificador(tabla)
+        grupos = [_identificador(c) for c in por]
+        columnas = grupos + [
+            f"{expresion} AS {_identificador(alias)}"
+            for alias, expresion in medidas.items()
+        ]
+
+        condiciones, parametros = [], []
+        for columna, valor in (filtros or {}).items():
+            columna = _identificador(columna)
+            if isinstance(valor, (list, tuple, set)):
+                valores = list(valor)
+                marcadores = ", ".join("?" * len(valores))
+                condiciones.append(f"{columna} IN ({marcadores})")
+                parametros.extend(valores)
+            else:
+                condiciones.append(f"{columna} = ?")
+                parametros.append(valor)
+
+        sql = f"SELECT {', '.join(columnas)} FROM {tabla}"
+        if condiciones:
+            sql += " WHERE " + " AND ".join(condiciones)
+        if grupos:
+            sql += " GROUP BY " + ", ".join(grupos)
+        if medidas:
+            sql += f" ORDER BY {next(iter(medidas))} DESC"
+        return self.consultar(sql, parametros)
+
+    def explicar(self, sql: str) -> str:
+        """Plan de ejecución (útil para comprobar el *pushdown*)."""
+        filas = self._conexion.execute(f"EXPLAIN {sql}").fetchall()
+        return "\n".join(str(fila[-1]) for fila in filas)
+
+    # ── Ciclo de vida ───────────────────────────────────────
+
+    def cerrar(self) -> None:
+        self._conexion.close()
+
+    def __enter__(self) -> "MotorAnalitico":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.cerrar()
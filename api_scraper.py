@@ -30,6 +30,7 @@ from __future__ import annotations
 import json
 import logging
 import time
+from concurrent.futures import ThreadPoolExecutor
 import urllib.error
 import urllib.parse
 import urllib.request
@@ -37,6 +38,7 @@ from typing import Any, Iterable, Optional
 
 import pandas as pd
 
+from cache_disco import CacheDisco, huella
 from catalogos import (
     DEPARTAMENTOS,
     ESTADOS,
@@ -45,9 +47,14 @@ from catalogos import (
     buscar_opcion,
 )
 from config import (
+    API_HILOS,
+    BUSQUEDA_TEXTO,
+    CACHE_DIR,
     CSV_ENCODING,
     CSV_SEPARATOR,
     ESTADO_SECOP1,
+    FACETAS_MAX_MB,
+    FACETAS_TTL,
     MAX_RETRIES,
     OUTPUT_DIR,
     RETRY_BACKOFF,
@@ -108,6 +115,63 @@ COLUMNAS_API = [
     "urlproceso",
 ]
 
+# Perfiles de proyección: qué columnas pide ``$select`` según el uso que
+# se les va a dar. Pedir solo las necesarias reduce el JSON que envía
+# Socrata y lo que cuesta decodificarlo; ``consulta.normalizar_esquema``
+# rellena con nulos las que falten.
+PERFILES_PROYECCION: dict[str, tuple[str, ...]] = {
+    "completo": tuple(COLUMNAS_API),
+    # Las que muestra el dashboard (``consulta.ESQUEMA_DASHBOARD``).
+    "dashboard": (
+        "nombre_entidad",
+        "objeto_del_contrato",
+        "valor_del_contrato",
+        "valor_pagado",
+        "modalidad_de_contratacion",
+        "ciudad",
+        "departamento",
+        "estado_contrato",
+        "tipo_de_contrato",
+        "proveedor_adjudicado",
+        "proceso_de_compra",
+        "urlproceso",
+        "fecha_de_inicio_del_contrato",
+        "fecha_de_fin_del_contrato",
+    ),
+    # Precios y oferentes (``analizar_mercado`` y ``analizar_oferta``).
+    "estudio-mercado": ("id_contrato", "valor_del_contrato", "proveedor_adjudicado"),
+    # Relación de contratos del anexo del estudio (``filas_anexo``).
+    "anexo": (
+        "proceso_de_compra",
+        "modalidad_de_contratacion",
+        "proveedor_adjudicado",
+        "nombre_entidad",
+        "ciudad",
+        "objeto_del_contrato",
+        "valor_del_contrato",
+        "fecha_de_inicio_del_contrato",
+        "fecha_de_fin_del_contrato",
+        "urlproceso",
+    ),
+    # Identificadores y enlaces, p. ej. para listar fichas.
+    "ids": ("id_contrato", "proceso_de_compra", "urlproceso"),
+}
+
+
+def columnas_perfil(perfil: str) -> list[str]:
+    """Columnas de un perfil de ``PERFILES_PROYECCION``.
+
+    Raises:
+        ValueError: Si el perfil no existe.
+    """
+    try:
+        return list(PERFILES_PROYECCION[perfil])
+    except KeyError:
+        raise ValueError(
+            f"Perfil de proyección desconocido: {perfil!r}. "
+            f"Disponibles: {', '.join(PERFILES_PROYECCION)}."
+        ) from None
+
 
 # ────────────────────────────────────────────────────────────
 # CONSTRUCCIÓN DEL FILTRO SoQL
@@ -221,7 +285,7 @@ def _traducir_estado(estado: str) -> list[str]:
     return list(opcion.api_valores)
 
 
-def _construir_where(
+def construir_where(
     departamento: Optional[str] = None,
     modalidad: Optional[str | Iterable[str]] = None,
     estado: Optional[str] = None,
@@ -305,6 +369,10 @@ def _construir_where(
 # ────────────────────────────────────────────────────────────
 # TRANSPORTE HTTP
 # ────────────────────────────────────────────────────────────
+#
+# ``pedir_pagina`` y ``descargar_paginado``, junto con ``construir_where``,
+# son la base sobre la que ``fragmentos_api``, ``agregados_api`` y
+# ``sincronizacion`` arman sus propias consultas.
 
 
 def _fetch(
@@ -356,30 +424,88 @@ def _fetch(
     )
 
 
-def _fetch_page(
+def pedir_pagina(
     dataset: str,
     where: str,
     select: str,
     limit: int = SOCRATA_PAGE_SIZE,
     offset: int = 0,
     order: str = ":id",
+    group: str = "",
+    q: str = "",
 ) -> list[dict[str, Any]]:
     """Descarga una página de resultados.
 
     ``order`` usa ``:id`` por defecto: es el único campo con unicidad
     garantizada, lo que hace que la paginación por ``$offset`` sea
-    consistente entre peticiones.
+    consistente entre peticiones. Con ``group`` (agregados) hay que
+    ordenar por la expresión agrupada, que es única por fila. ``q`` es
+    la búsqueda de texto completo de Socrata (``$q``).
     """
     params: dict[str, str] = {"$limit": str(limit), "$offset": str(offset)}
     if where:
         params["$where"] = where
+    if q:
+        params["$q"] = q
     if select:
         params["$select"] = select
+    if group:
+        params["$group"] = group
     if order:
         params["$order"] = order
     return _fetch(dataset, params)
 
 
+def descargar_paginado(
+    dataset: str,
+    where: str,
+    select: str,
+    objetivo: Optional[int] = None,
+    order: str = ":id",
+    group: str = "",
+    q: str = "",
+) -> list[dict[str, Any]]:
+    """Recorre todas las páginas de una consulta.
+
+    Args:
+        objetivo: Registros a descargar. ``None`` = hasta que la API deje
+                  de devolver filas.
+        order:    Orden estable para paginar por ``$offset``.
+        group:    Expresión ``$group`` (consultas de agregados).
+        q:        Búsqueda de texto completo (``$q``).
+
+    Returns:
+        Lista de registros.
+    """
+    registros: list[dict[str, Any]] = []
+    offset = 0
+
+    while objetivo is None or offset < objetivo:
+        tamano = SOCRATA_PAGE_SIZE
+        if objetivo is not None:
+            tamano = min(tamano, objetivo - offset)
+        pagina = pedir_pagina(
+            dataset, where=where, select=select, limit=tamano, offset=offset,
+            order=order, group=group, q=q,
+        )
+
+        if not pagina:
+            logger.info("La API dejó de devolver registros en offset %d.", offset)
+            break
+
+        registros.extend(pagina)
+        offset += len(pagina)
+        logger.info(
+            "  Página obtenida: %d registros (acumulado: %d / %s)",
+            len(pagina), len(registros), objetivo if objetivo is not None else "?",
+        )
+
+        if len(pagina) < tamano:
+            break  # última página
+
+    return registros
+
+
 # ────────────────────────────────────────────────────────────
 # CONSULTAS
 # ────────────────────────────────────────────────────────────
@@ -394,6 +520,7 @@ def contar_registros(
     fecha_fin: Optional[str] = None,
     tipo_contrato: Optional[str | Iterable[str]] = None,
     dataset: str = SOCRATA_DATASET_CONTRATOS,
+    busqueda: str = "like",
 ) -> int:
     """Cuenta los registros que coinciden con los filtros.
 
@@ -401,23 +528,170 @@ def contar_registros(
     las fechas. (La versión anterior las omitía, así que el total no
     correspondía con la consulta real y truncaba la descarga.)
 
+    Args:
+        busqueda: Con ``"q"`` la palabra clave va por ``$q`` y el total
+                  es el de **candidatos**: incluye filas que luego no
+                  pasan el filtro local de ``consultar_contratos``.
+
     Returns:
         Número total de registros coincidentes.
     """
-    where = _construir_where(
-        departamento, modalidad, estado, palabra_clave,
+    con_q = busqueda == "q" and bool(palabra_clave)
+    where = construir_where(
+        departamento, modalidad, estado, None if con_q else palabra_clave,
         fecha_inicio, fecha_fin, tipo_contrato,
     )
-    datos = _fetch_page(
+    datos = pedir_pagina(
         dataset,
         where=where,
         select="count(*) as total",
         limit=1,
         order="",
+        q=str(palabra_clave) if con_q else "",
     )
     return int(datos[0]["total"]) if datos else 0
 
 
+# Faceta → (expresión por la que se agrupa, filtro propio). Al contar una
+# faceta se omite su propio filtro: el recuento de cada departamento
+# tiene que ser el que daría elegirlo, no cero por no ser el elegido.
+FACETAS: dict[str, tuple[str, str]] = {
+    "departamento": ("departamento", "departamento"),
+    "modalidad": ("modalidad_de_contratacion", "modalidad"),
+    "tipo_contrato": ("tipo_de_contrato", "tipo_contrato"),
+    "estado": ("estado_contrato", "estado"),
+    "anio": ("date_extract_y(fecha_de_inicio_del_contrato)", "fechas"),
+}
+
+_cache_facetas: Optional[CacheDisco] = None
+
+
+def _cache() -> CacheDisco:
+    """Caché de recuentos por faceta, creada en el primer uso."""
+    global _cache_facetas
+    if _cache_facetas is None:
+        _cache_facetas = CacheDisco(
+            CACHE_DIR / "facetas",
+            ttl=FACETAS_TTL,
+            max_bytes=FACETAS_MAX_MB * 1024 * 1024,
+        )
+    return _cache_facetas
+
+
+def _contar_faceta(
+    dataset: str, where: str, expresion: str, q: str = ""
+) -> dict[str, int]:
+    """Registros por valor de ``expresion`` (``""`` = sin informar)."""
+    clave = huella("faceta", dataset, where, expresion, q)
+    crudo = _cache().leer_bytes(clave)
+    if crudo is not None:
+        return json.loads(crudo)
+
+    filas = pedir_pagina(
+        dataset,
+        where=where,
+        select=f"{expresion} as valor, count(*) as total",
+        limit=50000,
+        order="total DESC",
+        group=expresion,
+        q=q,
+    )
+    conteos: dict[str, int] = {}
+    for fila in filas:
+        valor = "" if fila.get("valor") is None else str(fila["valor"])
+        conteos[valor] = conteos.get(valor, 0) + int(fila.get("total", 0))
+
+    _cache().guardar_bytes(
+        clave, json.dumps(conteos).encode("utf-8"), sufijo=".json"
+    )
+    return conteos
+
+
+def contar_facetas(
+    departamento: Optional[str] = None,
+    modalidad: Optional[str | Iterable[str]] = None,
+    estado: Optional[str] = None,
+    palabra_clave: Optional[str] = None,
+    fecha_inicio: Optional[str] = None,
+    fecha_fin: Optional[str] = None,
+    tipo_contrato: Optional[str | Iterable[str]] = None,
+    facetas: Iterable[str] = tuple(FACETAS),
+    dataset: str = SOCRATA_DATASET_CONTRATOS,
+    hilos: int = API_HILOS,
+    busqueda: str = BUSQUEDA_TEXTO,
+) -> dict[str, dict[str, int]]:
+    """Cuenta los registros por cada valor de varias facetas, sin descargarlos.
+
+    Una petición ``count(*) … $group`` por faceta, en paralelo. Cada
+    faceta se cuenta con todos los filtros **menos el suyo**, para que
+    sirva de guía al elegir: junto a cada departamento, cuántos contratos
+    habría con el resto de filtros si se eligiera ese. Los recuentos se
+    guardan ``FACETAS_TTL`` segundos en ``CACHE_DIR/facetas``.
+
+    Acepta los mismos filtros que ``consultar_contratos``.
+
+    Args:
+        facetas:  Claves de ``FACETAS`` a contar.
+        hilos:    Peticiones a la vez.
+        busqueda: Como en ``contar_registros``: con ``"q"`` la palabra
+                  clave va por ``$q`` y los recuentos son de candidatos
+                  (una cota superior de lo que se descargaría).
+
+    Returns:
+        Por faceta, ``{valor de la API: registros}``. La clave ``""``
+        agrupa los registros sin valor; ``"anio"`` usa el año como texto.
+
+    Raises:
+        ValueError: Si se pide una faceta desconocida o ``busqueda`` no
+            es ``"like"`` ni ``"q"``.
+        RuntimeError: Si alguna petición agota los reintentos.
+    """
+    filtros = {
+        "departamento": departamento,
+        "modalidad": modalidad,
+        "estado": estado,
+        "palabra_clave": palabra_clave,
+        "fecha_inicio": fecha_inicio,
+        "fecha_fin": fecha_fin,
+        "tipo_contrato": tipo_contrato,
+    }
+    if busqueda not in ("like", "q"):
+        raise ValueError(f"Modo de búsqueda desconocido: {busqueda!r} (like o q).")
+    con_q = busqueda == "q" and bool(palabra_clave)
+    if con_q:
+        # El ``like`` sobre el objeto recorre toda la tabla; ``$q`` usa el
+        # índice de texto completo, igual que la descarga.
+        filtros["palabra_clave"] = None
+    facetas = list(facetas)
+    desconocidas = [f for f in facetas if f not in FACETAS]
+    if desconocidas:
+        raise ValueError(
+            f"Facetas desconocidas: {', '.join(desconocidas)}. "
+            f"Disponibles: {', '.join(FACETAS)}."
+        )
+
+    def _where_sin(propio: str) -> str:
+        omitidos = ("fecha_inicio", "fecha_fin") if propio == "fechas" else (propio,)
+        return construir_where(
+            **{k: v for k, v in filtros.items() if k not in omitidos}
+        )
+
+    with ThreadPoolExecutor(
+        max_workers=max(1, hilos), thread_name_prefix="secop-facetas"
+    ) as pool:
+        futuros = {
+            faceta: pool.submit(
+                _contar_faceta,
+                dataset,
+                _where_sin(FACETAS[faceta][1]),
+                FACETAS[faceta][0],
+                str(palabra_clave) if con_q else "",
+            )
+            for faceta in facetas
+        }
+        return {faceta: futuro.result() for faceta, futuro in futuros.items()}
+
+
 def consultar_contratos(
     departamento: Optional[str] = None,
     modalidad: Optional[str | Iterable[str]] = None,
@@ -428,6 +702,9 @@ def consultar_contratos(
     tipo_contrato: Optional[str | Iterable[str]] = None,
     max_registros: Optional[int] = None,
     dataset: str = SOCRATA_DATASET_CONTRATOS,
+    por_meses: bool = False,
+    busqueda: str = BUSQUEDA_TEXTO,
+    perfil: str = "completo",
 ) -> pd.DataFrame:
     """Descarga contratos de SECOP II con paginación automática.
 
@@ -440,15 +717,50 @@ def consultar_contratos(
         fecha_fin:     Fecha hasta (``dd/MM/yyyy``).
         max_registros: Tope de registros. ``None`` = **todos**.
         dataset:       Dataset a consultar.
+        por_meses:     Descargar por fragmentos mensuales en paralelo y
+                       con caché por mes (``fragmentos_api.py``). Para
+                       consultas grandes; se ignora con ``max_registros``.
+        busqueda:      ``"like"`` o ``"q"`` (ver ``BUSQUEDA_TEXTO`` en
+                       ``config.py``). Con ``"q"`` la palabra clave acota
+                       los candidatos por ``$q`` y el AND de subcadenas
+                       se aplica en local (``_consultar_texto_completo``).
+                       La descarga por meses usa siempre ``"like"``.
+        perfil:        Columnas a pedir (``PERFILES_PROYECCION``).
 
     Returns:
-        DataFrame con los contratos encontrados.
+        DataFrame con las columnas del perfil.
+
+    Raises:
+        ValueError: Si ``busqueda`` no es ``"like"`` ni ``"q"``, o el
+            perfil no existe.
     """
-    where = _construir_where(
+    if busqueda not in ("like", "q"):
+        raise ValueError(f"Modo de búsqueda desconocido: {busqueda!r} (like o q).")
+    columnas = columnas_perfil(perfil)
+
+    if por_meses and max_registros is None:
+        from fragmentos_api import consultar_por_meses
+
+        return consultar_por_meses(
+            departamento, modalidad, estado, palabra_clave,
+            fecha_inicio, fecha_fin, tipo_contrato, dataset,
+            columnas=columnas,
+        )
+
+    if busqueda == "q" and palabra_clave and str(palabra_clave).strip():
+        return _consultar_texto_completo(
+            construir_where(
+                departamento, modalidad, estado, None,
+                fecha_inicio, fecha_fin, tipo_contrato,
+            ),
+            str(palabra_clave), max_registros, dataset, columnas,
+        )
+
+    where = construir_where(
         departamento, modalidad, estado, palabra_clave,
         fecha_inicio, fecha_fin, tipo_contrato,
     )
-    select = ",".join(COLUMNAS_API)
+    select = ",".join(columnas)
 
     total = contar_registros(
         departamento, modalidad, estado, palabra_clave,
@@ -458,7 +770,7 @@ def consultar_contratos(
 
     if total == 0:
         logger.warning("La consulta no retornó registros.")
-        return pd.DataFrame(columns=COLUMNAS_API)
+        return pd.DataFrame(columns=columnas)
 
     objetivo = total if max_registros is None else min(total, max_registros)
     if objetivo < total:
@@ -467,51 +779,179 @@ def consultar_contratos(
     else:
         logger.info("Se descargarán los %d registros.", objetivo)
 
-    registros: list[dict[str, Any]] = []
-    offset = 0
+    registros = descargar_paginado(dataset, where, select, objetivo)
+    df = pd.DataFrame(registros)
 
-    while offset < objetivo:
-        tamano = min(SOCRATA_PAGE_SIZE, objetivo - offset)
-        pagina = _fetch_page(
-            dataset, where=where, select=select, limit=tamano, offset=offset
-        )
+    # Garantizar que todas las columnas pedidas existen, aunque la API
+    # las omita cuando vienen vacías en todos los registros.
+    for columna in columnas:
+        if columna not in df.columns:
+            df[columna] = pd.NA
 
+    logger.info("Consulta API completada: %d registros obtenidos.", len(df))
+    return df[columnas]
+
+
+def _consultar_texto_completo(
+    where: str,
+    palabra_clave: str,
+    max_registros: Optional[int],
+    dataset: str,
+    columnas: list[str],
+) -> pd.DataFrame:
+    """Busca la palabra clave con ``$q`` y confirma cada página en local.
+
+    ``$q`` usa el índice de texto completo de Socrata, así que no recorre
+    el dataset como ``like '%palabra%'``, pero busca en todas las columnas
+    de texto y no exige las palabras como subcadenas del objeto. Cada
+    página de candidatos pasa por ``cleaning.filtrar_por_palabra_clave``
+    (AND de subcadenas, sin tildes ni mayúsculas), y se pagina hasta
+    reunir ``max_registros`` contratos **que cumplen** o agotar los
+    candidatos.
+
+    Limitación: una palabra que solo aparece dentro de otra más larga
+    ("vigil" en "vigilancia") no llega como candidata.
+    """
+    from cleaning import filtrar_por_palabra_clave
+
+    # El objeto hace falta para el filtro local aunque el perfil no lo pida.
+    select = ",".join(dict.fromkeys(columnas + ["objeto_del_contrato"]))
+    conteo = pedir_pagina(
+        dataset, where=where, select="count(*) as total",
+        limit=1, order="", q=palabra_clave,
+    )
+    candidatos = int(conteo[0]["total"]) if conteo else 0
+    logger.info("Candidatos por texto completo ($q=%r): %d", palabra_clave, candidatos)
+    if candidatos == 0:
+        logger.warning("La consulta no retornó registros.")
+        return pd.DataFrame(columns=columnas)
+
+    partes: list[pd.DataFrame] = []
+    encontrados = 0
+    offset = 0
+    while offset < candidatos:
+        pagina = pedir_pagina(
+            dataset, where=where, select=select, offset=offset, q=palabra_clave,
+        )
         if not pagina:
-            logger.info("La API dejó de devolver registros en offset %d.", offset)
             break
-
-        registros.extend(pagina)
         offset += len(pagina)
+        df = pd.DataFrame(pagina)
+        if "objeto_del_contrato" not in df.columns:
+            df["objeto_del_contrato"] = ""
+        df = filtrar_por_palabra_clave(df, palabra_clave)
+        partes.append(df)
+        encontrados += len(df)
         logger.info(
-            "  Página obtenida: %d registros (acumulado: %d / %d)",
-            len(pagina), len(registros), objetivo,
+            "  Candidatos revisados: %d / %d (coinciden: %d)",
+            offset, candidatos, encontrados,
         )
+        if max_registros is not None and encontrados >= max_registros:
+            break
+        if len(pagina) < SOCRATA_PAGE_SIZE:
+            break
 
-        if len(pagina) < tamano:
-            break  # última página
+    df = pd.concat(partes, ignore_index=True) if partes else pd.DataFrame()
+    if max_registros is not None:
+        df = df.head(max_registros)
+    for columna in columnas:
+        if columna not in df.columns:
+            df[columna] = pd.NA
 
-    df = pd.DataFrame(registros)
+    logger.info(
+        "Consulta API completada: %d registros de %d candidatos revisados.",
+        len(df), offset,
+    )
+    return df[columnas]
 
-    # Garantizar que todas las columnas pedidas existen, aunque la API
-    # las omita cuando vienen vacías en todos los registros.
-    for columna in COLUMNAS_API:
+
+def consultar_cambios(
+    where: str,
+    desde: Optional[str] = None,
+    dataset: str = SOCRATA_DATASET_CONTRATOS,
+) -> pd.DataFrame:
+    """Descarga los registros creados o modificados desde una marca de agua.
+
+    Usa el campo de sistema ``:updated_at`` de Socrata, que cambia cada
+    vez que el publicador actualiza la fila. El corte es inclusivo
+    (``>=``): las filas con la misma marca exacta se vuelven a traer y el
+    llamador las deduplica, en vez de perder las que compartían
+    milisegundo con la última del lote anterior.
+
+    Args:
+        where:   Filtro base (``construir_where``).
+        desde:   Marca de agua ISO 8601. ``None`` = todo.
+        dataset: Dataset a consultar.
+
+    Returns:
+        DataFrame con ``COLUMNAS_API`` más ``:updated_at``, ordenado por
+        la marca de actualización.
+    """
+    condiciones = [f"({where})"] if where else []
+    if desde:
+        condiciones.append(f":updated_at >= '{_escapar(desde)}'")
+
+    registros = descargar_paginado(
+        dataset,
+        where=" AND ".join(condiciones),
+        select=",".join(COLUMNAS_API + [":updated_at"]),
+        order=":updated_at,:id",
+    )
+    df = pd.DataFrame(registros)
+    for columna in COLUMNAS_API + [":updated_at"]:
         if columna not in df.columns:
             df[columna] = pd.NA
 
-    logger.info("Consulta API completada: %d registros obtenidos.", len(df))
-    return df[COLUMNAS_API]
+    logger.info(
+        "Cambios desde %s: %d registros.", desde or "el origen", len(df)
+    )
+    return df[COLUMNAS_API + [":updated_at"]]
+
+
+def consultar_salientes(
+    where: str,
+    desde: str,
+    dataset: str = SOCRATA_DATASET_CONTRATOS,
+) -> set[str]:
+    """``id_contrato`` modificados desde la marca que ya no cumplen ``where``.
+
+    Complementa a ``consultar_cambios``: un contrato que cambió de estado
+    o de departamento deja de salir en el delta filtrado, pero su copia
+    local ya no es válida. Solo se pide la clave, así que la consulta es
+    ligera aunque abarque los cambios de todo el país. Las filas en las
+    que un campo filtrado pasó a ser nulo no aparecen (``NOT`` de un
+    nulo es nulo en SoQL).
+
+    Args:
+        where:   Filtro base (``construir_where``), no vacío.
+        desde:   Marca de agua ISO 8601.
+        dataset: Dataset a consultar.
+    """
+    registros = descargar_paginado(
+        dataset,
+        where=f"NOT ({where}) AND :updated_at >= '{_escapar(desde)}'",
+        select="id_contrato",
+    )
+    return {str(r["id_contrato"]) for r in registros if r.get("id_contrato")}
 
 
 def consultar_desde_params(
     params,
     max_registros: Optional[int] = None,
     tipo_contrato: Optional[str] = None,
+    por_meses: bool = False,
+    busqueda: str = BUSQUEDA_TEXTO,
+    perfil: str = "completo",
 ) -> pd.DataFrame:
     """Consulta usando un ``SearchParams`` de ``config.py``.
 
     Args:
         params:        Instancia de ``SearchParams``.
         max_registros: Tope opcional. ``None`` = todos los coincidentes.
+        por_meses:     Descargar por fragmentos mensuales (ver
+                       ``consultar_contratos``).
+        busqueda:      ``"like"`` o ``"q"`` (ver ``consultar_contratos``).
+        perfil:        Columnas a pedir (``PERFILES_PROYECCION``).
 
     Returns:
         DataFrame con los contratos.
@@ -525,6 +965,9 @@ def consultar_desde_params(
         fecha_fin=params.fecha_fin,
         tipo_contrato=tipo_contrato,
         max_registros=max_registros,
+        por_meses=por_meses,
+        busqueda=busqueda,
+        perfil=perfil,
     )
 
 
@@ -600,6 +600,7 @@ from catalogos import (  # noqa: E402
     MODALIDADES,
     NACIONAL,
     TIPOS_CONTRATO,
+    conteo_opcion,
     opciones_desplegable,
 )
 from consulta import normalizar_esquema  # noqa: E402
@@ -668,6 +669,47 @@ def buscar(df: pd.DataFrame, texto: str) -> pd.DataFrame:
     return df[mascara]
 
 
+@st.cache_data(ttl=120, show_spinner=False)
+def _facetas_cacheadas(
+    departamento: str,
+    modalidad: str,
+    estado: str,
+    palabra_clave: str,
+    fecha_inicio: str,
+    fecha_fin: str,
+    tipo_contrato: str,
+) -> dict[str, dict[str, int]]:
+    """Recuentos por faceta de SECOP II para la selección actual.
+
+    Cada cambio de filtro vuelve a ejecutar la app: esta caché en memoria
+    evita repetir las peticiones; debajo está la de disco de
+    ``api_scraper.contar_facetas``.
+    """
+    from consulta import facetas_secop2
+
+    return facetas_secop2(
+        departamento=departamento,
+        modalidad=modalidad,
+        estado=estado,
+        palabra_clave=palabra_clave,
+        fecha_inicio=fecha_inicio,
+        fecha_fin=fecha_fin,
+        tipo_contrato=tipo_contrato,
+    )
+
+
+def _formato_con_conteo(mapa: dict, conteos: dict[str, int] | None):
+    """``format_func`` de un desplegable que añade el recuento de SECOP II."""
+    def formato(etiqueta: str) -> str:
+        if conteos is None:
+            return etiqueta
+        total = conteo_opcion(mapa[etiqueta], conteos)
+        if total is None:
+            return etiqueta
+        return f"{etiqueta}  ({total:,})".replace(",", ".")
+    return formato
+
+
 # ────────────────────────────────────────────────────────────
 # FUNCIONES DE EXPORTACIÓN
 # ────────────────────────────────────────────────────────────
@@ -721,54 +763,120 @@ with st.sidebar:
         # legible, pero lo que viaja a cada portal es su valor exacto.
         # Así es imposible fallar por una tilde o una mayúscula.
         mapa_deptos = opciones_desplegable(DEPARTAMENTOS, NACIONAL)
+        mapa_modalidades = opciones_desplegable(MODALIDADES)
+        # Todos los tipos son exclusivos de SECOP II, así que la nota va
+        # en la ayuda del campo en vez de repetirse en cada opción.
+        mapa_tipos = opciones_desplegable(TIPOS_CONTRATO, anotar=False)
+        mapa_estados = opciones_desplegable(ESTADOS)
+
+        # Recuentos en vivo junto a cada opción, antes de descargar nada.
+        # Los desplegables aún no se han pintado en esta ejecución, así
+        # que se cuenta con la selección que Streamlit guarda en
+        # session_state desde la anterior.
+        facetas: dict[str, dict[str, int]] = {}
+        if "SECOP II" in fuentes_sel and st.toggle(
+            "Recuentos en vivo (SECOP II)",
+            value=False,
+            help=(
+                "Muestra junto a cada opción cuántos contratos de SECOP II "
+                "habría al elegirla, con el resto de filtros y la palabra "
+                "clave. Son unas pocas peticiones agregadas, sin descargas, "
+                "pero se repiten con cada cambio de filtro y sobre todo el "
+                "país pueden tardar."
+            ),
+        ):
+            def _etiqueta(mapa: dict, clave: str, defecto: str = "") -> str:
+                opcion = mapa.get(st.session_state.get(clave, defecto))
+                return opcion.etiqueta if opcion else ""
+
+            fechas_previas = ("", "")
+            if st.session_state.get("usar_fechas"):
+                fechas_previas = tuple(
+                    f.strftime("%d/%m/%Y") if f else ""
+                    for f in (
+                        st.session_state.get("q_fecha_ini"),
+                        st.session_state.get("q_fecha_fin"),
+                    )
+                )
+            try:
+                facetas = _facetas_cacheadas(
+                    _etiqueta(mapa_deptos, "q_depto_label", "Santander"),
+                    _etiqueta(mapa_modalidades, "q_modalidad_label"),
+                    _etiqueta(mapa_estados, "q_estado_label"),
+                    st.session_state.get("consulta_texto", ""),
+                    *fechas_previas,
+                    _etiqueta(mapa_tipos, "q_tipo_label"),
+                )
+            except Exception as exc:  # noqa: BLE001 - los recuentos son opcionales
+                st.caption(f"Recuentos no disponibles: {exc}")
+
         etiquetas_deptos = list(mapa_deptos)
         q_depto_label = st.selectbox(
             "Departamento",
             etiquetas_deptos,
             index=etiquetas_deptos.index("Santander"),
+            format_func=_formato_con_conteo(mapa_deptos, facetas.get("departamento")),
             help="Elige «Todo el país» para una consulta nacional.",
+            key="q_depto_label",
         )
         opcion_depto = mapa_deptos[q_depto_label]
         q_depto = opcion_depto.etiqueta if opcion_depto else ""
 
-        mapa_modalidades = opciones_desplegable(MODALIDADES)
         q_modalidad_label = st.selectbox(
-            "Modalidad de contratación", list(mapa_modalidades)
+            "Modalidad de contratación",
+            list(mapa_modalidades),
+            format_func=_formato_con_conteo(mapa_modalidades, facetas.get("modalidad")),
+            key="q_modalidad_label",
         )
         opcion_modalidad = mapa_modalidades[q_modalidad_label]
         q_modalidad = opcion_modalidad.etiqueta if opcion_modalidad else ""
 
-        # Todos los tipos son exclusivos de SECOP II, así que la nota va
-        # en la ayuda del campo en vez de repetirse en cada opción.
-        mapa_tipos = opciones_desplegable(TIPOS_CONTRATO, anotar=False)
         q_tipo_label = st.selectbox(
             "Tipo de contrato",
             list(mapa_tipos),
+            format_func=_formato_con_conteo(mapa_tipos, facetas.get("tipo_contrato")),
             help=(
                 "Solo filtra en SECOP II: la tabla de resultados de "
                 "SECOP I no incluye el tipo de contrato."
             ),
+            key="q_tipo_label",
         )
         opcion_tipo = mapa_tipos[q_tipo_label]
         q_tipo = opcion_tipo.etiqueta if opcion_tipo else ""
 
-        mapa_estados = opciones_desplegable(ESTADOS)
-        q_estado_label = st.selectbox("Estado", list(mapa_estados))
+        q_estado_label = st.selectbox(
+            "Estado",
+            list(mapa_estados),
+            format_func=_formato_con_conteo(mapa_estados, facetas.get("estado")),
+            key="q_estado_label",
+        )
         opcion_estado = mapa_estados[q_estado_label]
         q_estado = opcion_estado.etiqueta if opcion_estado else ""
 
-        usar_fechas = st.checkbox("Acotar por fechas", value=False)
+        usar_fechas = st.checkbox("Acotar por fechas", value=False, key="usar_fechas")
         if usar_fechas:
             col_fi, col_ff = st.columns(2)
             with col_fi:
                 q_fecha_ini = st.date_input(
                     "Desde", value=date(date.today().year, 1, 1),
-                    format="DD/MM/YYYY",
+                    format="DD/MM/YYYY", key="q_fecha_ini",
                 )
             with col_ff:
                 q_fecha_fin = st.date_input(
                     "Hasta", value=date.today(), format="DD/MM/YYYY",
+                    key="q_fecha_fin",
                 )
+        if facetas.get("anio"):
+            por_anio = sorted(
+                (anio, total) for anio, total in facetas["anio"].items() if anio
+            )
+            st.caption(
+                "Contratos por año de inicio: "
+                + " · ".join(
+                    f"{anio}: {total:,}".replace(",", ".")
+                    for anio, total in por_anio[-6:]
+                )
+            )
 
         if "SECOP I" in fuentes_sel:
             q_max_paginas = st.slider(
@@ -817,6 +925,7 @@ hero_slot = st.empty()
 st.markdown('<div class="search-container">', unsafe_allow_html=True)
 consulta = st.text_input(
     "🔍 Buscar por objeto del contrato",
+    key="consulta_texto",
     placeholder="Ej: suministro alimentos, vigilancia, consultoría, combustible...",
     help=(
         "Palabras separadas por espacio; se exige que el objeto las contenga "
@@ -846,14 +955,17 @@ def _consulta_cacheada(
     tipo_contrato: str,
     max_paginas: int,
     max_registros_api: int,
+    refrescar: bool,
     _version: int,
 ):
     """Envoltura cacheada de la consulta en vivo.
 
-    La caché dura 5 minutos y está indexada por los parámetros de
-    búsqueda: repetir la misma consulta dentro de esa ventana no vuelve
-    a golpear los portales (importante para no activar el WAF de
-    SECOP I). ``_version`` permite forzar una descarga nueva.
+    Esta caché dura 5 minutos y vive en la memoria del proceso. Debajo
+    está la caché en disco de ``consulta.py``, compartida con el CLI y
+    las tareas programadas, que sobrevive a reinicios: repetir la misma
+    consulta no vuelve a golpear los portales (importante para no
+    activar el WAF de SECOP I). ``refrescar`` se salta las dos y
+    ``_version`` permite forzar una descarga nueva.
     """
     from consulta import consultar_en_vivo
 
@@ -868,6 +980,7 @@ def _consulta_cacheada(
         tipo_contrato=tipo_contrato,
         max_paginas_secop1=max_paginas,
         max_registros_api=max_registros_api,
+        refrescar=refrescar,
     )
 
 
@@ -881,6 +994,18 @@ if modo_datos == "Consulta en vivo":
             st.warning("Selecciona al menos un portal en la barra lateral.")
         else:
             try:
+                if "SECOP I" in fuentes_sel:
+                    # El presupuesto de peticiones al portal es común a
+                    # todas las sesiones: se avisa si hay cola.
+                    from config import SECOP_RESULTADOS_DATA_URL
+                    from ritmo import espera_estimada
+
+                    espera = espera_estimada(SECOP_RESULTADOS_DATA_URL)
+                    if espera > 5:
+                        st.info(
+                            "contratos.gov.co está atendiendo otras consultas: "
+                            f"la tuya empezará en unos {espera:.0f} s."
+                        )
                 with st.spinner(
                     f"Consultando {' y '.join(fuentes_sel)} en tiempo real..."
                 ):
@@ -895,6 +1020,7 @@ if modo_datos == "Consulta en vivo":
                         q_tipo,
                         q_max_paginas,
                         q_max_api,
+                        st.session_state.pop("_forzar_descarga", False),
                         st.session_state.get("_version_consulta", 0),
                     )
                 st.session_state["_df"] = df
@@ -1107,6 +1233,12 @@ with st.sidebar:
         minutos = (datetime.now() - momento).total_seconds() / 60
         frescura = "ahora mismo" if minutos < 1 else f"hace {int(minutos)} min"
         st.caption(f"🟢 Consultado **{frescura}** · {momento:%d/%m/%Y %H:%M:%S}")
+        if informe_consulta.get("desde_cache"):
+            st.caption(
+                "· Servido desde la caché en disco"
+                + (" (actualizándose en segundo plano)"
+                   if informe_consulta.get("cache_vencida") else "")
+            )
 
         for fuente, cantidad in informe_consulta.get("por_fuente", {}).items():
             st.caption(f"· {fuente}: **{cantidad:,}** contratos")
@@ -1122,6 +1254,7 @@ with st.sidebar:
             st.session_state["_version_consulta"] = (
                 st.session_state.get("_version_consulta", 0) + 1
             )
+            st.session_state["_forzar_descarga"] = True
             st.cache_data.clear()
             st.rerun()
 
@@ -1292,10 +1425,11 @@ else:
     with tab_estudio:
         from estudio_sector import (
             ContextoEstudio,
-            construir_estudio,
+            construir_estudio_api,
+            construir_estudio_cacheado,
             cop,
-            exportar_docx,
-            exportar_pdf,
+            exportar_docx_cacheado,
+            exportar_pdf_cacheado,
             hay_soporte_pdf,
         )
 
@@ -1350,6 +1484,18 @@ else:
                     "gremios, factores que inciden en el costo…"
                 ),
             )
+            e_universo = False
+            if modo_datos == "Consulta en vivo" and "SECOP II" in fuentes_sel:
+                e_universo = st.checkbox(
+                    "Calcular sobre todo SECOP II (sin tope de registros)",
+                    help=(
+                        "Las cifras se agregan en el servidor de datos "
+                        "abiertos con los filtros de la consulta, en lugar "
+                        "de usar los contratos descargados; solo se bajan "
+                        "los del anexo. Los filtros locales de la tabla no "
+                        "se aplican."
+                    ),
+                )
             generar = st.form_submit_button(
                 "📑 Generar Estudio del Sector", type="primary"
             )
@@ -1372,7 +1518,8 @@ else:
                         "Tipo de contrato": q_tipo if modo_datos == "Consulta en vivo" else "",
                     },
                     fuentes=(
-                        sorted(base_estudio["fuente"].dropna().unique())
+                        ["SECOP II"] if e_universo
+                        else sorted(base_estudio["fuente"].dropna().unique())
                         if "fuente" in base_estudio.columns else ["SECOP"]
                     ),
                     consultado_en=(
@@ -1381,9 +1528,27 @@ else:
                     ),
                 )
                 with st.spinner("Analizando el sector y construyendo el documento..."):
-                    st.session_state["_estudio"] = construir_estudio(
-                        base_estudio, contexto
-                    )
+                    # Un estudio ya generado con los mismos filtros y datos
+                    # se sirve desde la caché en disco, con su procedencia.
+                    if e_universo:
+                        st.session_state["_estudio"] = construir_estudio_api(
+                            contexto,
+                            departamento=q_depto,
+                            modalidad=q_modalidad,
+                            estado=q_estado,
+                            palabra_clave=consulta,
+                            fecha_inicio=(
+                                q_fecha_ini.strftime("%d/%m/%Y") if q_fecha_ini else ""
+                            ),
+                            fecha_fin=(
+                                q_fecha_fin.strftime("%d/%m/%Y") if q_fecha_fin else ""
+                            ),
+                            tipo_contrato=q_tipo,
+                        )
+                    else:
+                        st.session_state["_estudio"] = construir_estudio_cacheado(
+                            base_estudio, contexto
+                        )
                 st.success("Estudio generado.")
             except Exception as exc:  # noqa: BLE001
                 st.error(f"No se pudo generar el estudio: {exc}")
@@ -1419,7 +1584,7 @@ else:
                 try:
                     st.download_button(
                         "📘 Descargar en Word (.docx)",
-                        data=exportar_docx(estudio),
+                        data=exportar_docx_cacheado(estudio),
                         file_name=f"estudio_del_sector_{sello_est}.docx",
                         mime=(
                             "application/vnd.openxmlformats-officedocument"
@@ -1443,7 +1608,7 @@ else:
                     try:
                         st.download_button(
                             "📕 Descargar en PDF",
-                            data=exportar_pdf(estudio),
+                            data=exportar_pdf_cacheado(estudio),
                             file_name=f"estudio_del_sector_{sello_est}.pdf",
                             mime="application/pdf",
                             width="stretch",
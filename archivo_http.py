@@ -0,0 +1,431 @@
+"""
+archivo_http.py — Archivo de respuestas crudas de contratos.gov.co.
+
+Cada mejora del parser o cambio de esquema obligaba a volver a raspar el
+portal, lento y limitado por el WAF. Este módulo guarda el cuerpo de
+cada respuesta de ``scraper._get`` (páginas de resultados y fichas de
+detalle) para poder reprocesarlo sin red, a velocidad de CPU.
+
+Formato en disco (``ARCHIVO_HTTP_DIR``), inspirado en WARC:
+  • ``objetos/ab/abcdef….gz``: el cuerpo comprimido con gzip, con el
+    SHA-256 del contenido como nombre. Una página que no cambió entre
+    dos rastreos se guarda una sola vez.
+  • ``indice.sqlite``: una fila por captura con URL, parámetros, fecha,
+    estado HTTP, algunas cabeceras y el hash del cuerpo.
+
+Desactivado por defecto: el archivo no caduca ni tiene tope de tamaño,
+así que se activa con ``SECOP_ARCHIVAR=1`` para los rastreos que se
+quieran conservar.
+
+Dos usos:
+  • **Reproducción** (``SECOP_REPLAY=1``): ``_get`` sirve cada petición
+    con la captura más reciente en lugar de ir a la red; el pipeline
+    completo corre offline.
+  • **Reparseo**: ``python archivo_http.py reparsear resultados`` vuelve
+    a pasar todas las páginas archivadas por ``parser.py`` (o las fichas
+    por ``detail_scraper``) y exporta el resultado.
+
+Si el directorio no se puede escribir (despliegue de solo lectura) el
+archivo se desactiva sin afectar al rastreo.
+
+Uso:
+    python archivo_http.py resumen
+    python archivo_http.py reparsear resultados --salida output/reparseo.parquet
+    python archivo_http.py reparsear detalle --salida output/detalles.csv
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import closing
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, Optional
+
+import requests
+
+from cache_disco import huella
+from config import (
+    ARCHIVO_HTTP_ACTIVO,
+    ARCHIVO_HTTP_DIR,
+    ARCHIVO_HTTP_REPLAY,
+    CSV_ENCODING,
+    CSV_SEPARATOR,
+    PARQUET_ENGINE,
+    SECOP_DETALLE_URL,
+    SECOP_RESULTADOS_DATA_URL,
+    setup_logging,
+)
+from exceptions import SecopEmptyTableError
+
+logger = logging.getLogger(__name__)
+
+# Cabeceras de la respuesta que se conservan en el índice.
+_CABECERAS_GUARDADAS = ("Content-Type", "ETag", "Last-Modified", "Date")
+
+
+@dataclass
+class Captura:
+    """Una respuesta archivada (fila del índice)."""
+
+    url: str
+    params: dict
+    status: int
+    obtenido: float
+    sha256: str
+    tamano: int
+    cabeceras: dict
+
+
+# ════════════════════════════════════════════════════════════
+# 1. ARCHIVO
+# ════════════════════════════════════════════════════════════
+
+
+class ArchivoRespuestas:
+    """Almacén de respuestas direccionado por contenido.
+
+    Args:
+        directorio: Carpeta del archivo (se crea si no existe).
+
+    Raises:
+        OSError, sqlite3.Error: Si el directorio no se puede usar.
+    """
+
+    def __init__(self, directorio: Path = ARCHIVO_HTTP_DIR) -> None:
+        self.directorio = Path(directorio)
+        (self.directorio / "objetos").mkdir(parents=True, exist_ok=True)
+        self._ruta_indice = self.directorio / "indice.sqlite"
+        self._cerrojo = threading.Lock()
+        with closing(self._conectar()) as conexion:
+            conexion.execute("PRAGMA journal_mode=WAL")
+            conexion.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS capturas (
+                    id        INTEGER PRIMARY KEY,
+                    peticion  TEXT NOT NULL,
+                    url       TEXT NOT NULL,
+                    params    TEXT NOT NULL,
+                    status    INTEGER NOT NULL,
+                    obtenido  REAL NOT NULL,
+                    sha256    TEXT NOT NULL,
+                    tamano    INTEGER NOT NULL,
+                    cabeceras TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS capturas_peticion
+                    ON capturas (peticion, obtenido);
+                CREATE INDEX IF NOT EXISTS capturas_url ON capturas (url);
+                """
+            )
+
+    def _conectar(self) -> sqlite3.Connection:
+        return sqlite3.connect(self._ruta_indice, timeout=30, isolation_level=None)
+
+    def _ruta_objeto(self, sha256: str) -> Path:
+        return self.directorio / "objetos" / sha256[:2] / f"{sha256}.gz"
+
+    @staticmethod
+    def clave_peticion(url: str, params: Optional[dict]) -> str:
+        """Identificador de una petición: URL más parámetros canónicos."""
+        return huella(url, params or {})
+
+    # ── Escritura ───────────────────────────────────────────
+
+    def guardar(
+        self,
+        url: str,
+        params: Optional[dict],
+        status: int,
+        contenido: bytes,
+        cabeceras: Optional[dict] = None,
+    ) -> str:
+        """Archiva una respuesta.
+
+        Returns:
+            SHA-256 del cuerpo.
+        """
+        sha256 = hashlib.sha256(contenido).hexdigest()
+        ruta = self._ruta_objeto(sha256)
+        if not ruta.exists():
+            ruta.parent.mkdir(exist_ok=True)
+            temporal = ruta.with_name(f".{ruta.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            try:
+                temporal.write_bytes(gzip.compress(contenido, compresslevel=6))
+                os.replace(temporal, ruta)
+            finally:
+                temporal.unlink(missing_ok=True)
+
+        with self._cerrojo, closing(self._conectar()) as conexion:
+            conexion.execute(
+                "INSERT INTO capturas (peticion, url, params, status, obtenido, "
+                "sha256, tamano, cabeceras) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    self.clave_peticion(url, params),
+                    url,
+                    json.dumps(params or {}, sort_keys=True, ensure_ascii=False),
+                    status,
+                    time.time(),
+                    sha256,
+                    len(contenido),
+                    json.dumps(cabeceras or {}, ensure_ascii=False),
+                ),
+            )
+        return sha256
+
+    def guardar_respuesta(
+        self, url: str, params: Optional[dict], respuesta: requests.Response
+    ) -> str:
+        """Archiva una ``requests.Response`` (atajo para ``scraper._get``)."""
+        cabeceras = {
+            nombre: respuesta.headers[nombre]
+            for nombre in _CABECERAS_GUARDADAS
+            if nombre in respuesta.headers
+        }
+        return self.guardar(url, params, respuesta.status_code, respuesta.content, cabeceras)
+
+    # ── Lectura ─────────────────────────────────────────────
+
+    def leer(self, sha256: str) -> bytes:
+        """Cuerpo original de un objeto."""
+        return gzip.decompress(self._ruta_objeto(sha256).read_bytes())
+
+    def texto(self, captura: Captura) -> str:
+        """Cuerpo de una captura decodificado como UTF-8 (como ``_get``)."""
+        return self.leer(captura.sha256).decode("utf-8", errors="replace")
+
+    def ultima(self, url: str, params: Optional[dict] = None) -> Optional[Captura]:
+        """Captura más reciente de una petición, o ``None``."""
+        with closing(self._conectar()) as conexion:
+            fila = conexion.execute(
+                "SELECT url, params, status, obtenido, sha256, tamano, cabeceras "
+                "FROM capturas WHERE peticion = ? ORDER BY obtenido DESC LIMIT 1",
+                (self.clave_peticion(url, params),),
+            ).fetchone()
+        return _captura(fila) if fila else None
+
+    def reproducir(self, url: str, params: Optional[dict] = None) -> Optional[requests.Response]:
+        """Reconstruye la respuesta archivada de una petición.
+
+        Returns:
+            Una ``requests.Response`` con el estado, las cabeceras y el
+            cuerpo originales, o ``None`` si la petición no se archivó.
+        """
+        captura = self.ultima(url, params)
+        if captura is None:
+            return None
+        respuesta = requests.Response()
+        respuesta.status_code = captura.status
+        respuesta._content = self.leer(captura.sha256)
+        respuesta.headers.update(captura.cabeceras)
+        respuesta.url = url
+        respuesta.encoding = "utf-8"
+        return respuesta
+
+    def capturas(
+        self,
+        prefijo_url: Optional[str] = None,
+        todas: bool = False,
+    ) -> Iterator[Captura]:
+        """Recorre las capturas con estado 200, en orden cronológico.
+
+        Args:
+            prefijo_url: Solo las URLs que empiezan así.
+            todas:       Incluir capturas antiguas de una misma petición
+                         (por defecto solo la más reciente de cada una).
+        """
+        condicion = "status = 200"
+        parametros: list = []
+        if prefijo_url:
+            condicion += " AND url LIKE ? ESCAPE '\\'"
+            escapado = prefijo_url.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            parametros.append(escapado + "%")
+        if not todas:
+            condicion += (
+                " AND obtenido = (SELECT max(obtenido) FROM capturas AS c2 "
+                "WHERE c2.peticion = capturas.peticion AND c2.status = 200)"
+            )
+        with closing(self._conectar()) as conexion:
+            filas = conexion.execute(
+                "SELECT url, params, status, obtenido, sha256, tamano, cabeceras "
+                f"FROM capturas WHERE {condicion} ORDER BY obtenido",
+                parametros,
+            ).fetchall()
+        for fila in filas:
+            yield _captura(fila)
+
+    def resumen(self) -> dict:
+        """Capturas, peticiones distintas, objetos y bytes en disco."""
+        with closing(self._conectar()) as conexion:
+            capturas, peticiones, objetos, originales = conexion.execute(
+                "SELECT count(*), count(DISTINCT peticion), count(DISTINCT sha256), "
+                "coalesce(sum(tamano), 0) FROM capturas"
+            ).fetchone()
+        comprimidos = sum(
+            ruta.stat().st_size for ruta in (self.directorio / "objetos").rglob("*.gz")
+        )
+        return {
+            "capturas": capturas,
+            "peticiones": peticiones,
+            "objetos": objetos,
+            "bytes_originales": originales,
+            "bytes_en_disco": comprimidos,
+        }
+
+    def __len__(self) -> int:
+        with closing(self._conectar()) as conexion:
+            return conexion.execute("SELECT count(*) FROM capturas").fetchone()[0]
+
+
+def _captura(fila: tuple) -> Captura:
+    url, params, status, obtenido, sha256, tamano, cabeceras = fila
+    return Captura(
+        url=url,
+        params=json.loads(params),
+        status=status,
+        obtenido=obtenido,
+        sha256=sha256,
+        tamano=tamano,
+        cabeceras=json.loads(cabeceras),
+    )
+
+
+_archivo: Optional[ArchivoRespuestas] = None
+_archivo_fallido = False
+_cerrojo_archivo = threading.Lock()
+
+
+def archivo_por_defecto() -> Optional[ArchivoRespuestas]:
+    """Archivo compartido del proceso, o ``None`` si está desactivado.
+
+    Solo existe con ``SECOP_ARCHIVAR=1`` y si el directorio se puede
+    escribir; en modo reproducción siempre está activo.
+    """
+    global _archivo, _archivo_fallido
+    if not (ARCHIVO_HTTP_ACTIVO or ARCHIVO_HTTP_REPLAY) or _archivo_fallido:
+        return None
+    with _cerrojo_archivo:
+        if _archivo is None and not _archivo_fallido:
+            try:
+                _archivo = ArchivoRespuestas()
+            except (OSError, sqlite3.Error) as exc:
+                _archivo_fallido = True
+                logger.warning(
+                    "Archivo de respuestas no disponible en %s (%s); no se "
+                    "archivará.", ARCHIVO_HTTP_DIR, exc,
+                )
+        return _archivo
+
+
+def modo_reproduccion() -> bool:
+    """Si las peticiones se sirven desde el archivo (``SECOP_REPLAY=1``)."""
+    return ARCHIVO_HTTP_REPLAY
+
+
+# ════════════════════════════════════════════════════════════
+# 2. REPARSEO SIN RED
+# ════════════════════════════════════════════════════════════
+
+
+def reparsear_resultados(archivo: ArchivoRespuestas, todas: bool = False):
+    """Vuelve a parsear las páginas de resultados archivadas.
+
+    Returns:
+        DataFrame consolidado, como ``parser.parsear_todas_paginas``.
+    """
+    from parser import parsear_todas_paginas
+
+    paginas = [
+        archivo.texto(c) for c in archivo.capturas(SECOP_RESULTADOS_DATA_URL, todas)
+    ]
+    logger.info("Reparseando %d páginas de resultados archivadas...", len(paginas))
+    return parsear_todas_paginas(paginas)
+
+
+def reparsear_detalles(archivo: ArchivoRespuestas, todas: bool = False):
+    """Vuelve a extraer las fichas de detalle archivadas.
+
+    Returns:
+        DataFrame con una fila por ficha, columnas de ``COLUMNAS_DETALLE``.
+    """
+    import pandas as pd
+
+    from config import COLUMNAS_DETALLE
+    from detail_scraper import _parsear_detalle_html
+
+    registros = []
+    for captura in archivo.capturas(SECOP_DETALLE_URL, todas):
+        url = requests.Request("GET", captura.url, params=captura.params).prepare().url
+        try:
+            registros.append(_parsear_detalle_html(archivo.texto(captura), url).to_dict())
+        except Exception as exc:  # noqa: BLE001 - una ficha mala no detiene el lote
+            logger.warning("Ficha archivada %s ilegible: %s", url, exc)
+    logger.info("%d fichas de detalle reparseadas.", len(registros))
+    if not registros:
+        return pd.DataFrame(columns=COLUMNAS_DETALLE)
+    df = pd.DataFrame(registros)
+    presentes = [c for c in COLUMNAS_DETALLE if c in df.columns]
+    return df[presentes + [c for c in df.columns if c not in COLUMNAS_DETALLE]]
+
+
+# ════════════════════════════════════════════════════════════
+# 3. PUNTO DE ENTRADA
+# ════════════════════════════════════════════════════════════
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--directorio", type=Path, default=ARCHIVO_HTTP_DIR)
+    subcomandos = parser.add_subparsers(dest="subcomando", required=True)
+
+    subcomandos.add_parser("resumen", help="Tamaño y contenido del archivo.")
+
+    sub = subcomandos.add_parser("reparsear", help="Reparsear las respuestas archivadas.")
+    sub.add_argument("tipo", choices=("resultados", "detalle"))
+    sub.add_argument("--salida", "-o", type=Path, required=True, help="CSV o .parquet.")
+    sub.add_argument(
+        "--todas", action="store_true",
+        help="Incluir capturas antiguas de una misma petición.",
+    )
+
+    args = parser.parse_args()
+    setup_logging()
+    archivo = ArchivoRespuestas(args.directorio)
+
+    if args.subcomando == "resumen":
+        for clave, valor in archivo.resumen().items():
+            print(f"{clave:<18} {valor:>14,}")
+        return 0
+
+    inicio = time.perf_counter()
+    try:
+        if args.tipo == "resultados":
+            df = reparsear_resultados(archivo, args.todas)
+        else:
+            df = reparsear_detalles(archivo, args.todas)
+    except SecopEmptyTableError as exc:
+        print(f"Nada que reparsear: {exc}")
+        return 1
+
+    args.salida.parent.mkdir(parents=True, exist_ok=True)
+    if args.salida.suffix.lower() == ".parquet":
+        df.to_parquet(args.salida, index=False, engine=PARQUET_ENGINE)
+    else:
+        df.to_csv(args.salida, index=False, sep=CSV_SEPARATOR, encoding=CSV_ENCODING)
+    print(
+        f"{len(df)} filas reparseadas en {time.perf_counter() - inicio:.1f} s "
+        f"→ {args.salida}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,557 @@
+"""
+benchmarks.py — Mediciones de rendimiento reproducibles del pipeline.
+
+Cada subcomando compara implementaciones alternativas de una etapa y
+comprueba antes que producen **exactamente** el mismo resultado: una
+ruta rápida que cambia la salida no es una optimización.
+
+Subcomandos:
+  • ``parser``: backends de ``parser.parsear_pagina`` sobre páginas de
+    resultados guardadas (o sintéticas, si no se indica ninguna).
+  • ``lote``: ``parser.parsear_todas_paginas`` en serie frente a un pool
+    de procesos.
+  • ``detalle``: backends del parser de fichas de detalle
+    (``detail_scraper._parsear_detalle_html``) sobre fichas guardadas,
+    las del archivo de respuestas o sintéticas.
+  • ``texto``: búsqueda por palabra clave en la API de SECOP II con
+    ``like`` en el servidor frente a ``$q`` con filtro local. Necesita
+    red. Aquí los resultados pueden diferir por diseño (``$q`` casa
+    palabras completas): en lugar de exigir igualdad se informa de qué
+    contratos encuentra cada modo.
+  • ``historico``: versión vigente de una base de ``historico.py``
+    leída con pandas (``BaseHistorica.leer``) frente a la vista de
+    DuckDB (``analitica``), antes y después de compactar. La base es
+    sintética y por defecto usa la clave de la API (``id_contrato``),
+    que la vista debe tomar del índice. Necesita ``duckdb``.
+
+Uso:
+  python benchmarks.py parser --paginas "output/paginas/*.html"
+  python benchmarks.py parser --sinteticas 50 --repeticiones 5
+  python benchmarks.py lote --sinteticas 1000 --procesos 8
+  python benchmarks.py detalle --archivo
+  python benchmarks.py detalle --fichas "output/fichas/*.html"
+  python benchmarks.py texto --departamento Santander --desde 01/01/2024
+  python benchmarks.py historico --lotes 20 --filas 5000
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import random
+import statistics
+import sys
+import time
+from glob import glob
+from pathlib import Path
+from typing import Callable
+
+import pandas as pd
+
+from config import setup_logging
+
+logger = logging.getLogger(__name__)
+
+
+# ════════════════════════════════════════════════════════════
+# 1. UTILIDADES
+# ════════════════════════════════════════════════════════════
+
+
+def _cronometrar(funcion: Callable[[], object], repeticiones: int) -> list[float]:
+    """Ejecuta ``funcion`` varias veces y devuelve los tiempos en segundos."""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return tiempos
+
+
+def _imprimir_tabla(resultados: dict[str, list[float]], unidades: int, nombre: str) -> None:
+    """Imprime mediana y mejor tiempo por variante, relativos a la primera."""
+    referencia = statistics.median(next(iter(resultados.values())))
+    print(f"\n{'variante':<12} {'mediana':>10} {'mejor':>10} {nombre:>14} {'vs ref':>8}")
+    for variante, tiempos in resultados.items():
+        mediana = statistics.median(tiempos)
+        print(
+            f"{variante:<12} {mediana * 1000:>8.1f}ms {min(tiempos) * 1000:>8.1f}ms "
+            f"{unidades / mediana:>14,.0f} {referencia / mediana:>7.1f}x"
+        )
+
+
+def _cargar_paginas(patron: str | None, sinteticas: int) -> list[str]:
+    if patron:
+        rutas = sorted(glob(patron, recursive=True))
+        if not rutas:
+            raise SystemExit(f"No hay páginas que coincidan con '{patron}'.")
+        return [Path(r).read_text(encoding="utf-8", errors="replace") for r in rutas]
+    return [pagina_sintetica(semilla=i) for i in range(sinteticas)]
+
+
+# ════════════════════════════════════════════════════════════
+# 2. PÁGINAS SINTÉTICAS
+# ════════════════════════════════════════════════════════════
+
+_MODALIDADES = (
+    "Contratación Mínima Cuantía",
+    "Selección Abreviada de Menor Cuantía (Ley 1150 de 2007)",
+    "Licitación Pública",
+    "Contratación Directa (Ley 1150 de 2007)",
+)
+_ESTADOS = ("Celebrado", "Convocado", "Adjudicado", "Liquidado")
+_MUNICIPIOS = ("Bucaramanga", "Girón", "Floridablanca", "San Gil", "Barrancabermeja")
+
+
+def pagina_sintetica(filas: int = 100, semilla: int = 0) -> str:
+    """Genera una página con la estructura real de ``resultadosConsulta.do``.
+
+    Incluye el ruido que rodea a la tabla en producción (tablas de
+    maquetación, formulario, paginador) para que la localización de la
+    tabla cueste lo que cuesta con una página real.
+    """
+    azar = random.Random(semilla)
+    cuerpo = []
+    for n in range(1, filas + 1):
+        id_proceso = f"{azar.randint(20, 26)}-{azar.randint(1, 15)}-{azar.randint(10**7, 10**8)}"
+        municipio = azar.choice(_MUNICIPIOS)
+        cuerpo.append(
+            f"""<tr class="{'fila_par' if n % 2 else 'fila_impar'}">
+  <td class="tdOrden">{n}</td>
+  <td><a href="#" onclick="javascript: consultaProceso('{id_proceso}')">MC-{n:03d}-{2020 + semilla % 6}</a></td>
+  <td>{azar.choice(_MODALIDADES)}</td>
+  <td>{azar.choice(_ESTADOS)}</td>
+  <td>SANTANDER - ALCALDÍA MUNICIPIO DE {municipio.upper()}</td>
+  <td>SUMINISTRO DE ELEMENTOS &amp; SERVICIOS  PARA LA {'OBRA ' * azar.randint(3, 30)}</td>
+  <td>Santander : {municipio}</td>
+  <td>${azar.randint(1, 9999)}.{azar.randint(100, 999)}.000,00</td>
+  <td>Fecha de Celebración del Primer Contrato {azar.randint(1, 28):02d}-{azar.randint(1, 12):02d}-2025</td>
+</tr>"""
+        )
+
+    return f"""<!DOCTYPE html>
+<html><head><title>SECOP I - Resultados</title>
+<script>function consultaProceso(id) {{ window.open('detalleProceso.do?numConstancia=' + id); }}</script>
+</head><body>
+<table width="100%"><tr><td><img src="logo.png"/></td><td>Colombia Compra Eficiente</td></tr></table>
+<form name="consultaForm"><input type="hidden" name="totalResultados" value="{filas * 37}" />
+<table class="formulario">{''.join(f'<tr><td>Campo {i}</td><td><input name="c{i}"/></td></tr>' for i in range(12))}</table>
+</form>
+<table>
+<tr>
+  <td>&#8711;</td><td>Número de Proceso</td><td>Tipo de Proceso</td><td>Estado</td>
+  <td>Entidad</td><td>Objeto</td><td>Departamento y Municipio de Ejecución</td>
+  <td>Cuantía</td><td>Fecha(dd-mm-aaaa)</td>
+</tr>
+{''.join(cuerpo)}
+</table>
+<table class="paginador"><tr>{''.join(f'<td><a href="#" onclick="irPagina({i})">{i}</a></td>' for i in range(1, 21))}</tr></table>
+</body></html>"""
+
+
+_SECCIONES_FICHA = (
+    ("Información General del Proceso", (
+        ("Tipo de Proceso", lambda a: a.choice(_MODALIDADES)),
+        ("Estado del Proceso", lambda a: a.choice(_ESTADOS)),
+        ("Detalle y Cantidad del Objeto a Contratar", lambda a: "SUMINISTRO DE " + "MATERIALES " * a.randint(2, 20)),
+        ("Cuantía a Contratar", lambda a: f"${a.randint(1, 9999) * 10**6:,}".replace(",", ".") + ",00"),
+        ("Fecha y Hora de Apertura del Proceso", lambda a: f"{a.randint(1, 28):02d}-{a.randint(1, 12):02d}-2025 11:30 A.M."),
+        ("Fecha y Hora de Cierre del Proceso", lambda a: f"{a.randint(1, 28):02d}-{a.randint(1, 12):02d}-2025 03:00 P.M."),
+        ("Departamento y Municipio de Ejecución", lambda a: f"Santander : {a.choice(_MUNICIPIOS)}"),
+    )),
+    ("Información del Contrato", (
+        ("Número del Contrato", lambda a: f"CT-{a.randint(1, 999):03d}-2025"),
+        ("Tipo de Contrato", lambda a: a.choice(("Obra", "Suministro", "Prestación de Servicios"))),
+        ("Estado del Contrato", lambda a: a.choice(("Celebrado", "Liquidado", "En ejecución"))),
+        ("Nombre o Razón Social del Contratista", lambda a: f"CONSORCIO <b>VÍAS</b> {a.randint(1, 99)}"),
+        ("Identificación del Contratista", lambda a: f"Nit de Persona Jurídica No. {a.randint(8 * 10**8, 9 * 10**8)}"),
+        ("Cuantía Definitiva del Contrato", lambda a: f"${a.randint(1, 9999) * 10**6:,} Peso Colombiano".replace(",", ".")),
+        ("Fecha de Firma del Contrato", lambda a: f"{a.randint(1, 28):02d}-{a.randint(1, 12):02d}-2025"),
+    )),
+)
+
+
+def ficha_sintetica(semilla: int = 0) -> str:
+    """Genera una ficha con la estructura de ``detalleProceso.do``.
+
+    Lleva lo que rodea a los datos en producción: cabecera con el número
+    y la entidad, menús, scripts, tablas de maquetación anidadas, filas
+    de una sola celda, comentarios y documentos adjuntos al final.
+    """
+    azar = random.Random(semilla)
+    secciones = []
+    for titulo, campos in _SECCIONES_FICHA:
+        filas = "".join(
+            f'<tr><td class="tttablas" width="30%">{etiqueta}</td>'
+            f'<td class="tablaslistOdd"><!-- valor -->{generar(azar)}</td></tr>'
+            for etiqueta, generar in campos
+        )
+        secciones.append(
+            f'<tr><td colspan="2" class="tttablas"><b>{titulo}</b></td></tr>{filas}'
+        )
+    documentos = "".join(
+        f'<tr><td><a href="#" onclick="descargar({n})">Documento {n}.pdf</a></td>'
+        f'<td>{azar.randint(1, 28):02d}-01-2025</td><td>Publicado</td></tr>'
+        for n in range(azar.randint(5, 40))
+    )
+    return f"""<!DOCTYPE html>
+<html><head><title>SECOP I - Detalle del Proceso</title>
+<script>var t = "<tr><td>Estado del Proceso</td><td>falso</td></tr>";</script>
+<style>td {{ font-size: 11px; }}</style></head><body>
+<table width="100%"><tr><td><img src="logo.png"/></td><td>Colombia Compra Eficiente</td></tr>
+<tr><td colspan="2">{''.join(f'<a href="#">Menú {i}</a> | ' for i in range(15))}</td></tr></table>
+<table><tr><td>
+  <p class="titulo">Detalle del Proceso Número: MC-{azar.randint(1, 999):03d}-{2020 + semilla % 6}</p>
+  <p>SANTANDER - ALCALDÍA MUNICIPIO DE {azar.choice(_MUNICIPIOS).upper()}</p>
+</td></tr></table>
+<table class="tablaDetalle">{''.join(secciones)}</table>
+<table class="documentos"><tr><td>Nombre</td><td>Fecha</td><td>Estado</td></tr>{documentos}</table>
+</body></html>"""
+
+
+# ════════════════════════════════════════════════════════════
+# 3. SUBCOMANDO: parser
+# ════════════════════════════════════════════════════════════
+
+
+def benchmark_parser(args: argparse.Namespace) -> int:
+    """Compara los backends de ``parsear_pagina`` y verifica equivalencia."""
+    import parser as modulo_parser
+
+    paginas = _cargar_paginas(args.paginas, args.sinteticas)
+    backends = [b for b in args.backends.split(",") if b]
+    logger.info("Benchmark de parser: %d páginas, backends %s.", len(paginas), backends)
+
+    # Verificación: todos los backends deben producir el mismo frame.
+    diferencias = 0
+    for indice, html in enumerate(paginas):
+        referencia = modulo_parser.parsear_pagina(html, backend=backends[0])
+        for backend in backends[1:]:
+            otro = modulo_parser.parsear_pagina(html, backend=backend)
+            try:
+                pd.testing.assert_frame_equal(referencia, otro)
+            except AssertionError as exc:
+                diferencias += 1
+                print(f"Página {indice}: '{backend}' difiere de '{backends[0]}':\n{exc}")
+    if diferencias:
+        print(f"\n{diferencias} diferencias: el benchmark no es válido.")
+        return 1
+
+    filas = sum(len(modulo_parser.parsear_pagina(h, backend=backends[0])) for h in paginas)
+    print(f"Equivalencia verificada en {len(paginas)} páginas ({filas} filas).")
+
+    # Sin logging INFO por página durante la medición.
+    logging.getLogger("parser").setLevel(logging.WARNING)
+    resultados = {
+        backend: _cronometrar(
+            lambda b=backend: [modulo_parser.parsear_pagina(h, backend=b) for h in paginas],
+            args.repeticiones,
+        )
+        for backend in backends
+    }
+    _imprimir_tabla(resultados, len(paginas), "páginas/s")
+    return 0
+
+
+def benchmark_lote(args: argparse.Namespace) -> int:
+    """Compara ``parsear_todas_paginas`` en serie y con un pool de procesos."""
+    import parser as modulo_parser
+
+    paginas = _cargar_paginas(args.paginas, args.sinteticas)
+    logging.getLogger("parser").setLevel(logging.WARNING)
+
+    serie = modulo_parser.parsear_todas_paginas(paginas, procesos=1)
+    paralelo = modulo_parser.parsear_todas_paginas(paginas, procesos=args.procesos)
+    try:
+        pd.testing.assert_frame_equal(serie, paralelo)
+    except AssertionError as exc:
+        print(f"El resultado en paralelo difiere del secuencial:\n{exc}")
+        return 1
+    print(f"Equivalencia verificada: {len(serie)} filas de {len(paginas)} páginas.")
+
+    resultados = {
+        "serie": _cronometrar(
+            lambda: modulo_parser.parsear_todas_paginas(paginas, procesos=1),
+            args.repeticiones,
+        ),
+        f"{args.procesos} procesos": _cronometrar(
+            lambda: modulo_parser.parsear_todas_paginas(paginas, procesos=args.procesos),
+            args.repeticiones,
+        ),
+    }
+    _imprimir_tabla(resultados, len(paginas), "páginas/s")
+    return 0
+
+
+def _cargar_fichas(args: argparse.Namespace) -> list[tuple[str, str]]:
+    """``(url, html)`` de las fichas a medir."""
+    if args.fichas:
+        rutas = sorted(glob(args.fichas, recursive=True))
+        if not rutas:
+            raise SystemExit(f"No hay fichas que coincidan con '{args.fichas}'.")
+        return [
+            (Path(r).name, Path(r).read_text(encoding="utf-8", errors="replace"))
+            for r in rutas
+        ]
+    if args.archivo:
+        from archivo_http import ArchivoRespuestas
+        from config import ARCHIVO_HTTP_DIR, SECOP_DETALLE_URL
+
+        archivo = ArchivoRespuestas(ARCHIVO_HTTP_DIR)
+        fichas = [
+            (captura.url, archivo.texto(captura))
+            for captura in archivo.capturas(SECOP_DETALLE_URL)
+        ]
+        if not fichas:
+            raise SystemExit(f"No hay fichas de detalle archivadas en {ARCHIVO_HTTP_DIR}.")
+        return fichas
+    return [
+        (f"sintetica-{i}", ficha_sintetica(semilla=i)) for i in range(args.sinteticas)
+    ]
+
+
+def benchmark_detalle(args: argparse.Namespace) -> int:
+    """Compara los backends del parser de fichas y verifica equivalencia."""
+    import detail_scraper
+
+    fichas = _cargar_fichas(args)
+    backends = [b for b in args.backends.split(",") if b]
+    logging.getLogger("detail_scraper").setLevel(logging.WARNING)
+    logger.info("Benchmark de fichas: %d fichas, backends %s.", len(fichas), backends)
+
+    diferencias = 0
+    for url, html in fichas:
+        referencia = detail_scraper._parsear_detalle_html(html, url, backend=backends[0])
+        for backend in backends[1:]:
+            otro = detail_scraper._parsear_detalle_html(html, url, backend=backend)
+            if otro != referencia:
+                diferencias += 1
+                distintos = {
+                    campo: (valor, getattr(otro, campo))
+                    for campo, valor in referencia.to_dict().items()
+                    if getattr(otro, campo) != valor
+                }
+                print(f"{url}: '{backend}' difiere de '{backends[0]}': {distintos}")
+    if diferencias:
+        print(f"\n{diferencias} diferencias: el benchmark no es válido.")
+        return 1
+
+    campos = sum(
+        sum(1 for v in detail_scraper._parsear_detalle_html(h, u, backend=backends[0]).to_dict().values() if v)
+        for u, h in fichas
+    )
+    print(f"Equivalencia verificada en {len(fichas)} fichas ({campos} campos con valor).")
+
+    resultados = {
+        backend: _cronometrar(
+            lambda b=backend: [
+                detail_scraper._parsear_detalle_html(h, u, backend=b) for u, h in fichas
+            ],
+            args.repeticiones,
+        )
+        for backend in backends
+    }
+    _imprimir_tabla(resultados, len(fichas), "fichas/s")
+    return 0
+
+
+# ════════════════════════════════════════════════════════════
+# 4. SUBCOMANDO: texto
+# ════════════════════════════════════════════════════════════
+
+# Consultas representativas del dashboard: una palabra, varias, con y
+# sin tildes, y términos muy frecuentes.
+_CONSULTAS_TEXTO = (
+    "vigilancia",
+    "suministro combustible",
+    "mantenimiento vehículos",
+    "interventoría obra",
+    "prestación servicios profesionales",
+)
+
+
+def benchmark_texto(args: argparse.Namespace) -> int:
+    """Compara ``like`` y ``$q`` para la palabra clave en SECOP II."""
+    import api_scraper
+
+    logging.getLogger("api_scraper").setLevel(logging.WARNING)
+    logging.getLogger("cleaning").setLevel(logging.WARNING)
+    consultas = [c for c in args.consultas.split(",") if c.strip()] or list(_CONSULTAS_TEXTO)
+    filtros = {
+        "departamento": args.departamento or None,
+        "fecha_inicio": args.desde or None,
+        "fecha_fin": args.hasta or None,
+        "max_registros": args.max_registros,
+    }
+    print(f"Filtros: {filtros}")
+
+    incompletos = 0
+    for consulta in consultas:
+        resultados: dict[str, list[float]] = {}
+        ids: dict[str, set[str]] = {}
+        for modo in ("like", "q"):
+            tiempos = []
+            for _ in range(args.repeticiones):
+                inicio = time.perf_counter()
+                try:
+                    df = api_scraper.consultar_contratos(
+                        palabra_clave=consulta, busqueda=modo, **filtros
+                    )
+                except RuntimeError as exc:
+                    print(f"'{consulta}' [{modo}]: falló ({exc}).")
+                    break
+                tiempos.append(time.perf_counter() - inicio)
+                ids[modo] = set(df["id_contrato"].dropna().astype(str))
+            if tiempos:
+                resultados[modo] = tiempos
+
+        print(f"\n── '{consulta}' ──")
+        if len(resultados) < 2:
+            incompletos += 1
+            continue
+        comunes = ids["like"] & ids["q"]
+        print(
+            f"like: {len(ids['like']):,} · $q: {len(ids['q']):,} · en ambos: "
+            f"{len(comunes):,} · solo like: {len(ids['like'] - ids['q']):,} · "
+            f"solo $q: {len(ids['q'] - ids['like']):,}"
+        )
+        _imprimir_tabla(resultados, max(len(ids["like"]), 1), "contratos/s")
+
+    if args.max_registros is not None:
+        print(
+            "\nCon --max-registros cada modo se queda con los primeros que "
+            "encuentra: las diferencias de conjunto no son de cobertura."
+        )
+    return 1 if incompletos == len(consultas) else 0
+
+
+# ════════════════════════════════════════════════════════════
+# 5. SUBCOMANDO: historico
+# ════════════════════════════════════════════════════════════
+
+
+def _lote_historico(clave: str, lote: int, filas: int, universo: int, semilla: int) -> pd.DataFrame:
+    """Lote sintético cuyas claves se repiten con las de otros lotes."""
+    azar = random.Random(semilla)
+    return pd.DataFrame({
+        clave: [f"CO1.PCCNTR.{azar.randrange(universo)}" for _ in range(filas)],
+        "valor_del_contrato": [float(azar.randrange(1, 10**9)) for _ in range(filas)],
+        "lote": lote,
+    })
+
+
+def benchmark_historico(args: argparse.Namespace) -> int:
+    """Compara ``BaseHistorica.leer`` con la vista ``historico`` de DuckDB."""
+    import tempfile
+
+    from analitica import MotorAnalitico
+    from historico import BaseHistorica
+
+    logging.getLogger("historico").setLevel(logging.WARNING)
+    logging.getLogger("analitica").setLevel(logging.WARNING)
+    universo = max(1, args.lotes * args.filas // 2)
+
+    with tempfile.TemporaryDirectory() as directorio:
+        # Sin columna_clave: la fija el primer lote y queda en el índice.
+        base = BaseHistorica(directorio)
+        for lote in range(args.lotes):
+            base.upsert(
+                _lote_historico(args.clave, lote, args.filas, universo, lote),
+                compactar=False,
+            )
+        print(f"Base sintética: {len(base):,} registros vigentes, clave '{base.columna_clave}'.")
+
+        for etapa in ("sin compactar", "compactada"):
+            if etapa == "compactada":
+                base.compactar(forzar=True)
+            with MotorAnalitico() as motor:
+                motor.registrar_historico("historico", directorio)
+                vista = motor.consultar("SELECT * FROM historico")
+            esperado = base.leer()
+            try:
+                pd.testing.assert_frame_equal(
+                    esperado.sort_values(args.clave).reset_index(drop=True),
+                    vista[list(esperado.columns)].sort_values(args.clave).reset_index(drop=True),
+                    check_dtype=False,
+                )
+            except (AssertionError, KeyError) as exc:
+                print(f"La vista de DuckDB difiere de la base ({etapa}):\n{exc}")
+                return 1
+            print(f"Equivalencia verificada ({etapa}): {len(vista):,} filas.")
+
+        def _duckdb() -> None:
+            with MotorAnalitico() as motor:
+                motor.registrar_historico("historico", directorio)
+                motor.consultar("SELECT * FROM historico")
+
+        resultados = {
+            "pandas": _cronometrar(base.leer, args.repeticiones),
+            "duckdb": _cronometrar(_duckdb, args.repeticiones),
+        }
+        _imprimir_tabla(resultados, len(base), "registros/s")
+    return 0
+
+
+# ════════════════════════════════════════════════════════════
+# 6. PUNTO DE ENTRADA
+# ════════════════════════════════════════════════════════════
+
+
+def construir_parser_args() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    subcomandos = parser.add_subparsers(dest="subcomando", required=True)
+
+    sub = subcomandos.add_parser("parser", help="Backends de parsear_pagina.")
+    sub.add_argument("--paginas", default=None, help="Patrón glob de páginas HTML guardadas.")
+    sub.add_argument("--sinteticas", type=int, default=20, help="Páginas sintéticas si no hay --paginas.")
+    sub.add_argument("--backends", default="bs4,lxml,tokens", help="Backends separados por comas.")
+    sub.add_argument("--repeticiones", type=int, default=5)
+    sub.set_defaults(funcion=benchmark_parser)
+
+    sub = subcomandos.add_parser("lote", help="parsear_todas_paginas en serie vs. en paralelo.")
+    sub.add_argument("--paginas", default=None, help="Patrón glob de páginas HTML guardadas.")
+    sub.add_argument("--sinteticas", type=int, default=400, help="Páginas sintéticas si no hay --paginas.")
+    sub.add_argument("--procesos", type=int, default=os.cpu_count() or 2)
+    sub.add_argument("--repeticiones", type=int, default=3)
+    sub.set_defaults(funcion=benchmark_lote)
+
+    sub = subcomandos.add_parser("detalle", help="Backends del parser de fichas de detalle.")
+    fuente = sub.add_mutually_exclusive_group()
+    fuente.add_argument("--fichas", default=None, help="Patrón glob de fichas HTML guardadas.")
+    fuente.add_argument("--archivo", action="store_true", help="Usar las fichas del archivo de respuestas.")
+    sub.add_argument("--sinteticas", type=int, default=200, help="Fichas sintéticas si no hay otra fuente.")
+    sub.add_argument("--backends", default="bs4,lxml", help="Backends separados por comas.")
+    sub.add_argument("--repeticiones", type=int, default=5)
+    sub.set_defaults(funcion=benchmark_detalle)
+
+    sub = subcomandos.add_parser("texto", help="Palabra clave en SECOP II: like vs. $q.")
+    sub.add_argument(
+        "--consultas", default="",
+        help="Consultas separadas por comas (por defecto, un juego representativo).",
+    )
+    sub.add_argument("--departamento", default="Santander", help="'' = todo el país.")
+    sub.add_argument("--desde", default="01/01/2024", help="Fecha inicial dd/MM/yyyy ('' = sin límite).")
+    sub.add_argument("--hasta", default="", help="Fecha final dd/MM/yyyy.")
+    sub.add_argument("--max-registros", type=int, default=None)
+    sub.add_argument("--repeticiones", type=int, default=1)
+    sub.set_defaults(funcion=benchmark_texto)
+
+    sub = subcomandos.add_parser("historico", help="Base histórica: pandas vs. vista de DuckDB.")
+    sub.add_argument("--clave", choices=("id_contrato", "numero_proceso"), default="id_contrato")
+    sub.add_argument("--lotes", type=int, default=10)
+    sub.add_argument("--filas", type=int, default=2000, help="Filas por lote.")
+    sub.add_argument("--repeticiones", type=int, default=3)
+    sub.set_defaults(funcion=benchmark_historico)
+
+    return parser
+
+
+def main() -> int:
+    args = construir_parser_args().parse_args()
+    setup_logging()
+    return args.funcion(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,235 @@
+"""
+bitacora.py — Puntos de control en disco para rastreos largos.
+
+Una descarga de 200 páginas de SECOP I o de miles de fichas de detalle
+puede cortarse a mitad por un ``SecopBlockedError``, un corte de red o
+un Ctrl+C. Sin bitácora todo lo descargado se pierde y hay que empezar
+de cero (y volver a gastar el presupuesto de peticiones del WAF).
+
+La bitácora es una base SQLite (``BITACORA_ARCHIVO``) con un registro
+por **sesión** y, dentro de cada sesión, un registro por **elemento**
+terminado (una página o una URL de detalle) con su resultado
+comprimido. Cada sesión pertenece a un **trabajo**, que se identifica
+por la huella de su definición canónica: los filtros de búsqueda tal y
+como se envían al portal (sin el número de página), o la lista de URLs
+de detalle.
+
+Ciclo de vida:
+  1. Se abre una sesión del trabajo. Con ``reanudar=True`` se adopta la
+     sesión más reciente que dejó una ejecución anterior; sin él, se
+     empieza una nueva. Dos ejecuciones simultáneas de la misma consulta
+     no se pisan: cada una ve y borra solo su sesión.
+  2. Cada elemento terminado se guarda al momento (una transacción por
+     elemento: un corte pierde como mucho el elemento en curso).
+  3. Al terminar con éxito se llama a ``finalizar`` y la sesión se
+     borra: la siguiente ejecución vuelve a descargar datos frescos.
+     Las sesiones abandonadas se purgan pasados
+     ``BITACORA_RETENCION_DIAS``.
+
+Si la base no se puede abrir (disco de solo lectura) la bitácora se
+desactiva sola y el rastreo sigue sin puntos de control.
+
+Uso:
+    >>> bitacora = Bitacora("detalle", sorted(urls), reanudar=True)
+    >>> for url in urls:
+    ...     if url in bitacora:
+    ...         continue
+    ...     bitacora.guardar(url, descargar(url))
+    >>> bitacora.finalizar()
+"""
+
+from __future__ import annotations
+
+import logging
+import sqlite3
+import time
+import uuid
+import zlib
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+from cache_disco import huella
+from config import BITACORA_ARCHIVO, BITACORA_RETENCION_DIAS
+
+logger = logging.getLogger(__name__)
+
+
+class Bitacora:
+    """Progreso persistente de un trabajo de rastreo.
+
+    Args:
+        tipo:     Clase de trabajo (``"secop1"``, ``"detalle"``...).
+        *partes:  Definición canónica del trabajo; su huella es la clave.
+        reanudar: Adoptar la última sesión de una ejecución anterior.
+        ruta:     Base SQLite de la bitácora.
+        sesion:   Abrir exactamente esta sesión (la que devolvió
+                  ``sesion`` de una bitácora anterior del mismo proceso).
+    """
+
+    def __init__(
+        self,
+        tipo: str,
+        *partes: Any,
+        reanudar: bool = False,
+        ruta: Path = BITACORA_ARCHIVO,
+        sesion: Optional[str] = None,
+    ) -> None:
+        self.tipo = tipo
+        self.clave = huella(tipo, *partes)
+        self.sesion = sesion or uuid.uuid4().hex
+        self._conexion = self._abrir(Path(ruta))
+        if self._conexion is None:
+            return
+
+        self._purgar()
+        if reanudar and sesion is None:
+            fila = self._conexion.execute(
+                "SELECT id FROM sesiones WHERE trabajo = ? "
+                "ORDER BY creado DESC LIMIT 1",
+                (self.clave,),
+            ).fetchone()
+            if fila is not None:
+                self.sesion = fila[0]
+        with self._conexion:
+            self._conexion.execute(
+                "INSERT OR IGNORE INTO sesiones (id, trabajo, tipo, creado) "
+                "VALUES (?, ?, ?, ?)",
+                (self.sesion, self.clave, tipo, time.time()),
+            )
+        terminados = len(self)
+        if reanudar and terminados:
+            logger.info(
+                "Reanudando trabajo %s (%s): %d elementos ya terminados.",
+                self.clave[:12], tipo, terminados,
+            )
+
+    # ── Base de datos ───────────────────────────────────────
+
+    @staticmethod
+    def _abrir(ruta: Path) -> Optional[sqlite3.Connection]:
+        try:
+            ruta.parent.mkdir(parents=True, exist_ok=True)
+            # Un mismo trabajo puede avanzar desde otro hilo (el productor
+            # de ``flujo.py``), nunca desde dos a la vez.
+            conexion = sqlite3.connect(ruta, timeout=30, check_same_thread=False)
+            conexion.execute("PRAGMA journal_mode=WAL")
+            conexion.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS sesiones (
+                    id        TEXT PRIMARY KEY,
+                    trabajo   TEXT NOT NULL,
+                    tipo      TEXT NOT NULL,
+                    creado    REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS sesiones_trabajo ON sesiones (trabajo);
+                CREATE TABLE IF NOT EXISTS elementos_sesion (
+                    sesion    TEXT NOT NULL,
+                    elemento  TEXT NOT NULL,
+                    datos     BLOB,
+                    terminado REAL NOT NULL,
+                    PRIMARY KEY (sesion, elemento)
+                );
+                """
+            )
+            return conexion
+        except (OSError, sqlite3.Error) as exc:
+            logger.warning(
+                "Bitácora no disponible en %s (%s); el rastreo no se podrá "
+                "reanudar.", ruta, exc,
+            )
+            return None
+
+    def _purgar(self) -> None:
+        """Borra las sesiones abandonadas hace más de la retención."""
+        limite = time.time() - BITACORA_RETENCION_DIAS * 86400
+        with self._conexion:
+            self._conexion.execute(
+                "DELETE FROM elementos_sesion WHERE sesion IN "
+                "(SELECT id FROM sesiones WHERE creado < ?)",
+                (limite,),
+            )
+            self._conexion.execute("DELETE FROM sesiones WHERE creado < ?", (limite,))
+
+    def _borrar(self) -> None:
+        with self._conexion:
+            self._conexion.execute(
+                "DELETE FROM elementos_sesion WHERE sesion = ?", (self.sesion,)
+            )
+            self._conexion.execute("DELETE FROM sesiones WHERE id = ?", (self.sesion,))
+
+    @property
+    def activa(self) -> bool:
+        """Si los puntos de control se están guardando."""
+        return self._conexion is not None
+
+    # ── Elementos ───────────────────────────────────────────
+
+    def guardar(self, elemento: str, datos: Optional[str] = None) -> None:
+        """Marca un elemento como terminado, con su resultado opcional."""
+        if self._conexion is None:
+            return
+        blob = zlib.compress(datos.encode("utf-8")) if datos is not None else None
+        with self._conexion:
+            self._conexion.execute(
+                "INSERT OR REPLACE INTO elementos_sesion "
+                "(sesion, elemento, datos, terminado) VALUES (?, ?, ?, ?)",
+                (self.sesion, elemento, blob, time.time()),
+            )
+
+    def guardar_varios(self, elementos: Iterable[str]) -> None:
+        """Marca varios elementos como terminados en una sola transacción.
+
+        Para cuando el resultado ya está a salvo en otra parte (las
+        partes Parquet de ``acumulador.py``) y solo hace falta la marca.
+        """
+        if self._conexion is None:
+            return
+        ahora = time.time()
+        with self._conexion:
+            self._conexion.executemany(
+                "INSERT OR REPLACE INTO elementos_sesion "
+                "(sesion, elemento, datos, terminado) VALUES (?, ?, NULL, ?)",
+                ((self.sesion, elemento, ahora) for elemento in elementos),
+            )
+
+    def leer(self, elemento: str) -> Optional[str]:
+        """Resultado guardado de un elemento (``None`` si no está o no tiene)."""
+        if self._conexion is None:
+            return None
+        fila = self._conexion.execute(
+            "SELECT datos FROM elementos_sesion WHERE sesion = ? AND elemento = ?",
+            (self.sesion, elemento),
+        ).fetchone()
+        if fila is None or fila[0] is None:
+            return None
+        return zlib.decompress(fila[0]).decode("utf-8")
+
+    def __contains__(self, elemento: str) -> bool:
+        if self._conexion is None:
+            return False
+        return self._conexion.execute(
+            "SELECT 1 FROM elementos_sesion WHERE sesion = ? AND elemento = ?",
+            (self.sesion, elemento),
+        ).fetchone() is not None
+
+    def __len__(self) -> int:
+        if self._conexion is None:
+            return 0
+        return self._conexion.execute(
+            "SELECT count(*) FROM elementos_sesion WHERE sesion = ?", (self.sesion,)
+        ).fetchone()[0]
+
+    # ── Ciclo de vida ───────────────────────────────────────
+
+    def finalizar(self) -> None:
+        """El trabajo terminó con éxito: se borra el progreso de la sesión."""
+        if self._conexion is None:
+            return
+        self._borrar()
+        self.cerrar()
+
+    def cerrar(self) -> None:
+        """Cierra la base conservando el progreso para ``--reanudar``."""
+        if self._conexion is not None:
+            self._conexion.close()
+            self._conexion = None
@@ -0,0 +1,318 @@
+"""
+cache_disco.py — Caché persistente en disco con caducidad y desalojo LRU.
+
+La caché de Streamlit (``st.cache_data``) vive en la memoria de un solo
+proceso y se pierde en cada reinicio. Esta otra guarda cada entrada como
+un archivo en disco y lleva un índice SQLite con la fecha de creación,
+el último acceso y el tamaño, de modo que:
+
+  • **Sobrevive a reinicios** y la comparten todos los procesos que usen
+    el mismo directorio (SQLite serializa las escrituras concurrentes).
+  • **Caduca por TTL**: una entrada más vieja que ``ttl`` deja de
+    servirse. Con ``gracia`` se puede seguir sirviendo, marcada como
+    vencida, mientras se revalida (*stale-while-revalidate*).
+  • **Está acotada en tamaño**: al superar ``max_bytes`` se desalojan
+    las entradas usadas hace más tiempo (LRU).
+
+Los archivos se escriben en un temporal y se renombran al final, así que
+un lector nunca ve una entrada a medio escribir.
+
+Si el sistema de archivos es de solo lectura la caché se desactiva sola:
+todas las operaciones pasan a ser no-ops y las lecturas fallan siempre.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+from contextlib import closing
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+_NOMBRE_INDICE = "indice.sqlite"
+
+
+def huella(*partes: Any) -> str:
+    """Calcula una huella estable de una combinación de valores.
+
+    Los diccionarios se serializan con las claves ordenadas, así que el
+    orden en que se construyeron no altera la huella. Los valores que no
+    son JSON (fechas, rutas) se convierten a texto.
+
+    Returns:
+        Hash SHA-256 en hexadecimal.
+    """
+    texto = json.dumps(
+        partes, sort_keys=True, default=str, ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class EntradaCache:
+    """Una entrada leída de la caché."""
+
+    clave: str
+    ruta: Path
+    creado: float
+    metadatos: dict[str, Any] = field(default_factory=dict)
+    vencida: bool = False
+
+    @property
+    def edad(self) -> float:
+        """Segundos transcurridos desde que se guardó."""
+        return time.time() - self.creado
+
+
+class CacheDisco:
+    """Caché de archivos en disco con TTL y desalojo LRU.
+
+    Args:
+        directorio: Carpeta donde viven los archivos y el índice.
+        ttl:        Segundos durante los que una entrada está fresca.
+        max_bytes:  Tamaño máximo del directorio antes de desalojar.
+        gracia:     Segundos adicionales durante los que una entrada
+                    vencida todavía se puede servir si se pide con
+                    ``permitir_vencida=True``.
+    """
+
+    def __init__(
+        self,
+        directorio: Path,
+        ttl: float,
+        max_bytes: int,
+        gracia: float = 0.0,
+    ) -> None:
+        self.directorio = Path(directorio)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.gracia = gracia
+        self.disponible = self._preparar()
+
+    # ── Índice ──────────────────────────────────────────────
+
+    def _preparar(self) -> bool:
+        try:
+            self.directorio.mkdir(parents=True, exist_ok=True)
+            with closing(self._conectar()) as conexion, conexion:
+                conexion.execute(
+                    "CREATE TABLE IF NOT EXISTS entradas ("
+                    " clave TEXT PRIMARY KEY,"
+                    " archivo TEXT NOT NULL,"
+                    " creado REAL NOT NULL,"
+                    " accedido REAL NOT NULL,"
+                    " bytes INTEGER NOT NULL,"
+                    " metadatos TEXT NOT NULL DEFAULT '{}')"
+                )
+            return True
+        except (OSError, sqlite3.Error) as exc:
+            logger.warning(
+                "Caché en disco desactivada en %s: %s", self.directorio, exc
+            )
+            return False
+
+    def _conectar(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.directorio / _NOMBRE_INDICE, timeout=30)
+
+    # ── Lectura ─────────────────────────────────────────────
+
+    def obtener(
+        self, clave: str, permitir_vencida: bool = False
+    ) -> Optional[EntradaCache]:
+        """Busca una entrada y registra el acceso para el LRU.
+
+        Args:
+            clave:            Clave de la entrada (normalmente una huella).
+            permitir_vencida: Devolver también entradas pasadas de TTL
+                              pero dentro de la ventana de ``gracia``.
+
+        Returns:
+            La entrada, o ``None`` si no existe, caducó o su archivo
+            desapareció.
+        """
+        if not self.disponible:
+            return None
+
+        try:
+            with closing(self._conectar()) as conexion, conexion:
+                fila = conexion.execute(
+                    "SELECT archivo, creado, metadatos FROM entradas "
+                    "WHERE clave = ?", (clave,),
+                ).fetchone()
+                if fila is None:
+                    return None
+
+                archivo, creado, metadatos = fila
+                edad = time.time() - creado
+                vencida = edad > self.ttl
+                limite = self.ttl + (self.gracia if permitir_vencida else 0.0)
+                ruta = self.directorio / archivo
+
+                if edad > limite or not ruta.exists():
+                    return None
+
+                conexion.execute(
+                    "UPDATE entradas SET accedido = ? WHERE clave = ?",
+                    (time.time(), clave),
+                )
+        except sqlite3.Error as exc:
+            logger.warning("Error leyendo la caché %s: %s", self.directorio, exc)
+            return None
+
+        return EntradaCache(
+            clave=clave,
+            ruta=ruta,
+            creado=creado,
+            metadatos=json.loads(metadatos or "{}"),
+            vencida=vencida,
+        )
+
+    def leer_bytes(self, clave: str) -> Optional[bytes]:
+        """Atajo de ``obtener`` que devuelve directamente el contenido."""
+        entrada = self.obtener(clave)
+        if entrada is None:
+            return None
+        try:
+            return entrada.ruta.read_bytes()
+        except OSError:
+            return None
+
+    # ── Escritura ───────────────────────────────────────────
+
+    def guardar(
+        self,
+        clave: str,
+        escribir: Callable[[Path], None],
+        sufijo: str = "",
+        metadatos: Optional[dict[str, Any]] = None,
+    ) -> Optional[EntradaCache]:
+        """Guarda una entrada usando una función de escritura.
+
+        La función recibe una ruta temporal y debe dejar ahí el contenido
+        (``df.to_parquet``, ``ruta.write_bytes``...). Al terminar se
+        renombra a su ruta definitiva de forma atómica.
+
+        Returns:
+            La entrada guardada, o ``None`` si la caché no está disponible
+            o la escritura falló (un fallo de caché nunca debe romper la
+            operación que se quería cachear).
+        """
+        if not self.disponible:
+            return None
+
+        archivo = f"{clave}{sufijo}"
+        destino = self.directorio / archivo
+        temporal = self.directorio / f".{archivo}.{os.getpid()}.tmp"
+        metadatos = metadatos or {}
+
+        try:
+            escribir(temporal)
+            os.replace(temporal, destino)
+            ahora = time.time()
+            with closing(self._conectar()) as conexion, conexion:
+                conexion.execute(
+                    "INSERT OR REPLACE INTO entradas "
+                    "(clave, archivo, creado, accedido, bytes, metadatos) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        clave, archivo, ahora, ahora,
+                        destino.stat().st_size,
+                        json.dumps(metadatos, default=str, ensure_ascii=False),
+                    ),
+                )
+        except Exception as exc:  # noqa: BLE001 - la caché es best-effort
+            logger.warning("No se pudo guardar en caché %s: %s", archivo, exc)
+            temporal.unlink(missing_ok=True)
+            return None
+
+        self.purgar()
+        return EntradaCache(
+            clave=clave, ruta=destino, creado=ahora, metadatos=metadatos
+        )
+
+    def guardar_bytes(
+        self,
+        clave: str,
+        datos: bytes,
+        sufijo: str = "",
+        metadatos: Optional[dict[str, Any]] = None,
+    ) -> Optional[EntradaCache]:
+        """Atajo de ``guardar`` para contenido ya serializado."""
+        return self.guardar(
+            clave, lambda ruta: ruta.write_bytes(datos), sufijo, metadatos
+        )
+
+    # ── Mantenimiento ───────────────────────────────────────
+
+    def invalidar(self, clave: str) -> None:
+        """Elimina una entrada concreta."""
+        if not self.disponible:
+            return
+        with closing(self._conectar()) as conexion, conexion:
+            fila = conexion.execute(
+                "SELECT archivo FROM entradas WHERE clave = ?", (clave,)
+            ).fetchone()
+            conexion.execute("DELETE FROM entradas WHERE clave = ?", (clave,))
+        if fila:
+            (self.directorio / fila[0]).unlink(missing_ok=True)
+
+    def vaciar(self) -> None:
+        """Elimina todas las entradas."""
+        if not self.disponible:
+            return
+        with closing(self._conectar()) as conexion, conexion:
+            archivos = [f for (f,) in conexion.execute("SELECT archivo FROM entradas")]
+            conexion.execute("DELETE FROM entradas")
+        for archivo in archivos:
+            (self.directorio / archivo).unlink(missing_ok=True)
+
+    def purgar(self) -> int:
+        """Elimina lo caducado y desaloja por LRU hasta caber en ``max_bytes``.
+
+        Returns:
+            Número de entradas eliminadas.
+        """
+        if not self.disponible:
+            return 0
+
+        limite_edad = time.time() - (self.ttl + self.gracia)
+        eliminar: list[tuple[str, str]] = []
+
+        try:
+            with closing(self._conectar()) as conexion, conexion:
+                filas = conexion.execute(
+                    "SELECT clave, archivo, creado, bytes FROM entradas "
+                    "ORDER BY accedido DESC"
+                ).fetchall()
+
+                ocupado = 0
+                for clave, archivo, creado, tamano in filas:
+                    if creado < limite_edad or ocupado + tamano > self.max_bytes:
+                        eliminar.append((clave, archivo))
+                    else:
+                        ocupado += tamano
+
+                conexion.executemany(
+                    "DELETE FROM entradas WHERE clave = ?",
+                    [(clave,) for clave, _ in eliminar],
+                )
+        except sqlite3.Error as exc:
+            logger.warning("No se pudo purgar la caché %s: %s", self.directorio, exc)
+            return 0
+
+        for _, archivo in eliminar:
+            (self.directorio / archivo).unlink(missing_ok=True)
+
+        if eliminar:
+            logger.debug(
+                "Caché %s: %d entradas desalojadas.", self.directorio.name, len(eliminar)
+            )
+        return len(eliminar)
@@ -354,3 +354,25 @@ def opciones_desplegable(
         clave = etiqueta_anotada(opcion) if anotar else opcion.etiqueta
         mapa[clave] = opcion
     return mapa
+
+
+def conteo_opcion(
+    opcion: Optional[Opcion], conteos: dict[str, int]
+) -> Optional[int]:
+    """Registros de SECOP II que corresponden a una opción del desplegable.
+
+    Args:
+        opcion:  La opción, o ``None`` para la opción "sin filtro".
+        conteos: ``{valor de la API: registros}`` de una faceta
+                 (``api_scraper.contar_facetas``).
+
+    Returns:
+        La suma de los valores de la API que representa la opción (todos,
+        si es la opción vacía), o ``None`` si la opción no existe en
+        SECOP II y no tiene sentido mostrar un recuento.
+    """
+    if opcion is None:
+        return sum(conteos.values())
+    if not opcion.existe_en_api:
+        return None
+    return sum(conteos.get(valor, 0) for valor in opcion.api_valores)
@@ -324,6 +324,28 @@ SEL_TABLA_RESULTADOS_FALLBACK: str = "table"
 # Enlace de detalle: es un javascript:consultaProceso('<id>'), no un href.
 PATRON_ID_PROCESO: str = r"consultaProceso\(\s*['\"]([^'\"]+)['\"]\s*\)"
 
+# Backend de parseo de la tabla de resultados (``parser.py``):
+#   • "tokens": sin árbol; lee la tabla como flujo de etiquetas y cae a
+#     lxml/bs4 si la estructura no es la conocida. Es el de "auto".
+#   • "lxml": árbol lxml + XPath, varias veces más rápido que bs4.
+#   • "bs4":  BeautifulSoup con ``html.parser`` (el original).
+# Si la ruta rápida no reconoce la tabla se cae siempre a BeautifulSoup.
+# Las fichas de detalle (``detail_scraper.py``) solo tienen "lxml" y
+# "bs4": cualquier valor distinto de "bs4" usa lxml.
+PARSER_BACKEND: str = os.getenv("SECOP_PARSER", "auto").strip().lower()
+
+# Procesos para parsear lotes de páginas en paralelo (``0`` o ``1`` =
+# secuencial). Solo compensa en lotes grandes: con menos de
+# ``PARSER_MIN_PAGINAS_POR_PROCESO`` páginas por proceso, arrancar el
+# pool cuesta más de lo que ahorra.
+PARSER_PROCESOS: int = int(os.getenv("SECOP_PARSER_PROCESOS", "0"))
+PARSER_MIN_PAGINAS_POR_PROCESO: int = 8
+
+# Páginas descargadas que pueden esperar turno de parseo en ``flujo.py``.
+# Acota la memoria: nunca hay más de esta cantidad de HTML en cola, más
+# la página que se está descargando y la que se está parseando.
+FLUJO_PAGINAS_EN_COLA: int = max(1, int(os.getenv("SECOP_FLUJO_COLA", "1")))
+
 
 # ────────────────────────────────────────────────────────────
 # 8. ESQUEMA CANÓNICO — TABLA DE RESULTADOS SECOP I
@@ -429,7 +451,13 @@ COLUMNAS_DETALLE: list[str] = [
 
 DEFAULT_TIMEOUT: int = 30        # WebDriverWait (Selenium)
 HTTP_TIMEOUT: int = 90           # requests: el portal puede tardar
-PAGE_LOAD_WAIT: float = 3.0      # espera tras clic de paginación
+# La ruta Selenium no duerme tiempos fijos: espera a condiciones del DOM
+# (iframe de resultados, ``totalResultados``, opciones de un select)
+# comprobándolas cada ``SELENIUM_SONDEO`` s, o a que la red lleve
+# ``SELENIUM_QUIETUD_RED`` s sin peticiones nuevas. El suelo de cortesía
+# entre páginas lo pone ``ritmo.py``.
+SELENIUM_SONDEO: float = 0.1
+SELENIUM_QUIETUD_RED: float = 0.5
 MAX_RETRIES: int = 3             # reintentos por operación
 RETRY_BACKOFF: float = 2.0       # factor de backoff exponencial
 MAX_PAGES: int = 200             # límite de seguridad de paginación
@@ -442,6 +470,52 @@ HTTP_DELAY: float = float(os.getenv("SECOP_DELAY", "2.5"))   # s entre páginas
 HTTP_DELAY_BLOQUEO: float = 90.0     # espera tras detectar un bloqueo
 HTTP_MAX_BLOQUEOS: int = 2           # bloqueos tolerados antes de abortar
 
+# Partición automática de consultas grandes de SECOP I (``particion.py``).
+# Una consulta solo se recorre hasta ``max_pages`` páginas de
+# ``REGISTROS_POR_PAGINA`` filas; si tiene más resultados se parte en
+# fragmentos disjuntos (bandas de cuantía, subrangos de fechas,
+# departamentos) que quepan. ``PARTICION_MAX_CONTEOS`` acota las
+# peticiones que se gastan contando fragmentos candidatos.
+PARTICION_AUTOMATICA: bool = os.getenv("SECOP_PARTICIONAR", "1") == "1"
+PARTICION_MAX_CONTEOS: int = int(os.getenv("SECOP_PARTICION_MAX_CONTEOS", "100"))
+
+# Ritmo adaptativo (``ritmo.py``). ``HTTP_DELAY`` es solo el intervalo
+# de partida: cada respuesta correcta lo acorta en ``RITMO_PASO`` y cada
+# bloqueo (403/406/429 o marcadores del WAF) lo multiplica por
+# ``RITMO_FACTOR_BLOQUEO``. Las respuestas lentas o 5xx lo alargan un
+# poco (``RITMO_FACTOR_LENTITUD``). Tras un bloqueo, durante
+# ``RITMO_MEMORIA_BLOQUEO`` segundos no se baja de ``RITMO_MARGEN`` veces
+# el intervalo que lo provocó.
+RITMO_INTERVALO_MIN: float = float(os.getenv("SECOP_RITMO_MIN", "0.5"))
+RITMO_INTERVALO_MAX: float = float(os.getenv("SECOP_RITMO_MAX", "60"))
+RITMO_PASO: float = float(os.getenv("SECOP_RITMO_PASO", "0.05"))
+RITMO_FACTOR_BLOQUEO: float = 2.0
+RITMO_FACTOR_LENTITUD: float = 1.25
+RITMO_LATENCIA_LENTA: float = 3.0    # × la latencia media = respuesta lenta
+RITMO_MARGEN: float = 1.25
+RITMO_MEMORIA_BLOQUEO: float = float(os.getenv("SECOP_RITMO_MEMORIA", str(6 * 3600)))
+RITMO_VIGENCIA: float = 7 * 86400    # ritmo aprendido más viejo → se descarta
+
+# Extracción concurrente de fichas de detalle (``planificador.py``). Los
+# hilos solapan la espera de respuestas lentas; el ritmo de inicio de
+# peticiones lo sigue poniendo ``ritmo.py``, compartido por todos ellos.
+# ``DETALLE_POR_HOST`` limita las peticiones simultáneas a un mismo host
+# y ``DETALLE_BACKOFF_MAX`` la pausa de un host tras errores seguidos.
+DETALLE_HILOS: int = int(os.getenv("SECOP_DETALLE_HILOS", "4"))
+DETALLE_POR_HOST: int = int(os.getenv("SECOP_DETALLE_POR_HOST", "2"))
+DETALLE_BACKOFF_MAX: float = float(os.getenv("SECOP_DETALLE_BACKOFF_MAX", "300"))
+DETALLE_PROGRESO_CADA: float = 30.0   # s entre líneas de progreso
+
+# Campos que justifican ir a la ficha: las filas de entrada a las que les
+# faltan más se extraen primero.
+DETALLE_CAMPOS_CLAVE: tuple[str, ...] = (
+    "valor_contrato",
+    "proveedor",
+    "nit_proveedor",
+    "fecha_adjudicacion",
+    "numero_contrato",
+)
+
 # Marcadores de la página de bloqueo del WAF.
 MARCADORES_BLOQUEO: tuple[str, ...] = (
     "access to the website is blocked",
@@ -561,6 +635,15 @@ CHROME_PREFS: dict = {
     "intl.accept_languages": "es-CO,es",
 }
 
+# Pool de navegadores de la ruta Selenium (``navegadores.py``). Arrancar
+# Chrome cuesta segundos; el pool mantiene hasta ``NAVEGADORES_MAX``
+# abiertos para reutilizarlos. Cada uno se recicla tras
+# ``NAVEGADOR_MAX_PAGINAS`` páginas (Chrome acumula memoria) o tras
+# ``NAVEGADOR_INACTIVIDAD`` segundos sin uso.
+NAVEGADORES_MAX: int = int(os.getenv("SECOP_NAVEGADORES", "2"))
+NAVEGADOR_MAX_PAGINAS: int = int(os.getenv("SECOP_NAVEGADOR_MAX_PAGINAS", "300"))
+NAVEGADOR_INACTIVIDAD: float = float(os.getenv("SECOP_NAVEGADOR_INACTIVIDAD", "900"))
+
 
 # ────────────────────────────────────────────────────────────
 # 13. API DE DATOS ABIERTOS (SECOP II)
@@ -578,6 +661,18 @@ SOCRATA_APP_TOKEN: Optional[str] = os.getenv("SOCRATA_APP_TOKEN") or None
 SOCRATA_PAGE_SIZE: int = int(os.getenv("SOCRATA_PAGE_SIZE", "20000"))
 SOCRATA_TIMEOUT: int = 180
 
+# Descarga por meses (``fragmentos_api.py``): fragmentos que se piden a
+# la vez. Sin app token conviene no subirlo (Socrata limita por IP).
+API_HILOS: int = int(os.getenv("SECOP_API_HILOS", "4"))
+
+# Cómo se busca la palabra clave en la API. "like": una condición
+# ``upper(objeto_del_contrato) like '%palabra%'`` por palabra, exacta
+# pero sin índice (lenta, y a escala nacional puede agotar el timeout).
+# "q": búsqueda de texto completo indexada de Socrata (``$q``) para
+# acotar los candidatos, y el AND de subcadenas se comprueba en local.
+# ``$q`` casa palabras completas: "vigil" no encuentra "vigilancia".
+BUSQUEDA_TEXTO: str = os.getenv("SECOP_BUSQUEDA", "like").lower()
+
 
 # ────────────────────────────────────────────────────────────
 # 13b. FUENTES PARA LA EXPORTACIÓN A PDF
@@ -639,6 +734,110 @@ CSV_ENCODING: str = "utf-8-sig"      # BOM para Excel en español
 PARQUET_ENGINE: str = "pyarrow"
 
 
+# ────────────────────────────────────────────────────────────
+# 14b. CACHÉ EN DISCO
+#      Sobrevive a reinicios y redespliegues, y la comparten todos
+#      los procesos que apunten al mismo directorio (CLI, dashboard,
+#      tareas programadas).
+# ────────────────────────────────────────────────────────────
+
+CACHE_DIR: Path = Path(os.getenv("SECOP_CACHE_DIR", str(OUTPUT_DIR / "cache")))
+
+# Estudios del Sector: el análisis y los documentos renderizados.
+CACHE_ESTUDIO_TTL: float = float(os.getenv("SECOP_CACHE_ESTUDIO_TTL", "86400"))
+CACHE_ESTUDIO_MAX_MB: int = int(os.getenv("SECOP_CACHE_ESTUDIO_MAX_MB", "200"))
+
+# Resultados de consultas en vivo (Parquet). Pasado el TTL se siguen
+# sirviendo durante la ventana de gracia mientras se revalidan en
+# segundo plano (stale-while-revalidate).
+CACHE_CONSULTAS_TTL: float = float(os.getenv("SECOP_CACHE_TTL", "3600"))
+CACHE_CONSULTAS_GRACIA: float = float(os.getenv("SECOP_CACHE_GRACIA", "86400"))
+CACHE_CONSULTAS_MAX_MB: int = int(os.getenv("SECOP_CACHE_MAX_MB", "500"))
+
+# Fragmentos mensuales de SECOP II (``fragmentos_api.py``): un Parquet
+# por mes y consulta con su recuento. Solo se vuelven a pedir los meses
+# cuyo recuento cambió o cuya entrada superó el TTL.
+FRAGMENTOS_API_TTL: float = float(os.getenv("SECOP_FRAGMENTOS_TTL", str(7 * 86400)))
+FRAGMENTOS_API_MAX_MB: int = int(os.getenv("SECOP_FRAGMENTOS_MAX_MB", "2000"))
+
+# Recuentos por faceta de la barra lateral (``api_scraper.contar_facetas``).
+# Caducan pronto: solo deben evitar repetir las peticiones mientras se
+# ajustan los filtros.
+FACETAS_TTL: float = float(os.getenv("SECOP_FACETAS_TTL", "600"))
+FACETAS_MAX_MB: int = int(os.getenv("SECOP_FACETAS_MAX_MB", "20"))
+
+# Copias locales sincronizadas de forma incremental contra la API
+# (``sincronizacion.py``): una carpeta por consulta con el Parquet y la
+# marca de agua de ``:updated_at``.
+SYNC_DIR: Path = Path(os.getenv("SECOP_SYNC_DIR", str(OUTPUT_DIR / "sync")))
+
+# Puntos de control de los rastreos largos (``bitacora.py``): páginas y
+# fichas ya descargadas, para continuar con ``--reanudar`` tras un corte.
+BITACORA_ARCHIVO: Path = Path(
+    os.getenv("SECOP_BITACORA", str(OUTPUT_DIR / "bitacora.sqlite"))
+)
+# Una búsqueda de SECOP I solo deja puntos de control con ``--reanudar``
+# o si es un rastreo largo: al menos estas páginas o varios fragmentos.
+# Las consultas cortas del dashboard no escriben en la bitácora.
+BITACORA_MIN_PAGINAS: int = int(os.getenv("SECOP_BITACORA_MIN_PAGINAS", "20"))
+# Días tras los que se purgan las sesiones abandonadas (un corte que no
+# se reanudó nunca).
+BITACORA_RETENCION_DIAS: float = float(os.getenv("SECOP_BITACORA_RETENCION_DIAS", "7"))
+
+# Resultados parciales de la extracción masiva de fichas
+# (``acumulador.py``): una carpeta por trabajo con partes Parquet de
+# ``DETALLE_FILAS_POR_PARTE`` filas, legible mientras el rastreo sigue.
+DETALLE_PARTES_DIR: Path = Path(
+    os.getenv("SECOP_DETALLE_PARTES", str(OUTPUT_DIR / "detalles_parciales"))
+)
+DETALLE_FILAS_POR_PARTE: int = int(os.getenv("SECOP_DETALLE_FILAS_PARTE", "500"))
+
+# Archivo de respuestas crudas de contratos.gov.co (``archivo_http.py``):
+# cada cuerpo se guarda una vez, comprimido y direccionado por su
+# SHA-256, con un índice de URL, parámetros, fecha y estado. Permite
+# volver a parsear sin tocar el portal (``SECOP_REPLAY=1`` sirve las
+# peticiones desde el archivo). No tiene límite de tamaño ni caducidad,
+# por eso se activa a propósito (``SECOP_ARCHIVAR=1``).
+ARCHIVO_HTTP_DIR: Path = Path(
+    os.getenv("SECOP_ARCHIVO_HTTP_DIR", str(OUTPUT_DIR / "archivo_http"))
+)
+ARCHIVO_HTTP_ACTIVO: bool = os.getenv("SECOP_ARCHIVAR", "0") == "1"
+ARCHIVO_HTTP_REPLAY: bool = os.getenv("SECOP_REPLAY", "0") == "1"
+
+# Validadores HTTP de las fichas de detalle (``validadores.py``): ETag,
+# Last-Modified y huella del cuerpo por URL, con el resultado parseado.
+# Las fichas de procesos en estado terminal comprobadas hace menos de
+# ``VALIDADORES_FRESCURA_CERRADOS`` segundos ni siquiera se piden.
+VALIDADORES_ARCHIVO: Path = Path(
+    os.getenv("SECOP_VALIDADORES", str(CACHE_DIR / "validadores.sqlite"))
+)
+VALIDADORES_FRESCURA_CERRADOS: float = float(
+    os.getenv("SECOP_FRESCURA_CERRADOS", str(30 * 86400))
+)
+ESTADOS_CERRADOS_SECOP1: tuple[str, ...] = (
+    "liquidado",
+    "descartado",
+    "terminado anormalmente",
+    "terminado sin liquidar",
+)
+
+# Ritmo y agenda de turnos por host (``ritmo.py``). Todos los procesos
+# que apunten a la misma base comparten un único presupuesto de
+# peticiones, y las ejecuciones sucesivas heredan el ritmo aprendido.
+RITMO_ARCHIVO: Path = Path(
+    os.getenv("SECOP_RITMO_ARCHIVO", str(CACHE_DIR / "ritmo.sqlite"))
+)
+
+# Base histórica particionada (``historico.py``). Cada actualización
+# añade una partición; la compactación reescribe solo las particiones
+# pequeñas o con muchas filas reemplazadas.
+HISTORICO_FILAS_POR_PARTICION: int = int(
+    os.getenv("SECOP_HISTORICO_FILAS_PARTICION", "100000")
+)
+HISTORICO_MAX_PARTICIONES: int = int(os.getenv("SECOP_HISTORICO_MAX_PARTICIONES", "64"))
+HISTORICO_MAX_OBSOLETAS: float = float(os.getenv("SECOP_HISTORICO_MAX_OBSOLETAS", "0.5"))
+
+
 # ────────────────────────────────────────────────────────────
 # 15. DATACLASS DE PARÁMETROS DE BÚSQUEDA
 # ────────────────────────────────────────────────────────────
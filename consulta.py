@@ -20,18 +20,33 @@ Diferencias entre fuentes que conviene tener presentes:
 
 Las dos rutas se normalizan al esquema de la API, que es contra el que
 está escrito ``app.py``.
+
+Los resultados se guardan en una caché persistente en disco (Parquet)
+indexada por los parámetros canónicos de la consulta. La comparten el
+CLI, el dashboard y las tareas programadas: repetir una consulta dentro
+de la ventana de frescura no vuelve a tocar los portales.
 """
 
 from __future__ import annotations
 
 import logging
+import threading
 from datetime import datetime
-from typing import Iterable, Optional
+from typing import Any, Callable, Iterable, Optional
 
 import pandas as pd
 
+from cache_disco import CacheDisco, EntradaCache, huella
 from catalogos import DEPARTAMENTOS, ESTADOS, MODALIDADES, buscar_opcion
-from config import SearchParams
+from config import (
+    BUSQUEDA_TEXTO,
+    CACHE_CONSULTAS_GRACIA,
+    CACHE_CONSULTAS_MAX_MB,
+    CACHE_CONSULTAS_TTL,
+    CACHE_DIR,
+    PARQUET_ENGINE,
+    SearchParams,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -83,10 +98,15 @@ def normalizar_esquema(df: pd.DataFrame, fuente: str = "") -> pd.DataFrame:
         df:     DataFrame de SECOP I o de la API.
         fuente: Etiqueta a guardar en la columna ``fuente``.
 
+    Las columnas que la consulta no pidió (ver los perfiles de
+    ``api_scraper.PERFILES_PROYECCION``) se añaden vacías.
+
     Returns:
         DataFrame con todas las columnas de ``ESQUEMA_DASHBOARD``.
     """
-    df = df.copy()
+    # Copia superficial: aquí solo se renombran y añaden columnas, así que
+    # no hace falta duplicar los datos de las que ya llegaron.
+    df = df.copy(deep=False)
 
     renombres = {
         origen: destino
@@ -120,11 +140,16 @@ def consultar_secop2(
     fecha_fin: Optional[str] = None,
     tipo_contrato: Optional[str] = None,
     max_registros: Optional[int] = 20000,
+    perfil: str = "dashboard",
 ) -> pd.DataFrame:
     """Consulta contratos en la API de Datos Abiertos (SECOP II).
 
     Todos los filtros, incluido el de texto libre, viajan al servidor.
 
+    Args:
+        perfil: Columnas a pedir (``api_scraper.PERFILES_PROYECCION``);
+                por defecto solo las que usa el dashboard.
+
     Returns:
         DataFrame normalizado al esquema del dashboard.
     """
@@ -140,6 +165,7 @@ def consultar_secop2(
         fecha_fin=fecha_fin or None,
         tipo_contrato=tipo_contrato or None,
         max_registros=max_registros,
+        perfil=perfil,
     )
 
     if df.empty:
@@ -160,7 +186,9 @@ def contar_secop2(
     """Cuenta cuántos contratos coinciden, sin descargarlos.
 
     Sirve para avisar antes de lanzar una descarga enorme: una consulta
-    nacional sin filtros son casi 6 millones de registros.
+    nacional sin filtros son casi 6 millones de registros. Con
+    ``SECOP_BUSQUEDA=q`` y palabra clave es el número de candidatos de
+    ``$q``, una cota superior.
     """
     from api_scraper import contar_registros
 
@@ -172,6 +200,36 @@ def contar_secop2(
         fecha_inicio=fecha_inicio or None,
         fecha_fin=fecha_fin or None,
         tipo_contrato=tipo_contrato or None,
+        busqueda=BUSQUEDA_TEXTO,
+    )
+
+
+def facetas_secop2(
+    departamento: Optional[str] = None,
+    modalidad: Optional[str] = None,
+    estado: Optional[str] = None,
+    palabra_clave: Optional[str] = None,
+    fecha_inicio: Optional[str] = None,
+    fecha_fin: Optional[str] = None,
+    tipo_contrato: Optional[str] = None,
+) -> dict[str, dict[str, int]]:
+    """Recuentos por departamento, modalidad, tipo, estado y año.
+
+    Para mostrarlos junto a cada opción de la barra lateral antes de
+    descargar nada (ver ``api_scraper.contar_facetas``). La palabra clave
+    se busca igual que en la descarga (``SECOP_BUSQUEDA``).
+    """
+    from api_scraper import contar_facetas
+
+    return contar_facetas(
+        departamento=departamento or None,
+        modalidad=modalidad or None,
+        estado=estado or None,
+        palabra_clave=palabra_clave or None,
+        fecha_inicio=fecha_inicio or None,
+        fecha_fin=fecha_fin or None,
+        tipo_contrato=tipo_contrato or None,
+        busqueda=BUSQUEDA_TEXTO,
     )
 
 
@@ -205,9 +263,7 @@ def consultar_secop1(
     Returns:
         DataFrame normalizado al esquema del dashboard.
     """
-    from cleaning import filtrar_por_palabra_clave, limpiar_dataframe
-    from parser import parsear_todas_paginas
-    from scraper import ejecutar_scraping
+    from flujo import extraer_secop1
 
     def _codigo(catalogo, valor):
         opcion = buscar_opcion(catalogo, valor)
@@ -230,14 +286,191 @@ def consultar_secop1(
         max_pages=max_paginas,
     )
 
-    paginas, _ = ejecutar_scraping(params)
-    df = parsear_todas_paginas(paginas)
-    df = filtrar_por_palabra_clave(df, palabra_clave)
+    # Cada página se parsea y limpia mientras se descarga la siguiente.
+    # Sin partir la consulta: ``max_paginas`` es el presupuesto de tiempo
+    # de una búsqueda en vivo, no un límite a sortear.
+    df = extraer_secop1(params, palabra_clave=palabra_clave, particionar=False)
+    return normalizar_esquema(df, "SECOP I")
 
-    if df.empty:
-        return normalizar_esquema(df, "SECOP I")
 
-    return normalizar_esquema(limpiar_dataframe(df), "SECOP I")
+# ────────────────────────────────────────────────────────────
+# CACHÉ PERSISTENTE DE CONSULTAS
+# ────────────────────────────────────────────────────────────
+
+_cache_consultas: Optional[CacheDisco] = None
+
+# Claves que se están revalidando en segundo plano en este proceso, para
+# no lanzar dos descargas de la misma consulta a la vez.
+_revalidando: set[str] = set()
+_cerrojo_revalidacion = threading.Lock()
+
+
+def _cache() -> CacheDisco:
+    """Caché de consultas, creada en el primer uso."""
+    global _cache_consultas
+    if _cache_consultas is None:
+        _cache_consultas = CacheDisco(
+            CACHE_DIR / "consultas",
+            ttl=CACHE_CONSULTAS_TTL,
+            max_bytes=CACHE_CONSULTAS_MAX_MB * 1024 * 1024,
+            gracia=CACHE_CONSULTAS_GRACIA,
+        )
+    return _cache_consultas
+
+
+def clave_consulta(**parametros: Any) -> str:
+    """Huella canónica de los parámetros de una consulta.
+
+    Dos consultas equivalentes deben caer en la misma entrada aunque
+    lleguen escritas distinto: los textos se recortan, los vacíos valen
+    lo mismo que ``None`` y las listas de fuentes se ordenan.
+    """
+    canonicos: dict[str, Any] = {}
+    for nombre, valor in parametros.items():
+        if isinstance(valor, str):
+            valor = valor.strip() or None
+        elif isinstance(valor, (list, tuple, set)):
+            valor = sorted(str(v) for v in valor) or None
+        canonicos[nombre] = valor
+    return huella("consulta", canonicos)
+
+
+def escribir_parquet(df: pd.DataFrame, ruta) -> None:
+    """Escribe un DataFrame a Parquet tolerando columnas de tipo mixto.
+
+    La API entrega algunos campos como diccionarios (``urlproceso``) y
+    pyarrow no admite mezclas en una misma columna: esos valores se
+    guardan como texto.
+    """
+    try:
+        df.to_parquet(ruta, index=False, engine=PARQUET_ENGINE)
+        return
+    except (TypeError, ValueError) as exc:
+        logger.debug("Parquet con tipos mixtos (%s); se convierten a texto.", exc)
+
+    def _texto(valor: Any) -> Any:
+        if valor is None or isinstance(valor, str):
+            return valor
+        if pd.api.types.is_scalar(valor) and pd.isna(valor):
+            return None
+        return str(valor)
+
+    df = df.copy()
+    for columna in df.columns:
+        if df[columna].dtype == object:
+            df[columna] = df[columna].map(_texto)
+    df.to_parquet(ruta, index=False, engine=PARQUET_ENGINE)
+
+
+def _informe_a_json(informe: dict) -> dict:
+    """Prepara el informe para guardarlo como metadatos de la entrada."""
+    serializable = dict(informe)
+    momento = serializable.get("consultado_en")
+    if isinstance(momento, datetime):
+        serializable["consultado_en"] = momento.isoformat()
+    return serializable
+
+
+def _informe_desde_json(datos: dict) -> dict:
+    informe = dict(datos)
+    momento = informe.get("consultado_en")
+    if isinstance(momento, str):
+        informe["consultado_en"] = datetime.fromisoformat(momento)
+    return informe
+
+
+def _leer_entrada(entrada: EntradaCache) -> tuple[pd.DataFrame, dict]:
+    df = pd.read_parquet(entrada.ruta, engine=PARQUET_ENGINE)
+    informe = _informe_desde_json(entrada.metadatos)
+    informe["desde_cache"] = True
+    informe["cache_vencida"] = entrada.vencida
+    return df, informe
+
+
+def _guardar_en_cache(clave: str, df: pd.DataFrame, informe: dict) -> None:
+    _cache().guardar(
+        clave,
+        lambda ruta: escribir_parquet(df, ruta),
+        sufijo=".parquet",
+        metadatos=_informe_a_json(informe),
+    )
+
+
+def _revalidar_en_segundo_plano(
+    clave: str, productor: Callable[[], tuple[pd.DataFrame, dict]]
+) -> None:
+    """Vuelve a ejecutar la consulta en un hilo y actualiza la caché."""
+    with _cerrojo_revalidacion:
+        if clave in _revalidando:
+            return
+        _revalidando.add(clave)
+
+    def _tarea() -> None:
+        try:
+            df, informe = productor()
+            if not informe.get("errores"):
+                _guardar_en_cache(clave, df, informe)
+                logger.info("Consulta revalidada en segundo plano (%s).", clave[:12])
+        except Exception as exc:  # noqa: BLE001 - se conserva la entrada vieja
+            logger.warning("Falló la revalidación de %s: %s", clave[:12], exc)
+        finally:
+            with _cerrojo_revalidacion:
+                _revalidando.discard(clave)
+
+    threading.Thread(target=_tarea, name=f"revalidar-{clave[:8]}", daemon=True).start()
+
+
+def consultar_con_cache(
+    parametros: dict[str, Any],
+    productor: Callable[[], tuple[pd.DataFrame, dict]],
+    refrescar: bool = False,
+    permitir_vencida: bool = True,
+) -> tuple[pd.DataFrame, dict]:
+    """Sirve una consulta desde la caché en disco o la ejecuta.
+
+    Args:
+        parametros:       Parámetros que identifican la consulta.
+        productor:        Función que ejecuta la consulta real y devuelve
+                          ``(df, informe)``. El informe debe llevar
+                          ``consultado_en``.
+        refrescar:        Ignorar la caché y consultar de nuevo.
+        permitir_vencida: Servir una entrada pasada de TTL (dentro de la
+                          ventana de gracia) mientras se revalida en
+                          segundo plano. Conviene desactivarlo en procesos
+                          de vida corta como el CLI, donde el hilo de
+                          revalidación moriría con el proceso.
+
+    Returns:
+        Tupla ``(df, informe)``. El informe conserva el ``consultado_en``
+        original e indica con ``desde_cache`` si no se tocó la red.
+    """
+    clave = clave_consulta(**parametros)
+
+    if not refrescar:
+        entrada = _cache().obtener(clave, permitir_vencida=permitir_vencida)
+        if entrada is not None:
+            try:
+                df, informe = _leer_entrada(entrada)
+            except Exception as exc:  # noqa: BLE001 - entrada corrupta
+                logger.warning("Entrada de caché ilegible (%s); se consulta.", exc)
+            else:
+                logger.info(
+                    "Consulta servida desde la caché (%s, %d filas%s).",
+                    clave[:12], len(df), ", vencida" if entrada.vencida else "",
+                )
+                if entrada.vencida:
+                    _revalidar_en_segundo_plano(clave, productor)
+                return df, informe
+
+    df, informe = productor()
+
+    # Un resultado parcial (una fuente falló) no se guarda: serviría
+    # durante todo el TTL un hueco que una nueva consulta podría llenar.
+    if not informe.get("errores"):
+        _guardar_en_cache(clave, df, informe)
+
+    informe["desde_cache"] = False
+    return df, informe
 
 
 # ────────────────────────────────────────────────────────────
@@ -256,6 +489,9 @@ def consultar_en_vivo(
     tipo_contrato: Optional[str] = None,
     max_paginas_secop1: int = 3,
     max_registros_api: Optional[int] = 20000,
+    usar_cache: bool = True,
+    refrescar: bool = False,
+    perfil_api: str = "dashboard",
 ) -> tuple[pd.DataFrame, dict]:
     """Ejecuta la consulta contra las fuentes indicadas y combina el resultado.
 
@@ -272,11 +508,64 @@ def consultar_en_vivo(
         fecha_fin:          ``dd/MM/yyyy``.
         max_paginas_secop1: Páginas a traer de SECOP I (100 procesos c/u).
         max_registros_api:  Tope de registros de la API.
+        usar_cache:         Consultar primero la caché en disco.
+        refrescar:          Ignorar la caché y volver a los portales.
+        perfil_api:         Columnas a pedir a la API (ver
+                            ``api_scraper.PERFILES_PROYECCION``).
 
     Returns:
         Tupla ``(df, informe)``. El informe lleva el momento de la
         consulta, el conteo por fuente y los errores encontrados.
     """
+    fuentes = tuple(fuentes)
+
+    def _productor() -> tuple[pd.DataFrame, dict]:
+        return _consultar_fuentes(
+            fuentes, departamento, modalidad, estado, palabra_clave,
+            fecha_inicio, fecha_fin, tipo_contrato,
+            max_paginas_secop1, max_registros_api, perfil_api,
+        )
+
+    if not usar_cache:
+        return _productor()
+
+    return consultar_con_cache(
+        {
+            "fuentes": fuentes,
+            "departamento": departamento,
+            "modalidad": modalidad,
+            "estado": estado,
+            "palabra_clave": palabra_clave,
+            "fecha_inicio": fecha_inicio,
+            "fecha_fin": fecha_fin,
+            "tipo_contrato": tipo_contrato,
+            "max_paginas_secop1": max_paginas_secop1 if "SECOP I" in fuentes else None,
+            "max_registros_api": max_registros_api if "SECOP II" in fuentes else None,
+            # Los dos modos de búsqueda no devuelven exactamente lo mismo.
+            "busqueda": (
+                BUSQUEDA_TEXTO if "SECOP II" in fuentes and palabra_clave else None
+            ),
+            "perfil_api": perfil_api if "SECOP II" in fuentes else None,
+        },
+        _productor,
+        refrescar=refrescar,
+    )
+
+
+def _consultar_fuentes(
+    fuentes: tuple[str, ...],
+    departamento: Optional[str],
+    modalidad: Optional[str],
+    estado: Optional[str],
+    palabra_clave: Optional[str],
+    fecha_inicio: Optional[str],
+    fecha_fin: Optional[str],
+    tipo_contrato: Optional[str],
+    max_paginas_secop1: int,
+    max_registros_api: Optional[int],
+    perfil_api: str = "dashboard",
+) -> tuple[pd.DataFrame, dict]:
+    """Consulta los portales, sin caché. Ver ``consultar_en_vivo``."""
     informe: dict = {
         "consultado_en": datetime.now(),
         "por_fuente": {},
@@ -307,8 +596,9 @@ def consultar_en_vivo(
                 informe["coincidencias_api"] = total
                 if max_registros_api and total > max_registros_api:
                     informe["truncado"] = True
+                    cota = "hasta " if BUSQUEDA_TEXTO == "q" and palabra_clave else ""
                     informe["avisos"].append(
-                        f"La consulta coincide con {total:,} contratos en "
+                        f"La consulta coincide con {cota}{total:,} contratos en "
                         f"SECOP II y se descargaron los {max_registros_api:,} "
                         "más recientes. Acota por departamento, fechas o "
                         "modalidad para verlos todos."
@@ -317,6 +607,7 @@ def consultar_en_vivo(
                 df_fuente = consultar_secop2(
                     departamento, modalidad, estado, palabra_clave,
                     fecha_inicio, fecha_fin, tipo_contrato, max_registros_api,
+                    perfil_api,
                 )
             elif fuente == "SECOP I":
                 df_fuente = consultar_secop1(
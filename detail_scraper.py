@@ -9,7 +9,8 @@ Responsabilidades:
   1. Descargar la ficha de un proceso (HTTP directo o, opcionalmente,
      reutilizando un WebDriver ya abierto).
   2. Convertir los pares etiqueta-valor del HTML en campos tipados.
-  3. Extracción masiva con control de ritmo para no despertar al WAF.
+  3. Extracción masiva concurrente con control de ritmo para no
+     despertar al WAF (``planificador.py``).
   4. Mantener una base histórica incremental.
 
 Las etiquetas del mapeo están tomadas del HTML real en producción: el
@@ -20,10 +21,15 @@ Contrato" para el valor final.
 
 from __future__ import annotations
 
+import hashlib
 import logging
 import re
+import shutil
+import threading
 import time
+from collections import Counter
 from dataclasses import asdict, dataclass
+from pathlib import Path
 from typing import Optional
 from urllib.parse import parse_qs, urlparse
 
@@ -32,10 +38,19 @@ from bs4 import BeautifulSoup
 
 from config import (
     COLUMNAS_DETALLE,
-    HTTP_DELAY,
+    DETALLE_CAMPOS_CLAVE,
+    DETALLE_HILOS,
+    DETALLE_PARTES_DIR,
     MAX_RETRIES,
+    PARSER_BACKEND,
     RETRY_BACKOFF,
 )
+from historico import CLAVES_HISTORICAS
+
+try:
+    import lxml.html as _lxml_html
+except ImportError:  # pragma: no cover - lxml es opcional
+    _lxml_html = None
 
 logger = logging.getLogger(__name__)
 
@@ -50,9 +65,13 @@ _RE_NUMERO_PROCESO = re.compile(
 # ════════════════════════════════════════════════════════════
 
 
-@dataclass
+@dataclass(slots=True)
 class DetalleProceso:
-    """Datos detallados de un proceso de contratación de SECOP I."""
+    """Datos detallados de un proceso de contratación de SECOP I.
+
+    Con ``__slots__``: en una extracción masiva hay una instancia viva
+    por ficha en vuelo y sin ``__dict__`` pesan bastante menos.
+    """
 
     numero_proceso: str = ""
     id_proceso: str = ""
@@ -160,28 +179,24 @@ def _id_desde_url(url: str) -> str:
 # ════════════════════════════════════════════════════════════
 
 
-def _parsear_detalle_html(html: str, url: str) -> DetalleProceso:
-    """Extrae los campos de la ficha de detalle de un proceso.
+# Campos distintos del mapeo: cuando están todos, no hace falta mirar
+# más filas.
+_CAMPOS_MAPEO: frozenset[str] = frozenset(_MAPEO_ETIQUETAS.values())
 
-    Recorre las filas ``<tr>`` con al menos dos celdas, interpretándolas
-    como pares etiqueta-valor, y además rescata el número de proceso y
-    la entidad del encabezado de la página.
+_CAMPOS_FECHA = ("fecha_apertura", "fecha_cierre", "fecha_adjudicacion")
 
-    Args:
-        html: HTML de la ficha de detalle.
-        url:  URL de origen (se guarda en el resultado).
 
-    Returns:
-        ``DetalleProceso`` con los campos encontrados.
-    """
-    soup = BeautifulSoup(html, "html.parser")
-    detalle = DetalleProceso(url_detalle=url, id_proceso=_id_desde_url(url))
+def _leer_encabezado(detalle: DetalleProceso, texto_pagina: str) -> None:
+    """Rescata número de proceso y entidad del texto de la página.
 
-    # --- Encabezado: número de proceso y entidad ---
-    texto_pagina = soup.get_text("\n", strip=True)
+    ``texto_pagina`` es el texto visible con un salto de línea entre
+    fragmentos (``get_text("\n", strip=True)``). La entidad es la línea
+    que sigue a la del número.
+    """
     coincidencia = _RE_NUMERO_PROCESO.search(texto_pagina)
-    if coincidencia:
-        detalle.numero_proceso = coincidencia.group(1).strip()
+    if not coincidencia:
+        return
+    detalle.numero_proceso = coincidencia.group(1).strip()
 
     lineas = [ln for ln in texto_pagina.split("\n") if ln.strip()]
     for indice, linea in enumerate(lineas):
@@ -189,6 +204,41 @@ def _parsear_detalle_html(html: str, url: str) -> DetalleProceso:
             detalle.entidad = lineas[indice + 1].strip()
             break
 
+
+def _asignar_par(
+    detalle: DetalleProceso, etiqueta: str, valor: str, encontrados: set[str]
+) -> None:
+    """Vuelca un par etiqueta-valor de la ficha en su campo, si lo tiene."""
+    etiqueta = _normalizar_etiqueta(etiqueta)
+    if not etiqueta or not valor:
+        return
+
+    campo = _MAPEO_ETIQUETAS.get(etiqueta)
+    if not campo or campo in encontrados:
+        return
+
+    if campo == "_ubicacion":
+        detalle.departamento, detalle.municipio = _partir_ubicacion(valor)
+        encontrados.add(campo)
+        return
+
+    if campo in _CAMPOS_FECHA:
+        valor = _solo_fecha(valor)
+        if not valor:
+            return
+
+    setattr(detalle, campo, valor)
+    encontrados.add(campo)
+
+
+def _parsear_detalle_bs4(html: str, url: str) -> DetalleProceso:
+    """Backend BeautifulSoup (``html.parser``), el original."""
+    soup = BeautifulSoup(html, "html.parser")
+    detalle = DetalleProceso(url_detalle=url, id_proceso=_id_desde_url(url))
+
+    # --- Encabezado: número de proceso y entidad ---
+    _leer_encabezado(detalle, soup.get_text("\n", strip=True))
+
     # --- Pares etiqueta / valor ---
     encontrados: set[str] = set()
 
@@ -196,36 +246,120 @@ def _parsear_detalle_html(html: str, url: str) -> DetalleProceso:
         celdas = fila.find_all("td")
         if len(celdas) < 2:
             continue
+        _asignar_par(
+            detalle,
+            celdas[0].get_text(" ", strip=True),
+            celdas[1].get_text(" ", strip=True),
+            encontrados,
+        )
+        if len(encontrados) == len(_CAMPOS_MAPEO):
+            break
 
-        etiqueta = _normalizar_etiqueta(celdas[0].get_text(" ", strip=True))
-        valor = celdas[1].get_text(" ", strip=True)
-        if not etiqueta or not valor:
-            continue
+    logger.debug(
+        "Detalle parseado para %r: %d campos.",
+        detalle.numero_proceso or url, len(encontrados),
+    )
+    return detalle
 
-        campo = _MAPEO_ETIQUETAS.get(etiqueta)
-        if not campo or campo in encontrados:
-            continue
 
-        if campo == "_ubicacion":
-            detalle.departamento, detalle.municipio = _partir_ubicacion(valor)
-            encontrados.add(campo)
-            continue
+# ── Ruta rápida con lxml ────────────────────────────────────
+#
+# BeautifulSoup construye el árbol en Python puro, después
+# ``get_text`` lo recorre entero y cada ``find_all("td")`` vuelve a
+# recorrer la fila. lxml construye el árbol en C; una sola consulta
+# XPath reúne los fragmentos de texto del encabezado y de cada fila se
+# leen solo las dos primeras celdas, parando en cuanto están todos los
+# campos del mapeo. Reproduce la semántica de BeautifulSoup: mismos
+# fragmentos de texto, mismas celdas (``td`` descendientes, también de
+# tablas anidadas) y mismo texto de celda.
+
+# Fragmentos de texto visibles: ``get_text`` de BeautifulSoup tampoco
+# devuelve comentarios ni el contenido de ``<script>``, ``<style>`` y
+# ``<template>``.
+_XPATH_FRAGMENTOS = (
+    ".//text()[not(ancestor::script) and not(ancestor::style) "
+    "and not(ancestor::template)]"
+)
 
-        if campo in ("fecha_apertura", "fecha_cierre", "fecha_adjudicacion"):
-            valor = _solo_fecha(valor)
-            if not valor:
-                continue
 
-        setattr(detalle, campo, valor)
-        encontrados.add(campo)
+def _texto_celda_lxml(celda) -> str:
+    """Equivalente de ``get_text(" ", strip=True)``."""
+    if len(celda) == 0:
+        # Celda sin hijos (ni etiquetas ni comentarios): la inmensa mayoría.
+        return (celda.text or "").strip()
+    return " ".join(t.strip() for t in celda.xpath(_XPATH_FRAGMENTOS) if t.strip())
+
+
+def _parsear_detalle_lxml(html: str, url: str) -> Optional[DetalleProceso]:
+    """Backend lxml; ``None`` si lxml no está o no puede con el HTML."""
+    if _lxml_html is None:
+        return None
+    try:
+        documento = _lxml_html.fromstring(html)
+    except (ValueError, TypeError, _lxml_html.etree.ParserError):
+        return None
+
+    detalle = DetalleProceso(url_detalle=url, id_proceso=_id_desde_url(url))
+
+    # --- Encabezado: número de proceso y entidad ---
+    # ``fromstring`` devuelve el elemento raíz; el texto previo a él
+    # (raro) no se pierde porque lxml lo cuelga dentro de ``<html>``.
+    raiz = documento.getroottree().getroot()
+    texto_pagina = "\n".join(
+        t.strip() for t in raiz.xpath(_XPATH_FRAGMENTOS) if t.strip()
+    )
+    _leer_encabezado(detalle, texto_pagina)
+
+    # --- Pares etiqueta / valor ---
+    encontrados: set[str] = set()
+
+    for fila in documento.iter("tr"):
+        celdas = fila.iter("td")
+        etiqueta = next(celdas, None)
+        valor = next(celdas, None)
+        if valor is None:
+            continue
+        _asignar_par(
+            detalle, _texto_celda_lxml(etiqueta), _texto_celda_lxml(valor), encontrados
+        )
+        if len(encontrados) == len(_CAMPOS_MAPEO):
+            break
 
     logger.debug(
-        "Detalle parseado para %r: %d campos.",
+        "Detalle parseado (lxml) para %r: %d campos.",
         detalle.numero_proceso or url, len(encontrados),
     )
     return detalle
 
 
+def _parsear_detalle_html(
+    html: str, url: str, backend: Optional[str] = None
+) -> DetalleProceso:
+    """Extrae los campos de la ficha de detalle de un proceso.
+
+    Recorre las filas ``<tr>`` con al menos dos celdas, interpretándolas
+    como pares etiqueta-valor, y además rescata el número de proceso y
+    la entidad del encabezado de la página. Deja de recorrer filas en
+    cuanto se han encontrado todos los campos del mapeo.
+
+    Args:
+        html:    HTML de la ficha de detalle.
+        url:     URL de origen (se guarda en el resultado).
+        backend: ``"lxml"`` o ``"bs4"``. ``None`` sigue
+                 ``PARSER_BACKEND``: todo lo que no sea ``"bs4"`` usa
+                 lxml, con BeautifulSoup de respaldo.
+
+    Returns:
+        ``DetalleProceso`` con los campos encontrados.
+    """
+    backend = (backend or PARSER_BACKEND).lower()
+    if backend != "bs4":
+        detalle = _parsear_detalle_lxml(html, url)
+        if detalle is not None:
+            return detalle
+    return _parsear_detalle_bs4(html, url)
+
+
 # ════════════════════════════════════════════════════════════
 # 4. DESCARGA DE UNA FICHA
 # ════════════════════════════════════════════════════════════
@@ -235,16 +369,27 @@ def extraer_detalle_proceso(
     url: str,
     sesion=None,
     driver=None,
+    validadores=None,
+    resumen: Optional[Counter] = None,
 ) -> Optional[DetalleProceso]:
     """Descarga y parsea la ficha de detalle de un proceso.
 
     Usa HTTP directo salvo que se pase un ``driver``, en cuyo caso
     navega con Selenium (útil si el WAF empieza a exigir JavaScript).
 
+    Con ``validadores`` (``validadores.CacheValidadores``) la descarga
+    HTTP es condicional: una ficha cerrada y comprobada hace poco no se
+    pide, un 304 reutiliza el resultado guardado y un cuerpo idéntico al
+    anterior no se vuelve a parsear.
+
     Args:
-        url:    URL absoluta de la ficha.
-        sesion: Sesión HTTP reutilizable.
-        driver: WebDriver a usar en lugar de HTTP.
+        url:         URL absoluta de la ficha.
+        sesion:      Sesión HTTP reutilizable.
+        driver:      WebDriver a usar en lugar de HTTP.
+        validadores: Almacén de validadores HTTP (opcional).
+        resumen:     Contador donde anotar cómo se resolvió la ficha
+                     (``vigente``, ``no_modificada``, ``sin_cambios``,
+                     ``descargada``).
 
     Returns:
         ``DetalleProceso``, o ``None`` si falla.
@@ -252,9 +397,14 @@ def extraer_detalle_proceso(
     if driver is not None:
         from selenium.common.exceptions import WebDriverException
 
+        from navegadores import pool_por_defecto
+        from ritmo import controlador_para
+
         for intento in range(1, MAX_RETRIES + 1):
+            controlador_para(url).esperar()
             try:
                 driver.get(url)
+                pool_por_defecto().anotar_paginas(driver)
                 return _parsear_detalle_html(driver.page_source, url)
             except WebDriverException as exc:
                 logger.warning(
@@ -267,10 +417,47 @@ def extraer_detalle_proceso(
 
     from scraper import _get, crear_sesion
 
+    resumen = resumen if resumen is not None else Counter()
+    entrada = validadores.obtener(url) if validadores is not None else None
+    if entrada is not None and entrada.vigente():
+        resumen["vigente"] += 1
+        return DetalleProceso(**entrada.resultado)
+
     sesion = sesion or crear_sesion()
     try:
-        respuesta = _get(sesion, url)
-        return _parsear_detalle_html(respuesta.text, url)
+        respuesta = _get(
+            sesion,
+            url,
+            cabeceras=entrada.cabeceras_condicionales() if entrada else None,
+        )
+        if respuesta.status_code == 304 and entrada is not None:
+            validadores.confirmar(url)
+            resumen["no_modificada"] += 1
+            return DetalleProceso(**entrada.resultado)
+
+        huella = hashlib.sha256(respuesta.content).hexdigest()
+        if entrada is not None and entrada.sha256 == huella:
+            # El portal ignoró los validadores, pero la ficha no cambió.
+            validadores.confirmar(url)
+            resumen["sin_cambios"] += 1
+            return DetalleProceso(**entrada.resultado)
+
+        detalle = _parsear_detalle_html(respuesta.text, url)
+        resumen["descargada"] += 1
+        campos = detalle.to_dict()
+        # Una ficha sin ningún campo (página de error, HTML inesperado) no
+        # se guarda: la próxima vez se vuelve a descargar entera.
+        if validadores is not None and any(
+            valor for campo, valor in campos.items() if campo != "url_detalle"
+        ):
+            validadores.guardar(
+                url,
+                respuesta.headers.get("ETag"),
+                respuesta.headers.get("Last-Modified"),
+                huella,
+                campos,
+            )
+        return detalle
     except Exception as exc:  # noqa: BLE001 - un fallo no debe parar el lote
         logger.warning("No se pudo obtener el detalle %s: %s", url, exc)
         return None
@@ -281,79 +468,247 @@ def extraer_detalle_proceso(
 # ════════════════════════════════════════════════════════════
 
 
+def prioridad_por_faltantes(
+    df: pd.DataFrame,
+    campos: tuple[str, ...] = DETALLE_CAMPOS_CLAVE,
+) -> dict[str, float]:
+    """Prioridad de cada ``url_detalle``: cuántos campos clave le faltan.
+
+    Una columna ausente cuenta como faltante en todas las filas, así que
+    una tabla de resultados (que no trae contratista ni valor final)
+    deja a todas con la misma prioridad y manda el orden de entrada; una
+    salida de detalle previa prioriza las fichas incompletas.
+
+    Args:
+        df:     DataFrame con la columna ``url_detalle``.
+        campos: Campos que la ficha debería completar.
+
+    Returns:
+        ``{url: número de campos faltantes}``.
+    """
+    if "url_detalle" not in df.columns:
+        return {}
+
+    faltantes = pd.Series(0, index=df.index)
+    for campo in campos:
+        if campo not in df.columns:
+            faltantes += 1
+            continue
+        valores = df[campo]
+        faltantes += (valores.isna() | (valores.astype(str).str.strip() == "")).astype(int)
+
+    prioridades: dict[str, float] = {}
+    for url, valor in zip(df["url_detalle"], faltantes):
+        if isinstance(url, str) and url:
+            prioridades[url] = max(prioridades.get(url, 0), float(valor))
+    return prioridades
+
+
 def extraer_detalles_masivo(
     urls: list[str],
-    delay: float = HTTP_DELAY,
+    delay: float = 0.0,
     max_errores: int = 10,
     driver=None,
     sesion=None,
+    reanudar: bool = False,
+    prioridades: Optional[dict[str, float]] = None,
+    hilos: int = DETALLE_HILOS,
+    progreso=None,
+    destino: Optional[str | Path] = None,
+    selenium: bool = False,
 ) -> pd.DataFrame:
-    """Descarga las fichas de varios procesos, de forma secuencial.
+    """Descarga las fichas de varios procesos con un pool de hilos.
+
+    Las URLs se reparten con ``planificador.Planificador``: como mucho
+    ``DETALLE_POR_HOST`` peticiones a la vez por host, el ritmo común de
+    ``ritmo.py`` para todos los hilos, las fichas más prioritarias
+    primero y, ante errores seguidos, pausas crecientes del host en lugar
+    de abortar.
+
+    Las fichas no se acumulan en memoria: ``acumulador.AcumuladorColumnar``
+    las escribe por columnas en partes Parquet de
+    ``DETALLE_FILAS_POR_PARTE`` filas dentro de ``destino``, que se puede
+    leer como un dataset mientras el rastreo sigue. Al escribir cada
+    parte sus URLs se marcan en la bitácora (``bitacora.py``); si la
+    extracción se corta, ``reanudar=True`` con las mismas URLs conserva
+    las partes y descarga solo lo que faltaba (como mucho se repite la
+    última parte sin escribir).
+
+    Con ``driver`` o ``sesion`` propios se usa un solo hilo: ni un
+    WebDriver ni una sesión de ``requests`` se pueden compartir entre
+    hilos. Con ``selenium=True`` cada hilo toma su propio navegador del
+    pool (``navegadores.py``), así que los hilos se limitan a
+    ``NAVEGADORES_MAX``.
 
     Args:
         urls:        URLs de detalle a procesar.
-        delay:       Segundos entre peticiones (cortesía con el WAF).
-        max_errores: Errores consecutivos tolerados antes de abortar.
-        driver:      WebDriver opcional (fuerza la ruta Selenium).
+        delay:       Pausa fija adicional de cada hilo tras cada ficha.
+                     El ritmo base lo pone ``ritmo.py``, que se adapta a
+                     las respuestas del WAF.
+        max_errores: Errores seguidos de un host, con la pausa ya al
+                     máximo (``DETALLE_BACKOFF_MAX``), antes de dejar sus
+                     fichas pendientes para ``--reanudar``.
+        driver:      WebDriver opcional (fuerza la ruta Selenium con un
+                     solo hilo).
         sesion:      Sesión HTTP reutilizable.
+        reanudar:    Aprovechar las fichas de una ejecución interrumpida.
+        prioridades: Prioridad por URL (mayor va antes), p. ej. de
+                     ``prioridad_por_faltantes``.
+        hilos:       Tamaño del pool (``SECOP_DETALLE_HILOS``).
+        progreso:    Callback opcional con ``planificador.MetricasRastreo``.
+        destino:     Directorio de las partes Parquet. ``None`` usa una
+                     carpeta de la sesión bajo ``DETALLE_PARTES_DIR``, que
+                     se borra al terminar con éxito. Sin ``reanudar`` se
+                     empieza en una carpeta nueva (con ``destino``, se
+                     vacía).
+        selenium:    Usar navegadores del pool en lugar de HTTP.
 
     Returns:
-        DataFrame con los detalles extraídos correctamente.
+        DataFrame con los detalles extraídos correctamente, en el orden
+        de ``urls``.
     """
+    from acumulador import AcumuladorColumnar
+    from bitacora import Bitacora
+    from planificador import SIN_RESULTADO, Planificador
     from scraper import calentar_sesion, crear_sesion
+    from validadores import validadores_por_defecto
+
+    bitacora = Bitacora("detalle", sorted(set(urls)), reanudar=reanudar)
+    # La carpeta es la de la sesión de la bitácora: con ``reanudar`` se
+    # retoma la de la ejecución interrumpida, y sin él no se tocan las
+    # partes de otra ejecución en curso con las mismas URLs.
+    directorio = Path(destino) if destino else DETALLE_PARTES_DIR / bitacora.sesion[:16]
+    if destino and not reanudar:
+        shutil.rmtree(directorio, ignore_errors=True)
+    acumulador = AcumuladorColumnar(
+        directorio,
+        COLUMNAS_DETALLE,
+        al_volcar=bitacora.guardar_varios,
+        columna_clave="url_detalle",
+    )
 
-    if driver is None and sesion is None:
-        sesion = crear_sesion()
-        calentar_sesion(sesion)
-
-    resultados: list[dict] = []
-    errores_consecutivos = 0
-    total = len(urls)
-
-    logger.info("Iniciando extracción masiva de detalles: %d procesos.", total)
+    previas = len(bitacora)
+    pendientes = [url for url in dict.fromkeys(urls) if url not in bitacora]
+
+    pool = None
+    if driver is not None or sesion is not None:
+        hilos = 1
+    elif selenium:
+        from navegadores import pool_por_defecto
+
+        pool = pool_por_defecto()
+        hilos = min(hilos, pool.maximo)
+    usa_http = driver is None and pool is None
+    validadores = validadores_por_defecto() if usa_http else None
+    resumen: Counter = Counter()
+    cerrojo = threading.Lock()
+    locales = threading.local()
+    sesiones: list = []
+    prestados: list = []
+
+    def _driver_del_hilo():
+        if pool is None:
+            return driver
+        propio = getattr(locales, "driver", None)
+        if propio is None:
+            propio = pool.tomar()
+            locales.driver = propio
+            with cerrojo:
+                prestados.append(propio)
+        return propio
+
+    def _sesion_del_hilo():
+        if sesion is not None:
+            return sesion
+        propia = getattr(locales, "sesion", None)
+        if propia is None:
+            propia = crear_sesion()
+            calentar_sesion(propia)
+            locales.sesion = propia
+            with cerrojo:
+                sesiones.append(propia)
+        return propia
+
+    def _descargar(url: str):
+        contador: Counter = Counter()
+        detalle = extraer_detalle_proceso(
+            url,
+            sesion=_sesion_del_hilo() if usa_http else None,
+            driver=_driver_del_hilo(),
+            validadores=validadores,
+            resumen=contador,
+        )
+        with cerrojo:
+            resumen.update(contador)
+        if delay:
+            time.sleep(delay)
+        if detalle is None:
+            return None  # transporte o WAF: el planificador pausa el host
+        if detalle.numero_proceso or detalle.objeto_contrato:
+            return detalle
+        # El portal respondió, pero la ficha no trae datos: no es un
+        # fallo del host ni se reintenta.
+        return SIN_RESULTADO
+
+    planificador = Planificador(
+        _descargar, hilos=hilos, max_errores=max_errores, progreso=progreso
+    )
+    completo = False
 
-    for indice, url in enumerate(urls, start=1):
-        detalle = extraer_detalle_proceso(url, sesion=sesion, driver=driver)
+    logger.info(
+        "Iniciando extracción masiva de detalles: %d procesos (%d ya en la "
+        "bitácora), %d hilos. Resultados parciales en %s.",
+        len(pendientes), previas, planificador.hilos, directorio,
+    )
 
-        if detalle and (detalle.numero_proceso or detalle.objeto_contrato):
-            resultados.append(detalle.to_dict())
-            errores_consecutivos = 0
+    try:
+        for _, detalle in planificador.ejecutar(pendientes, prioridades):
+            acumulador.agregar(detalle)
+        completo = planificador.completo
+    finally:
+        for propia in sesiones:
+            propia.close()
+        for prestado in prestados:
+            pool.devolver(prestado)
+        # También tras un corte: lo extraído queda en disco y marcado.
+        acumulador.cerrar()
+        if completo:
+            bitacora.finalizar()
         else:
-            errores_consecutivos += 1
-            logger.warning(
-                "Fallo en proceso %d/%d (errores consecutivos: %d).",
-                indice, total, errores_consecutivos,
-            )
+            if bitacora.activa:
+                logger.warning(
+                    "Extracción incompleta: %d fichas guardadas en %s. "
+                    "Repite con --reanudar para continuar.",
+                    len(bitacora), directorio,
+                )
+            bitacora.cerrar()
 
-        if errores_consecutivos >= max_errores:
-            logger.error(
-                "Abortando extracción masiva tras %d errores consecutivos.",
-                max_errores,
-            )
-            break
+    logger.info("Rastreo de detalles: %s.", planificador.metricas.linea())
 
-        if indice < total:
-            time.sleep(delay)
+    df = acumulador.leer()
+    if completo and destino is None:
+        acumulador.borrar()
 
-        if indice % 10 == 0:
-            logger.info(
-                "Progreso: %d/%d procesados (%d exitosos).",
-                indice, total, len(resultados),
-            )
+    # Una ficha puede estar repetida si el corte llegó entre escribir su
+    # parte y marcarla; manda la última.
+    df = df.drop_duplicates(subset="url_detalle", keep="last").set_index("url_detalle")
+    orden = [url for url in dict.fromkeys(urls) if url in df.index]
+    df = df.loc[orden].reset_index()[COLUMNAS_DETALLE]
 
-    if not resultados:
-        logger.warning("No se extrajo ningún detalle de %d URLs.", total)
+    if df.empty:
+        logger.warning("No se extrajo ningún detalle de %d URLs.", len(urls))
         return pd.DataFrame(columns=COLUMNAS_DETALLE)
 
-    df = pd.DataFrame(resultados)
-
-    presentes = [c for c in COLUMNAS_DETALLE if c in df.columns]
-    extras = [c for c in df.columns if c not in COLUMNAS_DETALLE]
-    df = df[presentes + extras]
-
     logger.info(
-        "Extracción masiva completada: %d/%d detalles extraídos.", len(df), total
+        "Extracción masiva completada: %d/%d detalles extraídos.", len(df), len(urls)
     )
+    if validadores is not None and resumen:
+        logger.info(
+            "Revalidación: %d descargadas, %d sin modificar (304), %d con el "
+            "mismo contenido, %d cerradas sin consultar.",
+            resumen["descargada"], resumen["no_modificada"],
+            resumen["sin_cambios"], resumen["vigente"],
+        )
     return df
 
 
@@ -365,23 +720,62 @@ def extraer_detalles_masivo(
 def actualizar_base_historica(
     nuevos: pd.DataFrame,
     ruta_historica: str,
-    columna_clave: str = "numero_proceso",
-) -> pd.DataFrame:
+    columna_clave: Optional[str] = None,
+) -> int:
     """Combina nuevos registros con una base histórica existente.
 
     Deduplica por ``columna_clave`` conservando el registro más reciente.
-    El formato (CSV o Parquet) se decide por la extensión del archivo.
+
+    Si la ruta es un directorio o no tiene extensión se usa la base
+    particionada de ``historico.py``: el lote se añade como partición
+    nueva y solo se actualiza el índice de claves, sin leer ni reescribir
+    el histórico. Con extensión ``.csv`` o ``.parquet`` se mantiene el
+    archivo único, que se reescribe entero en cada ejecución.
 
     Args:
         nuevos:         DataFrame con registros nuevos.
-        ruta_historica: Ruta del archivo histórico.
-        columna_clave:  Columna identificadora única.
+        ruta_historica: Ruta del archivo o directorio histórico.
+        columna_clave:  Columna identificadora única. Por defecto, la que
+                        ya tenga la base particionada o, si es nueva, la
+                        primera de ``CLAVES_HISTORICAS`` que traiga el
+                        lote. Sin ninguna, el archivo único anexa sin
+                        deduplicar y la base particionada no se toca.
 
     Returns:
-        DataFrame con la base histórica actualizada.
+        Número de registros vigentes en la base tras la actualización.
+
+    Raises:
+        ValueError: Si ``columna_clave`` no es la clave de la base
+            particionada.
     """
-    from pathlib import Path
+    from historico import BaseHistorica, es_base_particionada
+
+    if es_base_particionada(ruta_historica):
+        base = BaseHistorica(ruta_historica, columna_clave=columna_clave)
+        clave = base.columna_clave or next(
+            (c for c in CLAVES_HISTORICAS if c in nuevos.columns), None
+        )
+        if clave is None or clave not in nuevos.columns:
+            # Sin clave no se puede indexar: mejor no tocar la base que
+            # abortar la ejecución después de exportar los resultados.
+            logger.warning(
+                "El lote no tiene columna clave (%s); la base histórica "
+                "particionada '%s' no se actualiza.",
+                clave or " ni ".join(CLAVES_HISTORICAS), ruta_historica,
+            )
+            return len(base)
+        base.upsert(nuevos)
+        vigentes = len(base)
+        logger.info(
+            "Base histórica particionada '%s': %d registros vigentes.",
+            ruta_historica, vigentes,
+        )
+        return vigentes
 
+    if columna_clave is None:
+        columna_clave = next(
+            (c for c in CLAVES_HISTORICAS if c in nuevos.columns), None
+        )
     ruta = Path(ruta_historica)
 
     if ruta.exists():
@@ -396,7 +790,12 @@ def actualizar_base_historica(
 
     combinado = pd.concat([historica, nuevos], ignore_index=True)
 
-    if columna_clave in combinado.columns:
+    if columna_clave is None or columna_clave not in combinado.columns:
+        logger.warning(
+            "Sin columna clave (%s): el lote se anexa sin deduplicar.",
+            columna_clave or " ni ".join(CLAVES_HISTORICAS),
+        )
+    else:
         antes = len(combinado)
         combinado = combinado.drop_duplicates(
             subset=[columna_clave], keep="last"
@@ -415,4 +814,4 @@ def actualizar_base_historica(
     logger.info(
         "Base histórica actualizada en '%s': %d registros.", ruta, len(combinado)
     )
-    return combinado
+    return len(combinado)
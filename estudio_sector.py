@@ -31,15 +31,25 @@ se inventan.
 
 from __future__ import annotations
 
+import base64
+import hashlib
+import json
 import logging
-from dataclasses import dataclass, field
+from dataclasses import asdict, dataclass, field, replace
 from datetime import datetime
 from io import BytesIO
-from typing import Any, Optional
+from typing import Any, Callable, Optional
 
 import pandas as pd
 
-from config import resolver_fuente_pdf
+from cache_disco import CacheDisco, huella
+from config import (
+    CACHE_DIR,
+    CACHE_ESTUDIO_MAX_MB,
+    CACHE_ESTUDIO_TTL,
+    SOCRATA_DATASET_CONTRATOS,
+    resolver_fuente_pdf,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -195,13 +205,23 @@ def _distribucion(df: pd.DataFrame, columna: str, tope: int = 10) -> pd.DataFram
         df.groupby(df[columna].fillna("No informado").astype(str))
         .agg(contratos=("valor_del_contrato", "size"),
              valor_total=("valor_del_contrato", "sum"))
-        .sort_values("valor_total", ascending=False)
     )
+    return _resumir_grupos(agrupado.rename_axis("categoria"), tope)
+
+
+def _resumir_grupos(agrupado: pd.DataFrame, tope: int) -> pd.DataFrame:
+    """Ordena por valor, añade la participación y deja las ``tope`` primeras.
+
+    ``agrupado`` trae **todas** las categorías (índice ``categoria``,
+    columnas ``contratos`` y ``valor_total``), para que el porcentaje se
+    calcule sobre el total real y no sobre las que se muestran.
+    """
+    agrupado = agrupado.sort_values("valor_total", ascending=False)
     total = agrupado["valor_total"].sum()
     agrupado["pct_valor"] = (
         agrupado["valor_total"] / total * 100 if total else 0
     )
-    return agrupado.head(tope).reset_index().rename(columns={columna: "categoria"})
+    return agrupado.head(tope).reset_index()
 
 
 def analizar_demanda(df: pd.DataFrame) -> dict[str, Any]:
@@ -292,20 +312,25 @@ def analizar_oferta(df: pd.DataFrame) -> dict[str, Any]:
     resultado["proveedores"] = _distribucion(
         validos, "proveedor_adjudicado", tope=20
     )
+    return _concentracion(resultado)
+
 
-    # Concentración: cuota del mayor proveedor y de los cinco primeros.
+def _concentracion(resultado: dict[str, Any]) -> dict[str, Any]:
+    """Cuota del mayor proveedor y de los cinco primeros."""
     tabla = resultado["proveedores"]
     if not tabla.empty:
         resultado["cuota_lider"] = float(tabla.iloc[0]["pct_valor"])
         resultado["cuota_top5"] = float(tabla.head(5)["pct_valor"].sum())
         resultado["lider"] = str(tabla.iloc[0]["categoria"])
-
     return resultado
 
 
 def analizar_mercado(df: pd.DataFrame) -> dict[str, Any]:
     """Componente 5.2.5 — estudio de mercado (análisis de precios)."""
-    estadisticas = calcular_estadisticas(df["valor_del_contrato"])
+    return _mercado(calcular_estadisticas(df["valor_del_contrato"]))
+
+
+def _mercado(estadisticas: dict[str, Any]) -> dict[str, Any]:
     return {
         "estadisticas": estadisticas,
         "interpretacion": (
@@ -315,14 +340,20 @@ def analizar_mercado(df: pd.DataFrame) -> dict[str, Any]:
     }
 
 
-def construir_estudio(
-    df: pd.DataFrame, contexto: ContextoEstudio
-) -> dict[str, Any]:
-    """Ensambla todos los componentes del Estudio del Sector."""
+def _preparar_muestra(df: pd.DataFrame) -> pd.DataFrame:
+    """Copia de la muestra con el valor del contrato ya numérico."""
     df = df.copy()
     df["valor_del_contrato"] = pd.to_numeric(
         df.get("valor_del_contrato"), errors="coerce"
     )
+    return df
+
+
+def construir_estudio(
+    df: pd.DataFrame, contexto: ContextoEstudio
+) -> dict[str, Any]:
+    """Ensambla todos los componentes del Estudio del Sector."""
+    df = _preparar_muestra(df)
 
     return {
         "contexto": contexto,
@@ -334,6 +365,82 @@ def construir_estudio(
     }
 
 
+# ── Estudio sobre agregados calculados en la API ────────────
+#
+# ``construir_estudio`` necesita todas las filas en memoria, lo que en
+# la consulta en vivo limita el estudio a una muestra con tope. Con los
+# agregados de ``agregados_api`` (calculados por Socrata con ``$group``)
+# las cifras son las del universo completo y solo se descargan las filas
+# del anexo.
+
+# Filas de cada tabla de distribución, como en ``analizar_demanda``.
+_TOPES_DISTRIBUCION = {
+    "modalidades": ("modalidad_de_contratacion", 10),
+    "tipos_contrato": ("tipo_de_contrato", 10),
+    "entidades": ("nombre_entidad", 15),
+    "ciudades": ("ciudad", 10),
+    "estados": ("estado_contrato", 10),
+}
+
+
+def _grupos_agregados(
+    grupos: pd.DataFrame, tope: int, excluir_sin_informar: bool = False
+) -> pd.DataFrame:
+    """``_distribucion`` sobre una tabla ya agrupada en la API."""
+    if grupos.empty or grupos["categoria"].isna().all():
+        return pd.DataFrame()
+    categoria = grupos["categoria"]
+    if excluir_sin_informar:
+        texto = categoria.fillna("").astype(str)
+        grupos = grupos[texto.str.strip().ne("") & texto.str.lower().ne("nan")]
+        if grupos.empty:
+            return pd.DataFrame()
+        categoria = grupos["categoria"]
+    agrupado = (
+        grupos.assign(categoria=categoria.fillna("No informado").astype(str))
+        .groupby("categoria")[["contratos", "valor_total"]]
+        .sum()
+    )
+    agrupado["contratos"] = agrupado["contratos"].astype(int)
+    return _resumir_grupos(agrupado, tope)
+
+
+def construir_estudio_agregado(
+    agregados: Any, contexto: ContextoEstudio
+) -> dict[str, Any]:
+    """Como ``construir_estudio``, a partir de ``agregados_api.AgregadosEstudio``.
+
+    La muestra del resultado son solo los contratos del anexo; el total
+    de contratos analizados está en ``demanda["total_contratos"]``.
+    """
+    demanda: dict[str, Any] = {
+        "total_contratos": agregados.total_contratos,
+        "valor_total": agregados.valor_total,
+    }
+    for clave, (columna, tope) in _TOPES_DISTRIBUCION.items():
+        demanda[clave] = _grupos_agregados(agregados.grupos[columna], tope)
+    if agregados.periodo is not None and not agregados.por_anio.empty:
+        demanda["por_anio"] = agregados.por_anio
+        demanda["por_mes"] = agregados.por_mes
+        demanda["periodo"] = agregados.periodo
+
+    proveedores = agregados.grupos["proveedor_adjudicado"]
+    proveedores = _grupos_agregados(proveedores, len(proveedores), excluir_sin_informar=True)
+    oferta = _concentracion({
+        "n_proveedores": len(proveedores),
+        "proveedores": proveedores.head(20),
+    })
+
+    return {
+        "contexto": contexto,
+        "generado_en": datetime.now(),
+        "demanda": demanda,
+        "oferta": oferta,
+        "mercado": _mercado(agregados.estadisticas),
+        "muestra": _preparar_muestra(agregados.muestra),
+    }
+
+
 # ════════════════════════════════════════════════════════════
 # 4. FORMATEO
 # ════════════════════════════════════════════════════════════
@@ -805,10 +912,10 @@ def exportar_docx(estudio: dict[str, Any]) -> bytes:
             "portal SECOP, que sustentan el análisis de precios de los "
             "numerales anteriores."
         )
-        if len(estudio["muestra"]) > len(anexo):
+        if estudio["demanda"]["total_contratos"] > len(anexo):
             parrafo(
                 f"Se detallan {len(anexo)} de "
-                f"{len(estudio['muestra']):,} contratos analizados."
+                f"{estudio['demanda']['total_contratos']:,} contratos analizados."
                 .replace(",", "."),
                 negrita=True,
             )
@@ -1278,10 +1385,10 @@ def exportar_pdf(estudio: dict[str, Any]) -> bytes:
             "portal SECOP, que sustentan el análisis de precios de los "
             "numerales anteriores."
         )
-        if len(estudio["muestra"]) > len(anexo):
+        if estudio["demanda"]["total_contratos"] > len(anexo):
             texto(
                 f"Se detallan {len(anexo)} de "
-                f"{len(estudio['muestra']):,}".replace(",", ".")
+                f"{estudio['demanda']['total_contratos']:,}".replace(",", ".")
                 + " contratos analizados.",
                 8.5,
             )
@@ -1333,3 +1440,254 @@ def exportar_pdf(estudio: dict[str, Any]) -> bytes:
     )
 
     return bytes(pdf.output())
+
+
+# ════════════════════════════════════════════════════════════
+# 7. CACHÉ DE ESTUDIOS
+# ════════════════════════════════════════════════════════════
+#
+# Los analistas regeneran el mismo estudio muchas veces al día. El
+# análisis se guarda indexado por la huella de los filtros, las fuentes
+# y la versión de la muestra; los documentos, además, por los datos de
+# encabezado, que cambian el texto pero no las cifras.
+#
+# El análisis se guarda como JSON con las tablas en Parquet, nunca con
+# pickle: la caché vive en un directorio compartido y deserializar un
+# pickle ajeno permitiría ejecutar código en el dashboard.
+
+_cache_estudios: Optional[CacheDisco] = None
+
+
+def _cache() -> CacheDisco:
+    """Caché de estudios, creada en el primer uso."""
+    global _cache_estudios
+    if _cache_estudios is None:
+        _cache_estudios = CacheDisco(
+            CACHE_DIR / "estudios",
+            ttl=CACHE_ESTUDIO_TTL,
+            max_bytes=CACHE_ESTUDIO_MAX_MB * 1024 * 1024,
+        )
+    return _cache_estudios
+
+
+def version_muestra(df: pd.DataFrame) -> str:
+    """Versión de la instantánea de datos sobre la que se hace el estudio.
+
+    Es un hash del contenido: dos consultas con los mismos filtros pero
+    hechas en días distintos dan versiones distintas si el portal publicó
+    contratos nuevos entre medias.
+    """
+    try:
+        filas = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    except TypeError:
+        # La API a veces entrega diccionarios (``urlproceso``), que no
+        # son hashables: se comparan por su representación en texto.
+        filas = pd.util.hash_pandas_object(df.astype(str), index=False).to_numpy()
+    return huella(list(df.columns), hashlib.sha256(filas.tobytes()).hexdigest())
+
+
+def huella_estudio(contexto: ContextoEstudio, version: str) -> str:
+    """Clave del análisis: filtros, fuentes y versión de los datos."""
+    return huella("estudio", contexto.filtros, sorted(contexto.fuentes), version)
+
+
+def _a_json(valor: Any) -> Any:
+    """Codifica el análisis en tipos JSON, marcando tablas, fechas y tuplas."""
+    from consulta import escribir_parquet
+
+    if isinstance(valor, pd.DataFrame):
+        buffer = BytesIO()
+        escribir_parquet(valor, buffer)
+        return {"__tabla__": base64.b64encode(buffer.getvalue()).decode("ascii")}
+    if isinstance(valor, pd.Timestamp):
+        return {"__timestamp__": valor.isoformat()}
+    if isinstance(valor, datetime):
+        return {"__fecha__": valor.isoformat()}
+    if isinstance(valor, dict):
+        return {str(clave): _a_json(v) for clave, v in valor.items()}
+    if isinstance(valor, tuple):
+        return {"__tupla__": [_a_json(v) for v in valor]}
+    if isinstance(valor, list):
+        return [_a_json(v) for v in valor]
+    if hasattr(valor, "item"):
+        return valor.item()  # escalares de numpy
+    return valor
+
+
+def _de_json(valor: Any) -> Any:
+    """Inversa de ``_a_json``."""
+    if isinstance(valor, list):
+        return [_de_json(v) for v in valor]
+    if not isinstance(valor, dict):
+        return valor
+    if "__tabla__" in valor:
+        return pd.read_parquet(BytesIO(base64.b64decode(valor["__tabla__"])))
+    if "__timestamp__" in valor:
+        return pd.Timestamp(valor["__timestamp__"])
+    if "__fecha__" in valor:
+        return datetime.fromisoformat(valor["__fecha__"])
+    if "__tupla__" in valor:
+        return tuple(_de_json(v) for v in valor["__tupla__"])
+    return {clave: _de_json(v) for clave, v in valor.items()}
+
+
+def _leer_estudio(
+    clave: str, contexto: ContextoEstudio
+) -> Optional[dict[str, Any]]:
+    """Análisis guardado bajo ``clave``, o ``None`` si no hay uno legible.
+
+    Conserva la procedencia original: la fecha de generación y el
+    ``consultado_en`` de la consulta que lo originó. Solo trae
+    ``muestra`` si se guardó con ella.
+    """
+    crudo = _cache().leer_bytes(clave)
+    if crudo is None:
+        return None
+    try:
+        guardado = _de_json(json.loads(crudo))
+    except Exception as exc:  # noqa: BLE001 - entrada corrupta: se rehace
+        logger.warning("Estudio en caché ilegible (%s); se recalcula.", exc)
+        return None
+
+    if guardado.get("consultado_en") is not None:
+        contexto = replace(contexto, consultado_en=guardado["consultado_en"])
+    logger.info("Estudio servido desde la caché (%s).", clave[:12])
+    estudio = {
+        "contexto": contexto,
+        "generado_en": guardado["generado_en"],
+        "demanda": guardado["demanda"],
+        "oferta": guardado["oferta"],
+        "mercado": guardado["mercado"],
+        "huella": clave,
+    }
+    if "muestra" in guardado:
+        estudio["muestra"] = guardado["muestra"]
+    return estudio
+
+
+def _guardar_estudio(
+    clave: str, estudio: dict[str, Any], filas: int, con_muestra: bool = False
+) -> None:
+    """Guarda el análisis de ``estudio`` (y su muestra si ``con_muestra``)."""
+    contexto: ContextoEstudio = estudio["contexto"]
+    guardado = {
+        "generado_en": estudio["generado_en"],
+        "consultado_en": contexto.consultado_en,
+        "demanda": estudio["demanda"],
+        "oferta": estudio["oferta"],
+        "mercado": estudio["mercado"],
+    }
+    if con_muestra:
+        guardado["muestra"] = estudio["muestra"]
+    _cache().guardar_bytes(
+        clave,
+        json.dumps(_a_json(guardado)).encode("utf-8"),
+        sufijo=".json",
+        metadatos={"filas": filas, "consultado_en": contexto.consultado_en},
+    )
+
+
+def construir_estudio_cacheado(
+    df: pd.DataFrame,
+    contexto: ContextoEstudio,
+    version: Optional[str] = None,
+) -> dict[str, Any]:
+    """Como ``construir_estudio``, pero reutiliza un análisis ya hecho.
+
+    Un estudio repetido conserva la procedencia original: la fecha de
+    generación y el ``consultado_en`` de la consulta que lo originó.
+
+    Args:
+        df:       Muestra de contratos.
+        contexto: Datos de encabezado y trazabilidad de la consulta.
+        version:  Versión de la instantánea de datos. Por defecto se
+                  calcula a partir del contenido de ``df``.
+
+    Returns:
+        El mismo diccionario que ``construir_estudio``, más la clave
+        ``huella`` con la que se indexó.
+    """
+    clave = huella_estudio(contexto, version or version_muestra(df))
+
+    guardado = _leer_estudio(clave, contexto)
+    if guardado is not None:
+        guardado["muestra"] = _preparar_muestra(df)
+        return guardado
+
+    estudio = construir_estudio(df, contexto)
+    estudio["huella"] = clave
+    _guardar_estudio(clave, estudio, filas=len(df))
+    return estudio
+
+
+def construir_estudio_api(
+    contexto: ContextoEstudio,
+    dataset: str = SOCRATA_DATASET_CONTRATOS,
+    **filtros: Any,
+) -> dict[str, Any]:
+    """Estudio sobre todo SECOP II, con los agregados calculados en la API.
+
+    Cada tabla se pide ya agrupada a Socrata (``agregados_api``), así que
+    las cifras cubren el universo completo de los filtros en lugar de una
+    muestra con tope, y solo se descargan las filas del anexo. Se reutiliza
+    un análisis en caché mientras los totales del universo no cambien.
+
+    Args:
+        contexto: Datos de encabezado y trazabilidad de la consulta.
+        dataset:  Dataset de Socrata.
+        **filtros: Los de ``api_scraper.consultar_contratos``
+                   (``departamento``, ``palabra_clave``, ``fecha_inicio``…).
+
+    Returns:
+        El mismo diccionario que ``construir_estudio``, más ``huella``.
+    """
+    from agregados_api import agregar_universo, version_universo
+
+    clave = huella_estudio(contexto, version_universo(dataset, **filtros))
+
+    guardado = _leer_estudio(clave, contexto)
+    if guardado is not None:
+        return guardado
+
+    agregados = agregar_universo(
+        dataset=dataset, tope_anexo=TOPE_ANEXO, perfil_anexo="anexo", **filtros
+    )
+    estudio = construir_estudio_agregado(agregados, contexto)
+    estudio["huella"] = clave
+    # La muestra del anexo no se puede rehacer sin volver a la API.
+    _guardar_estudio(
+        clave, estudio, filas=agregados.total_contratos, con_muestra=True
+    )
+    return estudio
+
+
+def _documento_cacheado(
+    estudio: dict[str, Any],
+    formato: str,
+    exportador: Callable[[dict[str, Any]], bytes],
+) -> bytes:
+    """Devuelve el documento renderizado, reutilizándolo si ya existe."""
+    if "huella" not in estudio:
+        return exportador(estudio)
+
+    clave = huella(
+        "documento", formato, estudio["huella"],
+        asdict(estudio["contexto"]), estudio["generado_en"],
+    )
+    datos = _cache().leer_bytes(clave)
+    if datos is not None:
+        return datos
+
+    datos = exportador(estudio)
+    _cache().guardar_bytes(clave, datos, sufijo=f".{formato}")
+    return datos
+
+
+def exportar_docx_cacheado(estudio: dict[str, Any]) -> bytes:
+    """``exportar_docx`` con caché en disco."""
+    return _documento_cacheado(estudio, "docx", exportar_docx)
+
+
+def exportar_pdf_cacheado(estudio: dict[str, Any]) -> bytes:
+    """``exportar_pdf`` con caché en disco."""
+    return _documento_cacheado(estudio, "pdf", exportar_pdf)
@@ -11,7 +11,8 @@ Jerarquía:
   ├── SecopFormError         → Error al interactuar con el formulario.
   ├── SecopPaginationError   → Error durante la navegación de páginas.
   ├── SecopParsingError      → Error al parsear el HTML de resultados.
-  └── SecopExportError       → Error al exportar el DataFrame.
+  ├── SecopExportError       → Error al exportar el DataFrame.
+  └── SecopReplayError       → Petición sin respuesta archivada (replay).
 
 Cada excepción lleva un mensaje descriptivo y, opcionalmente, el
 contexto (URL, parámetros de búsqueda, HTML parcial) para facilitar
@@ -112,3 +113,12 @@ class SecopParsingError(SecopError):
 
 class SecopExportError(SecopError):
     """Error al guardar el DataFrame en disco (CSV, Parquet, etc.)."""
+
+
+class SecopReplayError(SecopError):
+    """En modo reproducción no hay respuesta archivada para la petición.
+
+    Con ``SECOP_REPLAY=1`` no se toca la red: toda petición debe haberse
+    archivado antes (``archivo_http.py``). El ``context`` incluye la URL
+    y los parámetros buscados.
+    """
@@ -0,0 +1,305 @@
+"""
+flujo.py — Descarga y procesamiento solapados de la tabla de SECOP I.
+
+La ruta por lotes (``scraper.ejecutar_scraping_http`` seguida de
+``parser.parsear_todas_paginas``) guarda en memoria el HTML de todas las
+páginas y no empieza a parsear hasta tener la última; mientras tanto la
+CPU está parada en las pausas de cortesía con el WAF (``SECOP_DELAY``).
+
+Aquí las dos etapas se solapan con un productor y un consumidor:
+
+  • **Productor** (hilo aparte): recorre ``scraper.iterar_paginas_http``
+    y deja cada página en una cola acotada (``FLUJO_PAGINAS_EN_COLA``).
+    Si la cola está llena espera, así que nunca se adelanta más de lo
+    permitido.
+  • **Consumidor** (hilo que llama): parsea cada página, descarta los
+    duplicados de páginas anteriores, aplica el filtro por palabra clave
+    y limpia el resultado. El HTML se suelta en cuanto se parsea.
+
+Como parsear y limpiar una página cuesta mucho menos que la pausa entre
+descargas, el tiempo total se acerca al de la descarga sola, y en
+memoria solo conviven una o dos páginas de HTML más las filas ya
+limpias.
+
+Uso:
+    >>> from flujo import extraer_secop1
+    >>> df = extraer_secop1(params, palabra_clave="vías")
+"""
+
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from typing import Any, Iterable, Iterator, Optional
+
+import pandas as pd
+
+from cleaning import filtrar_por_palabra_clave, limpiar_dataframe
+from config import FLUJO_PAGINAS_EN_COLA, PARTICION_AUTOMATICA, SearchParams
+from exceptions import SecopEmptyTableError
+from parser import parsear_pagina
+
+logger = logging.getLogger(__name__)
+
+# Marcas que el productor deja en la cola además de las páginas.
+_PAGINA = "pagina"
+_ERROR = "error"
+_FIN = "fin"
+
+
+# ════════════════════════════════════════════════════════════
+# 1. PRODUCTOR
+# ════════════════════════════════════════════════════════════
+
+
+def _entregar(cola: queue.Queue, elemento: tuple[str, Any], detener: threading.Event) -> bool:
+    """Encola ``elemento`` esperando turno; ``False`` si se pidió parar."""
+    while not detener.is_set():
+        try:
+            cola.put(elemento, timeout=0.5)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _producir(
+    paginas: Iterator[str],
+    cola: queue.Queue,
+    detener: threading.Event,
+) -> None:
+    """Cuerpo del hilo productor: pasa cada página a la cola.
+
+    Los errores de descarga no se pierden en el hilo: viajan por la cola
+    y el consumidor los relanza.
+    """
+    try:
+        for html in paginas:
+            if not _entregar(cola, (_PAGINA, html), detener):
+                return
+            del html
+        _entregar(cola, (_FIN, None), detener)
+    except Exception as exc:  # noqa: BLE001 - se relanza en el consumidor
+        _entregar(cola, (_ERROR, exc), detener)
+    finally:
+        # Cierra el generador (y con él la sesión HTTP) también si el
+        # consumidor abandonó a medias.
+        cerrar = getattr(paginas, "close", None)
+        if cerrar is not None:
+            cerrar()
+
+
+# ════════════════════════════════════════════════════════════
+# 2. DEDUPLICACIÓN INCREMENTAL
+# ════════════════════════════════════════════════════════════
+
+
+class _Deduplicador:
+    """Descarta filas ya vistas en páginas anteriores.
+
+    Mismo criterio que ``parser.deduplicar_resultados``, pero sin tener
+    todas las páginas a la vez: por ``id_proceso`` cuando lo hay y por el
+    hash de la fila completa en las filas sin ID y las tablas genéricas.
+    """
+
+    def __init__(self) -> None:
+        self._ids: set[str] = set()
+        self._filas: set[int] = set()
+
+    def filtrar(self, df: pd.DataFrame) -> pd.DataFrame:
+        if df.empty:
+            return df
+
+        hashes = pd.util.hash_pandas_object(df, index=False)
+        if "id_proceso" in df.columns:
+            ids = df["id_proceso"]
+            con_id = ids.notna() & (ids != "")
+        else:
+            ids = pd.Series(None, index=df.index, dtype=object)
+            con_id = pd.Series(False, index=df.index)
+
+        conservar = []
+        for identificador, tiene_id, valor_hash in zip(ids, con_id, hashes):
+            if tiene_id:
+                nueva = identificador not in self._ids
+                self._ids.add(identificador)
+            else:
+                nueva = valor_hash not in self._filas
+                self._filas.add(valor_hash)
+            conservar.append(nueva)
+
+        return df[conservar].reset_index(drop=True)
+
+
+# ════════════════════════════════════════════════════════════
+# 3. CONSUMIDOR
+# ════════════════════════════════════════════════════════════
+
+
+def procesar_en_flujo(
+    paginas: Iterable[str],
+    palabra_clave: Optional[str] = None,
+    en_cola: int = FLUJO_PAGINAS_EN_COLA,
+) -> pd.DataFrame:
+    """Parsea, filtra y limpia las páginas a medida que se descargan.
+
+    Args:
+        paginas:       Iterable de HTML, normalmente
+                       ``scraper.iterar_paginas_http(params)``. Se recorre
+                       en un hilo aparte.
+        palabra_clave: Filtro local sobre el objeto (``None`` = ninguno).
+        en_cola:       Páginas descargadas que pueden esperar a ser
+                       procesadas.
+
+    Returns:
+        DataFrame limpio, equivalente a parsear todas las páginas con
+        ``parsear_todas_paginas``, filtrar y limpiar el conjunto.
+
+    Raises:
+        SecopEmptyTableError: Si la consulta no tiene registros o ninguna
+            página produjo datos.
+        Exception: Cualquier error de descarga del productor.
+    """
+    cola: queue.Queue = queue.Queue(maxsize=max(1, en_cola))
+    detener = threading.Event()
+    hilo = threading.Thread(
+        target=_producir,
+        args=(iter(paginas), cola, detener),
+        name="secop-descarga",
+        daemon=True,
+    )
+
+    deduplicador = _Deduplicador()
+    partes: list[pd.DataFrame] = []
+    vacio: Optional[pd.DataFrame] = None
+    leidas = errores = filas_crudas = duplicadas = 0
+    procesando = 0.0
+
+    hilo.start()
+    try:
+        while True:
+            tipo, contenido = cola.get()
+            if tipo == _FIN:
+                break
+            if tipo == _ERROR:
+                raise contenido
+
+            leidas += 1
+            inicio = time.perf_counter()
+            try:
+                df = parsear_pagina(contenido)
+            except Exception as exc:  # noqa: BLE001 - una página mala no detiene el flujo
+                errores += 1
+                logger.warning("Página %d: error de parsing — %s", leidas, exc)
+                continue
+            finally:
+                contenido = None
+
+            filas_crudas += len(df)
+            antes = len(df)
+            df = deduplicador.filtrar(df)
+            duplicadas += antes - len(df)
+            df = filtrar_por_palabra_clave(df, palabra_clave)
+            if df.empty:
+                vacio = df
+            else:
+                partes.append(limpiar_dataframe(df))
+            procesando += time.perf_counter() - inicio
+    finally:
+        detener.set()
+        hilo.join()
+
+    if leidas == errores:
+        raise SecopEmptyTableError(
+            f"Ninguna de las {leidas} páginas produjo datos "
+            f"({errores} errores de parsing).",
+        )
+
+    resultado = (
+        pd.concat(partes, ignore_index=True) if partes else limpiar_dataframe(vacio)
+    )
+    logger.info(
+        "Flujo completado: %d páginas (%d errores), %d filas leídas, %d "
+        "duplicadas → %d filas; %.1f s de parseo y limpieza solapados con "
+        "la descarga.",
+        leidas, errores, filas_crudas, duplicadas, len(resultado), procesando,
+    )
+    return resultado
+
+
+# ════════════════════════════════════════════════════════════
+# 4. API PÚBLICA
+# ════════════════════════════════════════════════════════════
+
+
+def extraer_secop1(
+    params: SearchParams,
+    palabra_clave: Optional[str] = None,
+    usar_selenium: bool = False,
+    reanudar: bool = False,
+    particionar: bool = PARTICION_AUTOMATICA,
+) -> pd.DataFrame:
+    """Extrae, parsea, filtra y limpia los resultados de SECOP I.
+
+    Con HTTP directo el procesamiento se solapa con la descarga y, en
+    los rastreos largos, cada página queda en la bitácora hasta terminar
+    (``bitacora.py``). Una
+    consulta que no cabe en ``max_pages`` páginas se parte en fragmentos
+    disjuntos que se recorren seguidos (``particion.py``); el
+    deduplicador descarta los procesos repetidos entre fragmentos. Si esa
+    ruta falla por algo distinto de "sin resultados" se repite con
+    Selenium, igual que ``scraper.ejecutar_scraping``; en ese caso las
+    páginas llegan todas juntas y se procesan después.
+
+    Args:
+        params:        Filtros de búsqueda.
+        palabra_clave: Filtro local sobre el objeto del contrato.
+        usar_selenium: Forzar la ruta Selenium desde el principio.
+        reanudar:      Aprovechar las páginas de una descarga HTTP
+                       interrumpida con los mismos filtros.
+        particionar:   Partir las consultas que no caben en vez de
+                       truncarlas.
+
+    Returns:
+        DataFrame limpio.
+    """
+    from particion import iterar_paginas_particionadas, planificar_consulta
+    from scraper import crear_sesion, ejecutar_scraping_selenium
+
+    if not usar_selenium:
+        sesion = crear_sesion()
+        plan = None
+        try:
+            plan = planificar_consulta(
+                params, sesion, reanudar=reanudar, particionar=particionar
+            )
+            df = procesar_en_flujo(
+                iterar_paginas_particionadas(plan, sesion), palabra_clave
+            )
+            plan.finalizar()
+            if len(plan.fragmentos) > 1:
+                logger.info("[HTTP] Cobertura:\n%s", plan.informe())
+            return df
+        except SecopEmptyTableError:
+            if plan is not None:
+                plan.finalizar()
+            raise
+        except Exception as exc:  # noqa: BLE001 - se degrada a Selenium
+            if plan is not None and plan.puntos_control:
+                logger.warning(
+                    "[HTTP] Falló la ruta sin navegador (%s); las páginas ya "
+                    "descargadas quedan en la bitácora para --reanudar. "
+                    "Probando con Selenium...", exc,
+                )
+            else:
+                logger.warning(
+                    "[HTTP] Falló la ruta sin navegador (%s). Probando con "
+                    "Selenium...", exc,
+                )
+        finally:
+            sesion.close()
+
+    paginas = ejecutar_scraping_selenium(params)
+    return procesar_en_flujo(paginas, palabra_clave)
@@ -0,0 +1,306 @@
+"""
+fragmentos_api.py — Descarga de SECOP II por meses, en paralelo y con caché.
+
+``api_scraper.consultar_contratos`` recorre una consulta con un único
+cursor de ``$offset``: una descarga nacional o de varios años son
+cientos de páginas seguidas, al ritmo de una sola conexión, y un fallo a
+mitad obliga a empezar de cero.
+
+Este modo parte el ``$where`` por **mes** de
+``fecha_de_inicio_del_contrato``:
+
+  1. **Conteo**: una sola petición ``$group`` por
+     ``date_trunc_ym(fecha)`` devuelve cuántos registros tiene cada mes,
+     más los que no tienen fecha (fragmento propio, ``IS NULL``).
+  2. **Descarga**: cada mes con registros es un fragmento disjunto
+     (``fecha >= mes AND fecha < mes siguiente``) que se pagina por su
+     cuenta; ``API_HILOS`` fragmentos a la vez.
+  3. **Caché por fragmento**: cada fragmento terminado se guarda como
+     Parquet en ``CACHE_DIR/fragmentos_api`` con su recuento. Una
+     descarga posterior solo vuelve a pedir los meses cuyo recuento
+     cambió (o cuya entrada caducó con ``FRAGMENTOS_API_TTL``); un corte
+     solo pierde los fragmentos en curso.
+  4. **Fallos aislados**: un fragmento que falla se reintenta solo, al
+     final. Si sigue fallando se informa de qué meses faltan y los demás
+     quedan en caché para el siguiente intento.
+
+Limitación: comparar recuentos no detecta una fila modificada sin que
+cambie el total del mes. ``FRAGMENTOS_API_TTL`` acota cuánto puede durar
+esa diferencia; para seguir los cambios fila a fila está
+``sincronizacion.py``.
+
+Uso:
+    >>> from fragmentos_api import consultar_por_meses
+    >>> df = consultar_por_meses(fecha_inicio="01/01/2020", fecha_fin="31/12/2024")
+"""
+
+from __future__ import annotations
+
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+import pandas as pd
+
+from api_scraper import (
+    COLUMNAS_API,
+    construir_where,
+    descargar_paginado,
+    pedir_pagina,
+)
+from cache_disco import CacheDisco, huella
+from config import (
+    API_HILOS,
+    CACHE_DIR,
+    FRAGMENTOS_API_MAX_MB,
+    FRAGMENTOS_API_TTL,
+    PARQUET_ENGINE,
+    SOCRATA_DATASET_CONTRATOS,
+)
+from consulta import escribir_parquet
+
+logger = logging.getLogger(__name__)
+
+CAMPO_FECHA = "fecha_de_inicio_del_contrato"
+
+_cache_fragmentos: Optional[CacheDisco] = None
+
+
+def _cache() -> CacheDisco:
+    """Caché de fragmentos, creada en el primer uso."""
+    global _cache_fragmentos
+    if _cache_fragmentos is None:
+        _cache_fragmentos = CacheDisco(
+            CACHE_DIR / "fragmentos_api",
+            ttl=FRAGMENTOS_API_TTL,
+            max_bytes=FRAGMENTOS_API_MAX_MB * 1024 * 1024,
+        )
+    return _cache_fragmentos
+
+
+# ────────────────────────────────────────────────────────────
+# FRAGMENTOS MENSUALES
+# ────────────────────────────────────────────────────────────
+
+
+@dataclass(frozen=True)
+class FragmentoMensual:
+    """Un mes de la consulta (``mes=None``: registros sin fecha).
+
+    Attributes:
+        mes:   Primer día del mes, ``yyyy-MM``; ``None`` = sin fecha.
+        total: Registros del mes según el conteo agrupado.
+        where: Filtro SoQL del fragmento.
+    """
+
+    mes: Optional[str]
+    total: int
+    where: str
+
+    @property
+    def nombre(self) -> str:
+        return self.mes or "sin fecha"
+
+
+def _mes_siguiente(mes: str) -> str:
+    anio, numero = (int(p) for p in mes.split("-"))
+    return f"{anio + numero // 12}-{numero % 12 + 1:02d}"
+
+
+def _where_fragmento(where: str, mes: Optional[str], campo: str) -> str:
+    condiciones = [f"({where})"] if where else []
+    if mes is None:
+        condiciones.append(f"{campo} IS NULL")
+    else:
+        condiciones.append(f"{campo} >= '{mes}-01T00:00:00'")
+        condiciones.append(f"{campo} < '{_mes_siguiente(mes)}-01T00:00:00'")
+    return " AND ".join(condiciones)
+
+
+def contar_por_mes(
+    where: str,
+    dataset: str = SOCRATA_DATASET_CONTRATOS,
+    campo: str = CAMPO_FECHA,
+) -> list[FragmentoMensual]:
+    """Registros por mes de ``campo`` con una sola petición ``$group``.
+
+    Returns:
+        Fragmentos con registros, en orden cronológico y con el de los
+        registros sin fecha al final.
+    """
+    agrupacion = f"date_trunc_ym({campo})"
+    filas = pedir_pagina(
+        dataset,
+        where=where,
+        select=f"{agrupacion} as mes, count(*) as total",
+        limit=50000,
+        order=agrupacion,
+        group=agrupacion,
+    )
+
+    fragmentos = []
+    sin_fecha: Optional[FragmentoMensual] = None
+    for fila in filas:
+        total = int(fila.get("total", 0))
+        if not total:
+            continue
+        mes = fila.get("mes")
+        if mes is None:
+            sin_fecha = FragmentoMensual(None, total, _where_fragmento(where, None, campo))
+        else:
+            mes = str(mes)[:7]
+            fragmentos.append(FragmentoMensual(mes, total, _where_fragmento(where, mes, campo)))
+    if sin_fecha is not None:
+        fragmentos.append(sin_fecha)
+    return fragmentos
+
+
+# ────────────────────────────────────────────────────────────
+# DESCARGA CON CACHÉ POR FRAGMENTO
+# ────────────────────────────────────────────────────────────
+
+
+def _clave(dataset: str, fragmento: FragmentoMensual, select: str) -> str:
+    return huella("fragmento-api", dataset, fragmento.where, select)
+
+
+def _leer_cacheado(
+    dataset: str, fragmento: FragmentoMensual, select: str
+) -> Optional[pd.DataFrame]:
+    """El fragmento en caché, si su recuento sigue siendo el mismo."""
+    entrada = _cache().obtener(_clave(dataset, fragmento, select))
+    if entrada is None or entrada.metadatos.get("total") != fragmento.total:
+        return None
+    try:
+        return pd.read_parquet(entrada.ruta, engine=PARQUET_ENGINE)
+    except (OSError, ValueError) as exc:
+        logger.warning("Fragmento %s ilegible en caché: %s", fragmento.nombre, exc)
+        return None
+
+
+def _descargar_fragmento(
+    dataset: str, fragmento: FragmentoMensual, select: str
+) -> pd.DataFrame:
+    registros = descargar_paginado(dataset, fragmento.where, select)
+    df = pd.DataFrame(registros)
+    columnas = select.split(",")
+    for columna in columnas:
+        if columna not in df.columns:
+            df[columna] = pd.NA
+    df = df[columnas]
+    if len(df) != fragmento.total:
+        # El mes cambió entre el conteo y la descarga: se guarda con el
+        # recuento real para que la próxima pasada lo compare con ese.
+        logger.info(
+            "Fragmento %s: %d registros contados, %d descargados.",
+            fragmento.nombre, fragmento.total, len(df),
+        )
+    _cache().guardar(
+        _clave(dataset, fragmento, select),
+        lambda ruta: escribir_parquet(df, ruta),
+        sufijo=".parquet",
+        metadatos={"total": len(df), "mes": fragmento.mes},
+    )
+    return df
+
+
+def consultar_por_meses(
+    departamento: Optional[str] = None,
+    modalidad: Optional[str | Iterable[str]] = None,
+    estado: Optional[str] = None,
+    palabra_clave: Optional[str] = None,
+    fecha_inicio: Optional[str] = None,
+    fecha_fin: Optional[str] = None,
+    tipo_contrato: Optional[str | Iterable[str]] = None,
+    dataset: str = SOCRATA_DATASET_CONTRATOS,
+    hilos: int = API_HILOS,
+    columnas: Optional[list[str]] = None,
+) -> pd.DataFrame:
+    """Descarga una consulta de SECOP II mes a mes, en paralelo.
+
+    Acepta los mismos filtros que ``api_scraper.consultar_contratos`` y
+    devuelve el mismo esquema.
+
+    Args:
+        hilos:    Fragmentos que se descargan a la vez.
+        columnas: Columnas a pedir; por defecto ``COLUMNAS_API``. Cada
+                  proyección se guarda en caché por separado.
+
+    Returns:
+        DataFrame con los contratos, en orden cronológico por mes.
+
+    Raises:
+        RuntimeError: Si el conteo falla o algún fragmento sigue fallando
+            tras reintentarlo (los demás quedan en caché).
+    """
+    where = construir_where(
+        departamento, modalidad, estado, palabra_clave,
+        fecha_inicio, fecha_fin, tipo_contrato,
+    )
+    columnas = list(columnas or COLUMNAS_API)
+    select = ",".join(columnas)
+
+    fragmentos = contar_por_mes(where, dataset)
+    total = sum(f.total for f in fragmentos)
+    if not fragmentos:
+        logger.warning("La consulta no retornó registros.")
+        return pd.DataFrame(columns=columnas)
+
+    resultados: dict[FragmentoMensual, pd.DataFrame] = {}
+    for fragmento in fragmentos:
+        df = _leer_cacheado(dataset, fragmento, select)
+        if df is not None:
+            resultados[fragmento] = df
+    pendientes = [f for f in fragmentos if f not in resultados]
+    logger.info(
+        "%d registros en %d meses: %d en caché, %d por descargar (%d hilos).",
+        total, len(fragmentos), len(resultados), len(pendientes), hilos,
+    )
+
+    fallidos: list[FragmentoMensual] = []
+    if pendientes:
+        with ThreadPoolExecutor(
+            max_workers=max(1, hilos), thread_name_prefix="secop-api"
+        ) as pool:
+            futuros = {
+                pool.submit(_descargar_fragmento, dataset, f, select): f
+                for f in pendientes
+            }
+            for futuro in as_completed(futuros):
+                fragmento = futuros[futuro]
+                try:
+                    resultados[fragmento] = futuro.result()
+                except Exception as exc:  # noqa: BLE001 - se reintenta aparte
+                    logger.warning("Fragmento %s falló: %s", fragmento.nombre, exc)
+                    fallidos.append(fragmento)
+                    continue
+                logger.info(
+                    "Fragmento %s: %d registros (%d/%d meses).",
+                    fragmento.nombre, len(resultados[fragmento]),
+                    len(resultados), len(fragmentos),
+                )
+
+    # Los fallidos se reintentan solos, sin competir con los demás.
+    perdidos = []
+    for fragmento in fallidos:
+        try:
+            resultados[fragmento] = _descargar_fragmento(dataset, fragmento, select)
+        except Exception as exc:  # noqa: BLE001 - se informa abajo
+            logger.error("Fragmento %s falló de nuevo: %s", fragmento.nombre, exc)
+            perdidos.append(fragmento.nombre)
+    if perdidos:
+        raise RuntimeError(
+            f"No se pudieron descargar {len(perdidos)} meses ({', '.join(perdidos)}); "
+            "los demás quedan en caché y no se volverán a pedir."
+        )
+
+    df = pd.concat([resultados[f] for f in fragmentos], ignore_index=True)
+    if "id_contrato" in df.columns:
+        # Un contrato que cambió de fecha durante la descarga puede
+        # aparecer en dos meses.
+        con_id = df["id_contrato"].notna()
+        df = df[~(df["id_contrato"].duplicated(keep="last") & con_id)]
+        df = df.reset_index(drop=True)
+    logger.info("Consulta por meses completada: %d registros.", len(df))
+    return df
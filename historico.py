@@ -0,0 +1,524 @@
+"""
+historico.py — Base histórica particionada con índice de claves.
+
+La base histórica en un único CSV o Parquet obliga a leer todo el
+histórico, concatenar, deduplicar y reescribirlo en cada actualización:
+el coste crece con la historia, no con el lote. Aquí la base es un
+directorio con:
+
+  • ``part-*.parquet``: una partición por lote añadido. Las particiones
+    no se modifican nunca después de escritas.
+  • ``indice.sqlite``: tabla ``claves`` (``numero_proceso``, o
+    ``id_contrato`` para la API → partición que tiene su versión
+    vigente) y tabla ``particiones`` (el manifiesto: filas totales y
+    filas vigentes de cada archivo), más la tabla ``metadatos`` con la
+    columna clave de la base: se fija al crearla (o con el primer lote)
+    y quien abra la base después la lee de ahí.
+
+Un *upsert* escribe el lote como partición nueva y, en una sola
+transacción, apunta sus claves a ella. Las filas antiguas de esas claves
+siguen en sus particiones pero quedan obsoletas: el índice ya no las
+referencia y la lectura las ignora. El coste depende solo del tamaño
+del lote.
+
+La **compactación** reescribe las particiones pequeñas o con demasiadas
+filas obsoletas en particiones nuevas de ``HISTORICO_FILAS_POR_PARTICION``
+filas. Se dispara sola tras un *upsert* cuando se supera
+``HISTORICO_MAX_PARTICIONES``, y se puede programar (cron, tarea de
+Windows) con::
+
+    python historico.py output/historico --forzar
+
+SQLite serializa los escritores (``BEGIN IMMEDIATE``), así que varios
+procesos pueden actualizar la misma base sin corromper el índice. Un
+archivo de partición que quede huérfano por una caída entre la escritura
+y el *commit* lo elimina una compactación posterior (pasada una hora,
+para no borrar la de un *upsert* concurrente en curso).
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import Iterable, Optional
+
+import pandas as pd
+
+from config import (
+    HISTORICO_FILAS_POR_PARTICION,
+    HISTORICO_MAX_OBSOLETAS,
+    HISTORICO_MAX_PARTICIONES,
+    PARQUET_ENGINE,
+)
+
+logger = logging.getLogger(__name__)
+
+_NOMBRE_INDICE = "indice.sqlite"
+_PATRON_PARTICION = "part-*.parquet"
+
+# Un archivo sin registrar más joven que esto puede ser la partición de
+# un *upsert* concurrente que todavía no ha hecho *commit*.
+_EDAD_HUERFANO = 3600
+
+# Claves admitidas, por orden de preferencia: SECOP I y las fichas de
+# detalle traen ``numero_proceso``; la API de SECOP II, ``id_contrato``.
+CLAVES_HISTORICAS: tuple[str, ...] = ("numero_proceso", "id_contrato")
+
+
+class BaseHistorica:
+    """Base histórica de solo-anexar con índice por clave.
+
+    La columna clave se guarda en el índice: una base creada con
+    ``id_contrato`` se sigue abriendo con ``id_contrato`` aunque quien la
+    abra no lo indique.
+
+    Args:
+        directorio:    Carpeta de la base (se crea si no existe).
+        columna_clave: Columna identificadora única. En una base nueva
+                       fija la clave; sin ella la toma el primer lote
+                       (la primera de ``CLAVES_HISTORICAS`` que traiga).
+                       En una existente debe coincidir con la guardada.
+
+    Raises:
+        ValueError: Si ``columna_clave`` no es la clave de la base.
+    """
+
+    def __init__(self, directorio: str | Path, columna_clave: Optional[str] = None) -> None:
+        self.directorio = Path(directorio)
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        with closing(self._conectar()) as conexion, conexion:
+            conexion.execute(
+                "CREATE TABLE IF NOT EXISTS particiones ("
+                " archivo TEXT PRIMARY KEY,"
+                " registros INTEGER NOT NULL,"
+                " vigentes INTEGER NOT NULL,"
+                " creado REAL NOT NULL)"
+            )
+            conexion.execute(
+                "CREATE TABLE IF NOT EXISTS claves ("
+                " clave TEXT PRIMARY KEY,"
+                " particion TEXT NOT NULL)"
+            )
+            conexion.execute(
+                "CREATE INDEX IF NOT EXISTS claves_particion ON claves (particion)"
+            )
+            conexion.execute(
+                "CREATE TABLE IF NOT EXISTS metadatos ("
+                " nombre TEXT PRIMARY KEY,"
+                " valor TEXT NOT NULL)"
+            )
+            guardada = self._clave_guardada(conexion)
+            if guardada is None:
+                # Base nueva, o anterior a guardar la clave en el índice.
+                guardada = columna_clave or self._deducir_clave(conexion)
+                if guardada is not None:
+                    guardada = self._fijar_clave(conexion, guardada)
+        if columna_clave is not None and guardada != columna_clave:
+            raise ValueError(
+                f"La base histórica '{self.directorio}' usa la clave "
+                f"'{guardada}', no '{columna_clave}'."
+            )
+        self.columna_clave: Optional[str] = guardada
+
+    # ── Utilidades ──────────────────────────────────────────
+
+    def _conectar(self) -> sqlite3.Connection:
+        conexion = sqlite3.connect(
+            self.directorio / _NOMBRE_INDICE, timeout=60, isolation_level=None
+        )
+        conexion.execute("PRAGMA journal_mode=WAL")
+        return conexion
+
+    @staticmethod
+    def _clave_guardada(conexion: sqlite3.Connection) -> Optional[str]:
+        fila = conexion.execute(
+            "SELECT valor FROM metadatos WHERE nombre = 'columna_clave'"
+        ).fetchone()
+        return fila[0] if fila else None
+
+    def _fijar_clave(self, conexion: sqlite3.Connection, columna: str) -> str:
+        """Guarda la clave si aún no hay una; devuelve la que quedó."""
+        conexion.execute(
+            "INSERT OR IGNORE INTO metadatos (nombre, valor) "
+            "VALUES ('columna_clave', ?)", (columna,),
+        )
+        # Otro proceso pudo fijarla antes.
+        return self._clave_guardada(conexion)
+
+    def _deducir_clave(self, conexion: sqlite3.Connection) -> Optional[str]:
+        """Clave de una base sin metadatos, según las columnas de sus datos."""
+        fila = conexion.execute(
+            "SELECT archivo FROM particiones WHERE vigentes > 0 ORDER BY creado LIMIT 1"
+        ).fetchone()
+        if fila is None:
+            return None
+        columnas = pd.read_parquet(self.directorio / fila[0], engine=PARQUET_ENGINE).columns
+        return next((c for c in CLAVES_HISTORICAS if c in columnas), None)
+
+    def _nuevo_archivo(self) -> str:
+        return f"part-{time.time_ns():020d}-{os.getpid()}.parquet"
+
+    def _escribir_particion(self, df: pd.DataFrame) -> str:
+        archivo = self._nuevo_archivo()
+        temporal = self.directorio / f".{archivo}.tmp"
+        try:
+            df.to_parquet(temporal, index=False, engine=PARQUET_ENGINE)
+        except (TypeError, ValueError):
+            # Columnas object con tipos mezclados (números y texto). Los
+            # nulos se conservan: ``astype(str)`` los dejaría en "nan".
+            df = df.copy()
+            for columna in df.columns:
+                if df[columna].dtype == object:
+                    df[columna] = df[columna].map(
+                        lambda v: v if pd.isna(v) else str(v)
+                    )
+            df.to_parquet(temporal, index=False, engine=PARQUET_ENGINE)
+        os.replace(temporal, self.directorio / archivo)
+        return archivo
+
+    def _claves(self, df: pd.DataFrame) -> pd.Series:
+        return df[self.columna_clave].astype(str).str.strip()
+
+    def _leer_vigentes(
+        self, conexion: sqlite3.Connection, archivo: str
+    ) -> pd.DataFrame:
+        """Filas de una partición a las que todavía apunta el índice."""
+        vigentes = {
+            clave for (clave,) in conexion.execute(
+                "SELECT clave FROM claves WHERE particion = ?", (archivo,)
+            )
+        }
+        if not vigentes:
+            return pd.DataFrame()
+        df = pd.read_parquet(self.directorio / archivo, engine=PARQUET_ENGINE)
+        return df[self._claves(df).isin(vigentes)]
+
+    # ── Escritura ───────────────────────────────────────────
+
+    def upsert(self, nuevos: pd.DataFrame, compactar: bool = True) -> int:
+        """Añade un lote como partición nueva y actualiza el índice.
+
+        Dentro del lote se conserva la última aparición de cada clave.
+        Las filas sin clave no se pueden indexar y se descartan.
+
+        Args:
+            nuevos:    Registros a insertar o reemplazar.
+            compactar: Ejecutar la compactación si la política lo pide.
+
+        Returns:
+            Número de registros escritos.
+
+        Raises:
+            KeyError: Si el lote no tiene la columna clave (o, en una base
+                sin clave todavía, ninguna de ``CLAVES_HISTORICAS``).
+        """
+        if nuevos.empty:
+            return 0
+        if self.columna_clave is None:
+            columna = next((c for c in CLAVES_HISTORICAS if c in nuevos.columns), None)
+            if columna is None:
+                raise KeyError(
+                    "El lote no tiene ninguna columna clave "
+                    f"({', '.join(CLAVES_HISTORICAS)})."
+                )
+            with closing(self._conectar()) as conexion:
+                self.columna_clave = self._fijar_clave(conexion, columna)
+        if self.columna_clave not in nuevos.columns:
+            raise KeyError(
+                f"El lote no tiene la columna clave '{self.columna_clave}'."
+            )
+
+        claves = self._claves(nuevos)
+        con_clave = nuevos[self.columna_clave].notna() & (claves != "")
+        if not con_clave.all():
+            logger.warning(
+                "%d registros sin '%s' descartados de la base histórica.",
+                int((~con_clave).sum()), self.columna_clave,
+            )
+        lote = nuevos[con_clave].copy()
+        lote["_clave"] = claves[con_clave]
+        lote = lote.drop_duplicates(subset="_clave", keep="last")
+        claves_lote = lote.pop("_clave").tolist()
+        if not claves_lote:
+            return 0
+
+        archivo = self._escribir_particion(lote.reset_index(drop=True))
+
+        with closing(self._conectar()) as conexion:
+            conexion.execute("BEGIN IMMEDIATE")
+            try:
+                conexion.execute(
+                    "CREATE TEMP TABLE IF NOT EXISTS lote (clave TEXT PRIMARY KEY)"
+                )
+                conexion.execute("DELETE FROM lote")
+                conexion.executemany(
+                    "INSERT INTO lote (clave) VALUES (?)",
+                    ((c,) for c in claves_lote),
+                )
+                # Las particiones que pierden filas vigentes.
+                afectadas = conexion.execute(
+                    "SELECT particion, COUNT(*) FROM claves "
+                    "WHERE clave IN (SELECT clave FROM lote) GROUP BY particion"
+                ).fetchall()
+                conexion.executemany(
+                    "UPDATE particiones SET vigentes = vigentes - ? "
+                    "WHERE archivo = ?",
+                    ((n, particion) for particion, n in afectadas),
+                )
+                conexion.execute(
+                    "INSERT INTO particiones (archivo, registros, vigentes, creado) "
+                    "VALUES (?, ?, ?, ?)",
+                    (archivo, len(claves_lote), len(claves_lote), time.time()),
+                )
+                conexion.execute(
+                    "INSERT OR REPLACE INTO claves (clave, particion) "
+                    "SELECT clave, ? FROM lote", (archivo,),
+                )
+                conexion.execute("COMMIT")
+            except BaseException:
+                conexion.execute("ROLLBACK")
+                (self.directorio / archivo).unlink(missing_ok=True)
+                raise
+
+        logger.info(
+            "Base histórica '%s': %d registros añadidos en %s.",
+            self.directorio, len(claves_lote), archivo,
+        )
+        if compactar and self.necesita_compactar():
+            self.compactar()
+        return len(claves_lote)
+
+    # ── Lectura ─────────────────────────────────────────────
+
+    def leer(self) -> pd.DataFrame:
+        """Lee la versión vigente de todos los registros."""
+        with closing(self._conectar()) as conexion:
+            archivos = [
+                a for (a,) in conexion.execute(
+                    "SELECT archivo FROM particiones WHERE vigentes > 0 "
+                    "ORDER BY creado"
+                )
+            ]
+            partes = [self._leer_vigentes(conexion, a) for a in archivos]
+
+        partes = [p for p in partes if not p.empty]
+        if not partes:
+            return pd.DataFrame()
+        return pd.concat(partes, ignore_index=True)
+
+    def obtener(self, claves: Iterable[str]) -> pd.DataFrame:
+        """Lee solo los registros indicados, abriendo sus particiones.
+
+        Args:
+            claves: Valores de la columna clave.
+
+        Returns:
+            Las filas vigentes encontradas (las claves ausentes se omiten).
+        """
+        buscadas = {str(c).strip() for c in claves}
+        if not buscadas:
+            return pd.DataFrame()
+
+        with closing(self._conectar()) as conexion:
+            conexion.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS buscadas (clave TEXT PRIMARY KEY)"
+            )
+            conexion.execute("DELETE FROM buscadas")
+            conexion.executemany(
+                "INSERT OR IGNORE INTO buscadas (clave) VALUES (?)",
+                ((c,) for c in buscadas),
+            )
+            por_particion: dict[str, set[str]] = {}
+            for clave, particion in conexion.execute(
+                "SELECT clave, particion FROM claves "
+                "WHERE clave IN (SELECT clave FROM buscadas)"
+            ):
+                por_particion.setdefault(particion, set()).add(clave)
+
+        partes = []
+        for archivo, claves_particion in por_particion.items():
+            df = pd.read_parquet(self.directorio / archivo, engine=PARQUET_ENGINE)
+            partes.append(df[self._claves(df).isin(claves_particion)])
+        if not partes:
+            return pd.DataFrame()
+        return pd.concat(partes, ignore_index=True)
+
+    def contiene(self, clave: str) -> bool:
+        """Indica si la clave está en la base (consulta solo el índice)."""
+        with closing(self._conectar()) as conexion:
+            fila = conexion.execute(
+                "SELECT 1 FROM claves WHERE clave = ?", (str(clave).strip(),)
+            ).fetchone()
+        return fila is not None
+
+    def __len__(self) -> int:
+        with closing(self._conectar()) as conexion:
+            return conexion.execute("SELECT COUNT(*) FROM claves").fetchone()[0]
+
+    # ── Compactación ────────────────────────────────────────
+
+    def _candidatas(
+        self, conexion: sqlite3.Connection, forzar: bool
+    ) -> list[str]:
+        """Particiones que conviene reescribir.
+
+        Son candidatas las que tienen más de ``HISTORICO_MAX_OBSOLETAS``
+        filas reemplazadas y las pequeñas, estas últimas solo si hay al
+        menos dos que fusionar. "Pequeña" es menos de una décima parte del
+        tamaño objetivo, o cualquiera por debajo del objetivo cuando se ha
+        superado ``HISTORICO_MAX_PARTICIONES``. Con ``forzar`` lo son todas
+        las que no estén llenas y limpias.
+        """
+        filas = conexion.execute(
+            "SELECT archivo, registros, vigentes FROM particiones ORDER BY creado"
+        ).fetchall()
+        pequena = (
+            HISTORICO_FILAS_POR_PARTICION
+            if len(filas) > HISTORICO_MAX_PARTICIONES
+            else max(1, HISTORICO_FILAS_POR_PARTICION // 10)
+        )
+        candidatas, pequenas = [], []
+        for archivo, registros, vigentes in filas:
+            obsoletas = 1 - vigentes / registros if registros else 1.0
+            if obsoletas > HISTORICO_MAX_OBSOLETAS:
+                candidatas.append(archivo)
+            elif forzar and (
+                vigentes < registros or registros < HISTORICO_FILAS_POR_PARTICION
+            ):
+                candidatas.append(archivo)
+            elif registros < pequena:
+                pequenas.append(archivo)
+        if len(pequenas) > 1:
+            candidatas.extend(pequenas)
+        return candidatas
+
+    def necesita_compactar(self) -> bool:
+        """Política de compactación automática."""
+        with closing(self._conectar()) as conexion:
+            total = conexion.execute("SELECT COUNT(*) FROM particiones").fetchone()[0]
+        return total > HISTORICO_MAX_PARTICIONES
+
+    def compactar(self, forzar: bool = False) -> int:
+        """Reescribe las particiones candidatas y borra los huérfanos.
+
+        Solo se leen y reescriben las particiones candidatas; el resto
+        no se toca.
+
+        Args:
+            forzar: Reescribir toda partición que no esté llena y limpia.
+
+        Returns:
+            Número de particiones eliminadas.
+        """
+        with closing(self._conectar()) as conexion:
+            conexion.execute("BEGIN IMMEDIATE")
+            try:
+                candidatas = self._candidatas(conexion, forzar)
+                vivas = [self._leer_vigentes(conexion, a) for a in candidatas]
+                vivas = [v for v in vivas if not v.empty]
+                combinado = (
+                    pd.concat(vivas, ignore_index=True) if vivas else pd.DataFrame()
+                )
+
+                for inicio in range(0, len(combinado), HISTORICO_FILAS_POR_PARTICION):
+                    bloque = combinado.iloc[
+                        inicio:inicio + HISTORICO_FILAS_POR_PARTICION
+                    ].reset_index(drop=True)
+                    archivo = self._escribir_particion(bloque)
+                    conexion.execute(
+                        "INSERT INTO particiones (archivo, registros, vigentes, creado) "
+                        "VALUES (?, ?, ?, ?)",
+                        (archivo, len(bloque), len(bloque), time.time()),
+                    )
+                    conexion.executemany(
+                        "UPDATE claves SET particion = ? WHERE clave = ?",
+                        ((archivo, c) for c in self._claves(bloque)),
+                    )
+
+                conexion.executemany(
+                    "DELETE FROM particiones WHERE archivo = ?",
+                    ((a,) for a in candidatas),
+                )
+                registradas = {
+                    a for (a,) in conexion.execute("SELECT archivo FROM particiones")
+                }
+                conexion.execute("COMMIT")
+            except BaseException:
+                conexion.execute("ROLLBACK")
+                raise
+
+        # Fuera de la transacción: candidatas y huérfanos de caídas previas.
+        eliminadas = 0
+        limite = time.time() - _EDAD_HUERFANO
+        for ruta in self.directorio.glob(_PATRON_PARTICION):
+            if ruta.name in registradas:
+                continue
+            if ruta.name in candidatas or ruta.stat().st_mtime < limite:
+                ruta.unlink(missing_ok=True)
+                eliminadas += 1
+
+        logger.info(
+            "Compactación de '%s': %d particiones reescritas (%d registros), "
+            "%d archivos eliminados.",
+            self.directorio, len(candidatas), len(combinado), eliminadas,
+        )
+        return eliminadas
+
+    # ── Migración ───────────────────────────────────────────
+
+    def importar(self, ruta_archivo: str | Path) -> int:
+        """Importa una base histórica de archivo único (CSV o Parquet)."""
+        ruta = Path(ruta_archivo)
+        if ruta.suffix == ".parquet":
+            df = pd.read_parquet(ruta, engine=PARQUET_ENGINE)
+        else:
+            df = pd.read_csv(ruta, dtype=str)
+        return self.upsert(df)
+
+
+def es_base_particionada(ruta: str | Path) -> bool:
+    """Una ruta sin extensión o que ya es un directorio es particionada."""
+    ruta = Path(ruta)
+    return ruta.is_dir() or not ruta.suffix
+
+
+# ════════════════════════════════════════════════════════════
+# EJECUCIÓN DIRECTA (compactación programada)
+# ════════════════════════════════════════════════════════════
+
+if __name__ == "__main__":
+    import argparse
+
+    from config import setup_logging
+
+    parser = argparse.ArgumentParser(
+        description="Compacta una base histórica particionada."
+    )
+    parser.add_argument("directorio", help="Carpeta de la base histórica.")
+    parser.add_argument(
+        "--forzar", action="store_true",
+        help="Reescribir toda partición que no esté llena y limpia.",
+    )
+    parser.add_argument(
+        "--importar", metavar="ARCHIVO", default=None,
+        help="Importar antes un CSV/Parquet histórico de archivo único.",
+    )
+    parser.add_argument(
+        "--clave", choices=CLAVES_HISTORICAS, default=None,
+        help=(
+            "Columna clave de una base nueva (por defecto, la del primer "
+            "lote). En una base existente debe ser la suya."
+        ),
+    )
+    args = parser.parse_args()
+
+    setup_logging()
+    base = BaseHistorica(args.directorio, columna_clave=args.clave)
+    if args.importar:
+        base.importar(args.importar)
+    base.compactar(forzar=args.forzar)
+    print(f"{len(base)} registros vigentes en {args.directorio}")
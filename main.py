@@ -10,6 +10,10 @@ Punto de entrada principal.  Ofrece dos modos de operación:
      Toma un CSV existente con ``url_detalle`` → ingresa a cada proceso →
      extrae datos enriquecidos → actualiza base histórica.
 
+  3. **SQL** (``--modo sql``):
+     Consulta analítica con DuckDB sobre las salidas en Parquet (copias
+     sincronizadas, base histórica) sin cargarlas en memoria.
+
 Uso:
   python main.py \\
       --palabra-clave "vigilancia" \\
@@ -35,9 +39,11 @@ from pathlib import Path
 import pandas as pd
 
 from config import (
+    BUSQUEDA_TEXTO,
     CSV_ENCODING,
     CSV_SEPARATOR,
     OUTPUT_DIR,
+    PARQUET_ENGINE,
     SearchParams,
     setup_logging,
 )
@@ -57,6 +63,8 @@ def construir_parser_args() -> argparse.ArgumentParser:
     Returns:
         Instancia de ``ArgumentParser`` configurada.
     """
+    from api_scraper import PERFILES_PROYECCION
+
     parser = argparse.ArgumentParser(
         description="Pipeline de scraping SECOP I — Búsqueda y extracción de contratos.",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -84,7 +92,7 @@ Ejemplos:
     # --- Modo de operación ---
     parser.add_argument(
         "--modo",
-        choices=["busqueda", "detalle"],
+        choices=["busqueda", "detalle", "sql"],
         default="busqueda",
         help="Modo de operación (default: busqueda).",
     )
@@ -214,13 +222,41 @@ Ejemplos:
         "--salida", "-o",
         type=str,
         default=None,
-        help="Ruta del archivo de salida (CSV). Default: output/secop_<timestamp>.csv",
+        help=(
+            "Ruta del archivo de salida (CSV, o Parquet si termina en "
+            ".parquet). Default: output/secop_<timestamp>.csv"
+        ),
     )
     grupo_io.add_argument(
         "--historica",
         type=str,
         default=None,
-        help="Ruta de la base histórica para actualización incremental.",
+        help=(
+            "Ruta de la base histórica para actualización incremental. Sin "
+            "extensión se usa la base particionada (historico.py)."
+        ),
+    )
+
+    # --- Consultas analíticas ---
+    grupo_sql = parser.add_argument_group("Consultas analíticas (--modo sql)")
+    grupo_sql.add_argument(
+        "--sql",
+        type=str,
+        default=None,
+        help=(
+            "Consulta SQL (DuckDB) o ruta a un archivo .sql. Sin ella se "
+            "listan las tablas disponibles."
+        ),
+    )
+    grupo_sql.add_argument(
+        "--tabla",
+        action="append",
+        default=[],
+        metavar="NOMBRE=RUTA",
+        help=(
+            "Registrar un Parquet/CSV (archivo, directorio o patrón) como "
+            "tabla. Se puede repetir."
+        ),
     )
 
     # --- Opciones avanzadas ---
@@ -228,8 +264,66 @@ Ejemplos:
     grupo_avanzado.add_argument(
         "--delay-detalle",
         type=float,
-        default=1.5,
-        help="Segundos de espera entre cada detalle (rate limiting, default: 1.5).",
+        default=0.0,
+        help=(
+            "Pausa fija adicional entre detalles, en segundos (default: 0). "
+            "El ritmo base se adapta solo a las respuestas del portal."
+        ),
+    )
+    grupo_avanzado.add_argument(
+        "--refrescar",
+        action="store_true",
+        help=(
+            "Ignorar la caché de consultas en disco y volver a consultar "
+            "los portales."
+        ),
+    )
+    grupo_avanzado.add_argument(
+        "--incremental",
+        action="store_true",
+        help=(
+            "Con la API, sincronizar solo los contratos modificados desde la "
+            "última ejecución y exportar la copia local completa."
+        ),
+    )
+    grupo_avanzado.add_argument(
+        "--por-meses",
+        action="store_true",
+        help=(
+            "Con la API, descargar por meses en paralelo y guardar cada mes "
+            "en caché: las consultas grandes no empiezan de cero tras un "
+            "fallo y al refrescar solo se piden los meses que cambiaron."
+        ),
+    )
+    grupo_avanzado.add_argument(
+        "--busqueda",
+        choices=["like", "q"],
+        default=BUSQUEDA_TEXTO,
+        help=(
+            "Con la API, cómo buscar la palabra clave: 'like' (subcadenas "
+            "en el servidor, exacto pero lento) o 'q' (índice de texto "
+            "completo y filtro exacto en local; solo palabras completas). "
+            "Por defecto, SECOP_BUSQUEDA o 'like'."
+        ),
+    )
+    grupo_avanzado.add_argument(
+        "--perfil",
+        choices=list(PERFILES_PROYECCION),
+        default="completo",
+        help=(
+            "Con la API, qué columnas descargar: 'completo' (las 18), "
+            "'dashboard', 'estudio-mercado' (id, valor y proveedor), 'anexo' "
+            "o 'ids' (id, proceso y enlace). Menos columnas, descarga más "
+            "ligera (default: completo)."
+        ),
+    )
+    grupo_avanzado.add_argument(
+        "--reanudar",
+        action="store_true",
+        help=(
+            "Continuar una descarga interrumpida (páginas de SECOP I o "
+            "fichas de detalle) desde el último punto de control."
+        ),
     )
     grupo_avanzado.add_argument(
         "--debug",
@@ -291,6 +385,15 @@ def generar_ruta_salida(ruta_arg: str | None, prefijo: str = "secop") -> Path:
     return OUTPUT_DIR / f"{prefijo}_{timestamp}.csv"
 
 
+def exportar(df: pd.DataFrame, ruta: Path) -> None:
+    """Escribe el resultado en CSV o, si la extensión es ``.parquet``, en
+    Parquet (el formato que ``--modo sql`` consulta sin cargarlo)."""
+    if ruta.suffix == ".parquet":
+        df.to_parquet(ruta, index=False, engine=PARQUET_ENGINE)
+    else:
+        df.to_csv(ruta, index=False, sep=CSV_SEPARATOR, encoding=CSV_ENCODING)
+
+
 # ════════════════════════════════════════════════════════════
 # 4. MODO BÚSQUEDA
 # ════════════════════════════════════════════════════════════
@@ -309,7 +412,10 @@ def ejecutar_modo_busqueda(args: argparse.Namespace) -> int:
     Returns:
         Código de salida (0 = éxito, 1 = error).
     """
-    from cleaning import filtrar_por_palabra_clave, limpiar_dataframe
+    from dataclasses import asdict
+
+    from cleaning import limpiar_dataframe
+    from consulta import consultar_con_cache
 
     params = args_a_search_params(args)
     ruta_salida = generar_ruta_salida(args.salida, prefijo="secop_busqueda")
@@ -325,25 +431,39 @@ def ejecutar_modo_busqueda(args: argparse.Namespace) -> int:
     # ── Intento 1: SECOP I (contratos.gov.co) ──
     if args.fuente in ("auto", "secop1"):
         try:
-            from scraper import ejecutar_scraping
-            from parser import parsear_todas_paginas
-
-            transporte = "Selenium" if args.selenium else "HTTP directo"
-            logger.info("[SECOP I] Extrayendo vía %s...", transporte)
-
-            paginas_html, _ = ejecutar_scraping(
-                params=params,
-                usar_selenium=args.selenium,
+            from flujo import extraer_secop1
+
+            def _extraer_secop1():
+                transporte = "Selenium" if args.selenium else "HTTP directo"
+                logger.info("[SECOP I] Extrayendo vía %s...", transporte)
+
+                # Cada página se parsea, filtra y limpia mientras se
+                # descarga la siguiente. SECOP I no tiene búsqueda por
+                # texto libre: la palabra clave se filtra en local.
+                df_secop1 = extraer_secop1(
+                    params,
+                    palabra_clave=args.palabra_clave,
+                    usar_selenium=args.selenium,
+                    reanudar=args.reanudar,
+                )
+                return df_secop1, {"consultado_en": datetime.now()}
+
+            # Una consulta repetida del CLI dentro del TTL no vuelve a tocar
+            # el portal. El almacén en disco es el del dashboard, pero las
+            # entradas no se comparten: las claves llevan ``fuente`` y aquí
+            # se guarda el resultado limpio sin normalizar al esquema del
+            # dashboard.
+            df_limpio, informe = consultar_con_cache(
+                {"fuente": "secop1", **asdict(params)},
+                _extraer_secop1,
+                refrescar=args.refrescar,
+                permitir_vencida=False,
             )
-            logger.info("[SECOP I] %d páginas descargadas.", len(paginas_html))
-
-            df_crudo = parsear_todas_paginas(paginas_html)
-            logger.info("[SECOP I] Parsing completado: %d filas.", len(df_crudo))
-
-            # SECOP I no tiene búsqueda por texto libre: se filtra en local.
-            df_crudo = filtrar_por_palabra_clave(df_crudo, args.palabra_clave)
-
-            df_limpio = limpiar_dataframe(df_crudo)
+            if informe.get("desde_cache"):
+                logger.info(
+                    "[SECOP I] Resultado de la caché (consultado el %s).",
+                    informe["consultado_en"],
+                )
             logger.info("[SECOP I] Limpieza completada: %d filas.", len(df_limpio))
 
         except Exception as exc:
@@ -360,19 +480,70 @@ def ejecutar_modo_busqueda(args: argparse.Namespace) -> int:
         try:
             from api_scraper import consultar_desde_params
 
-            logger.info("[API] Consultando SECOP II vía datos.gov.co...")
-            df_api = consultar_desde_params(
-                params,
-                max_registros=args.max_registros,
-                tipo_contrato=args.tipo_contrato,
-            )
-
-            if df_api.empty:
+            def _consultar_api():
+                logger.info("[API] Consultando SECOP II vía datos.gov.co...")
+                df_api = consultar_desde_params(
+                    params,
+                    max_registros=args.max_registros,
+                    tipo_contrato=args.tipo_contrato,
+                    por_meses=args.por_meses,
+                    busqueda=args.busqueda,
+                    perfil=args.perfil,
+                )
+                if not df_api.empty:
+                    df_api = limpiar_dataframe(df_api)
+                return df_api, {"consultado_en": datetime.now()}
+
+            if args.incremental:
+                # La copia local sincronizada ya es la caché: solo se
+                # descargan las filas con :updated_at posterior a la marca.
+                from sincronizacion import sincronizar_desde_params
+
+                df_limpio, resumen = sincronizar_desde_params(
+                    params,
+                    tipo_contrato=args.tipo_contrato,
+                    completa=args.refrescar,
+                )
+                informe = {}
+                logger.info(
+                    "[API] Sincronización incremental desde %s: %d nuevos, "
+                    "%d actualizados, %d retirados.",
+                    resumen["desde"] or "el origen",
+                    resumen["nuevos"], resumen["actualizados"],
+                    resumen["retirados"],
+                )
+            else:
+                parametros_api = asdict(params)
+                parametros_api.pop("max_pages")
+                df_limpio, informe = consultar_con_cache(
+                    {
+                        "fuente": "api",
+                        **parametros_api,
+                        "max_registros": args.max_registros,
+                        "tipo_contrato": args.tipo_contrato,
+                        # Por meses no hay tope: no puede servir un
+                        # resultado recortado guardado sin la opción.
+                        "por_meses": args.por_meses,
+                        # 'like' y 'q' devuelven filas distintas para la
+                        # misma palabra clave; sin ella no influye.
+                        "busqueda": args.busqueda if args.palabra_clave else None,
+                        "perfil": args.perfil,
+                    },
+                    _consultar_api,
+                    refrescar=args.refrescar,
+                    permitir_vencida=False,
+                )
+
+            if df_limpio.empty:
                 logger.warning("[API] La consulta no retornó registros.")
                 print("\nSin resultados en la API.")
                 return 0
 
-            df_limpio = limpiar_dataframe(df_api)
+            if informe.get("desde_cache"):
+                logger.info(
+                    "[API] Resultado de la caché (consultado el %s).",
+                    informe["consultado_en"],
+                )
             logger.info("[API] %d registros obtenidos y limpiados.", len(df_limpio))
 
         except Exception as exc_api:
@@ -390,12 +561,7 @@ def ejecutar_modo_busqueda(args: argparse.Namespace) -> int:
 
     # ── Exportación ──
     logger.info("Exportando resultados...")
-    df_limpio.to_csv(
-        ruta_salida,
-        index=False,
-        sep=CSV_SEPARATOR,
-        encoding=CSV_ENCODING,
-    )
+    exportar(df_limpio, ruta_salida)
     logger.info("Resultados exportados a: %s", ruta_salida)
 
     # --- Opcional: Actualizar base histórica ---
@@ -440,7 +606,11 @@ def ejecutar_modo_detalle(args: argparse.Namespace) -> int:
     Returns:
         Código de salida (0 = éxito, 1 = error).
     """
-    from detail_scraper import extraer_detalles_masivo, actualizar_base_historica
+    from detail_scraper import (
+        actualizar_base_historica,
+        extraer_detalles_masivo,
+        prioridad_por_faltantes,
+    )
     from cleaning import limpiar_dataframe
 
     if not args.entrada:
@@ -477,18 +647,15 @@ def ejecutar_modo_detalle(args: argparse.Namespace) -> int:
         print("⚠️  No hay URLs de detalle en el archivo.")
         return 0
 
-    driver = None
-    if args.selenium:
-        from scraper import crear_driver
-        driver = crear_driver()
-
     try:
         # --- Paso 1: Extracción masiva ---
         logger.info("[1/3] Extrayendo detalles de %d procesos...", len(urls))
         df_detalles = extraer_detalles_masivo(
             urls=urls,
             delay=args.delay_detalle,
-            driver=driver,
+            selenium=args.selenium,
+            reanudar=args.reanudar,
+            prioridades=prioridad_por_faltantes(df_entrada),
         )
         logger.info("Extracción completada: %d detalles.", len(df_detalles))
 
@@ -503,12 +670,7 @@ def ejecutar_modo_detalle(args: argparse.Namespace) -> int:
 
         # --- Paso 3: Exportación ---
         logger.info("[3/3] Exportando detalles...")
-        df_limpio.to_csv(
-            ruta_salida,
-            index=False,
-            sep=CSV_SEPARATOR,
-            encoding=CSV_ENCODING,
-        )
+        exportar(df_limpio, ruta_salida)
         logger.info("Detalles exportados a: %s", ruta_salida)
 
         # Base histórica
@@ -541,14 +703,74 @@ def ejecutar_modo_detalle(args: argparse.Namespace) -> int:
         print(f"\n❌ Error inesperado: {exc}")
         return 1
 
-    finally:
-        if driver is not None:
-            from scraper import cerrar_driver
-            cerrar_driver(driver)
+
+# ════════════════════════════════════════════════════════════
+# 6. MODO SQL
+# ════════════════════════════════════════════════════════════
+
+
+def ejecutar_modo_sql(args: argparse.Namespace) -> int:
+    """Ejecuta una consulta analítica sobre las salidas en disco.
+
+    Registra las copias sincronizadas, la base histórica (``--historica``,
+    si es particionada) y las tablas de ``--tabla``, y ejecuta ``--sql``
+    con DuckDB sin cargar los datos en pandas.
+
+    Returns:
+        Código de salida.
+    """
+    from analitica import MotorAnalitico
+    from historico import es_base_particionada
+
+    try:
+        historico = (
+            args.historica
+            if args.historica and es_base_particionada(args.historica)
+            else None
+        )
+        with MotorAnalitico.por_defecto(historico=historico) as motor:
+            if args.historica and historico is None:
+                motor.registrar("historico", args.historica)
+            for definicion in args.tabla:
+                nombre, separador, ruta = definicion.partition("=")
+                if not separador:
+                    print(f"❌ --tabla espera NOMBRE=RUTA, no '{definicion}'.")
+                    return 1
+                motor.registrar(nombre.strip(), ruta.strip())
+
+            if not args.sql:
+                print("Tablas disponibles:")
+                for tabla in motor.tablas:
+                    columnas = motor.consultar(f"DESCRIBE {tabla}")["column_name"]
+                    print(f"  {tabla}: {', '.join(columnas)}")
+                return 0
+
+            sql = args.sql
+            if sql.strip().lower().endswith(".sql") and Path(sql.strip()).exists():
+                sql = Path(sql.strip()).read_text(encoding="utf-8")
+            resultado = motor.consultar(sql)
+
+    except (RuntimeError, FileNotFoundError, ValueError) as exc:
+        logger.error("Error preparando la consulta: %s", exc)
+        print(f"\n❌ Error: {exc}")
+        return 1
+    except Exception as exc:  # noqa: BLE001 - errores de sintaxis/binder de DuckDB
+        logger.error("Error ejecutando la consulta: %s", exc)
+        print(f"\n❌ Error en la consulta: {exc}")
+        return 1
+
+    if args.salida:
+        ruta_salida = generar_ruta_salida(args.salida)
+        exportar(resultado, ruta_salida)
+        logger.info("Resultado exportado a: %s", ruta_salida)
+
+    print(resultado.head(50).to_string(index=False))
+    print(f"\n[{len(resultado)} filas]")
+    return 0
 
 
 # ════════════════════════════════════════════════════════════
-# 6. PUNTO DE ENTRADA
+# 7. PUNTO DE ENTRADA
 # ════════════════════════════════════════════════════════════
 
 
@@ -578,6 +800,8 @@ def main() -> int:
         return ejecutar_modo_busqueda(args)
     elif args.modo == "detalle":
         return ejecutar_modo_detalle(args)
+    elif args.modo == "sql":
+        return ejecutar_modo_sql(args)
     else:
         logger.error("Modo desconocido: %s", args.modo)
         return 1
@@ -0,0 +1,311 @@
+"""
+navegadores.py — Pool de navegadores Chrome reutilizables (ruta Selenium).
+
+Cada caída a la ruta Selenium arrancaba un Chrome nuevo con
+``scraper.crear_driver`` (varios segundos, más la resolución del
+ChromeDriver) y lo cerraba al terminar. En el dashboard, donde cada
+consulta de SECOP I que falla por HTTP cae a Selenium, ese coste fijo se
+pagaba en cada búsqueda.
+
+El pool mantiene abiertos hasta ``NAVEGADORES_MAX`` navegadores y los
+presta a quien los pida (``consulta.py`` a través de ``flujo.py``, el
+dashboard, ``detail_scraper``):
+
+  • **Préstamo acotado**: si todos están prestados y no se puede abrir
+    otro, se espera a que alguien devuelva uno.
+  • **Chequeo de salud**: antes de prestar uno se comprueba que responde;
+    si no, se cierra y se abre otro.
+  • **Reciclado**: tras ``NAVEGADOR_MAX_PAGINAS`` páginas o
+    ``NAVEGADOR_INACTIVIDAD`` segundos sin uso se cierra (Chrome acumula
+    memoria con el uso). Los inactivos se cierran también sin que nadie
+    pida otro: un temporizador revisa los libres mientras quede alguno.
+  • **Devolución limpia**: al devolverlo se deja en ``about:blank``; si
+    quien lo usaba terminó con un error de WebDriver, se descarta.
+
+Los navegadores se cierran al salir del proceso.
+
+Uso:
+    >>> from navegadores import pool_por_defecto
+    >>> with pool_por_defecto().prestar() as driver:
+    ...     driver.get(url)
+"""
+
+from __future__ import annotations
+
+import atexit
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterator, Optional
+
+from config import NAVEGADOR_INACTIVIDAD, NAVEGADOR_MAX_PAGINAS, NAVEGADORES_MAX
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(eq=False)
+class _Navegador:
+    """Un navegador del pool y su uso."""
+
+    driver: Any
+    paginas: int = 0
+    creado: float = field(default_factory=time.monotonic)
+    usado: float = field(default_factory=time.monotonic)
+
+
+class PoolNavegadores:
+    """Navegadores abiertos que se prestan y se devuelven.
+
+    Args:
+        maximo:      Navegadores abiertos a la vez como mucho.
+        max_paginas: Páginas tras las que se recicla un navegador.
+        inactividad: Segundos sin uso tras los que se cierra.
+        fabrica:     Función que abre un navegador (``scraper.crear_driver``).
+    """
+
+    def __init__(
+        self,
+        maximo: int = NAVEGADORES_MAX,
+        max_paginas: int = NAVEGADOR_MAX_PAGINAS,
+        inactividad: float = NAVEGADOR_INACTIVIDAD,
+        fabrica: Optional[Callable[[], Any]] = None,
+    ) -> None:
+        self.maximo = max(1, maximo)
+        self.max_paginas = max_paginas
+        self.inactividad = inactividad
+        self._fabrica = fabrica
+        self._condicion = threading.Condition()
+        self._libres: list[_Navegador] = []
+        self._prestados: dict[int, _Navegador] = {}
+        self._abriendo = 0
+        self._temporizador: Optional[threading.Timer] = None
+        self.creados = 0
+        self.reutilizados = 0
+
+    # ── Ciclo de vida de un navegador ───────────────────────
+
+    def _abrir(self) -> Any:
+        if self._fabrica is not None:
+            return self._fabrica()
+        from scraper import crear_driver
+
+        return crear_driver()
+
+    @staticmethod
+    def _cerrar(navegador: _Navegador) -> None:
+        from scraper import cerrar_driver
+
+        cerrar_driver(navegador.driver)
+
+    @staticmethod
+    def _sano(navegador: _Navegador) -> bool:
+        """Si el navegador sigue respondiendo."""
+        try:
+            navegador.driver.execute_script("return 1")
+            return True
+        except Exception:  # noqa: BLE001 - cualquier fallo = navegador inservible
+            return False
+
+    def _agotado(self, navegador: _Navegador, ahora: float) -> bool:
+        return (
+            navegador.paginas >= self.max_paginas
+            or ahora - navegador.usado >= self.inactividad
+        )
+
+    def _purgar(self, ahora: float) -> list[_Navegador]:
+        """Saca de la lista de libres los que toca reciclar (con el cerrojo)."""
+        agotados = [n for n in self._libres if self._agotado(n, ahora)]
+        if agotados:
+            self._libres = [n for n in self._libres if n not in agotados]
+        return agotados
+
+    def _programar_purga(self) -> None:
+        """Arranca el temporizador de inactividad si hay libres (con el cerrojo)."""
+        if self._temporizador is not None or not self._libres:
+            return
+        ahora = time.monotonic()
+        # Hasta que caduque el libre más antiguo.
+        espera = min(self.inactividad - (ahora - n.usado) for n in self._libres)
+        self._temporizador = threading.Timer(max(espera, 1.0), self._purga_programada)
+        self._temporizador.daemon = True
+        self._temporizador.start()
+
+    def _purga_programada(self) -> None:
+        with self._condicion:
+            self._temporizador = None
+        self.purgar()
+
+    def purgar(self) -> int:
+        """Cierra los navegadores libres agotados o inactivos.
+
+        Returns:
+            Cuántos se cerraron.
+        """
+        with self._condicion:
+            agotados = self._purgar(time.monotonic())
+            self._programar_purga()
+        for navegador in agotados:
+            logger.debug("Cerrando navegador inactivo (%d páginas).", navegador.paginas)
+            self._cerrar(navegador)
+        return len(agotados)
+
+    # ── Préstamo ────────────────────────────────────────────
+
+    def tomar(self, timeout: Optional[float] = None) -> Any:
+        """Presta un navegador sano; hay que devolverlo con ``devolver``.
+
+        Args:
+            timeout: Segundos máximos de espera si están todos prestados
+                     (``None`` = sin límite).
+
+        Raises:
+            TimeoutError: Si no quedó ninguno libre a tiempo.
+            SecopFormError: Si no se pudo abrir Chrome.
+        """
+        limite = None if timeout is None else time.monotonic() + timeout
+        while True:
+            candidato: Optional[_Navegador] = None
+            abrir = False
+            with self._condicion:
+                while True:
+                    para_cerrar = self._purgar(time.monotonic())
+                    if para_cerrar:
+                        break
+                    if self._libres:
+                        candidato = self._libres.pop()
+                        break
+                    if len(self._prestados) + self._abriendo < self.maximo:
+                        self._abriendo += 1
+                        abrir = True
+                        break
+                    restante = None if limite is None else limite - time.monotonic()
+                    if restante is not None and restante <= 0:
+                        raise TimeoutError("No hay navegadores libres en el pool.")
+                    self._condicion.wait(restante)
+
+            # Cerrar y abrir Chrome lleva segundos: fuera del cerrojo.
+            for navegador in para_cerrar:
+                logger.debug("Reciclando navegador (%d páginas).", navegador.paginas)
+                self._cerrar(navegador)
+            if abrir:
+                return self._abrir_prestado()
+            if candidato is None:
+                continue
+
+            if self._sano(candidato):
+                with self._condicion:
+                    candidato.usado = time.monotonic()
+                    self._prestados[id(candidato.driver)] = candidato
+                    self.reutilizados += 1
+                return candidato.driver
+
+            logger.warning("Navegador del pool sin respuesta; se abre otro.")
+            self._cerrar(candidato)
+
+    def _abrir_prestado(self) -> Any:
+        """Abre un navegador nuevo ya contado en ``_abriendo``."""
+        try:
+            driver = self._abrir()
+        except BaseException:
+            with self._condicion:
+                self._abriendo -= 1
+                self._condicion.notify()
+            raise
+        with self._condicion:
+            self._abriendo -= 1
+            self._prestados[id(driver)] = _Navegador(driver)
+            self.creados += 1
+        logger.info(
+            "Navegador nuevo en el pool (%d abiertos).", len(self._prestados) + len(self._libres)
+        )
+        return driver
+
+    def devolver(self, driver: Any, descartar: bool = False) -> None:
+        """Devuelve un navegador prestado.
+
+        Args:
+            driver:    El navegador que dio ``tomar``.
+            descartar: Cerrarlo en lugar de guardarlo (p. ej. tras un
+                       error de WebDriver).
+        """
+        with self._condicion:
+            navegador = self._prestados.pop(id(driver), None)
+        if navegador is None:
+            return
+
+        if not descartar:
+            try:
+                # Suelta la memoria de la última página.
+                driver.get("about:blank")
+            except Exception:  # noqa: BLE001 - si falla, se descarta
+                descartar = True
+
+        navegador.usado = time.monotonic()
+        if descartar or navegador.paginas >= self.max_paginas:
+            self._cerrar(navegador)
+            navegador = None
+
+        with self._condicion:
+            if navegador is not None:
+                self._libres.append(navegador)
+            self._condicion.notify()
+        # De paso se cierran los que llevan rato sin usarse.
+        self.purgar()
+
+    @contextmanager
+    def prestar(self, timeout: Optional[float] = None) -> Iterator[Any]:
+        """``tomar`` y ``devolver`` como gestor de contexto.
+
+        Un error de WebDriver dentro del bloque descarta el navegador.
+        """
+        from selenium.common.exceptions import WebDriverException
+
+        driver = self.tomar(timeout)
+        descartar = False
+        try:
+            yield driver
+        except WebDriverException:
+            descartar = True
+            raise
+        finally:
+            self.devolver(driver, descartar=descartar)
+
+    def anotar_paginas(self, driver: Any, paginas: int = 1) -> None:
+        """Suma páginas cargadas al navegador (para reciclarlo a tiempo)."""
+        with self._condicion:
+            navegador = self._prestados.get(id(driver))
+            if navegador is not None:
+                navegador.paginas += paginas
+
+    # ── Cierre ──────────────────────────────────────────────
+
+    def cerrar(self) -> None:
+        """Cierra los navegadores libres (los prestados, al devolverse)."""
+        with self._condicion:
+            libres, self._libres = self._libres, []
+            self.max_paginas = 0   # los prestados se cerrarán al volver
+            if self._temporizador is not None:
+                self._temporizador.cancel()
+                self._temporizador = None
+        for navegador in libres:
+            self._cerrar(navegador)
+
+    def __len__(self) -> int:
+        with self._condicion:
+            return len(self._libres) + len(self._prestados)
+
+
+_pool: Optional[PoolNavegadores] = None
+_cerrojo_pool = threading.Lock()
+
+
+def pool_por_defecto() -> PoolNavegadores:
+    """Pool compartido por todo el proceso (se cierra al salir)."""
+    global _pool
+    with _cerrojo_pool:
+        if _pool is None:
+            _pool = PoolNavegadores()
+            atexit.register(_pool.cerrar)
+        return _pool
@@ -3,7 +3,8 @@ parser.py — Estructuración de las tablas HTML de resultados de SECOP I.
 
 Responsabilidades:
   1. Recibir HTML crudo (una o varias páginas) desde ``scraper.py``.
-  2. Localizar la tabla de resultados con BeautifulSoup.
+  2. Localizar la tabla de resultados (lxml + XPath, o BeautifulSoup
+     como respaldo; ver ``PARSER_BACKEND``).
   3. Mapear las columnas al esquema canónico de ``config``.
   4. Derivar campos compuestos:
        • ``id_proceso``  ← ``javascript: consultaProceso('26-11-14696064')``
@@ -30,6 +31,7 @@ from __future__ import annotations
 
 import logging
 import re
+from html.parser import HTMLParser
 from typing import Optional
 
 import pandas as pd
@@ -38,6 +40,9 @@ from bs4 import BeautifulSoup, Tag
 from config import (
     COLUMNAS_RESULTADO,
     COLUMNAS_TABLA_SECOP1,
+    PARSER_BACKEND,
+    PARSER_MIN_PAGINAS_POR_PROCESO,
+    PARSER_PROCESOS,
     PATRON_ID_PROCESO,
     SECOP_DETALLE_URL,
     SEL_TABLA_RESULTADOS,
@@ -179,6 +184,48 @@ def _url_detalle(id_proceso: Optional[str]) -> Optional[str]:
 # ════════════════════════════════════════════════════════════
 
 
+def _es_fila_de_datos(textos: list[str]) -> bool:
+    """Indica si los textos de una fila corresponden a un proceso."""
+    if len(textos) < len(COLUMNAS_TABLA_SECOP1):
+        return False  # separador o pie de paginación
+
+    # En las filas de datos la primera columna es el ordinal (1, 2, 3...);
+    # en el encabezado es el símbolo de ordenación "∇". Sirve para
+    # descartar el encabezado aunque esté maquetado con <td>.
+    if not textos[0].strip().isdigit():
+        return False
+
+    # Descartar filas sin número de proceso (decorativas)
+    return bool(textos[1])
+
+
+def _registro_secop1(textos: list[str], id_proceso: Optional[str]) -> dict:
+    """Construye el registro canónico a partir de los textos de una fila.
+
+    Es común a todos los backends de parseo, que solo difieren en cómo
+    obtienen el texto de las celdas y el ID del enlace.
+    """
+    crudo = {
+        nombre: textos[indice]
+        for indice, nombre in COLUMNAS_TABLA_SECOP1.items()
+    }
+    departamento, municipio = _partir_ubicacion(crudo.pop("ubicacion_ejecucion", ""))
+    etiqueta, fecha = _partir_fecha(crudo.pop("fecha_texto", ""))
+    crudo.pop("orden", None)
+
+    crudo.update(
+        {
+            "id_proceso": id_proceso,
+            "departamento": departamento,
+            "municipio": municipio,
+            "fecha_etiqueta": etiqueta,
+            "fecha_apertura": fecha,
+            "url_detalle": _url_detalle(id_proceso),
+        }
+    )
+    return crudo
+
+
 def _parsear_filas_secop1(tabla: Tag) -> list[dict]:
     """Convierte las filas de la tabla de SECOP I en diccionarios."""
     registros: list[dict] = []
@@ -189,40 +236,11 @@ def _parsear_filas_secop1(tabla: Tag) -> list[dict]:
             continue  # fila de encabezado
 
         celdas = fila.find_all("td")
-        if len(celdas) < len(COLUMNAS_TABLA_SECOP1):
-            continue  # separador o pie de paginación
-
-        crudo = {
-            nombre: celdas[indice].get_text(" ", strip=True)
-            for indice, nombre in COLUMNAS_TABLA_SECOP1.items()
-        }
-
-        # En las filas de datos la primera columna es el ordinal (1, 2, 3...);
-        # en el encabezado es el símbolo de ordenación "∇". Sirve para
-        # descartar el encabezado aunque esté maquetado con <td>.
-        if not crudo.get("orden", "").strip().isdigit():
+        textos = [celda.get_text(" ", strip=True) for celda in celdas]
+        if not _es_fila_de_datos(textos):
             continue
 
-        # Descartar filas sin número de proceso (decorativas)
-        if not crudo.get("numero_proceso"):
-            continue
-
-        id_proceso = _extraer_id_proceso(celdas[1])
-        departamento, municipio = _partir_ubicacion(crudo.pop("ubicacion_ejecucion", ""))
-        etiqueta, fecha = _partir_fecha(crudo.pop("fecha_texto", ""))
-        crudo.pop("orden", None)
-
-        crudo.update(
-            {
-                "id_proceso": id_proceso,
-                "departamento": departamento,
-                "municipio": municipio,
-                "fecha_etiqueta": etiqueta,
-                "fecha_apertura": fecha,
-                "url_detalle": _url_detalle(id_proceso),
-            }
-        )
-        registros.append(crudo)
+        registros.append(_registro_secop1(textos, _extraer_id_proceso(celdas[1])))
 
     return registros
 
@@ -273,11 +291,331 @@ def _parsear_filas_generico(tabla: Tag) -> pd.DataFrame:
     return pd.DataFrame(normalizadas, columns=columnas)
 
 
-def parsear_pagina(html: str) -> pd.DataFrame:
+# ════════════════════════════════════════════════════════════
+# 3b. RUTA RÁPIDA CON lxml
+# ════════════════════════════════════════════════════════════
+#
+# BeautifulSoup con ``html.parser`` construye el árbol en Python puro y
+# ``_encontrar_tabla`` recorre cada tabla varias veces. lxml construye el
+# árbol en C y con XPath se salta directamente a la tabla y a sus celdas.
+# Reproduce exactamente la semántica de la ruta BeautifulSoup (misma
+# tabla, mismo texto de celda, mismos descartes de filas); si la tabla
+# no es la de SECOP I devuelve ``None`` y decide BeautifulSoup.
+
+try:
+    import lxml.html as _lxml_html
+except ImportError:  # pragma: no cover - lxml es opcional
+    _lxml_html = None
+
+# Tablas con alguna fila, en orden de documento (como ``find_all``).
+_XPATH_TABLAS = "//table[.//tr]"
+
+
+def _texto_lxml(elemento) -> str:
+    """Equivalente de ``get_text(" ", strip=True)`` de BeautifulSoup.
+
+    ``itertext`` ya omite los comentarios; el texto de ``<script>`` y
+    ``<style>``, que BeautifulSoup tampoco devuelve, se excluye solo
+    cuando la celda los contiene (casi nunca).
+    """
+    if elemento.find(".//script") is None and elemento.find(".//style") is None:
+        partes = elemento.itertext()
+    else:
+        partes = elemento.xpath(
+            ".//text()[not(ancestor::script) and not(ancestor::style)]"
+        )
+    return " ".join(t.strip() for t in partes if t.strip())
+
+
+def _id_proceso_lxml(celda) -> Optional[str]:
+    for enlace in celda.iter("a"):
+        for atributo in ("href", "onclick"):
+            coincidencia = _RE_ID_PROCESO.search(enlace.get(atributo) or "")
+            if coincidencia:
+                return coincidencia.group(1).strip()
+    return None
+
+
+def _parsear_secop1_lxml(html: str) -> Optional[list[dict]]:
+    """Extrae los registros de SECOP I con lxml.
+
+    Returns:
+        Lista de registros (posiblemente vacía), o ``None`` si no hay una
+        tabla con el encabezado "Número de Proceso" y hay que recurrir a
+        BeautifulSoup.
+    """
+    try:
+        documento = _lxml_html.fromstring(html)
+    except (ValueError, TypeError, _lxml_html.etree.ParserError):
+        return None
+
+    tabla = None
+    for candidata in documento.xpath(_XPATH_TABLAS):
+        primera = candidata.find(".//tr")
+        texto = _texto_lxml(primera).lower()
+        if any(clave in texto for clave in _ENCABEZADOS_CLAVE):
+            tabla = candidata
+            break
+    if tabla is None:
+        return None
+
+    contenedor = tabla.find(".//tbody")
+    if contenedor is None:
+        contenedor = tabla
+
+    registros: list[dict] = []
+    for fila in contenedor.iterdescendants("tr"):
+        if fila.find(".//th") is not None:
+            continue
+        celdas = fila.findall(".//td")
+        textos = [_texto_lxml(celda) for celda in celdas]
+        if not _es_fila_de_datos(textos):
+            continue
+        registros.append(_registro_secop1(textos, _id_proceso_lxml(celdas[1])))
+    return registros
+
+
+# ════════════════════════════════════════════════════════════
+# 3c. EXTRACCIÓN POR TOKENS (sin árbol)
+# ════════════════════════════════════════════════════════════
+#
+# La tabla de SECOP I es regular: no hace falta un árbol para leerla.
+# ``_TablaPorTokens`` recibe el HTML como un flujo de eventos (apertura,
+# cierre, texto), guarda solo el texto de la fila en curso y emite el
+# registro al cerrarse cada ``</tr>``. Deja de leer en cuanto se cierra
+# la tabla de resultados.
+#
+# Los eventos los produce el tokenizador en C de lxml (interfaz
+# *target*: no construye ningún árbol) o, sin lxml, ``html.parser``.
+#
+# Solo acepta la estructura conocida. Ante cualquier cosa que la ruta
+# BeautifulSoup trataría distinto (tablas anidadas, encabezado dentro de
+# otra tabla) se declara no apta y ``parsear_pagina`` recurre a los
+# backends con árbol, y de ahí al parseo genérico.
+
+
+class _FinTabla(Exception):
+    """Señal interna para dejar de tokenizar al cerrar la tabla."""
+
+
+class _TablaPorTokens:
+    """Máquina de estados que extrae la tabla de SECOP I de un flujo."""
+
+    def __init__(self) -> None:
+        self.registros: list[dict] = []
+        self.apta = True
+        self.encontrada = False
+        # Pila de tablas abiertas: [filas_vistas, primera_fila_abierta].
+        self._tablas: list[list] = []
+        self._profundidad_resultados = 0
+        self._en_tbody = False
+        self._tbody_visto = False
+        # Fila en curso.
+        self._en_fila = False
+        self._con_th = False
+        self._celdas: list[str] = []
+        self._partes_celda: list[str] = []
+        self._en_celda = False
+        self._id_celda1: Optional[str] = None
+        self._texto_fila: list[str] = []
+        # Texto entre dos etiquetas (BeautifulSoup lo une en un solo nodo).
+        self._buffer: list[str] = []
+        self._ignorar = 0  # dentro de <script>/<style>
+
+    # ── Texto ───────────────────────────────────────────────
+
+    def _vaciar_buffer(self) -> None:
+        if not self._buffer:
+            return
+        texto = "".join(self._buffer).strip()
+        self._buffer.clear()
+        if not texto:
+            return
+        if self._en_fila:
+            self._texto_fila.append(texto)
+        if self._en_celda:
+            self._partes_celda.append(texto)
+
+    def data(self, data: str) -> None:
+        if not self._ignorar and self._en_fila:
+            self._buffer.append(data)
+
+    # ── Filas y celdas ──────────────────────────────────────
+
+    def _cerrar_celda(self) -> None:
+        if self._en_celda:
+            self._celdas.append(" ".join(self._partes_celda))
+            self._partes_celda = []
+            self._en_celda = False
+
+    def _cerrar_fila(self) -> None:
+        self._cerrar_celda()
+        if not self._en_fila:
+            return
+        self._en_fila = False
+
+        if not self.encontrada:
+            tabla = self._tablas[-1] if self._tablas else None
+            es_primera = tabla is not None and tabla[0] == 1
+            texto = " ".join(self._texto_fila).lower()
+            if es_primera and any(clave in texto for clave in _ENCABEZADOS_CLAVE):
+                if any(t[1] for t in self._tablas[:-1]):
+                    # El encabezado está dentro de la primera fila de una
+                    # tabla exterior: BeautifulSoup elegiría la exterior.
+                    self.apta = False
+                    raise _FinTabla
+                self.encontrada = True
+                self._profundidad_resultados = len(self._tablas)
+            if tabla is not None:
+                tabla[1] = False
+            return
+
+        if self._tbody_visto and not self._en_tbody:
+            return  # fuera del primer <tbody>: BeautifulSoup no la ve
+        if self._con_th or not _es_fila_de_datos(self._celdas):
+            return
+        self.registros.append(_registro_secop1(self._celdas, self._id_celda1))
+
+    # ── Etiquetas ───────────────────────────────────────────
+
+    def start(self, tag: str, attrs) -> None:
+        self._vaciar_buffer()
+        if tag in ("script", "style"):
+            self._ignorar += 1
+        elif tag == "table":
+            if self.encontrada:
+                self.apta = False  # tabla anidada en la de resultados
+                raise _FinTabla
+            self._tablas.append([0, False])
+        elif tag == "tr" and self._tablas:
+            self._cerrar_fila()
+            tabla = self._tablas[-1]
+            tabla[0] += 1
+            tabla[1] = tabla[0] == 1
+            self._en_fila = True
+            self._con_th = False
+            self._celdas = []
+            self._texto_fila = []
+            self._id_celda1 = None
+        elif tag in ("td", "th") and self._en_fila:
+            self._cerrar_celda()
+            if tag == "th":
+                self._con_th = True
+            else:
+                self._en_celda = True
+        elif tag == "a" and self._en_celda and len(self._celdas) == 1:
+            if self._id_celda1 is None:
+                for atributo in ("href", "onclick"):
+                    coincidencia = _RE_ID_PROCESO.search(attrs.get(atributo) or "")
+                    if coincidencia:
+                        self._id_celda1 = coincidencia.group(1).strip()
+                        break
+        elif tag == "tbody" and self.encontrada and not self._tbody_visto:
+            self._tbody_visto = True
+            self._en_tbody = True
+            self.registros.clear()  # solo cuentan las filas del tbody
+
+    def end(self, tag: str) -> None:
+        self._vaciar_buffer()
+        if tag in ("script", "style"):
+            self._ignorar = max(0, self._ignorar - 1)
+        elif tag == "td":
+            self._cerrar_celda()
+        elif tag == "tr":
+            self._cerrar_fila()
+        elif tag == "tbody":
+            self._en_tbody = False
+        elif tag == "table" and self._tablas:
+            self._cerrar_fila()
+            self._tablas.pop()
+            if self.encontrada and len(self._tablas) < self._profundidad_resultados:
+                raise _FinTabla
+
+    def close(self) -> None:
+        """Requerido por la interfaz *target* de lxml."""
+
+
+class _TokenizadorStdlib(HTMLParser):
+    """Adaptador de ``html.parser`` a la interfaz de ``_TablaPorTokens``."""
+
+    def __init__(self, destino: _TablaPorTokens) -> None:
+        super().__init__(convert_charrefs=True)
+        self._destino = destino
+
+    def handle_starttag(self, tag: str, attrs: list) -> None:
+        self._destino.start(tag, dict(attrs))
+
+    def handle_endtag(self, tag: str) -> None:
+        self._destino.end(tag)
+
+    def handle_data(self, data: str) -> None:
+        self._destino.data(data)
+
+
+def _recortar_hasta_tabla(html: str) -> str:
+    """Salta el preámbulo de la página hasta la tabla de resultados.
+
+    La cabecera, el formulario y los scripts ocupan buena parte de la
+    página. Si el encabezado aparece literalmente y no hay ninguna tabla
+    abierta antes de la suya, se empieza en el ``<table`` que lo
+    contiene. Si no, se tokeniza todo.
+    """
+    minusculas = html.lower()
+    posiciones = [p for p in (minusculas.find(c) for c in _ENCABEZADOS_CLAVE) if p >= 0]
+    if not posiciones:
+        return html
+    inicio = minusculas.rfind("<table", 0, min(posiciones))
+    if inicio < 0:
+        return html
+    previo = minusculas[:inicio]
+    if previo.count("<table") != previo.count("</table"):
+        return html
+    return html[inicio:]
+
+
+def _parsear_secop1_tokens(html: str) -> Optional[list[dict]]:
+    """Extrae los registros de SECOP I sin construir un árbol.
+
+    Returns:
+        Lista de registros, o ``None`` si la estructura no es la esperada
+        y hay que recurrir a un backend con árbol.
+    """
+    tabla = _TablaPorTokens()
+    fragmento = _recortar_hasta_tabla(html)
+    try:
+        if _lxml_html is not None:
+            tokenizador = _lxml_html.etree.HTMLParser(target=tabla)
+            tokenizador.feed(fragmento)
+            tokenizador.close()
+        else:
+            tokenizador = _TokenizadorStdlib(tabla)
+            tokenizador.feed(fragmento)
+            tokenizador.close()
+    except _FinTabla:
+        pass
+    if not tabla.apta or not tabla.encontrada:
+        return None
+    return tabla.registros
+
+
+def backend_efectivo(backend: Optional[str] = None) -> str:
+    """Resuelve ``auto`` y degrada ``lxml`` a ``bs4`` si no está instalado."""
+    backend = (backend or PARSER_BACKEND).lower()
+    if backend == "auto":
+        return "tokens"
+    if backend == "lxml" and _lxml_html is None:
+        logger.warning("lxml no está instalado; se usa BeautifulSoup.")
+        return "bs4"
+    return backend
+
+
+def parsear_pagina(html: str, backend: Optional[str] = None) -> pd.DataFrame:
     """Convierte el HTML de una página de resultados en un DataFrame.
 
     Args:
-        html: HTML crudo de una página.
+        html:    HTML crudo de una página.
+        backend: ``"tokens"``, ``"lxml"``, ``"bs4"`` o ``"auto"``.
+                 ``None`` usa ``PARSER_BACKEND``.
 
     Returns:
         DataFrame sin tipar, con el esquema de ``COLUMNAS_RESULTADO`` si
@@ -286,20 +624,32 @@ def parsear_pagina(html: str) -> pd.DataFrame:
     Raises:
         SecopParsingError: Si no se encuentra tabla o no hay filas.
     """
-    soup = BeautifulSoup(html, "html.parser")
-    tabla = _encontrar_tabla(soup)
+    registros = None
+    backend = backend_efectivo(backend)
+    if backend == "tokens":
+        registros = _parsear_secop1_tokens(html)
+        if registros is None:
+            logger.debug("Estructura no reconocida por tokens; se usa un árbol.")
+            backend = backend_efectivo("lxml")
+    if registros is None and backend == "lxml":
+        registros = _parsear_secop1_lxml(html)
+
+    if registros is None:
+        soup = BeautifulSoup(html, "html.parser")
+        tabla = _encontrar_tabla(soup)
+
+        if tabla is None:
+            raise SecopParsingError(
+                "No se encontró tabla de resultados en el HTML.",
+                context={"html_length": len(html)},
+            )
+
+        if not _es_tabla_secop1(tabla):
+            logger.debug("La tabla no tiene el esquema de SECOP I; parseo genérico.")
+            return _parsear_filas_generico(tabla)
+
+        registros = _parsear_filas_secop1(tabla)
 
-    if tabla is None:
-        raise SecopParsingError(
-            "No se encontró tabla de resultados en el HTML.",
-            context={"html_length": len(html)},
-        )
-
-    if not _es_tabla_secop1(tabla):
-        logger.debug("La tabla no tiene el esquema de SECOP I; parseo genérico.")
-        return _parsear_filas_generico(tabla)
-
-    registros = _parsear_filas_secop1(tabla)
     if not registros:
         raise SecopParsingError(
             "Tabla de SECOP I encontrada pero sin filas de datos.",
@@ -322,16 +672,68 @@ def parsear_pagina(html: str) -> pd.DataFrame:
 # ════════════════════════════════════════════════════════════
 
 
-def parsear_todas_paginas(paginas_html: list[str]) -> pd.DataFrame:
+def _parsear_pagina_columnar(html: str) -> tuple[Optional[dict[str, list]], Optional[str]]:
+    """Parsea una página en un proceso del pool.
+
+    Devuelve columnas como listas en lugar de un DataFrame: serializar
+    listas de cadenas entre procesos es mucho más barato que un
+    DataFrame, y el padre construye un único frame al final.
+
+    Returns:
+        ``(columnas, None)`` o ``(None, mensaje_de_error)``.
+    """
+    try:
+        df = parsear_pagina(html)
+    except SecopParsingError as exc:
+        return None, str(exc)
+    return {columna: df[columna].tolist() for columna in df.columns}, None
+
+
+def _parsear_en_paralelo(
+    paginas_html: list[str], procesos: int
+) -> list[tuple[Optional[dict[str, list]], Optional[str]]]:
+    from concurrent.futures import ProcessPoolExecutor
+
+    # Lotes de varias páginas por tarea para amortizar el envío.
+    tamano_lote = max(1, len(paginas_html) // (procesos * 4))
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        return list(pool.map(_parsear_pagina_columnar, paginas_html, chunksize=tamano_lote))
+
+
+def deduplicar_resultados(df: pd.DataFrame) -> pd.DataFrame:
+    """Elimina filas repetidas entre páginas.
+
+    Las páginas se solapan cuando el portal reordena resultados mientras
+    se pagina. Con ``id_proceso`` (identificador único del portal) se
+    deduplica por esa columna, que es un único hash por fila en vez de
+    comparar todas las columnas; las filas sin ID y las tablas genéricas
+    se deduplican por fila completa.
+    """
+    if "id_proceso" not in df.columns:
+        return df.drop_duplicates().reset_index(drop=True)
+
+    con_id = df["id_proceso"].notna() & (df["id_proceso"] != "")
+    repetidas = df["id_proceso"].duplicated() & con_id
+    repetidas |= ~con_id & df.duplicated()
+    return df[~repetidas].reset_index(drop=True)
+
+
+def parsear_todas_paginas(
+    paginas_html: list[str], procesos: Optional[int] = None
+) -> pd.DataFrame:
     """Parsea varias páginas y las consolida en un único DataFrame.
 
     Si una página falla, se registra y se omite sin detener el pipeline.
 
     Args:
         paginas_html: Lista de HTML, uno por página.
+        procesos:     Procesos del pool de parseo. ``None`` usa
+                      ``PARSER_PROCESOS``; ``0`` o ``1``, secuencial.
+                      Con pocas páginas por proceso se parsea en serie.
 
     Returns:
-        DataFrame consolidado con todas las filas.
+        DataFrame consolidado con todas las filas, en el orden de las
+        páginas.
 
     Raises:
         SecopEmptyTableError: Si ninguna página produjo datos.
@@ -339,26 +741,49 @@ def parsear_todas_paginas(paginas_html: list[str]) -> pd.DataFrame:
     if not paginas_html:
         raise SecopEmptyTableError("No se recibieron páginas HTML para parsear.")
 
-    dataframes: list[pd.DataFrame] = []
-    errores = 0
+    procesos = PARSER_PROCESOS if procesos is None else procesos
+    if procesos > 1 and len(paginas_html) < procesos * PARSER_MIN_PAGINAS_POR_PROCESO:
+        procesos = 1
 
-    for indice, html in enumerate(paginas_html, start=1):
+    resultados = None
+    if procesos > 1:
         try:
-            dataframes.append(parsear_pagina(html))
-        except SecopParsingError as exc:
+            resultados = _parsear_en_paralelo(paginas_html, procesos)
+            logger.info(
+                "%d páginas parseadas con %d procesos.", len(paginas_html), procesos
+            )
+        except Exception as exc:  # noqa: BLE001 - el pool es una optimización
+            logger.warning("Parseo en paralelo no disponible (%s); se hace en serie.", exc)
+    if resultados is None:
+        resultados = [_parsear_pagina_columnar(html) for html in paginas_html]
+
+    columnas: dict[str, list] = {}
+    filas = 0
+    errores = 0
+    for indice, (datos, error) in enumerate(resultados, start=1):
+        if datos is None:
             errores += 1
-            logger.warning("Página %d: error de parsing — %s", indice, exc)
-
-    if not dataframes:
+            logger.warning("Página %d: error de parsing — %s", indice, error)
+            continue
+        n = len(next(iter(datos.values()), []))
+        for columna, valores in datos.items():
+            # Columnas que no estaban en páginas anteriores se rellenan.
+            columnas.setdefault(columna, [None] * filas).extend(valores)
+        for columna, valores in columnas.items():
+            if columna not in datos:
+                valores.extend([None] * n)
+        filas += n
+
+    if not columnas:
         raise SecopEmptyTableError(
             f"Ninguna de las {len(paginas_html)} páginas produjo datos "
             f"({errores} errores de parsing).",
         )
 
-    consolidado = pd.concat(dataframes, ignore_index=True)
+    consolidado = pd.DataFrame(columnas)
 
     antes = len(consolidado)
-    consolidado = consolidado.drop_duplicates().reset_index(drop=True)
+    consolidado = deduplicar_resultados(consolidado)
     if antes != len(consolidado):
         logger.info("Duplicados eliminados: %d → %d filas.", antes, len(consolidado))
 
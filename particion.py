@@ -0,0 +1,501 @@
+"""
+particion.py — Partición automática de consultas grandes de SECOP I.
+
+``scraper.iterar_paginas_http`` recorre como mucho ``max_pages`` páginas
+de ``REGISTROS_POR_PAGINA`` filas (200 × 100 por defecto). Una consulta
+con más resultados se cortaba ahí sin más aviso que una línea de log, y
+el resto de procesos no llegaba nunca.
+
+Antes de descargar, este módulo **cuenta** la consulta (la página 1 trae
+``totalResultados``) y, si no cabe, la parte en fragmentos disjuntos que
+sí quepan, probando las dimensiones en este orden:
+
+  1. **Subrangos de fechas**: si la consulta tiene fecha inicial y
+     final, el rango se parte por la mitad (en días).
+  2. **Bandas de cuantía**: si no filtra por cuantía, una consulta por
+     cada banda del portal (``CUANTIA_SECOP1``).
+  3. **Departamentos**: si no filtra por departamento, una consulta por
+     departamento (``DEPARTAMENTO_SECOP1``).
+
+Cada fragmento que sigue sin caber se vuelve a partir por la siguiente
+dimensión aplicable. Los fragmentos se recorren uno tras otro con la
+misma sesión, así que comparten el ritmo de ``_get`` (``ritmo.py``) como
+si fueran una sola descarga, y la página 1 usada para contar cada
+fragmento se reutiliza al descargarlo: contar no cuesta una petición de
+más en los fragmentos que se descargan.
+
+Solo los rastreos largos (varios fragmentos o ``BITACORA_MIN_PAGINAS``
+páginas) o los lanzados con ``reanudar`` dejan puntos de control en la
+bitácora; una consulta corta como las del dashboard no escribe en disco.
+
+El **informe de cobertura** compara la suma de los ``totalResultados``
+de los fragmentos con el total de la consulta sin partir, y señala los
+fragmentos que, agotadas las dimensiones (o ``PARTICION_MAX_CONTEOS``),
+siguen truncados. Los duplicados entre fragmentos (un proceso que cambia
+de fecha o de cuantía a mitad de la descarga) se descartan por
+``id_proceso`` al fusionar, como los de páginas solapadas.
+
+Uso:
+    >>> sesion = crear_sesion()
+    >>> plan = planificar_consulta(params, sesion)
+    >>> print(plan.informe())
+    >>> paginas = list(iterar_paginas_particionadas(plan, sesion))
+    >>> plan.finalizar()
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import math
+from collections import deque
+from dataclasses import asdict, dataclass, field, replace
+from datetime import datetime, timedelta
+from typing import Callable, Iterator, Optional
+
+import requests
+
+from bitacora import Bitacora
+from config import (
+    BITACORA_MIN_PAGINAS,
+    CUANTIA_SECOP1,
+    DEPARTAMENTO_SECOP1,
+    HTTP_DELAY,
+    PARAM_PAGINA,
+    PARTICION_AUTOMATICA,
+    PARTICION_MAX_CONTEOS,
+    REGISTROS_POR_PAGINA,
+    SearchParams,
+)
+from exceptions import SecopEmptyTableError
+from scraper import (
+    abrir_bitacora,
+    calentar_sesion,
+    construir_parametros,
+    descargar_pagina,
+    extraer_total_resultados,
+    iterar_paginas_http,
+)
+
+logger = logging.getLogger(__name__)
+
+_FORMATO_FECHA = "%d/%m/%Y"
+
+# Elemento de la bitácora con la página 1 (el mismo que usa
+# ``iterar_paginas_http``).
+_PRIMERA_PAGINA = "pagina:1"
+
+
+# ════════════════════════════════════════════════════════════
+# 1. FRAGMENTOS Y PLAN
+# ════════════════════════════════════════════════════════════
+
+
+def capacidad(params: SearchParams) -> int:
+    """Registros que caben en un recorrido de ``params.max_pages`` páginas."""
+    return max(1, params.max_pages) * REGISTROS_POR_PAGINA
+
+
+@dataclass(frozen=True)
+class Fragmento:
+    """Una consulta del plan y su ``totalResultados``.
+
+    ``total`` es ``None`` si el portal no dejó leerlo (se baja una página).
+    """
+
+    params: SearchParams
+    total: Optional[int]
+
+    @property
+    def truncado(self) -> bool:
+        """Si tiene más registros de los que se pueden recorrer."""
+        return self.total is not None and self.total > capacidad(self.params)
+
+    @property
+    def paginas(self) -> int:
+        """Páginas que se descargarán."""
+        if self.total is None:
+            return 1
+        return min(max(1, math.ceil(self.total / REGISTROS_POR_PAGINA)), self.params.max_pages)
+
+    def describir(self) -> str:
+        """Filtros que distinguen al fragmento, para el log."""
+        partes = []
+        if self.params.fecha_inicio or self.params.fecha_fin:
+            partes.append(f"{self.params.fecha_inicio or '…'}–{self.params.fecha_fin or '…'}")
+        if self.params.cuantia and self.params.cuantia != "0":
+            partes.append(CUANTIA_SECOP1.get(self.params.cuantia, self.params.cuantia))
+        if self.params.departamento:
+            partes.append(
+                DEPARTAMENTO_SECOP1.get(self.params.departamento, self.params.departamento)
+            )
+        return ", ".join(partes) or "consulta completa"
+
+
+@dataclass
+class PlanConsulta:
+    """Fragmentos en que se descarga una consulta y su cobertura.
+
+    Attributes:
+        params:         Consulta original (normalizada).
+        total:          ``totalResultados`` de la consulta sin partir.
+        fragmentos:     Consultas disjuntas a descargar, en orden.
+        conteos:        Peticiones gastadas en contar al planificar.
+        puntos_control: Si la descarga deja progreso en la bitácora.
+        sesiones:       Sesión de bitácora de cada fragmento (con
+                        ``puntos_control``).
+        primeras:       Página 1 de cada fragmento, ya descargada al
+                        contar (sin ``puntos_control``; con ellos está
+                        en la bitácora).
+        registro:       Sesión de la bitácora que guarda el plan.
+    """
+
+    params: SearchParams
+    total: Optional[int]
+    fragmentos: list[Fragmento]
+    conteos: int = 0
+    puntos_control: bool = True
+    sesiones: list[Optional[str]] = field(default_factory=list)
+    primeras: list[Optional[str]] = field(default_factory=list, repr=False)
+    registro: Optional[str] = None
+
+    @property
+    def suma(self) -> int:
+        """Suma de los ``totalResultados`` de los fragmentos."""
+        return sum(f.total or 0 for f in self.fragmentos)
+
+    @property
+    def paginas(self) -> int:
+        return sum(f.paginas for f in self.fragmentos)
+
+    @property
+    def truncados(self) -> list[Fragmento]:
+        return [f for f in self.fragmentos if f.truncado]
+
+    @property
+    def cubierto(self) -> bool:
+        """Si los fragmentos suman el total y ninguno queda truncado."""
+        return self.total is not None and self.suma >= self.total and not self.truncados
+
+    def informe(self) -> str:
+        """Informe de cobertura legible (varias líneas)."""
+        lineas = [
+            f"{len(self.fragmentos)} fragmento(s), {self.paginas} páginas "
+            f"(≈ {self.paginas * HTTP_DELAY / 60:.0f} min a {HTTP_DELAY:g} s/página); "
+            f"{self.conteos} peticiones para contar."
+        ]
+        if self.total is None:
+            lineas.append("Total de la consulta desconocido: no se puede medir la cobertura.")
+        else:
+            diferencia = self.suma - self.total
+            lineas.append(
+                f"Registros: {self.suma} en fragmentos frente a {self.total} sin "
+                f"partir ({diferencia:+d})."
+            )
+            if diferencia < 0:
+                lineas.append(
+                    f"Faltan {-diferencia} registros que ninguna dimensión cubre "
+                    "(p. ej. procesos sin departamento o sin cuantía)."
+                )
+        for fragmento in self.truncados:
+            lineas.append(
+                f"Truncado: {fragmento.describir()} — {fragmento.total} registros, "
+                f"se recorren {capacidad(fragmento.params)}."
+            )
+        return "\n".join(lineas)
+
+    def finalizar(self) -> None:
+        """Borra las sesiones del plan y de sus fragmentos (descarga completa)."""
+        self.primeras = []
+        if not self.puntos_control:
+            return
+        for fragmento, sesion in zip(self.fragmentos, self.sesiones):
+            if sesion is not None:
+                abrir_bitacora(fragmento.params, sesion=sesion).finalizar()
+        if self.registro is not None:
+            _registro_plan(self.params, sesion=self.registro).finalizar()
+
+
+# ════════════════════════════════════════════════════════════
+# 2. DIMENSIONES DE PARTICIÓN
+# ════════════════════════════════════════════════════════════
+
+
+def _por_fechas(params: SearchParams) -> Optional[list[SearchParams]]:
+    """Parte el rango de fechas por la mitad (hace falta inicio y fin)."""
+    if not (params.fecha_inicio and params.fecha_fin):
+        return None
+    try:
+        inicio = datetime.strptime(params.fecha_inicio, _FORMATO_FECHA)
+        fin = datetime.strptime(params.fecha_fin, _FORMATO_FECHA)
+    except ValueError:
+        return None
+    if fin <= inicio:
+        return None
+    medio = inicio + timedelta(days=(fin - inicio).days // 2)
+    return [
+        replace(params, fecha_fin=medio.strftime(_FORMATO_FECHA)),
+        replace(params, fecha_inicio=(medio + timedelta(days=1)).strftime(_FORMATO_FECHA)),
+    ]
+
+
+def _por_cuantia(params: SearchParams) -> Optional[list[SearchParams]]:
+    """Una consulta por banda de cuantía, si no se filtró por ninguna."""
+    if params.cuantia not in (None, "", "0"):
+        return None
+    return [replace(params, cuantia=codigo) for codigo in CUANTIA_SECOP1 if codigo != "0"]
+
+
+def _por_departamento(params: SearchParams) -> Optional[list[SearchParams]]:
+    """Una consulta por departamento, si no se filtró por ninguno."""
+    if params.departamento:
+        return None
+    return [replace(params, departamento=codigo) for codigo in DEPARTAMENTO_SECOP1]
+
+
+_DIMENSIONES: tuple[Callable[[SearchParams], Optional[list[SearchParams]]], ...] = (
+    _por_fechas,
+    _por_cuantia,
+    _por_departamento,
+)
+
+
+def _partir(params: SearchParams) -> Optional[list[SearchParams]]:
+    """Fragmentos disjuntos según la primera dimensión aplicable."""
+    for dimension in _DIMENSIONES:
+        hijos = dimension(params)
+        if hijos:
+            return hijos
+    return None
+
+
+# ════════════════════════════════════════════════════════════
+# 3. PLANIFICACIÓN
+# ════════════════════════════════════════════════════════════
+
+
+def _registro_plan(
+    params: SearchParams, reanudar: bool = False, sesion: Optional[str] = None
+) -> Bitacora:
+    """Bitácora con el plan de una consulta partida (para ``--reanudar``)."""
+    consulta = construir_parametros(params)
+    consulta.pop(PARAM_PAGINA)
+    return Bitacora(
+        "secop1-plan", consulta, params.max_pages, reanudar=reanudar, sesion=sesion
+    )
+
+
+def _clave(params: SearchParams) -> str:
+    return json.dumps(asdict(params), sort_keys=True, ensure_ascii=False)
+
+
+class _Contador:
+    """Cuenta consultas con su página 1, que se guarda para descargarlas.
+
+    Con ``reanudar`` la página 1 se busca antes en la bitácora de una
+    ejecución anterior, y se recuerda la sesión en la que estaba.
+    """
+
+    def __init__(self, sesion: requests.Session, reanudar: bool) -> None:
+        self._sesion = sesion
+        self._reanudar = reanudar
+        self._calentada = False
+        self.peticiones = 0
+        self.primeras: dict[str, str] = {}
+        self.sesiones: dict[str, str] = {}
+
+    def contar(self, params: SearchParams) -> Optional[int]:
+        clave = _clave(params)
+        html = None
+        if self._reanudar:
+            bitacora = abrir_bitacora(params, reanudar=True)
+            html = bitacora.leer(_PRIMERA_PAGINA)
+            self.sesiones[clave] = bitacora.sesion
+            bitacora.cerrar()
+        if html is None:
+            if not self._calentada:
+                calentar_sesion(self._sesion)
+                self._calentada = True
+            html = descargar_pagina(self._sesion, params, 1)
+            self.peticiones += 1
+        self.primeras[clave] = html
+        return extraer_total_resultados(html)
+
+    def descartar(self, params: SearchParams) -> None:
+        """Borra la sesión de una consulta que no se va a descargar."""
+        self.primeras.pop(_clave(params), None)
+        sesion = self.sesiones.pop(_clave(params), None)
+        if sesion is not None:
+            abrir_bitacora(params, sesion=sesion).finalizar()
+
+
+def _plan_a_json(plan: PlanConsulta) -> str:
+    return json.dumps(
+        {
+            "total": plan.total,
+            "fragmentos": [[asdict(f.params), f.total] for f in plan.fragmentos],
+            "sesiones": plan.sesiones,
+        },
+        ensure_ascii=False,
+    )
+
+
+def _plan_desde_json(params: SearchParams, texto: str) -> PlanConsulta:
+    datos = json.loads(texto)
+    fragmentos = [Fragmento(SearchParams(**p), total) for p, total in datos["fragmentos"]]
+    return PlanConsulta(
+        params, datos["total"], fragmentos, sesiones=datos["sesiones"]
+    )
+
+
+def planificar_consulta(
+    params: SearchParams,
+    sesion: requests.Session,
+    reanudar: bool = False,
+    particionar: bool = PARTICION_AUTOMATICA,
+    max_conteos: int = PARTICION_MAX_CONTEOS,
+) -> PlanConsulta:
+    """Cuenta la consulta y la parte en fragmentos que quepan si hace falta.
+
+    Args:
+        params:      Filtros de búsqueda (se normalizan internamente).
+        sesion:      Sesión con la que se contará y luego se descargará.
+        reanudar:    Reutilizar el plan y las páginas de una descarga
+                     interrumpida con los mismos filtros.
+        particionar: ``False`` = un único fragmento aunque no quepa (el
+                     comportamiento anterior: se trunca).
+        max_conteos: Peticiones máximas para contar fragmentos candidatos.
+
+    Returns:
+        El plan, con un único fragmento si la consulta cabe entera.
+
+    Raises:
+        SecopEmptyTableError: Si la consulta no devuelve registros.
+        SecopBlockedError:    Si el WAF bloquea de forma persistente.
+    """
+    params = params.normalizada()
+
+    if reanudar:
+        registro = _registro_plan(params, reanudar=True)
+        guardado = registro.leer("plan")
+        if guardado is None:
+            # Sin plan guardado la sesión recién abierta quedaría vacía.
+            registro.finalizar()
+        else:
+            registro.cerrar()
+            plan = _plan_desde_json(params, guardado)
+            plan.registro = registro.sesion
+            logger.info(
+                "[HTTP] Plan de %d fragmentos recuperado de la bitácora.",
+                len(plan.fragmentos),
+            )
+            return plan
+
+    contador = _Contador(sesion, reanudar)
+    total = contador.contar(params)
+    if total == 0:
+        contador.descartar(params)
+        raise SecopEmptyTableError(
+            "La consulta no devolvió registros.",
+            context={"filtros": str(params)},
+        )
+
+    hojas: list[Fragmento] = []
+    pendientes = deque([Fragmento(params, total)])
+    while pendientes:
+        fragmento = pendientes.popleft()
+        hijos = _partir(fragmento.params) if particionar and fragmento.truncado else None
+        if hijos and contador.peticiones + len(hijos) > max_conteos:
+            logger.warning(
+                "[HTTP] Sin presupuesto para seguir partiendo %s (%d conteos).",
+                fragmento.describir(), contador.peticiones,
+            )
+            hijos = None
+        if not hijos:
+            hojas.append(fragmento)
+            continue
+
+        # La página 1 de los fragmentos que se parten ya no sirve.
+        contador.descartar(fragmento.params)
+        for hijo in hijos:
+            total_hijo = contador.contar(hijo)
+            if total_hijo == 0:
+                contador.descartar(hijo)
+            else:
+                pendientes.append(Fragmento(hijo, total_hijo))
+
+    plan = PlanConsulta(params, total, hojas, contador.peticiones)
+    plan.puntos_control = (
+        reanudar or len(hojas) > 1 or plan.paginas >= BITACORA_MIN_PAGINAS
+    )
+    primeras = [contador.primeras.get(_clave(h.params)) for h in hojas]
+    if not plan.puntos_control:
+        plan.primeras = primeras
+    else:
+        # La página 1 pasa a la bitácora de su fragmento: a partir de aquí
+        # un corte se puede reanudar.
+        for hoja, html in zip(hojas, primeras):
+            bitacora = abrir_bitacora(
+                hoja.params, sesion=contador.sesiones.get(_clave(hoja.params))
+            )
+            if html is not None and _PRIMERA_PAGINA not in bitacora:
+                bitacora.guardar(_PRIMERA_PAGINA, html)
+            plan.sesiones.append(bitacora.sesion)
+            bitacora.cerrar()
+
+    if len(hojas) > 1:
+        registro = _registro_plan(params)
+        registro.guardar("plan", _plan_a_json(plan))
+        registro.cerrar()
+        plan.registro = registro.sesion
+        logger.info("[HTTP] Consulta partida en fragmentos:\n%s", plan.informe())
+    if plan.truncados:
+        logger.warning(
+            "[HTTP] %d fragmento(s) no caben en %d páginas y se truncarán.",
+            len(plan.truncados), params.max_pages,
+        )
+    return plan
+
+
+# ════════════════════════════════════════════════════════════
+# 4. DESCARGA
+# ════════════════════════════════════════════════════════════
+
+
+def iterar_paginas_particionadas(
+    plan: PlanConsulta, sesion: requests.Session
+) -> Iterator[str]:
+    """Descarga las páginas de todos los fragmentos, uno tras otro.
+
+    Con ``plan.puntos_control`` cada fragmento avanza en su propia sesión
+    de bitácora (se conserva si la descarga se corta, para
+    ``--reanudar``); ``PlanConsulta.finalizar`` las borra al terminar.
+
+    Yields:
+        HTML crudo de cada página, fragmento a fragmento.
+    """
+    for numero, fragmento in enumerate(plan.fragmentos, 1):
+        if len(plan.fragmentos) > 1:
+            logger.info(
+                "[HTTP] Fragmento %d/%d (%s): %s registros.",
+                numero, len(plan.fragmentos), fragmento.describir(),
+                fragmento.total if fragmento.total is not None else "¿?",
+            )
+        bitacora = None
+        primera = None
+        if plan.puntos_control:
+            bitacora = abrir_bitacora(fragmento.params, sesion=plan.sesiones[numero - 1])
+        elif plan.primeras:
+            primera, plan.primeras[numero - 1] = plan.primeras[numero - 1], None
+        try:
+            # Las cookies de la sesión indican que ya visitó el formulario.
+            yield from iterar_paginas_http(
+                fragmento.params, sesion, bitacora,
+                calentada=bool(sesion.cookies), primera_pagina=primera,
+            )
+        except SecopEmptyTableError:
+            # Quedó vacío entre el conteo y la descarga.
+            logger.info("[HTTP] Fragmento %d sin registros; se omite.", numero)
+        finally:
+            if bitacora is not None:
+                bitacora.cerrar()
@@ -0,0 +1,336 @@
+"""
+planificador.py — Rastreo concurrente de URLs con cortesía por host.
+
+``detail_scraper.extraer_detalles_masivo`` pedía las fichas de una en
+una: cada petición esperaba la respuesta completa del portal (varios
+segundos con carga) antes de pedir turno para la siguiente, así que
+10.000 fichas eran muchas horas aunque el ritmo del WAF permitiera más.
+
+El planificador reparte las URLs entre un pool de hilos acotado con
+tres reglas:
+
+  • **Presupuesto por host**: como mucho ``DETALLE_POR_HOST`` peticiones
+    simultáneas a un mismo host. El ritmo de inicio lo sigue poniendo
+    ``ritmo.py``, compartido por todos los hilos (y procesos), así que
+    más hilos solapan esperas pero no aceleran la cadencia frente al WAF.
+  • **Prioridad**: cada host tiene una cola de prioridad; sale primero
+    la URL de prioridad más alta (p. ej. la fila a la que le faltan más
+    campos clave) y, a igualdad, la que llegó antes. Los reintentos van
+    detrás de las URLs nuevas de su misma prioridad.
+  • **Backoff por errores seguidos**: cada fallo (excepción o ``None``)
+    pausa el host ``RETRY_BACKOFF ** errores`` segundos (hasta
+    ``DETALLE_BACKOFF_MAX``) y la URL vuelve a la cola hasta
+    ``MAX_RETRIES`` intentos. Un acierto
+    pone el contador a cero. Solo si un host acumula ``max_errores``
+    fallos seguidos con la pausa ya al máximo se abandona lo que le
+    queda (y la bitácora permite retomarlo con ``--reanudar``).
+    Una URL que respondió bien pero sin nada útil (``SIN_RESULTADO``)
+    no es un fallo del host: se cuenta como vacía y no se reintenta.
+
+El bucle de coordinación corre en el hilo que llama y devuelve los
+resultados según terminan, de modo que guardarlos (bitácora, DataFrame)
+no necesita cerrojos.
+
+Uso:
+    >>> planificador = Planificador(descargar_ficha, hilos=4)
+    >>> for url, ficha in planificador.ejecutar(urls, prioridades):
+    ...     guardar(url, ficha)
+    >>> planificador.metricas.linea()
+"""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable, Generic, Iterable, Iterator, Optional, TypeVar
+from urllib.parse import urlparse
+
+from config import (
+    DETALLE_BACKOFF_MAX,
+    DETALLE_HILOS,
+    DETALLE_POR_HOST,
+    DETALLE_PROGRESO_CADA,
+    MAX_RETRIES,
+    RETRY_BACKOFF,
+)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Lo que devuelve el trabajo cuando la URL respondió pero no hay nada que
+# guardar (p. ej. una ficha vacía): no pausa el host ni se reintenta.
+SIN_RESULTADO = object()
+
+
+# ════════════════════════════════════════════════════════════
+# 1. MÉTRICAS DE PROGRESO
+# ════════════════════════════════════════════════════════════
+
+
+@dataclass
+class MetricasRastreo:
+    """Contadores de un rastreo en curso."""
+
+    total: int = 0
+    completadas: int = 0
+    fallidas: int = 0          # agotaron sus intentos
+    vacias: int = 0            # respondieron sin resultado (SIN_RESULTADO)
+    abandonadas: int = 0       # pendientes de un host abandonado
+    reintentos: int = 0
+    en_vuelo: int = 0
+    inicio: float = field(default_factory=time.monotonic)
+
+    @property
+    def procesadas(self) -> int:
+        return self.completadas + self.vacias + self.fallidas + self.abandonadas
+
+    @property
+    def por_minuto(self) -> float:
+        """Fichas completadas por minuto desde el inicio."""
+        transcurrido = time.monotonic() - self.inicio
+        return 60 * self.completadas / transcurrido if transcurrido > 0 else 0.0
+
+    @property
+    def eta(self) -> Optional[float]:
+        """Segundos estimados hasta terminar, o ``None`` sin datos aún."""
+        if not self.completadas:
+            return None
+        pendientes = self.total - self.procesadas
+        return 60 * pendientes / max(self.por_minuto, 1e-9)
+
+    def linea(self) -> str:
+        """Resumen de una línea para el log."""
+        eta = f"{self.eta / 60:.0f} min" if self.eta is not None else "—"
+        return (
+            f"{self.procesadas}/{self.total} procesadas ({self.completadas} "
+            f"correctas, {self.vacias} vacías, {self.fallidas} fallidas, "
+            f"{self.reintentos} reintentos, {self.en_vuelo} en curso); "
+            f"{self.por_minuto:.1f}/min, ETA {eta}"
+        )
+
+
+# ════════════════════════════════════════════════════════════
+# 2. ESTADO POR HOST
+# ════════════════════════════════════════════════════════════
+
+
+@dataclass
+class _Host:
+    """Cola de prioridad y presupuesto de un host."""
+
+    nombre: str
+    cola: list = field(default_factory=list)   # heap de (clave, url, intentos)
+    en_vuelo: int = 0
+    errores: int = 0
+    pausa_hasta: float = 0.0
+    abandonado: bool = False
+
+    def disponible(self, ahora: float, por_host: int) -> bool:
+        return (
+            bool(self.cola)
+            and not self.abandonado
+            and self.en_vuelo < por_host
+            and ahora >= self.pausa_hasta
+        )
+
+
+def host_de(url: str) -> str:
+    """Host de una URL (clave del presupuesto de cortesía)."""
+    return urlparse(url).netloc.lower()
+
+
+# ════════════════════════════════════════════════════════════
+# 3. PLANIFICADOR
+# ════════════════════════════════════════════════════════════
+
+
+class Planificador(Generic[T]):
+    """Ejecuta ``trabajo(url)`` en un pool de hilos con cortesía por host.
+
+    Args:
+        trabajo:     Función que procesa una URL y devuelve su resultado,
+                     ``None`` si falló o ``SIN_RESULTADO`` si respondió
+                     sin nada útil. Se llama desde los hilos del pool;
+                     una excepción cuenta como fallo.
+        hilos:       Tamaño del pool.
+        por_host:    Peticiones simultáneas máximas por host.
+        max_errores: Fallos seguidos de un host, con la pausa ya al
+                     máximo, antes de abandonarlo.
+        backoff_max: Pausa máxima de un host tras errores, en segundos.
+        progreso:    Callback opcional con las métricas tras cada URL.
+    """
+
+    def __init__(
+        self,
+        trabajo: Callable[[str], Optional[T | object]],
+        hilos: int = DETALLE_HILOS,
+        por_host: int = DETALLE_POR_HOST,
+        max_errores: int = 10,
+        backoff_max: float = DETALLE_BACKOFF_MAX,
+        progreso: Optional[Callable[[MetricasRastreo], None]] = None,
+    ) -> None:
+        self._trabajo = trabajo
+        self.hilos = max(1, hilos)
+        self.por_host = max(1, por_host)
+        self.max_errores = max(1, max_errores)
+        self.backoff_max = backoff_max
+        self._progreso = progreso
+        self._hosts: dict[str, _Host] = {}
+        self._orden = itertools.count()
+        self.metricas = MetricasRastreo()
+
+    # ── Colas ───────────────────────────────────────────────
+
+    def _encolar(self, url: str, prioridad: float, intentos: int = 0) -> None:
+        nombre = host_de(url)
+        host = self._hosts.setdefault(nombre, _Host(nombre))
+        # Mayor prioridad primero; a igualdad, menos intentos y orden de llegada.
+        clave = (-prioridad, intentos, next(self._orden))
+        heapq.heappush(host.cola, (clave, url, intentos))
+
+    def _siguiente(self, ahora: float) -> Optional[tuple[_Host, str, float, int]]:
+        """Elemento de mayor prioridad entre los hosts con presupuesto libre."""
+        candidatos = [
+            host for host in self._hosts.values() if host.disponible(ahora, self.por_host)
+        ]
+        if not candidatos:
+            return None
+        host = min(candidatos, key=lambda h: h.cola[0][0])
+        clave, url, intentos = heapq.heappop(host.cola)
+        return host, url, -clave[0], intentos
+
+    def _pendientes(self) -> bool:
+        return any(h.cola and not h.abandonado for h in self._hosts.values())
+
+    def _espera_hasta_turno(self, ahora: float) -> Optional[float]:
+        """Segundos hasta que acabe la pausa más próxima de un host con cola."""
+        pausas = [
+            h.pausa_hasta - ahora
+            for h in self._hosts.values()
+            if h.cola and not h.abandonado and h.pausa_hasta > ahora
+        ]
+        return max(0.0, min(pausas)) if pausas else None
+
+    # ── Resultados ──────────────────────────────────────────
+
+    def _fallo(self, host: _Host, url: str, prioridad: float, intentos: int) -> None:
+        if host.abandonado:
+            # Terminó en vuelo cuando el host ya se había abandonado.
+            self.metricas.abandonadas += 1
+            return
+        host.errores += 1
+        pausa = min(RETRY_BACKOFF**host.errores, self.backoff_max)
+        host.pausa_hasta = time.monotonic() + pausa
+
+        if intentos + 1 < MAX_RETRIES:
+            self.metricas.reintentos += 1
+            self._encolar(url, prioridad, intentos + 1)
+        else:
+            self.metricas.fallidas += 1
+            logger.warning("Sin resultado tras %d intentos: %s", intentos + 1, url)
+
+        if host.errores >= self.max_errores and pausa >= self.backoff_max:
+            host.abandonado = True
+            restantes = len(host.cola)
+            self.metricas.abandonadas += restantes
+            logger.error(
+                "Host %s abandonado tras %d errores seguidos; quedan %d URLs "
+                "sin procesar.", host.nombre, host.errores, restantes,
+            )
+        else:
+            logger.debug(
+                "Host %s: %d errores seguidos, pausa de %.0f s.",
+                host.nombre, host.errores, pausa,
+            )
+
+    def _ejecutar_uno(self, url: str) -> Optional[T | object]:
+        try:
+            return self._trabajo(url)
+        except Exception as exc:  # noqa: BLE001 - cuenta como fallo y se reintenta
+            logger.warning("Error procesando %s: %s", url, exc)
+            return None
+
+    @property
+    def completo(self) -> bool:
+        """Si no quedó ninguna URL sin intentar por abandono de un host."""
+        return not any(h.abandonado for h in self._hosts.values())
+
+    # ── Bucle principal ─────────────────────────────────────
+
+    def ejecutar(
+        self,
+        urls: Iterable[str],
+        prioridades: Optional[dict[str, float]] = None,
+    ) -> Iterator[tuple[str, T]]:
+        """Procesa las URLs y devuelve ``(url, resultado)`` según terminan.
+
+        Solo se devuelven los resultados correctos; las URLs vacías y
+        las fallidas quedan contadas en ``metricas``.
+
+        Args:
+            urls:        URLs a procesar (sin duplicados).
+            prioridades: Prioridad por URL; mayor va antes (default 0).
+        """
+        prioridades = prioridades or {}
+        for url in urls:
+            self._encolar(url, prioridades.get(url, 0.0))
+            self.metricas.total += 1
+        self.metricas.inicio = time.monotonic()
+        ultimo_informe = self.metricas.inicio
+
+        en_curso: dict[Future, tuple[_Host, str, float, int]] = {}
+        pool = ThreadPoolExecutor(max_workers=self.hilos, thread_name_prefix="secop-detalle")
+        try:
+            while True:
+                ahora = time.monotonic()
+                while len(en_curso) < self.hilos:
+                    elegido = self._siguiente(ahora)
+                    if elegido is None:
+                        break
+                    host, url, _, _ = elegido
+                    host.en_vuelo += 1
+                    en_curso[pool.submit(self._ejecutar_uno, url)] = elegido
+                self.metricas.en_vuelo = len(en_curso)
+
+                if not en_curso:
+                    if not self._pendientes():
+                        break
+                    # Todos los hosts con cola están en pausa por errores.
+                    time.sleep(self._espera_hasta_turno(ahora) or 0.1)
+                    continue
+
+                hechos, _ = wait(
+                    en_curso,
+                    timeout=self._espera_hasta_turno(ahora),
+                    return_when=FIRST_COMPLETED,
+                )
+                for futuro in hechos:
+                    host, url, prioridad, intentos = en_curso.pop(futuro)
+                    host.en_vuelo -= 1
+                    resultado = futuro.result()
+                    if resultado is None:
+                        self._fallo(host, url, prioridad, intentos)
+                    elif resultado is SIN_RESULTADO:
+                        # El host respondió: no es un error de transporte.
+                        host.errores = 0
+                        self.metricas.vacias += 1
+                    else:
+                        host.errores = 0
+                        self.metricas.completadas += 1
+                        yield url, resultado
+                    if self._progreso is not None:
+                        self._progreso(self.metricas)
+
+                if time.monotonic() - ultimo_informe >= DETALLE_PROGRESO_CADA:
+                    ultimo_informe = time.monotonic()
+                    logger.info("Progreso: %s.", self.metricas.linea())
+        finally:
+            # Un corte (Ctrl+C, consumidor que abandona) no lanza más
+            # trabajo; lo que ya está en vuelo termina y se descarta.
+            pool.shutdown(wait=True, cancel_futures=True)
+            self.metricas.en_vuelo = 0
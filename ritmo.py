@@ -0,0 +1,371 @@
+"""
+ritmo.py — Ritmo adaptativo de peticiones frente al WAF de contratos.gov.co.
+
+Con una pausa fija (``SECOP_DELAY``) hay que elegir entre ir lento
+siempre o arriesgarse a un bloqueo de 90 s. El controlador de este
+módulo ajusta el intervalo entre peticiones según lo que responde el
+portal, con el esquema AIMD de control de congestión:
+
+  • **Respuesta correcta**: el intervalo baja un paso fijo
+    (``RITMO_PASO``). El ritmo sube despacio, sondeando el límite.
+  • **Bloqueo** (403/406/429 o los marcadores de ``MARCADORES_BLOQUEO``):
+    el intervalo se multiplica (``RITMO_FACTOR_BLOQUEO``) y todas las
+    peticiones se pausan lo que pida ``Retry-After`` o, si no lo envía,
+    ``HTTP_DELAY_BLOQUEO``. Durante ``RITMO_MEMORIA_BLOQUEO`` el intervalo
+    no vuelve a bajar del que provocó el bloqueo (con ``RITMO_MARGEN``).
+  • **Respuesta lenta o 5xx**: el servidor va cargado; el intervalo sube
+    un poco (``RITMO_FACTOR_LENTITUD``) sin pausar.
+
+El estado se guarda en una base SQLite (``RITMO_ARCHIVO``) que
+comparten **todos los procesos** de la máquina: la CLI, cada sesión del
+dashboard y las tareas programadas piden turno en una misma agenda por
+host, de modo que la carga conjunta sobre el portal respeta un único
+ritmo. Los turnos se conceden en orden de llegada y quien tiene que
+esperar mucho lo ve en el log (o con ``espera_estimada`` antes de
+ponerse en cola). El ritmo aprendido sobrevive además entre ejecuciones:
+la siguiente arranca desde él y no desde ``SECOP_DELAY``.
+
+Uso:
+    >>> from ritmo import controlador_para
+    >>> ritmo = controlador_para(url)
+    >>> ritmo.esperar()
+    >>> ... hacer la petición ...
+    >>> ritmo.registrar_respuesta(status, latencia, bloqueado=False)
+"""
+
+from __future__ import annotations
+
+import logging
+import sqlite3
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Callable, Optional, TypeVar
+from urllib.parse import urlparse
+
+from config import (
+    HTTP_DELAY,
+    HTTP_DELAY_BLOQUEO,
+    RITMO_ARCHIVO,
+    RITMO_FACTOR_BLOQUEO,
+    RITMO_FACTOR_LENTITUD,
+    RITMO_INTERVALO_MAX,
+    RITMO_INTERVALO_MIN,
+    RITMO_LATENCIA_LENTA,
+    RITMO_MARGEN,
+    RITMO_MEMORIA_BLOQUEO,
+    RITMO_PASO,
+    RITMO_VIGENCIA,
+)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Códigos que el portal usa para frenar ráfagas.
+ESTADOS_BLOQUEO: frozenset[int] = frozenset({403, 406, 429})
+
+# Suavizado de la media móvil de latencia y muestras antes de usarla.
+_ALFA_LATENCIA = 0.2
+_MUESTRAS_MINIMAS = 5
+
+
+# ════════════════════════════════════════════════════════════
+# 1. UTILIDADES
+# ════════════════════════════════════════════════════════════
+
+
+def leer_retry_after(valor: Optional[str]) -> Optional[float]:
+    """Interpreta la cabecera ``Retry-After``.
+
+    Admite las dos formas del estándar: segundos (``"120"``) o una
+    fecha HTTP (``"Wed, 21 Oct 2026 07:28:00 GMT"``).
+
+    Returns:
+        Segundos a esperar, o ``None`` si no hay cabecera o no se entiende.
+    """
+    if not valor:
+        return None
+    valor = valor.strip()
+    if valor.isdigit():
+        return float(valor)
+    try:
+        fecha = parsedate_to_datetime(valor)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, fecha.timestamp() - time.time())
+
+
+# ════════════════════════════════════════════════════════════
+# 2. CONTROLADOR AIMD
+# ════════════════════════════════════════════════════════════
+
+
+class ControladorRitmo:
+    """Intervalo adaptativo entre peticiones a un mismo host.
+
+    El estado (intervalo, turno de la siguiente petición, pausa tras
+    bloqueo) vive en una tabla SQLite compartida por todos los procesos
+    de la máquina: la CLI, cada sesión del dashboard y las tareas
+    programadas reservan turno en la **misma agenda**, así que la carga
+    total sobre el portal nunca supera un ritmo (como mucho una petición
+    cada ``RITMO_INTERVALO_MIN``). Cada reserva se hace en una
+    transacción ``BEGIN IMMEDIATE``, que SQLite serializa: los turnos se
+    conceden en orden de llegada y cada petición reserva uno solo, de
+    modo que varios llamadores quedan intercalados.
+
+    Si la base no se puede abrir (disco de solo lectura) el controlador
+    sigue funcionando con un estado solo en memoria.
+
+    Args:
+        host:    Nombre del host (clave en la tabla).
+        archivo: Base SQLite compartida. ``None`` = solo en memoria.
+    """
+
+    def __init__(self, host: str, archivo: Optional[Path] = RITMO_ARCHIVO) -> None:
+        self.host = host
+        self._cerrojo = threading.Lock()
+        self._conexion: Optional[sqlite3.Connection] = None
+
+        # Estado compartido (copia local, se relee en cada transacción).
+        # Todos los instantes son de reloj de pared: se comparan entre
+        # procesos.
+        self.intervalo = HTTP_DELAY
+        self._bloqueo_intervalo: Optional[float] = None
+        self._bloqueo_en = 0.0
+        self._proximo = 0.0          # turno de la siguiente petición
+        self._pausa_hasta = 0.0      # pausa cooperativa tras un bloqueo
+
+        # Estado local: la latencia depende de la red de cada proceso.
+        self._latencia_media: Optional[float] = None
+        self._muestras = 0
+
+        if archivo is not None:
+            self._conexion = self._abrir(Path(archivo))
+
+    # ── Estado compartido ───────────────────────────────────
+
+    def _abrir(self, ruta: Path) -> Optional[sqlite3.Connection]:
+        try:
+            ruta.parent.mkdir(parents=True, exist_ok=True)
+            conexion = sqlite3.connect(
+                ruta, timeout=30, isolation_level=None, check_same_thread=False
+            )
+            conexion.execute("PRAGMA journal_mode=WAL")
+            conexion.execute(
+                """
+                CREATE TABLE IF NOT EXISTS ritmo (
+                    host              TEXT PRIMARY KEY,
+                    intervalo         REAL NOT NULL,
+                    bloqueo_intervalo REAL,
+                    bloqueo_en        REAL NOT NULL DEFAULT 0,
+                    proximo           REAL NOT NULL DEFAULT 0,
+                    pausa_hasta       REAL NOT NULL DEFAULT 0,
+                    actualizado       REAL NOT NULL
+                )
+                """
+            )
+            return conexion
+        except (OSError, sqlite3.Error) as exc:
+            logger.warning(
+                "Ritmo compartido no disponible en %s (%s); cada proceso "
+                "llevará su propio ritmo.", ruta, exc,
+            )
+            return None
+
+    def _leer(self, conexion: sqlite3.Connection) -> None:
+        fila = conexion.execute(
+            "SELECT intervalo, bloqueo_intervalo, bloqueo_en, proximo, "
+            "pausa_hasta, actualizado FROM ritmo WHERE host = ?",
+            (self.host,),
+        ).fetchone()
+        if fila is None:
+            return
+        intervalo, bloqueo_intervalo, bloqueo_en, proximo, pausa_hasta, actualizado = fila
+        self._proximo, self._pausa_hasta = proximo, pausa_hasta
+        if time.time() - actualizado > RITMO_VIGENCIA:
+            # Ritmo aprendido demasiado viejo: se vuelve a sondear.
+            self.intervalo, self._bloqueo_intervalo, self._bloqueo_en = HTTP_DELAY, None, 0.0
+        else:
+            self.intervalo = intervalo
+            self._bloqueo_intervalo, self._bloqueo_en = bloqueo_intervalo, bloqueo_en
+
+    def _escribir(self, conexion: sqlite3.Connection) -> None:
+        conexion.execute(
+            "INSERT OR REPLACE INTO ritmo (host, intervalo, bloqueo_intervalo, "
+            "bloqueo_en, proximo, pausa_hasta, actualizado) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                self.host, self.intervalo, self._bloqueo_intervalo,
+                self._bloqueo_en, self._proximo, self._pausa_hasta, time.time(),
+            ),
+        )
+
+    def _atomico(self, operacion: Callable[[], T], escribe: bool = True) -> T:
+        """Ejecuta ``operacion`` sobre el estado compartido más reciente.
+
+        Relee la fila del host, aplica la operación sobre la copia local
+        y, si ``escribe``, la guarda, todo dentro de una transacción que
+        excluye a los demás procesos.
+        """
+        with self._cerrojo:
+            conexion = self._conexion
+            if conexion is None:
+                return operacion()
+
+            hecho = False
+            try:
+                conexion.execute("BEGIN IMMEDIATE" if escribe else "BEGIN")
+                self._leer(conexion)
+                resultado = operacion()
+                hecho = True
+                if escribe:
+                    self._escribir(conexion)
+                conexion.execute("COMMIT")
+                return resultado
+            except sqlite3.Error as exc:
+                try:
+                    conexion.execute("ROLLBACK")
+                except sqlite3.Error:
+                    pass
+                logger.warning(
+                    "Ritmo compartido no disponible (%s); se sigue con el "
+                    "ritmo de este proceso.", exc,
+                )
+                self._conexion = None
+                conexion.close()
+                return resultado if hecho else operacion()
+
+    # ── Ajuste ──────────────────────────────────────────────
+
+    def _acotar(self, intervalo: float) -> float:
+        return min(RITMO_INTERVALO_MAX, max(self._piso(), intervalo))
+
+    def _piso(self) -> float:
+        """Intervalo mínimo vigente: el global o el recordado del bloqueo."""
+        if (
+            self._bloqueo_intervalo is not None
+            and time.time() - self._bloqueo_en < RITMO_MEMORIA_BLOQUEO
+        ):
+            return max(RITMO_INTERVALO_MIN, self._bloqueo_intervalo * RITMO_MARGEN)
+        return RITMO_INTERVALO_MIN
+
+    def _reservar(self) -> float:
+        ahora = time.time()
+        turno = max(ahora, self._proximo, self._pausa_hasta)
+        self._proximo = turno + self._acotar(self.intervalo)
+        return turno - ahora
+
+    def espera_estimada(self) -> float:
+        """Segundos hasta el próximo turno libre, sin reservarlo.
+
+        Sirve para avisar al usuario antes de ponerse en cola.
+        """
+        return self._atomico(
+            lambda: max(0.0, self._proximo - time.time(), self._pausa_hasta - time.time()),
+            escribe=False,
+        )
+
+    def esperar(self) -> float:
+        """Bloquea hasta que sea el turno de la siguiente petición.
+
+        Cada llamada reserva su turno en la agenda compartida antes de
+        dormir, así que los llamadores (hilos o procesos) quedan
+        espaciados por el intervalo y atendidos en orden de llegada.
+
+        Returns:
+            Segundos esperados.
+        """
+        espera = self._atomico(self._reservar)
+        if espera > max(5.0, 2 * self.intervalo):
+            logger.info(
+                "Ritmo %s: en cola tras ~%d peticiones de este u otros "
+                "procesos; turno en %.0f s.",
+                self.host, int(espera / max(self.intervalo, 1e-3)), espera,
+            )
+        if espera > 0:
+            time.sleep(espera)
+        return espera
+
+    def registrar_respuesta(
+        self,
+        status: Optional[int],
+        latencia: float,
+        bloqueado: bool = False,
+        retry_after: Optional[float] = None,
+    ) -> None:
+        """Ajusta el intervalo con el resultado de una petición.
+
+        Args:
+            status:      Código HTTP, o ``None`` si falló la red.
+            latencia:    Segundos que tardó la respuesta.
+            bloqueado:   Si la respuesta es la página de bloqueo del WAF.
+            retry_after: Segundos pedidos por ``Retry-After``, si los hay.
+        """
+        lenta = self._es_lenta(latencia)
+        if status is not None and status < 500:
+            self._actualizar_latencia(latencia)
+
+        def _ajustar() -> None:
+            anterior = self.intervalo
+            if bloqueado or status in ESTADOS_BLOQUEO:
+                self._bloqueo_intervalo = anterior
+                self._bloqueo_en = time.time()
+                self.intervalo = self._acotar(anterior * RITMO_FACTOR_BLOQUEO)
+                pausa = retry_after if retry_after is not None else HTTP_DELAY_BLOQUEO
+                self._pausa_hasta = max(self._pausa_hasta, time.time() + pausa)
+                logger.warning(
+                    "Ritmo %s: respuesta %s → una petición cada %.2f s (antes "
+                    "%.2f s), pausa de %.0f s para todos los procesos.",
+                    self.host, status, self.intervalo, anterior, pausa,
+                )
+            elif status is None or status >= 500 or lenta:
+                self.intervalo = self._acotar(anterior * RITMO_FACTOR_LENTITUD)
+                if retry_after is not None:
+                    self._pausa_hasta = max(self._pausa_hasta, time.time() + retry_after)
+                logger.debug(
+                    "Ritmo %s: servidor cargado (status=%s, %.1f s) → %.2f s.",
+                    self.host, status, latencia, self.intervalo,
+                )
+            else:
+                self.intervalo = self._acotar(anterior - RITMO_PASO)
+
+        self._atomico(_ajustar)
+
+    def _es_lenta(self, latencia: float) -> bool:
+        return (
+            self._muestras >= _MUESTRAS_MINIMAS
+            and self._latencia_media is not None
+            and latencia > RITMO_LATENCIA_LENTA * self._latencia_media
+        )
+
+    def _actualizar_latencia(self, latencia: float) -> None:
+        if self._latencia_media is None:
+            self._latencia_media = latencia
+        else:
+            self._latencia_media += _ALFA_LATENCIA * (latencia - self._latencia_media)
+        self._muestras += 1
+
+
+# ════════════════════════════════════════════════════════════
+# 3. REGISTRO DE CONTROLADORES
+# ════════════════════════════════════════════════════════════
+
+_controladores: dict[str, ControladorRitmo] = {}
+_cerrojo_registro = threading.Lock()
+
+
+def controlador_para(url: str) -> ControladorRitmo:
+    """Controlador compartido del host de ``url`` (se crea al primer uso)."""
+    host = urlparse(url).netloc or url
+    with _cerrojo_registro:
+        controlador = _controladores.get(host)
+        if controlador is None:
+            controlador = _controladores[host] = ControladorRitmo(host)
+        return controlador
+
+
+def espera_estimada(url: str) -> float:
+    """Segundos que esperaría ahora una petición a ``url`` (sin reservar)."""
+    return controlador_para(url).espera_estimada()
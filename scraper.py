@@ -9,7 +9,9 @@ de salida (lista de HTML crudo por página):
      ``resultadosConsulta.do`` con todos los filtros en la query string.
      Ese endpoint acepta GET y **no exige token de reCAPTCHA**, así que
      no hace falta navegador. Es un orden de magnitud más rápido y
-     estable que Selenium.
+     estable que Selenium. ``iterar_paginas_http`` entrega las mismas
+     páginas de una en una, para procesarlas mientras se descarga la
+     siguiente (ver ``flujo.py``).
 
   2. **Selenium** (respaldo, ``ejecutar_scraping_selenium``).
      Rellena el formulario en un Chrome real. Útil si el WAF empieza a
@@ -34,9 +36,11 @@ from __future__ import annotations
 
 import logging
 import math
+import os
 import re
 import time
-from typing import Optional
+from pathlib import Path
+from typing import Iterator, Optional
 from urllib.parse import parse_qs, urlparse
 
 import requests
@@ -48,14 +52,11 @@ from config import (
     CHROME_PREFS,
     CHROME_USER_AGENT,
     DEFAULT_TIMEOUT,
-    HTTP_DELAY,
-    HTTP_DELAY_BLOQUEO,
     HTTP_HEADERS,
     HTTP_MAX_BLOQUEOS,
     HTTP_TIMEOUT,
     MARCADORES_BLOQUEO,
     MAX_RETRIES,
-    PAGE_LOAD_WAIT,
     PARAM_ACTION,
     PARAM_CUANTIA,
     PARAM_DEPARTAMENTO,
@@ -72,10 +73,13 @@ from config import (
     PARAM_PAGINA,
     PARAM_RECAPTCHA,
     PARAM_REGISTROS_PAGINA,
+    PARTICION_AUTOMATICA,
     REGISTROS_POR_PAGINA,
     RETRY_BACKOFF,
     SECOP_CONSULTA_URL,
     SECOP_RESULTADOS_DATA_URL,
+    SELENIUM_QUIETUD_RED,
+    SELENIUM_SONDEO,
     SEL_BTN_BUSCAR,
     SEL_BTN_BUSCAR_LINK,
     SEL_CUANTIA,
@@ -97,8 +101,12 @@ from exceptions import (
     SecopFormError,
     SecopIframeError,
     SecopRecaptchaError,
+    SecopReplayError,
     SecopTimeoutError,
 )
+from archivo_http import archivo_por_defecto, modo_reproduccion
+from bitacora import Bitacora
+from ritmo import controlador_para, leer_retry_after
 
 logger = logging.getLogger(__name__)
 
@@ -163,14 +171,26 @@ def _get(
     url: str,
     params: Optional[dict] = None,
     referer: Optional[str] = SECOP_CONSULTA_URL,
+    cabeceras: Optional[dict[str, str]] = None,
 ) -> requests.Response:
-    """GET con reintentos, backoff y manejo del bloqueo del WAF.
+    """GET con ritmo adaptativo, reintentos y manejo del bloqueo del WAF.
+
+    El espaciado entre peticiones lo decide ``ritmo.ControladorRitmo``
+    (compartido por host): cada respuesta le informa de la latencia y de
+    si hubo bloqueo, y la siguiente petición espera su turno. Tras un
+    bloqueo la pausa es la de ``Retry-After`` o ``HTTP_DELAY_BLOQUEO``.
+
+    Las respuestas válidas se guardan en el archivo de respuestas crudas
+    (``archivo_http.py``); con ``SECOP_REPLAY=1`` se sirven desde él sin
+    tocar la red.
 
     Args:
-        sesion:  Sesión activa.
-        url:     URL destino.
-        params:  Query string.
-        referer: Cabecera ``Referer`` (el portal la revisa).
+        sesion:    Sesión activa.
+        url:       URL destino.
+        params:    Query string.
+        referer:   Cabecera ``Referer`` (el portal la revisa).
+        cabeceras: Cabeceras adicionales, p. ej. las condicionales
+                   (``If-None-Match``); un 304 se devuelve tal cual.
 
     Returns:
         La respuesta HTTP, ya con ``encoding='utf-8'``.
@@ -178,20 +198,36 @@ def _get(
     Raises:
         SecopBlockedError: Si el WAF bloquea de forma persistente.
         SecopTimeoutError: Si se agotan los reintentos por timeout/red.
+        SecopReplayError:  En modo reproducción, si no hay captura.
     """
-    cabeceras = {"Referer": referer} if referer else {}
+    archivo = archivo_por_defecto()
+    if modo_reproduccion():
+        respuesta = archivo.reproducir(url, params) if archivo else None
+        if respuesta is None:
+            raise SecopReplayError(
+                "Modo reproducción: la petición no está en el archivo.",
+                context={"url": url, "params": params},
+            )
+        return respuesta
+
+    encabezados = {"Referer": referer} if referer else {}
+    encabezados.update(cabeceras or {})
+    ritmo = controlador_para(url)
     bloqueos = 0
     ultimo_error: Optional[Exception] = None
 
     for intento in range(1, MAX_RETRIES + 1):
+        ritmo.esperar()
+        inicio = time.monotonic()
         try:
             respuesta = sesion.get(
                 url,
                 params=params,
-                headers=cabeceras,
+                headers=encabezados,
                 timeout=HTTP_TIMEOUT,
             )
         except requests.RequestException as exc:
+            ritmo.registrar_respuesta(None, time.monotonic() - inicio)
             ultimo_error = exc
             espera = RETRY_BACKOFF**intento
             logger.warning(
@@ -201,23 +237,46 @@ def _get(
             time.sleep(espera)
             continue
 
-        if _es_bloqueo_waf(respuesta):
+        bloqueado = _es_bloqueo_waf(respuesta)
+        retry_after = leer_retry_after(respuesta.headers.get("Retry-After"))
+        ritmo.registrar_respuesta(
+            respuesta.status_code,
+            time.monotonic() - inicio,
+            bloqueado=bloqueado,
+            retry_after=retry_after,
+        )
+
+        if bloqueado:
             bloqueos += 1
             if bloqueos > HTTP_MAX_BLOQUEOS:
                 raise SecopBlockedError(
                     "El WAF de contratos.gov.co bloqueó la IP de forma "
-                    "persistente. Espera unos minutos o sube SECOP_DELAY.",
+                    "persistente. Espera unos minutos antes de reintentar.",
                     context={"url": url, "status": respuesta.status_code},
                 )
             logger.warning(
-                "WAF bloqueó la petición (403). Esperando %.0f s antes de "
-                "reintentar (bloqueo %d/%d).",
-                HTTP_DELAY_BLOQUEO, bloqueos, HTTP_MAX_BLOQUEOS,
+                "WAF bloqueó la petición (%d). Se reintenta tras la pausa "
+                "(bloqueo %d/%d).",
+                respuesta.status_code, bloqueos, HTTP_MAX_BLOQUEOS,
+            )
+            continue
+
+        if respuesta.status_code == 429:
+            # Limitación sin página del WAF: el controlador ya aplicó la
+            # pausa de Retry-After; se reintenta como un fallo más.
+            ultimo_error = requests.HTTPError(f"429 en {url}")
+            logger.warning(
+                "El portal pidió bajar el ritmo (429, intento %d/%d).",
+                intento, MAX_RETRIES,
             )
-            time.sleep(HTTP_DELAY_BLOQUEO)
             continue
 
         respuesta.encoding = "utf-8"
+        if archivo is not None and respuesta.status_code != 304:
+            try:
+                archivo.guardar_respuesta(url, params, respuesta)
+            except Exception as exc:  # noqa: BLE001 - archivar no debe cortar el rastreo
+                logger.debug("No se pudo archivar %s: %s", url, exc)
         return respuesta
 
     raise SecopTimeoutError(
@@ -329,23 +388,48 @@ def descargar_pagina(
     return respuesta.text
 
 
-def ejecutar_scraping_http(
+def abrir_bitacora(
+    params: SearchParams, reanudar: bool = False, sesion: Optional[str] = None
+) -> Bitacora:
+    """Bitácora de páginas de una búsqueda (ver ``bitacora.py``).
+
+    La clave es la query string canónica que recibe el portal, sin el
+    número de página ni los filtros que se aplican en local: con
+    ``reanudar``, una búsqueda que pide lo mismo al portal retoma el
+    progreso de la anterior.
+    """
+    consulta = construir_parametros(params.normalizada())
+    consulta.pop(PARAM_PAGINA)
+    return Bitacora("secop1", consulta, reanudar=reanudar, sesion=sesion)
+
+
+def iterar_paginas_http(
     params: SearchParams,
     sesion: Optional[requests.Session] = None,
-) -> list[str]:
-    """Recorre todas las páginas de resultados usando HTTP directo.
-
-    Flujo:
-      1. Calentar la sesión (cookies).
-      2. Descargar la página 1 y leer ``totalResultados``.
-      3. Calcular cuántas páginas hay y descargarlas con pausas.
+    bitacora: Optional[Bitacora] = None,
+    calentada: bool = False,
+    primera_pagina: Optional[str] = None,
+) -> Iterator[str]:
+    """Descarga las páginas de resultados de una en una, bajo demanda.
+
+    Es la base de ``ejecutar_scraping_http`` y de ``flujo.py``: cada
+    página se entrega en cuanto llega, sin acumular las anteriores, y la
+    pausa de cortesía (la del ritmo adaptativo de ``_get``) se hace antes
+    de pedir la siguiente. Quien consume puede procesar la página
+    mientras tanto.
 
     Args:
-        params: Filtros de búsqueda (se normalizan internamente).
-        sesion: Sesión reutilizable (opcional).
-
-    Returns:
-        Lista de HTML, uno por página de resultados.
+        params:   Filtros de búsqueda (se normalizan internamente).
+        sesion:   Sesión reutilizable (opcional). Si no se pasa, se crea
+                  una y se cierra al agotar o cerrar el generador.
+        bitacora: Puntos de control. Cada página descargada se guarda y
+                  las que ya estaban se sirven sin volver al portal.
+        calentada: Si ``sesion`` ya visitó el formulario (no se repite).
+        primera_pagina: HTML de la página 1 si ya se descargó (al contar
+                  la consulta), para no volver a pedirla.
+
+    Yields:
+        HTML crudo de cada página, en orden.
 
     Raises:
         SecopEmptyTableError: Si la consulta no devuelve registros.
@@ -355,11 +439,27 @@ def ejecutar_scraping_http(
     sesion_propia = sesion is None
     sesion = sesion or crear_sesion()
 
-    try:
-        calentar_sesion(sesion)
+    def _pagina(numero: int) -> str:
+        nonlocal calentada
+        if numero == 1 and primera_pagina is not None:
+            return primera_pagina
+        elemento = f"pagina:{numero}"
+        if bitacora is not None:
+            guardada = bitacora.leer(elemento)
+            if guardada is not None:
+                logger.info("[HTTP] Página %d recuperada de la bitácora.", numero)
+                return guardada
+        if not calentada:
+            calentar_sesion(sesion)
+            calentada = True
+        html = descargar_pagina(sesion, params, numero)
+        if bitacora is not None:
+            bitacora.guardar(elemento, html)
+        return html
 
+    try:
         logger.info("[HTTP] Descargando página 1...")
-        primera = descargar_pagina(sesion, params, 1)
+        primera = _pagina(1)
 
         total = extraer_total_resultados(primera)
         if total == 0:
@@ -372,7 +472,8 @@ def ejecutar_scraping_http(
             logger.warning(
                 "No se pudo leer el total de resultados; se asume una sola página."
             )
-            return [primera]
+            yield primera
+            return
 
         paginas_totales = max(1, math.ceil(total / REGISTROS_POR_PAGINA))
         paginas_a_bajar = min(paginas_totales, params.max_pages)
@@ -382,26 +483,89 @@ def ejecutar_scraping_http(
             total, paginas_totales, paginas_a_bajar,
         )
 
-        paginas_html = [primera]
+        yield primera
+        del primera
 
         for numero in range(2, paginas_a_bajar + 1):
-            time.sleep(HTTP_DELAY)
+            # La pausa de cortesía la pone ``_get`` (ritmo adaptativo).
             logger.info("[HTTP] Descargando página %d/%d...", numero, paginas_a_bajar)
-            paginas_html.append(descargar_pagina(sesion, params, numero))
+            yield _pagina(numero)
 
-        logger.info("[HTTP] Descarga completada: %d páginas.", len(paginas_html))
-        return paginas_html
+    finally:
+        if sesion_propia:
+            sesion.close()
+
+
+def ejecutar_scraping_http(
+    params: SearchParams,
+    sesion: Optional[requests.Session] = None,
+    reanudar: bool = False,
+    particionar: bool = PARTICION_AUTOMATICA,
+) -> list[str]:
+    """Recorre todas las páginas de resultados usando HTTP directo.
+
+    Flujo:
+      1. Calentar la sesión (cookies).
+      2. Descargar la página 1 y leer ``totalResultados``.
+      3. Si no cabe en ``max_pages`` páginas, partir la consulta en
+         fragmentos que quepan (``particion.py``).
+      4. Descargar las páginas de cada fragmento con pausas.
+
+    En los rastreos largos (o con ``reanudar``) cada página queda en la
+    bitácora hasta que termina la descarga; si se corta,
+    ``reanudar=True`` continúa desde la última guardada.
+
+    Args:
+        params:      Filtros de búsqueda (se normalizan internamente).
+        sesion:      Sesión reutilizable (opcional).
+        reanudar:    Aprovechar las páginas de una ejecución interrumpida.
+        particionar: Partir las consultas que no caben en vez de
+                     truncarlas.
+
+    Returns:
+        Lista de HTML, uno por página de resultados. Entre fragmentos
+        puede haber filas repetidas: ``parser.parsear_todas_paginas`` las
+        descarta por ``id_proceso``.
 
+    Raises:
+        SecopEmptyTableError: Si la consulta no devuelve registros.
+        SecopBlockedError:    Si el WAF bloquea de forma persistente.
+    """
+    from particion import iterar_paginas_particionadas, planificar_consulta
+
+    sesion_propia = sesion is None
+    sesion = sesion or crear_sesion()
+    try:
+        plan = planificar_consulta(params, sesion, reanudar=reanudar, particionar=particionar)
+        try:
+            paginas_html = list(iterar_paginas_particionadas(plan, sesion))
+        except BaseException:
+            if plan.puntos_control:
+                logger.warning(
+                    "[HTTP] Descarga interrumpida; las páginas descargadas "
+                    "quedan en la bitácora. Repite con --reanudar para continuar."
+                )
+            raise
     finally:
         if sesion_propia:
             sesion.close()
 
+    plan.finalizar()
+    logger.info("[HTTP] Descarga completada: %d páginas.", len(paginas_html))
+    if len(plan.fragmentos) > 1:
+        logger.info("[HTTP] Cobertura:\n%s", plan.informe())
+    return paginas_html
+
 
 # ════════════════════════════════════════════════════════════
 # 6. RUTA SELENIUM (RESPALDO)
 # ════════════════════════════════════════════════════════════
 
 
+# ChromeDriver resuelto por el primer ``crear_driver`` del proceso.
+_ruta_chromedriver: Optional[str] = os.getenv("CHROMEDRIVER") or None
+
+
 def crear_driver():
     """Crea una instancia configurada de Chrome WebDriver.
 
@@ -410,6 +574,11 @@ def crear_driver():
     Linux, de modo que funciona igual en Windows, macOS y Linux.
     Se puede forzar con la variable de entorno ``CHROME_BINARY``.
 
+    El ChromeDriver se resuelve una vez por proceso (o se fija con
+    ``CHROMEDRIVER``) y los siguientes navegadores arrancan directamente
+    con esa ruta. Para no pagar el arranque en cada consulta, pide el
+    navegador a ``navegadores.pool_por_defecto()`` en lugar de crearlo.
+
     Returns:
         Instancia activa de ``webdriver.Chrome``.
 
@@ -447,15 +616,26 @@ def crear_driver():
     options.add_experimental_option("excludeSwitches", ["enable-automation"])
     options.add_experimental_option("useAutomationExtension", False)
 
+    global _ruta_chromedriver
     try:
-        try:
-            # Selenium 4.6+ resuelve el driver solo (Selenium Manager).
-            driver = webdriver.Chrome(options=options)
-        except WebDriverException:
-            from webdriver_manager.chrome import ChromeDriverManager
-
-            servicio = Service(ChromeDriverManager().install())
-            driver = webdriver.Chrome(service=servicio, options=options)
+        driver = None
+        if _ruta_chromedriver and Path(_ruta_chromedriver).exists():
+            # Ruta ya resuelta en este proceso: sin Selenium Manager ni
+            # webdriver-manager, que pueden consultar la red.
+            try:
+                driver = webdriver.Chrome(service=Service(_ruta_chromedriver), options=options)
+            except WebDriverException:
+                _ruta_chromedriver = None
+        if driver is None:
+            try:
+                # Selenium 4.6+ resuelve el driver solo (Selenium Manager).
+                driver = webdriver.Chrome(options=options)
+            except WebDriverException:
+                from webdriver_manager.chrome import ChromeDriverManager
+
+                servicio = Service(ChromeDriverManager().install())
+                driver = webdriver.Chrome(service=servicio, options=options)
+            _ruta_chromedriver = getattr(driver.service, "path", None)
     except Exception as exc:
         raise SecopFormError(
             "No se pudo inicializar Chrome WebDriver.",
@@ -539,12 +719,9 @@ def manejar_recaptcha(driver, timeout: int = 0) -> None:
     logger.warning(
         "reCAPTCHA detectado. Esperando resolución manual (%d s)...", timeout
     )
-    inicio = time.monotonic()
-    while time.monotonic() - inicio < timeout:
-        time.sleep(2)
-        if not _hay_reto_recaptcha(driver):
-            logger.info("reCAPTCHA resuelto.")
-            return
+    if _esperar(driver, lambda d: not _hay_reto_recaptcha(d), timeout, sondeo=1.0):
+        logger.info("reCAPTCHA resuelto.")
+        return
 
     raise SecopRecaptchaError(
         f"reCAPTCHA no resuelto tras {timeout} segundos.",
@@ -552,6 +729,86 @@ def manejar_recaptcha(driver, timeout: int = 0) -> None:
     )
 
 
+# ── Esperas por condición ───────────────────────────────────
+#
+# Cada espera termina en cuanto el DOM muestra lo que se espera, en vez
+# de dormir el peor caso en todas las páginas.
+
+
+def _esperar(
+    driver,
+    condicion,
+    timeout: float = DEFAULT_TIMEOUT,
+    sondeo: float = SELENIUM_SONDEO,
+) -> bool:
+    """``WebDriverWait`` que devuelve ``False`` en vez de lanzar al vencer."""
+    from selenium.common.exceptions import TimeoutException
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=sondeo).until(condicion)
+        return True
+    except TimeoutException:
+        return False
+
+
+class _RedInactiva:
+    """Condición: documento cargado y sin peticiones nuevas un rato.
+
+    Cuenta los recursos de ``performance`` y las peticiones jQuery en
+    curso; la red está inactiva cuando el recuento no cambia durante
+    ``quietud`` segundos. Es la señal de respaldo para páginas sin
+    marcadores conocidos.
+    """
+
+    _JS = (
+        "return [document.readyState,"
+        " performance.getEntriesByType('resource').length,"
+        " window.jQuery ? jQuery.active : 0];"
+    )
+
+    def __init__(self, quietud: float = SELENIUM_QUIETUD_RED) -> None:
+        self.quietud = quietud
+        self._recursos: Optional[int] = None
+        self._desde = time.monotonic()
+
+    def __call__(self, driver) -> bool:
+        estado, recursos, ajax = driver.execute_script(self._JS)
+        ahora = time.monotonic()
+        if estado != "complete" or ajax or recursos != self._recursos:
+            self._recursos = recursos
+            self._desde = ahora
+            return False
+        return ahora - self._desde >= self.quietud
+
+
+# Marcadores de una página de resultados completa: el input oculto con
+# el total o el texto "N registros encontrados" (también con 0).
+_JS_RESULTADOS_LISTOS = (
+    f"return document.querySelector(\"input[name='{CAMPO_TOTAL_RESULTADOS}']\") !== null"
+    " || /registros\\s+encontrados/i.test(document.body ? document.body.innerText : '');"
+)
+
+
+def _esperar_resultados(driver) -> None:
+    """Espera a que la página de resultados cargada esté completa."""
+    red = _RedInactiva()
+    if not _esperar(
+        driver, lambda d: d.execute_script(_JS_RESULTADOS_LISTOS) or red(d)
+    ):
+        logger.debug("La página de resultados no dio señal de estar lista.")
+
+
+def _iframe_resultados_presente(driver) -> bool:
+    """Si el iframe de resultados ya está en la página."""
+    from selenium.webdriver.common.by import By
+
+    return any(
+        "resultadosConsulta.do" in (iframe.get_attribute("src") or "")
+        for iframe in driver.find_elements(By.TAG_NAME, "iframe")
+    )
+
+
 def _rellenar_campo(driver, css: str, valor: Optional[str]) -> None:
     """Escribe en un campo de texto si el valor no es ``None``."""
     from selenium.common.exceptions import WebDriverException
@@ -588,20 +845,32 @@ def _seleccionar_por_valor(driver, css: str, valor: Optional[str]) -> None:
         )
 
 
-def _esperar_opciones(driver, css: str, timeout: int = 15) -> bool:
-    """Espera a que un ``<select>`` cargue sus opciones por AJAX/JS."""
-    from selenium.common.exceptions import TimeoutException, WebDriverException
+def _esperar_opciones(
+    driver, css: str, timeout: int = 15, valor: Optional[str] = None
+) -> bool:
+    """Espera a que un ``<select>`` cargue sus opciones por AJAX/JS.
+
+    Con ``valor``, espera a que exista justo esa opción: tras cambiar el
+    departamento, el select de municipios puede tener aún las opciones
+    viejas.
+    """
+    from selenium.common.exceptions import WebDriverException
     from selenium.webdriver.common.by import By
-    from selenium.webdriver.support.ui import Select, WebDriverWait
+
+    if valor:
+        selector = f"{css} option[value='{valor}']"
+        condicion = lambda d: bool(d.find_elements(By.CSS_SELECTOR, selector))  # noqa: E731
+    else:
+        selector = f"{css} option"
+        condicion = lambda d: len(d.find_elements(By.CSS_SELECTOR, selector)) > 1  # noqa: E731
 
     try:
-        WebDriverWait(driver, timeout).until(
-            lambda d: len(Select(d.find_element(By.CSS_SELECTOR, css)).options) > 1
-        )
-        return True
-    except (TimeoutException, WebDriverException):
-        logger.warning("El dropdown '%s' no cargó opciones en %d s.", css, timeout)
-        return False
+        if _esperar(driver, condicion, timeout):
+            return True
+    except WebDriverException:
+        pass
+    logger.warning("El dropdown '%s' no cargó opciones en %d s.", css, timeout)
+    return False
 
 
 def rellenar_formulario(driver, params: SearchParams) -> None:
@@ -648,11 +917,12 @@ def rellenar_formulario(driver, params: SearchParams) -> None:
     _seleccionar_por_valor(driver, SEL_CUANTIA, params.cuantia)
 
     if params.municipio:
-        time.sleep(2.0)  # el municipio carga por AJAX tras elegir departamento
+        # El municipio carga por AJAX tras elegir departamento.
+        _esperar_opciones(driver, SEL_MUNICIPIO, valor=params.municipio)
         _seleccionar_por_valor(driver, SEL_MUNICIPIO, params.municipio)
 
     if params.estado:
-        _esperar_opciones(driver, SEL_ESTADO)
+        _esperar_opciones(driver, SEL_ESTADO, valor=params.estado)
         _seleccionar_por_valor(driver, SEL_ESTADO, params.estado)
 
     logger.info(
@@ -690,7 +960,8 @@ def enviar_formulario(driver) -> None:
                 context={"url": driver.current_url},
             ) from exc
 
-    time.sleep(PAGE_LOAD_WAIT)
+    # Listo cuando aparece el iframe de resultados (o un reCAPTCHA).
+    _esperar(driver, lambda d: _iframe_resultados_presente(d) or _hay_reto_recaptcha(d))
     manejar_recaptcha(driver)
 
 
@@ -726,7 +997,6 @@ def _url_iframe_resultados(driver) -> str:
 def ejecutar_scraping_selenium(
     params: SearchParams,
     driver=None,
-    cerrar_al_final: bool = True,
 ) -> list[str]:
     """Recorre los resultados usando un navegador real.
 
@@ -734,18 +1004,28 @@ def ejecutar_scraping_selenium(
     formulario reutiliza el endpoint del iframe para paginar, que es más
     fiable que pelearse con los controles de paginación.
 
+    Sin ``driver`` se pide un navegador ya abierto al pool
+    (``navegadores.py``) y se devuelve al terminar, en vez de arrancar y
+    cerrar Chrome en cada consulta. Un ``driver`` pasado no se cierra:
+    es de quien lo pasó.
+
     Args:
-        params:          Filtros de búsqueda.
-        driver:          WebDriver existente (opcional).
-        cerrar_al_final: Si cerrar el driver al terminar.
+        params: Filtros de búsqueda.
+        driver: WebDriver existente (opcional).
 
     Returns:
         Lista de HTML, uno por página de resultados.
     """
+    from selenium.common.exceptions import WebDriverException
+
+    from navegadores import pool_por_defecto
+
     params = params.normalizada()
+    pool = pool_por_defecto()
     driver_propio = driver is None
     if driver_propio:
-        driver = crear_driver()
+        driver = pool.tomar()
+    descartar = False
 
     try:
         rellenar_formulario(driver, params)
@@ -755,7 +1035,8 @@ def ejecutar_scraping_selenium(
         logger.debug("URL del iframe de resultados: %s", url_base)
 
         driver.get(url_base)
-        time.sleep(PAGE_LOAD_WAIT)
+        pool.anotar_paginas(driver)
+        _esperar_resultados(driver)
         primera = driver.page_source
 
         total = extraer_total_resultados(primera)
@@ -785,18 +1066,25 @@ def ejecutar_scraping_selenium(
                 f"{partes.scheme}://{partes.netloc}{partes.path}?"
                 + "&".join(f"{k}={v}" for k, v in consulta.items())
             )
-            time.sleep(HTTP_DELAY)
+            controlador_para(url_pagina).esperar()
             logger.info(
                 "[Selenium] Descargando página %d/%d...", numero, paginas_a_bajar
             )
             driver.get(url_pagina)
+            pool.anotar_paginas(driver)
+            _esperar_resultados(driver)
             paginas_html.append(driver.page_source)
 
         return paginas_html
 
+    except WebDriverException:
+        # Un navegador que falló no vuelve al pool.
+        descartar = True
+        raise
+
     finally:
-        if driver_propio and cerrar_al_final:
-            cerrar_driver(driver)
+        if driver_propio:
+            pool.devolver(driver, descartar=descartar)
 
 
 # ════════════════════════════════════════════════════════════
@@ -807,8 +1095,8 @@ def ejecutar_scraping_selenium(
 def ejecutar_scraping(
     params: SearchParams,
     driver=None,
-    cerrar_al_final: bool = True,
     usar_selenium: bool = False,
+    reanudar: bool = False,
 ) -> tuple[list[str], list[str]]:
     """Extrae todas las páginas de resultados de SECOP I.
 
@@ -817,9 +1105,11 @@ def ejecutar_scraping(
 
     Args:
         params:          Filtros de búsqueda.
-        driver:          WebDriver a reutilizar en la ruta Selenium.
-        cerrar_al_final: Si cerrar el driver al terminar.
+        driver:          WebDriver a reutilizar en la ruta Selenium (no
+                         se cierra al terminar).
         usar_selenium:   Forzar la ruta Selenium desde el principio.
+        reanudar:        Continuar una descarga HTTP interrumpida (ver
+                         ``bitacora.py``).
 
     Returns:
         Tupla ``(paginas_html, urls_detalle)``. La segunda lista se deja
@@ -831,7 +1121,7 @@ def ejecutar_scraping(
     """
     if not usar_selenium:
         try:
-            return ejecutar_scraping_http(params), []
+            return ejecutar_scraping_http(params, reanudar=reanudar), []
         except SecopEmptyTableError:
             raise
         except Exception as exc:  # noqa: BLE001 - se degrada a Selenium
@@ -840,4 +1130,4 @@ def ejecutar_scraping(
                 exc,
             )
 
-    return ejecutar_scraping_selenium(params, driver, cerrar_al_final), []
+    return ejecutar_scraping_selenium(params, driver), []
@@ -0,0 +1,337 @@
+"""
+sincronizacion.py — Sincronización incremental de SECOP II por marca de agua.
+
+Refrescar un departamento con ``api_scraper.consultar_contratos`` vuelve
+a descargar todo el conjunto filtrado, aunque en un día solo cambien
+unos pocos cientos de filas. Este módulo mantiene una **copia local**
+por consulta y solo pide a Socrata lo que cambió desde la última vez:
+
+  1. Cada consulta (filtros SoQL + dataset) se identifica por su huella
+     y tiene su carpeta en ``SYNC_DIR``: ``datos.parquet`` con la copia
+     tipada y ``estado.json`` con la marca de agua.
+  2. La marca de agua es el mayor ``:updated_at`` visto. Es un campo de
+     sistema de Socrata que cambia cada vez que el publicador modifica
+     la fila, así que no depende del reloj local.
+  3. Cada sincronización pide ``:updated_at >= marca`` y fusiona el
+     delta en la copia local por ``id_contrato`` (gana la versión más
+     reciente).
+  4. Un contrato modificado que ya **no cumple** los filtros (cambió de
+     estado, se reasignó a otro departamento) no llega en el delta. Por
+     eso se piden también, solo por su ``id_contrato``, los cambios desde
+     la marca que caen fuera del filtro, y se retiran de la copia.
+  5. La copia se escribe antes que la marca de agua: si el proceso se
+     interrumpe entre ambas, la siguiente pasada repite el delta en vez
+     de saltárselo.
+
+Limitaciones conocidas: Socrata no publica las filas **eliminadas**, así
+que un contrato retirado del dataset sigue en la copia local. Tampoco
+se detecta el que deja de cumplir el filtro porque un campo filtrado
+pasa a estar vacío: en SoQL ``NOT (campo = 'x')`` es nulo y la fila no
+sale en ninguna de las dos consultas. Una sincronización
+``completa=True`` reconstruye la copia desde cero.
+
+Uso:
+    >>> from sincronizacion import sincronizar
+    >>> df, resumen = sincronizar(departamento="Santander", estado="Celebrado")
+    >>> resumen["nuevos"], resumen["actualizados"]
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+import pandas as pd
+
+from api_scraper import construir_where, consultar_cambios, consultar_salientes
+from cache_disco import huella
+from cleaning import limpiar_dataframe
+from config import PARQUET_ENGINE, SOCRATA_DATASET_CONTRATOS, SYNC_DIR
+
+logger = logging.getLogger(__name__)
+
+# Nombre local de la columna ``:updated_at`` (los dos puntos no son
+# cómodos como nombre de columna en Parquet ni en pandas).
+COLUMNA_ACTUALIZACION = "actualizado_en_api"
+CLAVE_FUSION = "id_contrato"
+
+_ARCHIVO_DATOS = "datos.parquet"
+_ARCHIVO_ESTADO = "estado.json"
+
+
+# ────────────────────────────────────────────────────────────
+# ESTADO DE LA COPIA LOCAL
+# ────────────────────────────────────────────────────────────
+
+
+@dataclass
+class EstadoSincronizacion:
+    """Marca de agua y metadatos de la copia local de una consulta.
+
+    Attributes:
+        clave:           Huella de la consulta (dataset + ``$where``).
+        dataset:         Dataset de Socrata.
+        where:           Filtro SoQL de la consulta.
+        marca_agua:      Mayor ``:updated_at`` incorporado (ISO 8601).
+        registros:       Filas en la copia local.
+        sincronizado_en: Fecha de la última sincronización (ISO 8601).
+    """
+
+    clave: str
+    dataset: str
+    where: str
+    marca_agua: Optional[str] = None
+    registros: int = 0
+    sincronizado_en: Optional[str] = None
+    filtros: dict[str, Any] = field(default_factory=dict)
+
+
+def _escribir_atomico(destino: Path, escribir) -> None:
+    """Escribe en un temporal y lo renombra sobre ``destino``."""
+    temporal = destino.with_name(f".{destino.name}.{os.getpid()}.tmp")
+    try:
+        escribir(temporal)
+        os.replace(temporal, destino)
+    finally:
+        temporal.unlink(missing_ok=True)
+
+
+def leer_estado(carpeta: Path) -> Optional[EstadoSincronizacion]:
+    """Lee ``estado.json`` de una carpeta de sincronización.
+
+    Returns:
+        El estado, o ``None`` si la carpeta no se ha sincronizado nunca
+        o el archivo está corrupto.
+    """
+    ruta = carpeta / _ARCHIVO_ESTADO
+    if not ruta.exists():
+        return None
+    try:
+        return EstadoSincronizacion(**json.loads(ruta.read_text(encoding="utf-8")))
+    except (OSError, ValueError, TypeError) as exc:
+        logger.warning("Estado de sincronización ilegible en %s: %s", ruta, exc)
+        return None
+
+
+def _guardar_estado(carpeta: Path, estado: EstadoSincronizacion) -> None:
+    texto = json.dumps(asdict(estado), ensure_ascii=False, indent=2, default=str)
+    _escribir_atomico(
+        carpeta / _ARCHIVO_ESTADO,
+        lambda ruta: ruta.write_text(texto, encoding="utf-8"),
+    )
+
+
+def leer_copia_local(carpeta: Path) -> pd.DataFrame:
+    """Lee la copia local de una carpeta (vacía si no existe)."""
+    ruta = carpeta / _ARCHIVO_DATOS
+    if not ruta.exists():
+        return pd.DataFrame()
+    return pd.read_parquet(ruta, engine=PARQUET_ENGINE)
+
+
+# ────────────────────────────────────────────────────────────
+# FUSIÓN
+# ────────────────────────────────────────────────────────────
+
+
+def _fusionar(
+    actual: pd.DataFrame, delta: pd.DataFrame
+) -> tuple[pd.DataFrame, int, int]:
+    """Incorpora el delta a la copia local por ``id_contrato``.
+
+    El delta llega ordenado por ``:updated_at``, así que ante varias
+    versiones de un mismo contrato se conserva la última.
+
+    Returns:
+        ``(copia_fusionada, nuevos, actualizados)``.
+    """
+    delta = delta.drop_duplicates(subset=CLAVE_FUSION, keep="last")
+    if actual.empty:
+        return delta.reset_index(drop=True), len(delta), 0
+
+    existentes = actual[CLAVE_FUSION].isin(delta[CLAVE_FUSION])
+    actualizados = int(existentes.sum())
+    fusionado = pd.concat([actual[~existentes], delta], ignore_index=True)
+    return fusionado, len(delta) - actualizados, actualizados
+
+
+# ────────────────────────────────────────────────────────────
+# SINCRONIZACIÓN
+# ────────────────────────────────────────────────────────────
+
+
+def sincronizar(
+    departamento: Optional[str] = None,
+    modalidad: Optional[str | Iterable[str]] = None,
+    estado: Optional[str] = None,
+    palabra_clave: Optional[str] = None,
+    fecha_inicio: Optional[str] = None,
+    fecha_fin: Optional[str] = None,
+    tipo_contrato: Optional[str | Iterable[str]] = None,
+    dataset: str = SOCRATA_DATASET_CONTRATOS,
+    directorio: Path = SYNC_DIR,
+    completa: bool = False,
+) -> tuple[pd.DataFrame, dict[str, Any]]:
+    """Trae los cambios desde la última sincronización y los fusiona.
+
+    La primera vez (o con ``completa=True``) descarga todo el conjunto
+    filtrado; las siguientes, solo las filas con ``:updated_at`` igual o
+    posterior a la marca de agua.
+
+    Args:
+        departamento … tipo_contrato: Filtros, con la misma semántica que
+                        ``api_scraper.consultar_contratos``.
+        dataset:        Dataset a consultar.
+        directorio:     Raíz de las copias locales.
+        completa:       Ignorar la marca de agua y reconstruir la copia.
+
+    Returns:
+        ``(copia_completa, resumen)``. El resumen incluye ``nuevos``,
+        ``actualizados``, ``retirados`` (dejaron de cumplir el filtro),
+        ``descargados``, ``total``, ``desde`` (marca usada),
+        ``marca_agua`` (nueva) y ``carpeta``.
+
+    Raises:
+        RuntimeError: Si la consulta a la API falla (se propaga de
+            ``api_scraper``). La copia local y la marca quedan intactas.
+    """
+    where = construir_where(
+        departamento, modalidad, estado, palabra_clave,
+        fecha_inicio, fecha_fin, tipo_contrato,
+    )
+    clave = huella("sincronizacion", dataset, where)
+    carpeta = Path(directorio) / clave[:16]
+    carpeta.mkdir(parents=True, exist_ok=True)
+
+    anterior = None if completa else leer_estado(carpeta)
+    desde = anterior.marca_agua if anterior else None
+    actual = leer_copia_local(carpeta) if anterior else pd.DataFrame()
+
+    logger.info(
+        "Sincronizando %s (%s) desde %s...",
+        dataset, where or "sin filtros", desde or "el origen",
+    )
+    crudo = consultar_cambios(where, desde=desde, dataset=dataset)
+    salientes: set[str] = set()
+    if desde and where and not actual.empty:
+        salientes = consultar_salientes(where, desde, dataset=dataset)
+
+    marca_agua = desde
+    if not crudo.empty and crudo[":updated_at"].notna().any():
+        # ISO 8601 con la misma precisión: el orden lexicográfico es el
+        # cronológico.
+        marca_agua = str(crudo[":updated_at"].dropna().max())
+
+    delta = crudo.rename(columns={":updated_at": COLUMNA_ACTUALIZACION})
+    if desde and not actual.empty:
+        # El corte es inclusivo: las filas que tienen justo la marca
+        # anterior y ya están en la copia no son cambios nuevos.
+        repetidas = (delta[COLUMNA_ACTUALIZACION] == desde) & delta[
+            CLAVE_FUSION
+        ].isin(actual[CLAVE_FUSION])
+        delta = delta[~repetidas]
+
+    sin_clave = delta[CLAVE_FUSION].isna() | (
+        delta[CLAVE_FUSION].astype(str).str.strip() == ""
+    )
+    if sin_clave.any():
+        logger.warning(
+            "%d registros sin %s descartados (no se pueden fusionar).",
+            int(sin_clave.sum()), CLAVE_FUSION,
+        )
+        delta = delta[~sin_clave]
+
+    nuevos = actualizados = retirados = 0
+    copia = actual
+    if salientes:
+        # Una fila que aparece en el delta volvió a cumplir el filtro
+        # después: manda el delta.
+        salientes -= set(delta[CLAVE_FUSION].astype(str))
+        fuera = copia[CLAVE_FUSION].astype(str).isin(salientes)
+        retirados = int(fuera.sum())
+        copia = copia[~fuera].reset_index(drop=True)
+    if not delta.empty:
+        delta = limpiar_dataframe(delta)
+        copia, nuevos, actualizados = _fusionar(copia, delta)
+
+    if anterior is None or retirados or not delta.empty:
+        # Primero la copia, después la marca (ver docstring del módulo).
+        # Una reconstrucción completa siempre reescribe la copia, aunque
+        # quede vacía: si no, la siguiente sincronización fusionaría
+        # sobre un ``datos.parquet`` anterior que la marca ya no describe.
+        _escribir_atomico(
+            carpeta / _ARCHIVO_DATOS,
+            lambda ruta: copia.to_parquet(ruta, index=False, engine=PARQUET_ENGINE),
+        )
+
+    _guardar_estado(
+        carpeta,
+        EstadoSincronizacion(
+            clave=clave,
+            dataset=dataset,
+            where=where,
+            marca_agua=marca_agua,
+            registros=len(copia),
+            sincronizado_en=datetime.now().isoformat(timespec="seconds"),
+            filtros={
+                "departamento": departamento,
+                "modalidad": modalidad,
+                "estado": estado,
+                "palabra_clave": palabra_clave,
+                "fecha_inicio": fecha_inicio,
+                "fecha_fin": fecha_fin,
+                "tipo_contrato": tipo_contrato,
+            },
+        ),
+    )
+
+    resumen = {
+        "desde": desde,
+        "marca_agua": marca_agua,
+        "descargados": len(crudo),
+        "nuevos": nuevos,
+        "actualizados": actualizados,
+        "retirados": retirados,
+        "total": len(copia),
+        "carpeta": carpeta,
+    }
+    logger.info(
+        "Sincronización completada: %d descargados, %d nuevos, "
+        "%d actualizados, %d retirados por dejar de cumplir el filtro, "
+        "%d en la copia local.",
+        len(crudo), nuevos, actualizados, retirados, len(copia),
+    )
+    return copia, resumen
+
+
+def sincronizar_desde_params(
+    params,
+    tipo_contrato: Optional[str] = None,
+    **kwargs: Any,
+) -> tuple[pd.DataFrame, dict[str, Any]]:
+    """Sincroniza usando un ``SearchParams`` de ``config.py``.
+
+    Args:
+        params:        Instancia de ``SearchParams``.
+        tipo_contrato: Filtro de tipo de contrato (no existe en SECOP I).
+        **kwargs:      ``dataset``, ``directorio`` o ``completa``.
+
+    Returns:
+        Igual que ``sincronizar``.
+    """
+    return sincronizar(
+        departamento=params.departamento,
+        modalidad=params.modalidad,
+        estado=params.estado,
+        palabra_clave=params.palabra_clave,
+        fecha_inicio=params.fecha_inicio,
+        fecha_fin=params.fecha_fin,
+        tipo_contrato=tipo_contrato,
+        **kwargs,
+    )
+
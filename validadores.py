@@ -0,0 +1,171 @@
+"""
+validadores.py — Revalidación HTTP de las fichas de detalle.
+
+Refrescar una base de detalles volvía a descargar y parsear cada ficha
+(``detalleProceso.do``), aunque la mayoría son de procesos cerrados que
+no cambian nunca. Este módulo guarda, por URL, los validadores HTTP de
+la última descarga y el resultado ya parseado:
+
+  • **Petición condicional**: si el portal envió ``ETag`` o
+    ``Last-Modified``, la siguiente petición lleva ``If-None-Match`` /
+    ``If-Modified-Since``. Un 304 cuesta un viaje de ida y vuelta sin
+    cuerpo y reutiliza el resultado guardado.
+  • **Huella del cuerpo**: donde el portal ignora los validadores y
+    responde 200 de todos modos, el SHA-256 del cuerpo dice si la ficha
+    cambió; si no, se reutiliza el resultado sin volver a parsear.
+  • **Procesos cerrados**: una ficha en estado terminal (liquidado,
+    descartado, terminado) comprobada hace menos de
+    ``VALIDADORES_FRESCURA_CERRADOS`` no se vuelve a pedir.
+
+El almacén es una tabla SQLite (``VALIDADORES_ARCHIVO``) compartida por
+todos los procesos. Si no se puede abrir, las fichas se descargan
+enteras como siempre.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from config import (
+    ESTADOS_CERRADOS_SECOP1,
+    VALIDADORES_ARCHIVO,
+    VALIDADORES_FRESCURA_CERRADOS,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class EntradaValidador:
+    """Lo que se sabe de la última descarga de una URL."""
+
+    url: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    sha256: str
+    resultado: dict
+    comprobado: float
+
+    def cabeceras_condicionales(self) -> dict[str, str]:
+        """Cabeceras ``If-None-Match`` / ``If-Modified-Since`` aplicables."""
+        cabeceras = {}
+        if self.etag:
+            cabeceras["If-None-Match"] = self.etag
+        if self.last_modified:
+            cabeceras["If-Modified-Since"] = self.last_modified
+        return cabeceras
+
+    @property
+    def cerrado(self) -> bool:
+        """Si la ficha es de un proceso en estado terminal."""
+        estado = str(self.resultado.get("estado", "")).strip().lower()
+        return any(estado.startswith(cerrado) for cerrado in ESTADOS_CERRADOS_SECOP1)
+
+    def vigente(self, frescura: float = VALIDADORES_FRESCURA_CERRADOS) -> bool:
+        """Si se puede reutilizar sin preguntar al portal."""
+        return self.cerrado and time.time() - self.comprobado < frescura
+
+
+class CacheValidadores:
+    """Validadores HTTP y resultado parseado por URL.
+
+    Args:
+        ruta: Base SQLite del almacén.
+
+    Raises:
+        OSError, sqlite3.Error: Si la base no se puede abrir.
+    """
+
+    def __init__(self, ruta: Path = VALIDADORES_ARCHIVO) -> None:
+        self._ruta = Path(ruta)
+        self._ruta.parent.mkdir(parents=True, exist_ok=True)
+        self._cerrojo = threading.Lock()
+        with closing(self._conectar()) as conexion:
+            conexion.execute("PRAGMA journal_mode=WAL")
+            conexion.execute(
+                """
+                CREATE TABLE IF NOT EXISTS validadores (
+                    url           TEXT PRIMARY KEY,
+                    etag          TEXT,
+                    last_modified TEXT,
+                    sha256        TEXT NOT NULL,
+                    resultado     TEXT NOT NULL,
+                    comprobado    REAL NOT NULL
+                )
+                """
+            )
+
+    def _conectar(self) -> sqlite3.Connection:
+        return sqlite3.connect(self._ruta, timeout=30, isolation_level=None)
+
+    def obtener(self, url: str) -> Optional[EntradaValidador]:
+        """Entrada guardada para ``url``, o ``None``."""
+        with closing(self._conectar()) as conexion:
+            fila = conexion.execute(
+                "SELECT url, etag, last_modified, sha256, resultado, comprobado "
+                "FROM validadores WHERE url = ?",
+                (url,),
+            ).fetchone()
+        if fila is None:
+            return None
+        url, etag, last_modified, sha256, resultado, comprobado = fila
+        return EntradaValidador(
+            url, etag, last_modified, sha256, json.loads(resultado), comprobado
+        )
+
+    def guardar(
+        self,
+        url: str,
+        etag: Optional[str],
+        last_modified: Optional[str],
+        sha256: str,
+        resultado: dict,
+    ) -> None:
+        """Registra una descarga completa y su resultado parseado."""
+        with self._cerrojo, closing(self._conectar()) as conexion:
+            conexion.execute(
+                "INSERT OR REPLACE INTO validadores "
+                "(url, etag, last_modified, sha256, resultado, comprobado) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    url, etag, last_modified, sha256,
+                    json.dumps(resultado, ensure_ascii=False), time.time(),
+                ),
+            )
+
+    def confirmar(self, url: str) -> None:
+        """Anota que la ficha se comprobó ahora y no había cambiado."""
+        with self._cerrojo, closing(self._conectar()) as conexion:
+            conexion.execute(
+                "UPDATE validadores SET comprobado = ? WHERE url = ?",
+                (time.time(), url),
+            )
+
+
+_cache: Optional[CacheValidadores] = None
+_cache_fallida = False
+_cerrojo_cache = threading.Lock()
+
+
+def validadores_por_defecto() -> Optional[CacheValidadores]:
+    """Almacén compartido del proceso, o ``None`` si no está disponible."""
+    global _cache, _cache_fallida
+    with _cerrojo_cache:
+        if _cache is None and not _cache_fallida:
+            try:
+                _cache = CacheValidadores()
+            except (OSError, sqlite3.Error) as exc:
+                _cache_fallida = True
+                logger.warning(
+                    "Validadores HTTP no disponibles en %s (%s); las fichas "
+                    "se descargarán enteras.", VALIDADORES_ARCHIVO, exc,
+                )
+        return _cache